@@ -1,12 +1,20 @@
 """Adapters for integrating AAP with external systems (e.g., git)."""
 
 from .git_adapter import (  # noqa: F401
+    commit_staged_paths,
     create_commit,
     create_tag,
+    create_tag_object,
     default_repo_root,
     ensure_repo,
     has_staged_changes,
+    head_ref,
+    list_staged_changes,
     list_staged_files,
     push,
+    push_refspecs,
+    rev_parse,
     stage_all,
+    update_refs,
 )
+from .worktree_pool import Lease, WorktreePool  # noqa: F401
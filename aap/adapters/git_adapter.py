@@ -1,13 +1,23 @@
+import os
 import subprocess
+import tempfile
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 from .. import config
+from .push_queue import PushResult, default_coordinator
 
 
-def _run_git(args: list[str], cwd: Optional[Path] = None) -> str:
+def _run_git(
+    args: list[str],
+    cwd: Optional[Path] = None,
+    env: Optional[Dict[str, str]] = None,
+    input: Optional[str] = None,
+) -> str:
     cmd = ["git"] + args
-    result = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True)
+    result = subprocess.run(
+        cmd, cwd=cwd, capture_output=True, text=True, input=input, env={**os.environ, **env} if env else None
+    )
     if result.returncode != 0:
         raise RuntimeError(result.stderr.strip() or f"git command failed: {' '.join(cmd)}")
     return (result.stdout or "").strip()
@@ -27,6 +37,13 @@ def list_staged_files(cwd: Optional[Path] = None) -> list[str]:
     return [line.strip() for line in output.splitlines() if line.strip()]
 
 
+def list_staged_changes(cwd: Optional[Path] = None) -> List[Tuple[str, str]]:
+    """Return (status, path) pairs for staged changes; renames appear as D + A."""
+    output = _run_git(["diff", "--cached", "--name-status", "--no-renames", "-z"], cwd=cwd)
+    fields = [f for f in output.split("\0") if f]
+    return [(fields[i][0], fields[i + 1]) for i in range(0, len(fields) - 1, 2)]
+
+
 def stage_all(cwd: Optional[Path] = None) -> None:
     _run_git(["add", "-A"], cwd=cwd)
 
@@ -47,15 +64,120 @@ def create_tag(tag_name: str, message: str, cwd: Optional[Path] = None) -> None:
     _run_git(["tag", "-a", tag_name, "-m", message], cwd=cwd)
 
 
-def push(branch: Optional[str] = None, push_tags: bool = False, cwd: Optional[Path] = None) -> None:
+def rev_parse(rev: str, cwd: Optional[Path] = None) -> str:
+    return _run_git(["rev-parse", "--verify", rev], cwd=cwd)
+
+
+def head_ref(cwd: Optional[Path] = None) -> str:
+    """Return the symbolic ref HEAD points at (e.g. refs/heads/main), or HEAD if detached."""
+    try:
+        return _run_git(["symbolic-ref", "-q", "HEAD"], cwd=cwd)
+    except RuntimeError:
+        return "HEAD"
+
+
+def update_ref(ref: str, new: str, cwd: Optional[Path] = None) -> None:
+    """Point ``ref`` at ``new`` (created or moved), so the commit stays reachable."""
+    _run_git(["update-ref", ref, new], cwd=cwd)
+
+
+def rebase_onto_remote(branch: str, remote: str = "origin", cwd: Optional[Path] = None) -> bool:
+    """Replay HEAD's own commits onto ``remote``'s ``branch``, so pushing HEAD there
+    fast-forwards. Returns False (nothing done) when the branch does not exist there yet."""
+    if not _run_git(["ls-remote", "--heads", remote, f"refs/heads/{branch}"], cwd=cwd):
+        return False
+    _run_git(["fetch", "--quiet", remote, f"refs/heads/{branch}"], cwd=cwd)
+    try:
+        _run_git(["rebase", "--quiet", "--autostash", "FETCH_HEAD"], cwd=cwd)
+    except RuntimeError as exc:
+        try:
+            _run_git(["rebase", "--abort"], cwd=cwd)
+        except RuntimeError:
+            pass
+        raise RuntimeError(f"Cannot rebase onto {remote}/{branch} (resolve and push by hand): {exc}")
+    return True
+
+
+def commit_staged_paths(
+    parent: str,
+    changes: List[Tuple[str, str]],
+    message: str,
+    cwd: Optional[Path] = None,
+) -> str:
+    """Create a commit on ``parent`` containing only the staged state of ``changes``.
+
+    Works on a temporary index, so the real index, working tree and HEAD are
+    untouched; no refs are updated and commit hooks do not run.
+    """
+    paths = [path for _, path in changes]
+    removed = [path for status, path in changes if status == "D"]
+    entries = _run_git(["ls-files", "-s", "-z", "--"] + paths, cwd=cwd) if len(removed) < len(paths) else ""
+    with tempfile.TemporaryDirectory(prefix="aap-index-") as tmp:
+        env = {"GIT_INDEX_FILE": str(Path(tmp) / "index")}
+        _run_git(["read-tree", parent], cwd=cwd, env=env)
+        if entries:
+            _run_git(["update-index", "-z", "--index-info"], cwd=cwd, env=env, input=entries)
+        if removed:
+            _run_git(["update-index", "--force-remove", "--"] + removed, cwd=cwd, env=env)
+        tree = _run_git(["write-tree"], cwd=cwd, env=env)
+    return _run_git(["commit-tree", tree, "-p", parent, "-m", message], cwd=cwd)
+
+
+def create_tag_object(tag_name: str, target: str, message: str, cwd: Optional[Path] = None) -> str:
+    """Write an annotated tag object without creating its ref."""
+    tagger = _run_git(["var", "GIT_COMMITTER_IDENT"], cwd=cwd)
+    body = f"object {target}\ntype commit\ntag {tag_name}\ntagger {tagger}\n\n{message}\n"
+    return _run_git(["mktag"], cwd=cwd, input=body)
+
+
+def update_refs(updates: List[Tuple[str, str, Optional[str]]], cwd: Optional[Path] = None) -> None:
+    """Apply (ref, new, old) updates in one atomic ``update-ref --stdin`` transaction.
+
+    ``old=None`` requires the ref not to exist yet.
+    """
+    lines = []
+    for ref, new, old in updates:
+        lines.append(f"create {ref} {new}" if old is None else f"update {ref} {new} {old}")
+    _run_git(["update-ref", "--stdin"], cwd=cwd, input="\n".join(lines) + "\n")
+
+
+def push_refspecs(refspecs: List[str], remote: str = "origin", cwd: Optional[Path] = None) -> PushResult:
+    """Push explicit refspecs through the coalescing push queue; raise on failure."""
+    ensure_repo(cwd)
+    result = default_coordinator().push(refspecs, remote=remote, cwd=cwd)
+    if not result.ok:
+        failed = [f"{ref} {status}" for ref, status in result.refs.items() if status not in ("ok", "up-to-date")]
+        raise RuntimeError(result.error or "; ".join(failed) or "git push failed")
+    return result
+
+
+def push(
+    branch: Optional[str] = None,
+    push_tags: bool = False,
+    cwd: Optional[Path] = None,
+    source: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+) -> PushResult:
+    """Push ``branch`` (default: the current branch) to origin with explicit refspecs.
+
+    ``source`` pushes that rev instead (e.g. a detached HEAD). Only the given
+    ``tags`` are pushed; ``push_tags`` adds tags pointing at the pushed commit,
+    never every local tag.
+    """
     ensure_repo(cwd)
-    push_args = ["push"]
-    if branch:
-        push_args.append("origin")
-        push_args.append(branch)
-    _run_git(push_args, cwd=cwd)
+    if not branch:
+        ref = head_ref(cwd=cwd)
+        if ref == "HEAD":
+            raise RuntimeError("HEAD is detached; pass a branch to push")
+        branch = ref[len("refs/heads/"):]
+    rev = source or f"refs/heads/{branch}"
+    refspecs = [f"{rev}:refs/heads/{branch}"]
+    tag_names = list(tags or [])
     if push_tags:
-        _run_git(["push", "--tags"], cwd=cwd)
+        pointing = _run_git(["tag", "--points-at", rev], cwd=cwd).splitlines()
+        tag_names.extend(t for t in pointing if t and t not in tag_names)
+    refspecs.extend(f"refs/tags/{name}" for name in tag_names)
+    return push_refspecs(refspecs, cwd=cwd)
 
 
 def default_repo_root() -> Path:
@@ -0,0 +1,197 @@
+"""Coalescing push coordinator for git_adapter.push.
+
+Push requests are queued and a background thread collects everything that
+arrives within a short window, merges the refspecs per (repo, remote) into a
+single ``git push --porcelain`` and retries transient failures with
+exponential backoff. Each caller gets its own per-ref completion status.
+A cross-process file lock keeps pushes from separate processes from racing.
+"""
+
+import queue
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .. import config
+from ..utils import file_lock
+
+# stderr fragments that indicate a retryable (network/remote) failure
+TRANSIENT_ERRORS = (
+    "could not read from remote repository",
+    "connection reset",
+    "connection timed out",
+    "operation timed out",
+    "the remote end hung up",
+    "early eof",
+    "could not resolve host",
+    "unable to access",
+    "rpc failed",
+    "cannot lock ref",
+)
+
+Runner = Callable[[List[str], Optional[Path]], subprocess.CompletedProcess]
+
+
+def _run(args: List[str], cwd: Optional[Path]) -> subprocess.CompletedProcess:
+    return subprocess.run(["git"] + args, cwd=cwd, capture_output=True, text=True)
+
+
+def _destination(refspec: str) -> str:
+    dst = refspec.lstrip("+").split(":", 1)[-1]
+    if dst.startswith("refs/"):
+        return dst
+    return f"refs/heads/{dst}"
+
+
+@dataclass
+class PushResult:
+    ok: bool
+    refs: Dict[str, str] = field(default_factory=dict)  # destination ref -> "ok" | "up-to-date" | "rejected: ..."
+    error: Optional[str] = None
+    attempts: int = 0
+    coalesced: int = 1  # number of requests served by the same git push
+
+
+class PushRequest:
+    def __init__(self, refspecs: List[str], remote: str, cwd: Optional[Path]) -> None:
+        self.refspecs = refspecs
+        self.remote = remote
+        self.cwd = cwd
+        self.result: Optional[PushResult] = None
+        self._done = threading.Event()
+
+    def wait(self, timeout: Optional[float] = None) -> PushResult:
+        if not self._done.wait(timeout):
+            raise TimeoutError("push did not complete in time")
+        assert self.result is not None
+        return self.result
+
+    def _finish(self, result: PushResult) -> None:
+        self.result = result
+        self._done.set()
+
+
+class PushCoordinator:
+    def __init__(
+        self,
+        window: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        backoff: Optional[float] = None,
+        runner: Optional[Runner] = None,
+    ) -> None:
+        self.window = config.PUSH_COALESCE_WINDOW if window is None else window
+        self.max_attempts = max_attempts or config.PUSH_MAX_ATTEMPTS
+        self.backoff = config.PUSH_RETRY_BACKOFF if backoff is None else backoff
+        self.runner = runner or _run
+        self.pushes = 0  # git push invocations, for observability/tests
+        self._queue: "queue.Queue[PushRequest]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, refspecs: List[str], remote: str = "origin", cwd: Optional[Path] = None) -> PushRequest:
+        request = PushRequest(list(refspecs), remote, Path(cwd) if cwd else None)
+        self._ensure_worker()
+        self._queue.put(request)
+        return request
+
+    def push(self, refspecs: List[str], remote: str = "origin", cwd: Optional[Path] = None) -> PushResult:
+        return self.submit(refspecs, remote=remote, cwd=cwd).wait()
+
+    def _ensure_worker(self) -> None:
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="aap-push-queue", daemon=True)
+                self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            groups: Dict[Tuple[Optional[Path], str], List[PushRequest]] = {}
+            for request in batch:
+                groups.setdefault((request.cwd, request.remote), []).append(request)
+            for (cwd, remote), requests in groups.items():
+                try:
+                    self._push_group(cwd, remote, requests)
+                except Exception as exc:  # never leave callers waiting
+                    for request in requests:
+                        request._finish(PushResult(ok=False, error=str(exc)))
+
+    def _push_group(self, cwd: Optional[Path], remote: str, requests: List[PushRequest]) -> None:
+        # Later requests for the same destination win; order is otherwise preserved.
+        by_destination: Dict[str, str] = {}
+        for request in requests:
+            for refspec in request.refspecs:
+                by_destination[_destination(refspec)] = refspec
+        refspecs = list(by_destination.values())
+
+        statuses: Dict[str, str] = {}
+        error: Optional[str] = None
+        attempts = 0
+        while attempts < self.max_attempts:
+            attempts += 1
+            with file_lock(config.LOCK_DIR / "git-push.lock"):
+                self.pushes += 1
+                proc = self.runner(["push", "--porcelain", remote] + refspecs, cwd)
+            statuses = _parse_porcelain(proc.stdout or "")
+            if proc.returncode == 0:
+                error = None
+                break
+            error = (proc.stderr or "").strip() or f"git push exited with {proc.returncode}"
+            if not any(marker in error.lower() for marker in TRANSIENT_ERRORS):
+                break
+            time.sleep(self.backoff * (2 ** (attempts - 1)))
+
+        for request in requests:
+            refs = {}
+            for refspec in request.refspecs:
+                dst = _destination(refspec)
+                if by_destination[dst] != refspec:
+                    refs[dst] = "superseded"
+                else:
+                    refs[dst] = statuses.get(dst, "ok" if error is None else f"failed: {error}")
+            ok = all(status in ("ok", "up-to-date") for status in refs.values())
+            request._finish(
+                PushResult(ok=ok, refs=refs, error=None if ok else error, attempts=attempts, coalesced=len(requests))
+            )
+
+
+def _parse_porcelain(output: str) -> Dict[str, str]:
+    """Map destination refs to a status from ``git push --porcelain`` output."""
+    statuses: Dict[str, str] = {}
+    for line in output.splitlines():
+        parts = line.split("\t")
+        if len(parts) < 3 or len(parts[0]) != 1:
+            continue
+        flag, refs, summary = parts[0], parts[1], parts[2]
+        dst = refs.split(":", 1)[-1]
+        if flag == "=":
+            statuses[dst] = "up-to-date"
+        elif flag == "!":
+            statuses[dst] = f"rejected: {summary}"
+        else:
+            statuses[dst] = "ok"
+    return statuses
+
+
+_default: Optional[PushCoordinator] = None
+_default_lock = threading.Lock()
+
+
+def default_coordinator() -> PushCoordinator:
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = PushCoordinator()
+        return _default
@@ -0,0 +1,202 @@
+"""Pool of pre-created git worktrees leased one per proposal.
+
+Each slot is a detached ``git worktree`` that is reset to the base ref when it
+is handed out, so proposals never share an index or working tree. Lease state
+lives in small JSON files next to the slots and is only mutated under a pool
+file lock, which makes leasing safe across processes. Leases that outlive
+their TTL, or whose owning process died, are reclaimed.
+"""
+
+import json
+import os
+import socket
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from .. import config
+from ..utils import ensure_dir, file_lock
+from . import git_adapter
+from .git_adapter import _run_git
+
+
+@dataclass
+class Lease:
+    slot: str
+    path: str
+    proposal_id: str
+    host: str
+    leased_at: float
+    expires_at: float
+    owner_pid: Optional[int] = None
+
+    def is_stale(self, now: Optional[float] = None) -> bool:
+        if (now or time.time()) >= self.expires_at:
+            return True
+        if self.owner_pid is not None and self.host == socket.gethostname():
+            try:
+                os.kill(self.owner_pid, 0)
+            except ProcessLookupError:
+                return True
+            except PermissionError:
+                return False
+        return False
+
+
+class WorktreePool:
+    def __init__(
+        self,
+        repo_root: Optional[Path] = None,
+        pool_dir: Optional[Path] = None,
+        size: Optional[int] = None,
+        base_ref: Optional[str] = None,
+        lease_ttl: Optional[float] = None,
+    ) -> None:
+        self.repo_root = repo_root or git_adapter.default_repo_root()
+        # Default under the git common dir so slots never show up as untracked files.
+        self.pool_dir = pool_dir or config.WORKTREE_POOL_DIR or (
+            Path(_run_git(["rev-parse", "--path-format=absolute", "--git-common-dir"], cwd=self.repo_root))
+            / "aap-worktrees"
+        )
+        self.size = size or config.WORKTREE_POOL_SIZE
+        self.base_ref = base_ref or config.WORKTREE_BASE_REF
+        self.lease_ttl = lease_ttl if lease_ttl is not None else config.WORKTREE_LEASE_TTL
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with file_lock(config.LOCK_DIR / "worktree-pool.lock"):
+            yield
+
+    def _slot_path(self, slot: str) -> Path:
+        return self.pool_dir / slot
+
+    def _lease_file(self, slot: str) -> Path:
+        return self.pool_dir / f"{slot}.lease.json"
+
+    def _read_lease(self, slot: str) -> Optional[Lease]:
+        path = self._lease_file(slot)
+        if not path.exists():
+            return None
+        try:
+            return Lease(**json.loads(path.read_text()))
+        except (ValueError, TypeError):
+            return None
+
+    def _write_lease(self, lease: Lease) -> None:
+        path = self._lease_file(lease.slot)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(asdict(lease)))
+        os.replace(tmp, path)
+
+    def slots(self) -> List[str]:
+        if not self.pool_dir.exists():
+            return []
+        names = [p.name for p in self.pool_dir.iterdir() if p.is_dir() and p.name.startswith("slot-")]
+        return sorted(names, key=lambda name: int(name.split("-", 1)[1]))
+
+    def _create_slot(self) -> str:
+        existing = set(self.slots())
+        index = 0
+        while f"slot-{index}" in existing:
+            index += 1
+        slot = f"slot-{index}"
+        ensure_dir(self.pool_dir)
+        base = _run_git(["rev-parse", self.base_ref], cwd=self.repo_root)
+        _run_git(["worktree", "add", "--detach", str(self._slot_path(slot)), base], cwd=self.repo_root)
+        return slot
+
+    def prepare(self, count: Optional[int] = None) -> List[str]:
+        """Pre-create worktrees so leases do not pay for `git worktree add`."""
+        target = min(count or self.size, self.size)
+        with self._locked():
+            while len(self.slots()) < target:
+                self._create_slot()
+            return self.slots()
+
+    def reset(self, slot: str) -> None:
+        """Discard all changes in a slot and move it to the current base ref."""
+        path = self._slot_path(slot)
+        base = _run_git(["rev-parse", self.base_ref], cwd=self.repo_root)
+        _run_git(["checkout", "--quiet", "--detach", "--force", base], cwd=path)
+        _run_git(["clean", "-fdxq"], cwd=path)
+
+    def find(self, proposal_id: str) -> Optional[Lease]:
+        for slot in self.slots():
+            lease = self._read_lease(slot)
+            if lease and lease.proposal_id == proposal_id and not lease.is_stale():
+                return lease
+        return None
+
+    def leases(self) -> List[Lease]:
+        return [lease for lease in (self._read_lease(slot) for slot in self.slots()) if lease]
+
+    def lease(self, proposal_id: str, ttl: Optional[float] = None, owner_pid: Optional[int] = None) -> Lease:
+        """Lease a clean worktree for ``proposal_id`` (renewing an existing lease)."""
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.lease_ttl)
+        fresh = False
+        with self._locked():
+            chosen: Optional[str] = None
+            free: Optional[str] = None
+            for slot in self.slots():
+                current = self._read_lease(slot)
+                if current and current.proposal_id == proposal_id and not current.is_stale(now):
+                    chosen = slot
+                    break
+                if free is None and (current is None or current.is_stale(now)):
+                    free = slot
+            if chosen is None:
+                fresh = True
+                if free is not None:
+                    chosen = free
+                elif len(self.slots()) < self.size:
+                    chosen = self._create_slot()
+                else:
+                    raise RuntimeError(f"Worktree pool exhausted ({self.size} slots leased)")
+            lease = Lease(
+                slot=chosen,
+                path=str(self._slot_path(chosen)),
+                proposal_id=proposal_id,
+                host=socket.gethostname(),
+                leased_at=now,
+                expires_at=expires_at,
+                owner_pid=owner_pid,
+            )
+            self._write_lease(lease)
+        if fresh:
+            # Outside the pool lock: the slot is already marked as ours.
+            self.reset(chosen)
+        return lease
+
+    def release(self, proposal_id: str) -> bool:
+        with self._locked():
+            for slot in self.slots():
+                current = self._read_lease(slot)
+                if current and current.proposal_id == proposal_id:
+                    self.reset(slot)
+                    self._lease_file(slot).unlink()
+                    return True
+        return False
+
+    def reclaim_stale(self) -> List[str]:
+        """Reset and free every slot whose lease expired or whose owner died."""
+        reclaimed: List[str] = []
+        with self._locked():
+            for slot in self.slots():
+                current = self._read_lease(slot)
+                if current and current.is_stale():
+                    self.reset(slot)
+                    self._lease_file(slot).unlink()
+                    reclaimed.append(slot)
+        return reclaimed
+
+    @contextmanager
+    def leased(self, proposal_id: str, ttl: Optional[float] = None) -> Iterator[Lease]:
+        """Hold a lease for the duration of a block (reclaimable if this process dies)."""
+        lease = self.lease(proposal_id, ttl=ttl, owner_pid=os.getpid())
+        try:
+            yield lease
+        finally:
+            self.release(proposal_id)
@@ -0,0 +1,256 @@
+"""In-process admission control for the API: rate limits, concurrency caps, quotas.
+
+Limits are read from ``config.RATE_LIMIT_FILE`` (YAML/JSON) and picked up again
+when the file changes. A request is keyed by (API token, agent) and must pass,
+in order: the endpoint-class concurrency cap, the API token's aggregate bucket
+(``token_rate``/``token_burst``, shared by every agent the token names, so
+rotating agent names buys no extra burst), the token bucket for its key and,
+for proposal creation, the agent's quota of open PROPOSED/EVALUATED proposals
+(read from the indexed ``state_counts`` table, not by scanning proposals).
+
+Buckets keep their levels across a reload and take the new limits on next
+use. A bucket idle long enough to have refilled is dropped, which loses nothing
+(a new one starts full); at most ``ADMISSION_MAX_BUCKETS`` are kept, least
+recently used first out.
+"""
+
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from . import config
+from .db import count_open_proposals
+from .utils import load_yaml_or_json
+
+DEFAULT_LIMITS: Dict[str, Any] = {
+    "defaults": {"rate": 5.0, "burst": 20, "open_quota": 200, "token_rate": 20.0, "token_burst": 80},
+    "concurrency": {"propose": 8, "evaluate": 4, "decide": 4, "commit": 2, "upload": 4},
+    "tokens": {},
+    "agents": {},
+}
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int, detail: str) -> None:
+        super().__init__(detail)
+        self.reason = reason
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, version: int = 0) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.version = version
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def configure(self, rate: float, burst: float, version: int) -> None:
+        """Apply new limits, keeping the current level (capped at the new burst)."""
+        self._refill(time.monotonic())
+        self.rate, self.burst, self.version = rate, burst, version
+        self.tokens = min(self.tokens, burst)
+
+    def refund(self, amount: float = 1.0) -> None:
+        self.tokens = min(self.burst, self.tokens + amount)
+
+    def full_by(self, now: float) -> bool:
+        """Whether it would have refilled completely by ``now`` (and can be forgotten)."""
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+    def take(self, amount: float = 1.0) -> float:
+        """Consume ``amount`` tokens; return 0 on success or seconds until enough refill."""
+        self._refill(time.monotonic())
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (amount - self.tokens) / self.rate
+
+
+class AdmissionController:
+    def __init__(self, path=None, reload_interval: float = 1.0) -> None:
+        self.path = path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._limits: Dict[str, Any] = DEFAULT_LIMITS
+        self._mtime: Optional[float] = None
+        self._checked = 0.0
+        self._version = 0
+        # (token, agent) buckets, plus (token, None) for each token's aggregate; LRU order.
+        self._buckets: "OrderedDict[Tuple[str, Optional[str]], TokenBucket]" = OrderedDict()
+        self._in_flight: Counter = Counter()
+        self.admitted: Counter = Counter()
+        self.shed: Counter = Counter()
+
+    def _file(self):
+        return self.path or config.RATE_LIMIT_FILE
+
+    def reload(self) -> Dict[str, Any]:
+        """Re-read the limits file; existing buckets keep their levels and take the new limits on next use."""
+        path = self._file()
+        data = load_yaml_or_json(path) if path.exists() else {}
+        limits = {key: dict(value) for key, value in DEFAULT_LIMITS.items()}
+        for key in limits:
+            limits[key].update(data.get(key) or {})
+        with self._lock:
+            self._limits = limits
+            self._mtime = path.stat().st_mtime if path.exists() else None
+            self._version += 1
+        return limits
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked < self.reload_interval:
+            return
+        self._checked = now
+        path = self._file()
+        mtime = path.stat().st_mtime if path.exists() else None
+        if mtime != self._mtime:
+            self.reload()
+
+    def limits_for(self, token: str, agent: str) -> Dict[str, Any]:
+        limits = dict(self._limits["defaults"])
+        limits.update(self._limits["tokens"].get(token) or {})
+        limits.update(self._limits["agents"].get(agent) or {})
+        return limits
+
+    def _token_limits(self, token: str) -> Tuple[float, float]:
+        limits = dict(self._limits["defaults"])
+        limits.update(self._limits["tokens"].get(token) or {})
+        return float(limits["token_rate"]), float(limits["token_burst"])
+
+    def _bucket(self, key: Tuple[str, Optional[str]], rate: float, burst: float) -> TokenBucket:
+        """The bucket for ``key`` (caller holds the lock), created full or updated to current limits."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(rate, burst, self._version)
+        else:
+            self._buckets.move_to_end(key)
+            if bucket.version != self._version:
+                bucket.configure(rate, burst, self._version)
+        return bucket
+
+    def _evict(self) -> None:
+        """Drop idle buckets that have refilled (no state lost), then any beyond the cap."""
+        now = time.monotonic()
+        while self._buckets:
+            key, oldest = next(iter(self._buckets.items()))
+            if len(self._buckets) <= config.ADMISSION_MAX_BUCKETS and not oldest.full_by(now):
+                break
+            del self._buckets[key]
+
+    def _reject(self, endpoint: str, reason: str, retry_after: float, detail: str) -> AdmissionRejected:
+        self.shed[(endpoint, reason)] += 1
+        return AdmissionRejected(reason, max(1, math.ceil(retry_after)), detail)
+
+    def _charge(self, token: str, agent: str, endpoint: str, limits: Dict[str, Any]) -> None:
+        """Take one token from the API token's aggregate bucket, then the agent's (caller holds the lock)."""
+        aggregate = self._bucket((token, None), *self._token_limits(token))
+        bucket = self._bucket((token, agent), float(limits["rate"]), float(limits["burst"]))
+        try:
+            wait = aggregate.take()
+            if wait:
+                raise self._reject(endpoint, "rate", wait, "Rate limit exceeded for this API token")
+            wait = bucket.take()
+            if wait:
+                aggregate.refund()
+                raise self._reject(endpoint, "rate", wait, f"Rate limit exceeded for agent {agent}")
+        finally:
+            # After the takes, so the buckets just used are no longer "full" or oldest.
+            self._evict()
+
+    def _refund(self, token: str, agent: str, limits: Dict[str, Any]) -> None:
+        """Give back what :meth:`_charge` took, for a request refused afterwards (caller holds the lock)."""
+        self._bucket((token, None), *self._token_limits(token)).refund()
+        self._bucket((token, agent), float(limits["rate"]), float(limits["burst"])).refund()
+
+    @contextmanager
+    def admit(
+        self, token: str, agent: str, endpoint: str, check_quota: bool = False, charge: bool = True
+    ) -> Iterator[None]:
+        """Admit one request or raise AdmissionRejected (mapped to HTTP 429 by the API).
+
+        ``charge=False`` only takes a concurrency slot; batch endpoints charge each
+        record to its own agent with :meth:`batch_check`.
+        """
+        self._maybe_reload()
+        limits = self.limits_for(token, agent)
+        with self._lock:
+            cap = self._limits["concurrency"].get(endpoint)
+            if cap is not None and self._in_flight[endpoint] >= cap:
+                raise self._reject(endpoint, "concurrency", 1, f"Too many concurrent {endpoint} requests")
+            if charge:
+                self._charge(token, agent, endpoint, limits)
+            self._in_flight[endpoint] += 1
+        try:
+            quota = limits.get("open_quota")
+            if check_quota and quota is not None:
+                open_count = count_open_proposals(agent)
+                if open_count >= int(quota):
+                    with self._lock:
+                        if charge:
+                            # A refused request costs no rate: hitting the quota must not drain the buckets.
+                            self._refund(token, agent, limits)
+                        raise self._reject(
+                            endpoint, "quota", 60, f"Agent {agent} has {open_count} open proposals (quota {quota})"
+                        )
+            with self._lock:
+                self.admitted[endpoint] += 1
+            yield
+        finally:
+            with self._lock:
+                self._in_flight[endpoint] -= 1
+
+    def batch_check(self, token: str, endpoint: str = "propose") -> Callable[[Any], Optional[str]]:
+        """Per-record admission for batch ingestion: the record's agent's rate, then its open quota.
+
+        The quota counts records admitted so far in the batch.
+        """
+        base: Dict[str, int] = {}
+        added: Counter = Counter()
+
+        def check(proposal: Any) -> Optional[str]:
+            agent = proposal.agent
+            limits = self.limits_for(token, agent)
+            with self._lock:
+                try:
+                    self._charge(token, agent, endpoint, limits)
+                except AdmissionRejected as exc:
+                    return f"{exc.detail} (retry after {exc.retry_after}s)"
+            quota = limits.get("open_quota")
+            if quota is None:
+                return None
+            if agent not in base:
+                base[agent] = count_open_proposals(agent)
+            if base[agent] + added[agent] >= int(quota):
+                with self._lock:
+                    self._refund(token, agent, limits)
+                    self.shed[(endpoint, "quota")] += 1
+                return f"Agent {agent} has reached its open proposal quota ({quota})"
+            added[agent] += 1
+            return None
+
+        return check
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            shed: Dict[str, Dict[str, int]] = {}
+            for (endpoint, reason), count in self.shed.items():
+                shed.setdefault(endpoint, {})[reason] = count
+            return {
+                "admitted": dict(self.admitted),
+                "shed": shed,
+                "shed_total": sum(self.shed.values()),
+                "in_flight": {k: v for k, v in self._in_flight.items() if v},
+                "buckets": len(self._buckets),
+            }
@@ -1,26 +1,45 @@
 """FastAPI wrapper around the AAP MVP for agents/humans via HTTP."""
 
-from typing import List, Optional
+import json
+import os
+from contextlib import ExitStack, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
 from uuid import uuid4
 from pathlib import Path
 
 try:
-    from fastapi import Depends, FastAPI, Header, HTTPException
+    from fastapi import Depends, FastAPI, Header, HTTPException, Request, Response
+    from fastapi.concurrency import run_in_threadpool
+    from fastapi.responses import JSONResponse, StreamingResponse
     from pydantic import BaseModel
+    from starlette.background import BackgroundTask
 except ImportError as exc:  # pragma: no cover
     raise SystemExit(
         "FastAPI not installed. Install with: pip install fastapi uvicorn\n"
         "You can still use the CLI via `python -m aap.cli`."
     ) from exc
 
-from . import config
-from .audit import record_event
-from .evaluator import evaluate_evidence
-from .gate import decide
-from .policy import evaluate_policy, load_policy
+from . import config, replication
+from .admission import AdmissionController, AdmissionRejected
+from .audit import AuditLogBroken, check_chain_head, record_event
+from .auth import is_allowed_actor
+from .committer import commit_batch
+from .db import get_job, job_counts, list_events, list_jobs, queue_claim, queue_peek, queue_release, queue_size
+from .evaluation import run_evaluation
+from .evidence_store import NAME_PATTERN, BlobWriter, EvidenceTooLarge, record_upload
+from .gate import decide, decide_batch, select_evaluated
+from .ingest import BatchIngest
+from .invalidation import bus as invalidation_bus
+from .jobs import enqueue_evaluation
+from .locks import LockTimeout, lock_manager, proposal_lock, scopes_lock
+from .read_cache import CachedBody, default_cache, etag_matches
+from .scopes import check_proposal, conflict_pairs, describe
 from .state import ProposalState
-from .storage import Proposal, list_proposals, load_proposal, proposal_path
-from .utils import file_lock, sha256_file, utc_now
+from .stats import get_stats
+from .storage import Proposal, check_id, load_proposal, proposal_exists
+from .watch import default_hub
+
+MAX_WAIT = 60.0
 
 
 def _load_api_tokens() -> set[str]:
@@ -61,8 +80,19 @@ class ProposalIn(BaseModel):
 
 
 class EvidenceIn(BaseModel):
-    evidence: dict
+    evidence: Optional[dict] = None  # None: use the uploaded results.json
     policy: Optional[str] = None
+    force: bool = False
+    queue: bool = False  # run on an `aap worker` and answer 202 (also: Prefer: respond-async)
+    priority: int = 0  # queued jobs: higher runs first
+
+
+class CommitBatchIn(BaseModel):
+    ids: List[str]
+    stage_all: bool = False
+    tag: bool = True
+    push: bool = False
+    branch: Optional[str] = None
 
 
 class DecisionIn(BaseModel):
@@ -72,7 +102,66 @@ class DecisionIn(BaseModel):
     otp: str
 
 
+class QueueClaimIn(BaseModel):
+    by: str
+    n: int = 1
+    lease_seconds: Optional[float] = None
+
+
+class QueueReleaseIn(BaseModel):
+    by: str
+    ids: List[str]
+
+
+class DecisionBatchIn(DecisionIn):
+    ids: List[str] = []
+    # Filters: every EVALUATED proposal matching them is added to ``ids``.
+    agent: Optional[str] = None
+    risk_level: Optional[str] = None
+
+
 app = FastAPI(title="AAP MVP API", version="0.1.0")
+admission = AdmissionController()
+
+
+@contextmanager
+def _admitted(
+    token: str, agent: str, endpoint: str, check_quota: bool = False, charge: bool = True
+) -> Iterator[None]:
+    try:
+        with admission.admit(token, agent, endpoint, check_quota=check_quota, charge=charge):
+            yield
+    except AdmissionRejected as exc:
+        raise HTTPException(
+            status_code=429, detail=exc.detail, headers={"Retry-After": str(exc.retry_after)}
+        )
+
+
+@app.exception_handler(LockTimeout)
+async def lock_timeout_handler(request: Request, exc: LockTimeout):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+
+@app.exception_handler(AuditLogBroken)
+async def audit_log_broken_handler(request: Request, exc: AuditLogBroken):
+    return JSONResponse(status_code=503, content={"detail": f"Audit log unusable: {exc}"})
+
+
+@app.middleware("http")
+async def guard_writes(request: Request, call_next):
+    """A read replica (``AAP_READ_ONLY=1``) serves GET/HEAD only; writes go to the primary.
+
+    On the primary, a write is refused up front while the audit log cannot be
+    appended to, before any state is saved.
+    """
+    if request.method not in ("GET", "HEAD", "OPTIONS"):
+        if replication.read_only():
+            return JSONResponse(status_code=503, content={"detail": "Read-only replica; send writes to the primary"})
+        try:
+            await run_in_threadpool(check_chain_head)
+        except AuditLogBroken as exc:
+            return await audit_log_broken_handler(request, exc)
+    return await call_next(request)
 
 
 @app.get("/health")
@@ -81,24 +170,101 @@ def health():
 
 
 @app.get("/proposals")
-def get_proposals(_: str = Depends(require_token)):
-    return [p.to_dict() for p in list_proposals()]
+async def get_proposals(
+    request: Request,
+    response: Response,
+    watch: bool = False,
+    since: Optional[int] = None,
+    wait: float = 30.0,
+    _: str = Depends(require_token),
+):
+    """List proposals, or follow changes: ``watch=true`` streams SSE, ``since`` long-polls."""
+    if watch:
+        last_id = request.headers.get("last-event-id")
+        if since is None and last_id and last_id.lstrip("-").isdigit():
+            since = int(last_id)
+        return StreamingResponse(_sse(since), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+    if since is not None:
+        result = await default_hub().poll(since, min(max(wait, 0.0), MAX_WAIT))
+        response.headers["X-Resource-Version"] = str(result["rv"])
+        return result
+    cache = default_cache()
+    version = await run_in_threadpool(cache.list_version)
+    if etag_matches(request.headers.get("if-none-match"), cache.list_etag(version)):
+        return _not_modified(cache.list_etag(version), {"X-Resource-Version": str(version[0])})
+    entry = await run_in_threadpool(cache.get_list)
+    return _cached_response(request, entry, {"X-Resource-Version": str(entry.version)})
+
+
+def _not_modified(etag: str, headers: Optional[dict] = None) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept-Encoding", **(headers or {})})
+
+
+def _cached_response(request: Request, entry: CachedBody, headers: Optional[dict] = None) -> Response:
+    """Serve a cached body: 304 on a matching If-None-Match, gzip when large and accepted."""
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return _not_modified(entry.etag, headers)
+    headers = {"Vary": "Accept-Encoding", **(headers or {})}
+    if len(entry.body) >= config.GZIP_MIN_BYTES and "gzip" in request.headers.get("accept-encoding", ""):
+        headers.update({"ETag": entry.gzip_etag, "Content-Encoding": "gzip"})
+        return Response(content=entry.gzipped(), media_type="application/json", headers=headers)
+    headers["ETag"] = entry.etag
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+async def _sse(since: Optional[int]) -> AsyncIterator[str]:
+    async for item in default_hub().stream(since):
+        if "heartbeat" in item:
+            yield f": heartbeat {item['heartbeat']}\n\n"
+        elif "evicted" in item:
+            yield f"event: evicted\ndata: {json.dumps({'rv': item['evicted']})}\n\n"
+        else:
+            yield f"id: {item['rv']}\nevent: change\ndata: {json.dumps(item)}\n\n"
+
+
+@app.get("/stats")
+def stats(agent: Optional[str] = None, days: int = 7, _: str = Depends(require_token)):
+    return get_stats(agent=agent, days=days)
 
 
 @app.get("/proposals/{proposal_id}")
-def get_proposal(proposal_id: str, _: str = Depends(require_token)):
+async def get_proposal(
+    proposal_id: str,
+    request: Request,
+    since: Optional[int] = None,
+    wait: float = 30.0,
+    _: str = Depends(require_token),
+):
+    """Fetch a proposal; with ``since``, first wait for a change to it newer than that rv."""
+    headers = {}
+    if since is not None:
+        result = await default_hub().poll(since, min(max(wait, 0.0), MAX_WAIT), proposal_id=proposal_id)
+        headers["X-Resource-Version"] = str(result["rv"])
+    cache = default_cache()
+    # None when the proposal is gone (deleted, or archived since): no 304 for it.
+    etag = await run_in_threadpool(cache.etag, proposal_id)
+    if etag and etag_matches(request.headers.get("if-none-match"), etag):
+        return _not_modified(etag, headers)
     try:
-        proposal = load_proposal(proposal_id)
+        entry = await run_in_threadpool(cache.get, proposal_id)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Proposal not found")
-    return proposal.to_dict()
+    return _cached_response(request, entry, headers)
 
 
 @app.post("/proposals")
 def create_proposal(body: ProposalIn, token: str = Depends(require_token)):
+    with _admitted(token, body.agent, "propose", check_quota=True):
+        return _create_proposal(body)
+
+
+def _create_proposal(body: ProposalIn) -> dict:
     proposal_id = body.id or uuid4().hex[:8]
-    path = proposal_path(proposal_id)
-    if path.exists():
+    try:
+        check_id(proposal_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if proposal_exists(proposal_id):
         raise HTTPException(status_code=400, detail="Proposal id already exists")
 
     proposal = Proposal(
@@ -114,95 +280,303 @@ def create_proposal(body: ProposalIn, token: str = Depends(require_token)):
         },
     )
     proposal.update_state(ProposalState.PROPOSED)
-    with file_lock(config.LOCK_DIR / f"{proposal_id}.lock"):
-        proposal.save()
-
-    record_event(
-        "propose",
-        proposal_id,
-        body.agent,
-        {"goal": proposal.goal, "scope": proposal.scope, "constraints": proposal.constraints},
+    with scopes_lock():
+        try:
+            mode, conflicts = check_proposal(proposal, [Path(body.policy)] if body.policy else None)
+        except (OSError, ValueError) as exc:
+            raise HTTPException(status_code=400, detail=f"Cannot check scope conflicts: {exc}")
+        if conflicts and mode == "block":
+            raise HTTPException(status_code=409, detail="; ".join(describe(conflicts)))
+        with proposal_lock(proposal_id):
+            proposal.save()
+
+    data = {
+        "goal": proposal.goal,
+        "scope": proposal.scope,
+        "constraints": proposal.constraints,
+        "risk_level": proposal.risk_level,
+        "state": proposal.state.value,
+        "proposal": proposal.to_dict(),
+    }
+    if conflicts:
+        data["conflicts"] = conflicts
+    record_event("propose", proposal_id, body.agent, data)
+    result = proposal.to_dict()
+    if conflicts:
+        result["conflicts"] = conflicts
+    return result
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """A streaming response whose iterator still reads the request body.
+
+    Under ASGI servers older than spec 2.4, StreamingResponse listens on
+    ``receive`` for disconnects and would swallow body chunks; here reading the
+    body notices a disconnect instead. The background task always runs.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.stream_response(send)
+        finally:
+            if self.background is not None:
+                await self.background()
+
+
+def _ingest_lines(batch: BatchIngest, first: int, lines: List[bytes], final: bool = False) -> List[Dict[str, Any]]:
+    """Add lines numbered from ``first``; commit every INGEST_COMMIT_RECORDS pending records (and at the end)."""
+    results: List[Dict[str, Any]] = []
+    for line_no, line in enumerate(lines, first):
+        if line.strip():
+            result = batch.add(line_no, line)
+            if result:
+                results.append(result)
+        if len(batch.pending) >= config.INGEST_COMMIT_RECORDS:
+            results.extend(batch.commit())
+    if final:
+        results.extend(batch.commit())
+    return results
+
+
+@app.post("/proposals:batch")
+async def create_proposals_batch(request: Request, token: str = Depends(require_token)):
+    """NDJSON body, one proposal per line; streams one NDJSON result per record.
+
+    The request takes one concurrency slot; each record is charged to its own
+    agent's rate bucket and quota. Results stream back as records are refused or
+    committed, while the rest of the body is still being read.
+    """
+    slot = ExitStack()
+    slot.enter_context(_admitted(token, "", "propose", charge=False))
+    try:
+        batch = await run_in_threadpool(BatchIngest, check=admission.batch_check(token))
+    except BaseException:
+        slot.close()
+        raise
+
+    async def results() -> AsyncIterator[str]:
+        with slot:
+            line_no, buffer = 0, b""
+            async for chunk in request.stream():
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                if lines:
+                    for result in await run_in_threadpool(_ingest_lines, batch, line_no + 1, lines):
+                        yield json.dumps(result) + "\n"
+                    line_no += len(lines)
+            for result in await run_in_threadpool(_ingest_lines, batch, line_no + 1, [buffer], True):
+                yield json.dumps(result) + "\n"
+
+    return _DuplexStreamingResponse(
+        results(), media_type="application/x-ndjson", background=BackgroundTask(slot.close)
     )
-    return proposal.to_dict()
 
 
 @app.post("/proposals/{proposal_id}/evaluate")
-def evaluate_proposal(proposal_id: str, body: EvidenceIn, token: str = Depends(require_token)):
+def evaluate_proposal(
+    proposal_id: str, body: EvidenceIn, prefer: Optional[str] = Header(None), token: str = Depends(require_token)
+):
     try:
         proposal = load_proposal(proposal_id)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Proposal not found")
-    if proposal.state in {ProposalState.REJECTED, ProposalState.COMMITTED}:
-        raise HTTPException(status_code=400, detail="Cannot evaluate in this state")
+    with _admitted(token, proposal.agent, "evaluate"):
+        if body.queue or "respond-async" in (prefer or ""):
+            return _queue_evaluation(proposal, body)
+        return _evaluate_proposal(proposal, body)
 
-    policy_path = body.policy or str(config.DEFAULT_POLICY_FILE)
-    policy = load_policy(Path(policy_path))
-    policy_hash = sha256_file(Path(policy_path))
-    policy_eval = evaluate_policy(proposal, policy)
-
-    proposal.policy = {
-        "name": policy_eval.policy_name,
-        "path": str(policy_path),
-        "hash": policy_hash,
-        "passed": policy_eval.passed,
-        "violations": policy_eval.violations,
-        "required_evidence": policy_eval.required_evidence,
-        "performance_budget_ms": policy_eval.performance_budget_ms,
-        "evaluated_at": utc_now(),
-    }
 
-    evidence_eval = evaluate_evidence(
-        body.evidence,
-        policy_eval.required_evidence,
-        required_metadata=["runner", "run_id", "artifact_sha256"],
-        performance_budget_ms=policy_eval.performance_budget_ms,
+def _queue_evaluation(proposal: Proposal, body: EvidenceIn) -> Response:
+    if proposal.state in {ProposalState.REJECTED, ProposalState.COMMITTED}:
+        raise HTTPException(status_code=400, detail="Cannot evaluate in this state")
+    job, deduplicated = enqueue_evaluation(
+        proposal.id, proposal.agent, evidence=body.evidence, policy=body.policy, force=body.force, priority=body.priority
+    )
+    location = f"/jobs/{job['id']}"
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job["id"], "status": job["state"], "deduplicated": deduplicated, "location": location},
+        headers={"Location": location},
     )
-    proposal.evidence = {
-        "path": "inline",
-        "passed": evidence_eval.passed,
-        "missing": evidence_eval.missing,
-        "failures": evidence_eval.failures,
-        "metadata_missing": evidence_eval.metadata_missing,
-        "metadata_invalid": evidence_eval.metadata_invalid,
-        "performance": evidence_eval.performance,
-        "performance_budget_ms": evidence_eval.performance_budget_ms,
-        "evaluated_at": utc_now(),
-    }
-
-    if policy_eval.passed and evidence_eval.passed and proposal.state == ProposalState.PROPOSED:
-        proposal.update_state(ProposalState.EVALUATED)
 
-    with file_lock(config.LOCK_DIR / f"{proposal.id}.lock"):
-        proposal.save()
 
-    record_event(
-        "evaluate",
-        proposal.id,
-        proposal.agent,
-        {
-            "policy_passed": policy_eval.passed,
-            "policy_violations": policy_eval.violations,
-            "evidence_passed": evidence_eval.passed,
-        },
-    )
+def _evaluate_proposal(proposal: Proposal, body: EvidenceIn) -> dict:
+    if proposal.state in {ProposalState.REJECTED, ProposalState.COMMITTED}:
+        raise HTTPException(status_code=400, detail="Cannot evaluate in this state")
+    try:
+        run_evaluation(
+            proposal,
+            policy_paths=[Path(body.policy)] if body.policy else None,
+            evidence=body.evidence,
+            force=body.force,
+        )
+    except LockTimeout:
+        raise
+    except (OSError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
     return proposal.to_dict()
 
 
+@app.put("/proposals/{proposal_id}/evidence")
+async def upload_evidence(
+    proposal_id: str, request: Request, name: str = "results.json", token: str = Depends(require_token)
+):
+    """Stream a raw request body into the content-addressed evidence store."""
+    if not NAME_PATTERN.match(name):
+        raise HTTPException(status_code=400, detail=f"invalid evidence name {name!r}")
+    try:
+        proposal = await run_in_threadpool(load_proposal, proposal_id, ())
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Proposal not found")
+    with _admitted(token, proposal.agent, "upload"):
+        writer = await run_in_threadpool(BlobWriter)
+        try:
+            async for chunk in request.stream():
+                await run_in_threadpool(writer.write, chunk)
+        except EvidenceTooLarge as exc:
+            raise HTTPException(status_code=413, detail=str(exc))
+        except BaseException:
+            writer.abort()
+            raise
+        digest, size, dedup = await run_in_threadpool(writer.commit)
+        entry = await run_in_threadpool(record_upload, proposal_id, name, digest, size, request.headers.get("content-type"))
+        await run_in_threadpool(
+            record_event,
+            "evidence",
+            proposal_id,
+            proposal.agent,
+            {"name": name, "sha256": digest, "size": size, "deduplicated": dedup},
+        )
+    return {"name": name, **entry, "deduplicated": dedup}
+
+
 @app.post("/proposals/{proposal_id}/decide")
 def decide_proposal(proposal_id: str, body: DecisionIn, token: str = Depends(require_token)):
     try:
-        proposal = load_proposal(proposal_id)
+        proposal = load_proposal(proposal_id, fields=())
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Proposal not found")
     decision = "accept" if body.accept else "reject"
-    try:
-        record = decide(
-            proposal,
-            decision=decision,
-            actor=body.by,
-            reason=body.reason or "",
-            otp=body.otp,
-        )
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc))
+    with _admitted(token, body.by, "decide"):
+        try:
+            record = decide(
+                proposal,
+                decision=decision,
+                actor=body.by,
+                reason=body.reason or "",
+                otp=body.otp,
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
     return {"decision": record}
+
+
+@app.post("/decisions")
+def decide_proposals(body: DecisionBatchIn, token: str = Depends(require_token)):
+    """One accept/reject for a list and/or filter of EVALUATED proposals, with one OTP."""
+    ids = list(body.ids)
+    if body.agent or body.risk_level:
+        ids += select_evaluated(agent=body.agent, risk_level=body.risk_level)
+    elif not ids:
+        raise HTTPException(status_code=400, detail="ids, agent or risk_level required")
+    with _admitted(token, body.by, "decide"):
+        try:
+            return decide_batch(
+                ids, decision="accept" if body.accept else "reject", actor=body.by, reason=body.reason or "", otp=body.otp
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+
+
+@app.post("/commits:batch")
+def commit_proposals(body: CommitBatchIn, token: str = Depends(require_token)):
+    with _admitted(token, "", "commit"):
+        try:
+            return commit_batch(
+                body.ids, stage_all=body.stage_all, tag=body.tag, push=body.push, branch=body.branch
+            )
+        except AuditLogBroken:
+            raise
+        except (ValueError, RuntimeError) as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+
+
+@app.get("/admission")
+def admission_metrics(_: str = Depends(require_token)):
+    return admission.metrics()
+
+
+@app.get("/jobs")
+def jobs_list(
+    state: Optional[str] = None, proposal_id: Optional[str] = None, limit: int = 50, _: str = Depends(require_token)
+):
+    """Background jobs, newest first, and per-state counts."""
+    return {"jobs": list_jobs(state=state, proposal_id=proposal_id, limit=min(max(limit, 1), 1000)), "counts": job_counts()}
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: int, _: str = Depends(require_token)):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/caches")
+def cache_metrics(_: str = Depends(require_token)):
+    """Read-cache hit counts and the invalidation bus's checks, reloads and generations."""
+    cache = default_cache()
+    return {"read_cache": {"hits": cache.hits, "misses": cache.misses}, "invalidation": invalidation_bus().metrics()}
+
+
+@app.get("/locks")
+def lock_metrics(_: str = Depends(require_token)):
+    return lock_manager().metrics()
+
+
+@app.get("/queue")
+def review_queue(n: int = 10, by: Optional[str] = None, include_claimed: bool = False, _: str = Depends(require_token)):
+    """The next ``n`` EVALUATED proposals in review priority order (peek; claims nothing)."""
+    return {"items": queue_peek(n, by=by, include_claimed=include_claimed), **queue_size()}
+
+
+def _require_reviewer(by: str) -> None:
+    if not is_allowed_actor(by):
+        raise HTTPException(status_code=403, detail=f"Reviewer {by} is not in allowlist")
+
+
+@app.post("/queue/claim")
+def review_queue_claim(body: QueueClaimIn, _: str = Depends(require_token)):
+    """Lease the next ``n`` unclaimed proposals to ``by`` (an allowlisted reviewer)."""
+    _require_reviewer(body.by)
+    return {"items": queue_claim(body.n, body.by, body.lease_seconds or config.REVIEW_LEASE_SECONDS)}
+
+
+@app.post("/queue/release")
+def review_queue_release(body: QueueReleaseIn, _: str = Depends(require_token)):
+    _require_reviewer(body.by)
+    return {"released": queue_release(body.ids, body.by)}
+
+
+@app.get("/audit")
+def audit_events(limit: int = 50, _: str = Depends(require_token)):
+    """Most recent audit events, newest first."""
+    return list_events(limit=min(max(limit, 1), 1000))
+
+
+@app.get("/replication")
+def replication_status(_: str = Depends(require_token)):
+    """Replica position and, when ``AAP_REPLICATION_SOURCE`` is set, lag behind the shipped log."""
+    source = os.environ.get(config.REPLICATION_SOURCE_ENV)
+    return replication.status(Path(source) if source else None)
+
+
+@app.get("/conflicts")
+def scope_conflicts(_: str = Depends(require_token)):
+    """Pairs of in-flight proposals whose scopes overlap."""
+    return conflict_pairs()
+
+
+@app.post("/admission/reload")
+def admission_reload(_: str = Depends(require_token)):
+    return admission.reload()
@@ -0,0 +1,292 @@
+"""Archive packs for terminal proposals.
+
+COMMITTED and REJECTED proposals older than a retention window are moved out of
+the hot directories (``proposals/``, ``decisions/``, ``evidence/<id>/``) into
+monthly pack files under ``ARCHIVE_DIR``:
+
+- ``<YYYY-MM>.pack`` is a series of gzip members, one per proposal, each holding
+  the proposal record, its decision file and its evidence directory as JSON.
+  A member can be read on its own by seeking to its offset.
+- ``<YYYY-MM>.idx`` is the offset index: one JSON line per member with the id,
+  offset, length, summary fields and the evidence blob digests it references.
+  A later line for the same id wins.
+
+Archiving appends members and fsyncs the pack, then appends and fsyncs the
+index lines, and only then deletes the hot files (under the proposal lock, and
+only if the record did not change meanwhile). A crash leaves at worst unindexed
+bytes in a pack or a proposal present in both places; the hot copy wins and the
+next run finishes the move. ``load_proposal`` falls back to the packs when the
+hot record is missing.
+
+``gc`` removes what no live or archived proposal needs any more: legacy
+per-proposal lock files, evidence directories of proposals that are gone,
+unreferenced blobs and abandoned uploads.
+"""
+
+import base64
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from . import config
+from .layout import iter_dirs, iter_files
+from .locks import lock_manager, proposal_lock, remove_legacy_locks
+from .state import ProposalState
+from .utils import ensure_dir, fsync_dir, load_yaml_or_json
+
+TERMINAL_STATES = {ProposalState.COMMITTED, ProposalState.REJECTED}
+
+_index_lock = threading.Lock()
+_index_cache: Tuple[Any, Dict[str, Dict[str, Any]]] = ((), {})
+
+
+def pack_path(month: str) -> Path:
+    return config.ARCHIVE_DIR / f"{month}.pack"
+
+
+def index_path(month: str) -> Path:
+    return config.ARCHIVE_DIR / f"{month}.idx"
+
+
+def _parse_ts(value: str) -> datetime:
+    ts = datetime.fromisoformat(value)
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _index_files() -> List[Path]:
+    if not config.ARCHIVE_DIR.exists():
+        return []
+    return sorted(config.ARCHIVE_DIR.glob("*.idx"))
+
+
+def index() -> Dict[str, Dict[str, Any]]:
+    """Archived proposal id -> index entry, re-read when an index file changes."""
+    global _index_cache
+    files = _index_files()
+    signature = tuple((str(p), st.st_size, st.st_mtime_ns) for p in files for st in [p.stat()])
+    with _index_lock:
+        if _index_cache[0] == signature:
+            return _index_cache[1]
+    entries: Dict[str, Dict[str, Any]] = {}
+    for path in files:
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # a line still being appended
+                entry["pack"] = path.stem
+                entries[entry["id"]] = entry
+    with _index_lock:
+        _index_cache = (signature, entries)
+    return entries
+
+
+def archived_ids() -> Set[str]:
+    return set(index())
+
+
+def read_bundle(proposal_id: str) -> Optional[Dict[str, Any]]:
+    """The archived bundle (proposal, decision, evidence files), or None if not archived."""
+    entry = index().get(proposal_id)
+    if entry is None:
+        return None
+    with pack_path(entry["pack"]).open("rb") as f:
+        f.seek(entry["offset"])
+        member = f.read(entry["length"])
+    return json.loads(gzip.decompress(member))
+
+
+def load_archived(proposal_id: str) -> Optional[Dict[str, Any]]:
+    """The archived proposal record, or None if not archived."""
+    bundle = read_bundle(proposal_id)
+    return None if bundle is None else bundle["proposal"]
+
+
+def _encode_file(path: Path) -> Dict[str, str]:
+    raw = path.read_bytes()
+    try:
+        return {"text": raw.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"base64": base64.b64encode(raw).decode("ascii")}
+
+
+def decode_file(entry: Dict[str, str]) -> bytes:
+    """Bytes of an evidence file stored in a bundle."""
+    if "text" in entry:
+        return entry["text"].encode("utf-8")
+    return base64.b64decode(entry["base64"])
+
+
+def _bundle(proposal_id: str, record: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    from .evaluator import evidence_dir
+    from .gate import decision_path
+
+    evidence: Dict[str, Dict[str, str]] = {}
+    directory = evidence_dir(proposal_id)
+    if directory.is_dir():
+        for path in sorted(directory.rglob("*")):
+            if path.is_file():
+                evidence[path.relative_to(directory).as_posix()] = _encode_file(path)
+    blobs: List[str] = []
+    if "manifest.json" in evidence:
+        manifest = json.loads(decode_file(evidence["manifest.json"]))
+        blobs = sorted({entry["sha256"] for entry in manifest.get("files", {}).values()})
+    decision = load_yaml_or_json(decision_path(proposal_id)) or None
+    return {"proposal": record, "decision": decision, "evidence": evidence}, blobs
+
+
+def _candidates(cutoff: datetime) -> Iterator[Any]:
+    from .storage import list_summaries
+
+    for summary in sorted(list_summaries(), key=lambda s: s.updated_at):
+        if summary.state in TERMINAL_STATES and summary.updated_at and _parse_ts(summary.updated_at) < cutoff:
+            yield summary
+
+
+def _remove_hot(proposal_id: str, updated_at: str) -> bool:
+    """Delete the hot copy if it is still the version that was archived."""
+    from .evaluator import evidence_dir
+    from .gate import decision_path
+    from .storage import _read_record, proposal_path
+
+    path = proposal_path(proposal_id)
+    with proposal_lock(proposal_id):
+        try:
+            current = _read_record(path, ())
+        except FileNotFoundError:
+            return True
+        if current.get("updated_at") != updated_at:
+            return False
+        decision_path(proposal_id).unlink(missing_ok=True)
+        shutil.rmtree(evidence_dir(proposal_id), ignore_errors=True)
+        path.unlink()
+    return True
+
+
+def archive(
+    older_than_days: Optional[float] = None, dry_run: bool = False, now: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Move terminal proposals last updated more than ``older_than_days`` ago
+    (default ``ARCHIVE_RETENTION_DAYS``) into monthly packs."""
+    from .storage import _read_record, proposal_path
+
+    days = config.ARCHIVE_RETENTION_DAYS if older_than_days is None else older_than_days
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=days)
+    report: Dict[str, Any] = {"cutoff": cutoff.isoformat(), "archived": [], "changed": [], "packs": {}}
+    candidates = list(_candidates(cutoff))
+    if dry_run:
+        report["archived"] = [s.id for s in candidates]
+        for s in candidates:
+            report["packs"][s.updated_at[:7]] = report["packs"].get(s.updated_at[:7], 0) + 1
+        return report
+
+    ensure_dir(config.ARCHIVE_DIR)
+    by_month: Dict[str, List[Any]] = {}
+    for summary in candidates:
+        by_month.setdefault(summary.updated_at[:7], []).append(summary)
+    with lock_manager().lock("archive"):
+        for month, summaries in sorted(by_month.items()):
+            lines: List[str] = []
+            moved: List[Tuple[str, str]] = []
+            with pack_path(month).open("ab") as pack:
+                for summary in summaries:
+                    with proposal_lock(summary.id, shared=True):
+                        try:
+                            record = _read_record(proposal_path(summary.id))
+                        except FileNotFoundError:
+                            continue
+                        bundle, blobs = _bundle(summary.id, record)
+                    if record.get("updated_at") != summary.updated_at:
+                        report["changed"].append(summary.id)
+                        continue
+                    member = gzip.compress(json.dumps(bundle, ensure_ascii=False).encode("utf-8"), mtime=0)
+                    offset = pack.tell()
+                    pack.write(member)
+                    lines.append(json.dumps({
+                        "id": summary.id, "offset": offset, "length": len(member),
+                        "state": summary.state.value, "agent": summary.agent, "goal": summary.goal,
+                        "risk_level": summary.risk_level, "created_at": summary.created_at,
+                        "updated_at": summary.updated_at, "blobs": blobs,
+                    }, ensure_ascii=False))
+                    moved.append((summary.id, summary.updated_at))
+                pack.flush()
+                os.fsync(pack.fileno())
+            if not lines:
+                continue
+            with index_path(month).open("a", encoding="utf-8") as idx:
+                idx.write("\n".join(lines) + "\n")
+                idx.flush()
+                os.fsync(idx.fileno())
+            fsync_dir(config.ARCHIVE_DIR)
+            for pid, updated_at in moved:
+                if _remove_hot(pid, updated_at):
+                    report["archived"].append(pid)
+                else:
+                    report["changed"].append(pid)
+            report["packs"][month] = len(moved)
+    if report["archived"]:
+        from .db import bump_generation
+
+        bump_generation("proposals")  # the hot set shrank without an event
+    return report
+
+
+def gc(dry_run: bool = False, grace_seconds: float = 3600.0) -> Dict[str, List[str]]:
+    """Remove lock, evidence and blob files no live or archived proposal needs.
+
+    Only evidence directories of archived proposals, or of ids the proposals
+    mirror or the event log knows (deleted proposals), are collected; anything
+    else under ``EVIDENCE_DIR`` (such as the shipped ``example``) is left alone.
+    Evidence directories, blobs and temporary uploads younger than
+    ``grace_seconds`` are kept, so uploads in flight are not collected.
+    """
+    from .db import known_proposal_ids
+    from .evidence_store import blob_dir
+
+    live = {pid for pid, _ in iter_files(config.PROPOSAL_DIR, ".yaml")}
+    archived = index()
+    known = known_proposal_ids() | set(archived)
+    stale_before = time.time() - grace_seconds
+    report: Dict[str, List[str]] = {"locks": [], "evidence": [], "blobs": [], "uploads": []}
+
+    report["locks"] = [p.name for p in remove_legacy_locks(dry_run=dry_run, ids=live | set(archived))]
+
+    referenced: Set[str] = set()
+    for entry in archived.values():
+        referenced.update(entry.get("blobs", ()))
+    blobs = blob_dir()
+    for proposal_id, directory in iter_dirs(config.EVIDENCE_DIR, skip=(blobs.name,)):
+        if proposal_id in live:
+            manifest = directory / "manifest.json"
+            if manifest.exists():
+                files = json.loads(manifest.read_text()).get("files", {})
+                referenced.update(entry["sha256"] for entry in files.values())
+            continue
+        if proposal_id in known and directory.stat().st_mtime < stale_before:
+            report["evidence"].append(directory.name)
+            if not dry_run:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    if blobs.exists():
+        for prefix in sorted(blobs.iterdir()):
+            if not prefix.is_dir():
+                continue
+            for path in sorted(prefix.iterdir()):
+                if prefix.name == "tmp":
+                    key = "uploads"
+                elif path.name in referenced:
+                    continue
+                else:
+                    key = "blobs"
+                if path.stat().st_mtime < stale_before:
+                    report[key].append(path.name)
+                    if not dry_run:
+                        path.unlink(missing_ok=True)
+    return report
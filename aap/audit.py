@@ -1,28 +1,339 @@
+import hashlib
 import json
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from . import config
-from .db import insert_event
+from .db import (
+    chain_head,
+    fetch_chain,
+    insert_checkpoint,
+    list_checkpoints,
+    mark_checkpoints_verified,
+    record_batch,
+    segment_hashes,
+)
+from .merkle import merkle_proof, merkle_root, verify_proof
 from .utils import ensure_dir, utc_now, file_lock
 
+GENESIS_HASH = "0" * 64
+_HASHED_FIELDS = ("seq", "timestamp", "event", "proposal_id", "actor", "data", "prev_hash")
 
-def record_event(event_type: str, proposal_id: str, actor: str, data: Dict[str, Any]) -> None:
+# In-process callbacks run after each audit write (e.g. to wake the watch hub).
+_listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+
+
+class AuditLogBroken(RuntimeError):
+    """The audit log cannot be appended to without forking the hash chain."""
+
+
+def add_listener(callback: Callable[[List[Dict[str, Any]]], None]) -> None:
+    _listeners.append(callback)
+
+
+def entry_hash(entry: Dict[str, Any]) -> str:
+    """Hash the canonical JSON form of an audit entry (excluding its own hash)."""
+    canonical = json.dumps(
+        {key: entry.get(key) for key in _HASHED_FIELDS},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _read_chain_head(path: Path) -> Tuple[int, str]:
+    """Return (next seq, prev hash) from the last line of the audit log.
+
+    Only the tail of the file is read so appends stay O(1) regardless of log size.
+    A missing or empty log starts the chain. A torn or unparsable last line
+    raises, because continuing from genesis would fork the chain.
+    """
+    if not path.exists():
+        return 0, GENESIS_HASH
+    with path.open("rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        if end == 0:
+            return 0, GENESIS_HASH
+        block = 4096
+        buf = b""
+        pos = end
+        while True:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+            if not buf.endswith(b"\n"):
+                raise AuditLogBroken(
+                    f"{path} ends with a partial line (a write was torn); truncate it to its last complete line "
+                    "and check it with `aap audit verify --log` before recording more events"
+                )
+            lines = buf.rstrip(b"\n").split(b"\n")
+            if len(lines) > 1 or pos == 0:
+                last = lines[-1]
+                break
+    if not last.strip():
+        return 0, GENESIS_HASH
+    try:
+        entry = json.loads(last.decode("utf-8"))
+    except ValueError:
+        raise AuditLogBroken(f"The last line of {path} is not valid JSON; repair the log before recording more events")
+    if "hash" not in entry or entry.get("seq") is None:
+        # Legacy (pre-chain) log: start a fresh chain after it.
+        return 0, GENESIS_HASH
+    return int(entry["seq"]) + 1, entry["hash"]
+
+
+def _chain_head() -> Tuple[int, str]:
+    """Next seq and prev hash for an append: the log's tail, cross-checked against
+    the newest event in the events table.
+
+    The table may lag the log (its writes are best-effort), but never lead it: a
+    log that ends before the table's head was truncated, rotated or replaced, and
+    appending to it would fork the chain.
+    """
+    seq, prev_hash = _read_chain_head(config.AUDIT_LOG_FILE)
+    try:
+        stored = chain_head()
+    except sqlite3.Error:
+        return seq, prev_hash
+    if stored is None:
+        return seq, prev_hash
+    db_seq, db_hash = stored
+    if seq <= db_seq:
+        raise AuditLogBroken(
+            f"{config.AUDIT_LOG_FILE} ends at seq {seq - 1} but the events table holds seq {db_seq}; "
+            "the log was truncated, rotated or replaced. Restore it before recording more events."
+        )
+    if seq == db_seq + 1 and prev_hash != db_hash:
+        raise AuditLogBroken(f"{config.AUDIT_LOG_FILE} and the events table disagree on the hash of seq {db_seq}")
+    return seq, prev_hash
+
+
+def check_chain_head() -> None:
+    """Raise :class:`AuditLogBroken` if the next append would be refused.
+
+    Commands run this before writing any state, so a broken log stops them
+    before a change is saved that could not be audited.
+    """
+    _chain_head()
+
+
+def _seal_checkpoint(seq: int) -> None:
+    interval = config.AUDIT_CHECKPOINT_INTERVAL
+    if (seq + 1) % interval:
+        return
+    segment = seq // interval
+    first_seq = segment * interval
+    chain = fetch_chain(first_seq, seq)
+    if len(chain) != interval:
+        # A best-effort DB write was lost; leave the gap for `aap audit verify` to report.
+        return
+    insert_checkpoint(
+        segment,
+        first_seq,
+        seq,
+        prev_hash=chain[0]["prev_hash"],
+        head_hash=chain[-1]["hash"],
+        root=merkle_root([e["hash"] for e in chain]),
+        created_at=utc_now(),
+    )
+
+
+def record_events(
+    events: List[Tuple[str, str, str, Dict[str, Any]]],
+    proposals: Optional[List[Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """Append several (event_type, proposal_id, actor, data) events at once.
+
+    The audit log gets a single write, and the events plus any ``proposals``
+    mirror rows are stored in one SQLite transaction.
+    """
     ensure_dir(config.AUDIT_LOG_FILE.parent)
-    entry = {
-        "timestamp": utc_now(),
-        "event": event_type,
-        "proposal_id": proposal_id,
-        "actor": actor,
-        "data": data,
-    }
     lock_path = config.LOCK_DIR / "audit.log.lock"
+    entries: List[Dict[str, Any]] = []
     with file_lock(lock_path):
+        seq, prev_hash = _chain_head()
+        for event_type, proposal_id, actor, data in events:
+            entry = {
+                "seq": seq,
+                "timestamp": utc_now(),
+                "event": event_type,
+                "proposal_id": proposal_id,
+                "actor": actor,
+                "data": data,
+                "prev_hash": prev_hash,
+            }
+            entry["hash"] = entry_hash(entry)
+            entries.append(entry)
+            seq, prev_hash = seq + 1, entry["hash"]
         with config.AUDIT_LOG_FILE.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(entry, ensure_ascii=False))
-            f.write("\n")
-    # Best-effort SQLite write; failures should not block
-    try:
-        insert_event(entry["timestamp"], event_type, proposal_id, actor, data)
-    except Exception:
-        pass
+            f.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries))
+        # Best-effort SQLite write; failures should not block. It runs under the
+        # audit lock so the events table sees the chain in seq order.
+        try:
+            record_batch(entries, proposals or [])
+            for entry in entries:
+                _seal_checkpoint(entry["seq"])
+        except Exception:
+            pass
+    for listener in _listeners:
+        try:
+            listener(entries)
+        except Exception:
+            pass
+    return entries
+
+
+def record_event(event_type: str, proposal_id: str, actor: str, data: Dict[str, Any]) -> None:
+    record_events([(event_type, proposal_id, actor, data)])
+
+
+def _verify_entries(entries: List[Dict[str, Any]], expected_prev: Optional[str]) -> List[str]:
+    errors: List[str] = []
+    prev_hash = expected_prev
+    prev_seq: Optional[int] = None
+    for entry in entries:
+        seq = entry.get("seq")
+        if prev_seq is not None and seq != prev_seq + 1:
+            errors.append(f"seq gap: {prev_seq} -> {seq}")
+        if prev_hash is not None and entry.get("prev_hash") != prev_hash:
+            errors.append(f"seq {seq}: prev_hash does not link to previous event")
+        if entry_hash(entry) != entry.get("hash"):
+            errors.append(f"seq {seq}: content does not match recorded hash")
+        prev_hash = entry.get("hash")
+        prev_seq = seq
+    return errors
+
+
+def _verify_segment(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Verify one checkpointed segment (or the unsealed tail). Runs in a worker process."""
+    chain = fetch_chain(task["first_seq"], task.get("last_seq"), db_file=task["db_file"])
+    errors = _verify_entries(chain, task["prev_hash"])
+    if chain and chain[0]["seq"] != task["first_seq"]:
+        errors.append(f"segment starts at seq {chain[0]['seq']}, expected {task['first_seq']}")
+    if task.get("root") is not None:
+        if len(chain) != task["last_seq"] - task["first_seq"] + 1:
+            errors.append(f"segment {task['segment']}: expected {task['last_seq'] - task['first_seq'] + 1} events, found {len(chain)}")
+        elif merkle_root([e["hash"] for e in chain]) != task["root"]:
+            errors.append(f"segment {task['segment']}: Merkle root mismatch")
+    return {
+        "segment": task.get("segment"),
+        "events": len(chain),
+        "errors": errors,
+        "head_hash": chain[-1]["hash"] if chain else task["prev_hash"],
+    }
+
+
+def verify_chain(full: bool = False, workers: Optional[int] = None) -> Dict[str, Any]:
+    """Verify the events-table hash chain.
+
+    By default only segments sealed after the last trusted (already verified)
+    checkpoint and the unsealed tail are re-hashed; ``full`` re-checks every
+    segment. Segments are hashed in parallel across processes.
+
+    Trust comes from ``checkpoints.verified_at``, which lives in the same
+    writable database as the events. Whoever can rewrite the events can also mark
+    their checkpoints verified. An incremental run therefore only catches
+    accidental corruption; use ``full`` (or ``verify_log`` on a copy of
+    ``audit.log`` kept elsewhere) to detect deliberate tampering.
+    """
+    checkpoints = list_checkpoints()
+    trusted = None
+    if not full:
+        for cp in checkpoints:
+            if not cp["verified_at"]:
+                break
+            trusted = cp
+    errors: List[str] = []
+    tasks: List[Dict[str, Any]] = []
+    prev_hash = GENESIS_HASH
+    next_seq = 0
+    for cp in checkpoints:
+        if cp["prev_hash"] != prev_hash or cp["first_seq"] != next_seq:
+            errors.append(f"checkpoint {cp['segment']} does not link to the previous checkpoint")
+        if trusted is None or cp["segment"] > trusted["segment"]:
+            tasks.append({**cp, "db_file": config.DB_FILE})
+        prev_hash, next_seq = cp["head_hash"], cp["last_seq"] + 1
+    tail = {"segment": None, "first_seq": next_seq, "last_seq": None, "prev_hash": prev_hash, "root": None, "db_file": config.DB_FILE}
+    tasks.append(tail)
+
+    max_workers = workers or os.cpu_count() or 1
+    if max_workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(tasks))) as pool:
+            results = list(pool.map(_verify_segment, tasks))
+    else:
+        results = [_verify_segment(task) for task in tasks]
+
+    checked = 0
+    for result in results:
+        checked += result["events"]
+        errors.extend(result["errors"])
+    if not errors:
+        mark_checkpoints_verified([t["segment"] for t in tasks if t["segment"] is not None], utc_now())
+    return {
+        "ok": not errors,
+        "errors": errors,
+        "events_checked": checked,
+        "segments_checked": len(tasks) - 1,
+        "trusted_segment": trusted["segment"] if trusted else None,
+    }
+
+
+def verify_log(path: Optional[Path] = None) -> Dict[str, Any]:
+    """Verify the hash chain recorded in the append-only ``audit.log`` file."""
+    log_path = path or config.AUDIT_LOG_FILE
+    entries: List[Dict[str, Any]] = []
+    errors: List[str] = []
+    if log_path.exists():
+        # Appends are whole batches under the exclusive audit lock, so the size seen
+        # under a shared hold ends on a batch boundary; reading only that far never
+        # trips over a concurrent writer's half-written line, and the hold is brief.
+        with file_lock(config.LOCK_DIR / "audit.log.lock", shared=True):
+            size = log_path.stat().st_size
+        read = 0
+        with log_path.open("rb") as f:
+            for lineno, line in enumerate(f, 1):
+                read += len(line)
+                if read > size:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    errors.append(f"line {lineno}: not valid JSON")
+                    continue
+                if "hash" in entry:
+                    entries.append(entry)
+    expected_prev = GENESIS_HASH if entries and entries[0].get("seq") == 0 else None
+    errors.extend(_verify_entries(entries, expected_prev))
+    return {"ok": not errors, "errors": errors, "events_checked": len(entries)}
+
+
+def inclusion_proof(seq: int) -> Dict[str, Any]:
+    """Build an O(log n) Merkle inclusion proof for a checkpointed event."""
+    interval = config.AUDIT_CHECKPOINT_INTERVAL
+    segment = seq // interval
+    checkpoint = next((cp for cp in list_checkpoints() if cp["segment"] == segment), None)
+    if checkpoint is None:
+        raise ValueError(f"Event {seq} is not covered by a checkpoint yet")
+    hashes = segment_hashes(checkpoint["first_seq"], checkpoint["last_seq"])
+    index = seq - checkpoint["first_seq"]
+    if index >= len(hashes):
+        raise ValueError(f"Event {seq} missing from events table")
+    return {
+        "seq": seq,
+        "hash": hashes[index],
+        "segment": segment,
+        "root": checkpoint["root"],
+        "path": merkle_proof(hashes, index),
+    }
+
+
+def verify_inclusion(proof: Dict[str, Any]) -> bool:
+    return verify_proof(proof["hash"], [tuple(p) for p in proof["path"]], proof["root"])
@@ -0,0 +1,150 @@
+"""Storage read-path benchmark: list latency and memory per proposal by projection.
+
+``bench_storage`` writes ``n`` proposal records shaped like real ones (policy
+results, evidence with failure lists, decisions and commits on a share of
+them) into a throwaway data directory. It then times and measures
+(tracemalloc) each read view:
+
+- ``full``: ``list_proposals()``, with every sub-document parsed;
+- ``lazy``: ``list_proposals(fields=())``, heavy sub-documents left to first access;
+- ``summary``: ``list_summaries()``, compact rows for listing views;
+- ``full_pure_yaml`` (optional, slow): the full view parsed by PyYAML's
+  pure-Python loader, which was the read path before libyaml was used.
+
+Latency covers listing all ``n`` records. Memory is what the built objects
+retain, measured on the first ``memory_sample`` records, because tracemalloc
+slows parsing several-fold and the per-record figure does not depend on ``n``.
+"""
+
+import gc
+import shutil
+import tempfile
+import time
+import tracemalloc
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from . import utils
+from .storage import Proposal, ProposalSummary, _iter_records, list_proposals, list_summaries
+from .utils import serialize_yaml_or_json, use_data_dir
+
+
+def _record(i: int) -> Dict[str, Any]:
+    state = ("proposed", "evaluated", "accepted", "rejected", "committed")[i % 5]
+    failing = i % 4 == 0
+    return {
+        "id": f"p{i:07d}",
+        "agent": f"agent-{i % 50}",
+        "goal": f"Refactor payment retry handling for merchant cohort {i % 97}",
+        "scope": [f"services/payment/{i % 13}/", "libs/retry/"],
+        "constraints": ["no_production_push_by_agent"],
+        "risk_level": ("low", "medium", "high")[i % 3],
+        "policy": {
+            "name": "default",
+            "path": "aap/policies/default.yaml",
+            "hash": "9f2c" * 16,
+            "applied": [{"name": "default", "path": "aap/policies/default.yaml", "hash": "9f2c" * 16}],
+            "passed": not failing,
+            "violations": [f"Scope path services/payment/{i % 13}/ touches a forbidden prefix"] if failing else [],
+            "required_evidence": ["unit_tests", "integration_tests", "lint"],
+            "performance_budget_ms": 5,
+            "eval_key": "4be1" * 16,
+            "evaluated_at": "2024-05-01T12:00:00+00:00",
+        },
+        "evidence": {
+            "path": "inline",
+            "sha256": "c0ff" * 16,
+            "passed": not failing,
+            "missing": [],
+            "failures": [f"tests/test_retry.py::test_case_{k} failed: AssertionError: expected 3 retries, got 4"
+                         for k in range(20)] if failing else [],
+            "metadata_missing": [],
+            "metadata_invalid": [],
+            "performance": {"p95_latency_delta_ms": 3.2, "budget_ms": 5, "passed": True},
+            "performance_budget_ms": 5,
+            "evaluated_at": "2024-05-01T12:00:00+00:00",
+        },
+        "decision": {
+            "proposal_id": f"p{i:07d}", "decision": "accept", "by": "you@example.com",
+            "reason": "looks good", "timestamp": "2024-05-01T13:00:00+00:00",
+        } if state in ("accepted", "committed") else {},
+        "commit": {
+            "message": f"aap:p{i:07d} retry handling", "sha": "ab12" * 10, "tag": f"aap/p{i:07d}",
+            "pushed": False, "branch": "main", "committed_at": "2024-05-01T14:00:00+00:00",
+        } if state == "committed" else {},
+        "state": state,
+        "created_at": "2024-05-01T11:00:00+00:00",
+        "updated_at": f"2024-05-01T11:{i // 6000 % 60:02d}:{i // 100 % 60:02d}.{i % 100:06d}+00:00",
+    }
+
+
+def generate(n: int, data_dir: Path) -> None:
+    proposals = data_dir / "proposals"
+    proposals.mkdir(parents=True, exist_ok=True)
+    for i in range(n):
+        (proposals / f"p{i:07d}.yaml").write_text(serialize_yaml_or_json(_record(i)))
+
+
+def _measure(load: Callable[[], List[Any]], build: Callable[[int], List[Any]], n: int, sample: int) -> Dict[str, Any]:
+    gc.collect()
+    started = time.perf_counter()
+    result = load()
+    seconds = time.perf_counter() - started
+    assert len(result) == n
+    del result
+    gc.collect()
+    tracemalloc.start()
+    result = build(sample)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {"seconds": round(seconds, 3), "us_per_proposal": round(seconds / n * 1e6, 1),
+            "bytes_per_proposal": round(retained / sample)}
+
+
+def _pure_yaml(fn: Callable[..., List[Any]]) -> Callable[..., List[Any]]:
+    def run(*args: Any) -> List[Any]:
+        saved = utils._YamlLoader
+        utils._YamlLoader = utils.yaml.SafeLoader
+        try:
+            return fn(*args)
+        finally:
+            utils._YamlLoader = saved
+
+    return run
+
+
+def _build(fields: Any, summary: bool = False) -> Callable[[int], List[Any]]:
+    def build(sample: int) -> List[Any]:
+        records = islice(_iter_records(fields), sample)
+        if summary:
+            return [ProposalSummary.from_dict(data) for data in records]
+        return [Proposal.from_dict(data, fields) for data in records]
+
+    return build
+
+
+def bench_storage(
+    n: int = 100_000, data_dir: Optional[Path] = None, memory_sample: int = 10_000, pure_yaml: bool = False
+) -> Dict[str, Any]:
+    root = Path(data_dir or tempfile.mkdtemp(prefix="aap-bench-"))
+    try:
+        started = time.perf_counter()
+        generate(n, root)
+        report: Dict[str, Any] = {"proposals": n, "generate_seconds": round(time.perf_counter() - started, 2)}
+        sample = min(n, memory_sample)
+        report["memory_sample"] = sample
+        with use_data_dir(root):
+            views = {
+                "full": (list_proposals, _build(None)),
+                "lazy": (lambda: list_proposals(fields=()), _build(())),
+                "summary": (list_summaries, _build((), summary=True)),
+            }
+            if pure_yaml and utils.yaml and utils._YamlLoader is not utils.yaml.SafeLoader:
+                views["full_pure_yaml"] = (_pure_yaml(list_proposals), _pure_yaml(_build(None)))
+            report["views"] = {name: _measure(load, build, n, sample) for name, (load, build) in views.items()}
+        return report
+    finally:
+        if data_dir is None:
+            shutil.rmtree(root, ignore_errors=True)
@@ -5,24 +5,42 @@ from uuid import uuid4
 
 from . import config
 from .adapters import git_adapter
-from .audit import record_event
-from .evaluator import evaluate_evidence, evidence_path, load_evidence
+from .adapters.worktree_pool import WorktreePool
+from .audit import AuditLogBroken, check_chain_head, record_event
+from .evaluation import run_evaluation
 from .gate import decide
-from .policy import evaluate_policy, load_policy
+from .locks import proposal_lock, scopes_lock
+from .scopes import check_proposal, describe
 from .state import ProposalState
-from .storage import Proposal, list_proposals, load_proposal, proposal_path
-from .utils import utc_now, sha256_file, file_lock
+from .storage import Proposal, check_id, list_summaries, load_proposal, proposal_exists
+from .utils import use_data_dir, utc_now
 
 
 def generate_id() -> str:
     return uuid4().hex[:8]
 
 
+def _require_audit_log() -> None:
+    """Stop a state-changing command before it writes anything if its event could not be recorded."""
+    try:
+        check_chain_head()
+    except AuditLogBroken as exc:
+        raise SystemExit(f"Audit log unusable: {exc}")
+
+
 def handle_propose(args: argparse.Namespace) -> None:
+    if args.from_file:
+        return handle_propose_batch(args)
+    if not args.agent or not args.goal:
+        raise SystemExit("--agent and --goal are required (or use --from-file)")
     proposal_id = args.id or generate_id()
-    path = proposal_path(proposal_id)
-    if path.exists():
-        raise SystemExit(f"Proposal {proposal_id} already exists at {path}")
+    try:
+        check_id(proposal_id)
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+    if proposal_exists(proposal_id):
+        raise SystemExit(f"Proposal {proposal_id} already exists")
+    _require_audit_log()
 
     proposal = Proposal(
         id=proposal_id,
@@ -37,15 +55,27 @@ def handle_propose(args: argparse.Namespace) -> None:
         },
     )
     proposal.update_state(ProposalState.PROPOSED)
-    with file_lock(config.LOCK_DIR / f"{proposal_id}.lock"):
-        proposal.save()
+    with scopes_lock():
+        try:
+            mode, conflicts = check_proposal(proposal, [Path(args.policy)] if args.policy else None)
+        except (OSError, ValueError) as exc:
+            raise SystemExit(f"Cannot check scope conflicts: {exc}")
+        if conflicts and mode == "block":
+            raise SystemExit("\n".join([f"Policy blocks proposal {proposal_id}:"] + describe(conflicts)))
+        with proposal_lock(proposal_id):
+            proposal.save()
 
-    record_event(
-        "propose",
-        proposal_id,
-        args.agent,
-        {"goal": proposal.goal, "scope": proposal.scope, "constraints": proposal.constraints},
-    )
+    data = {
+        "goal": proposal.goal,
+        "scope": proposal.scope,
+        "constraints": proposal.constraints,
+        "risk_level": proposal.risk_level,
+        "state": proposal.state.value,
+        "proposal": proposal.to_dict(),
+    }
+    if conflicts:
+        data["conflicts"] = conflicts
+    record_event("propose", proposal_id, args.agent, data)
 
     print(f"Created proposal {proposal_id}")
     print(f"  agent: {proposal.agent}")
@@ -53,81 +83,61 @@ def handle_propose(args: argparse.Namespace) -> None:
     print(f"  scope: {', '.join(proposal.scope) or '(none)'}")
     print(f"  constraints: {', '.join(proposal.constraints) or '(none)'}")
     print(f"  policy: {proposal.policy.get('name')}")
+    for line in describe(conflicts):
+        print(f"  warning: {line}")
+
+
+def handle_propose_batch(args: argparse.Namespace) -> None:
+    import sys
+
+    from .ingest import ingest_lines
+
+    _require_audit_log()
+    if args.from_file == "-":
+        results = list(ingest_lines(sys.stdin))
+    else:
+        path = Path(args.from_file)
+        if not path.exists():
+            raise SystemExit(f"NDJSON file not found: {path}")
+        with path.open(encoding="utf-8") as f:
+            results = list(ingest_lines(f))
+    created = 0
+    for result in sorted(results, key=lambda r: r["line"]):
+        if result["status"] == "created":
+            created += 1
+            if args.verbose:
+                print(f"line {result['line']}: created {result['id']}")
+        else:
+            print(f"line {result['line']}: {result['status']} {result['id'] or ''}: {result.get('error', '')}")
+    print(f"Created {created} of {len(results)} proposals")
+    if created != len(results):
+        raise SystemExit(1)
 
 
 def handle_evaluate(args: argparse.Namespace) -> None:
+    _require_audit_log()
     proposal = load_proposal(args.proposal_id)
     if proposal.state in {ProposalState.REJECTED, ProposalState.COMMITTED}:
         raise SystemExit(f"Proposal {proposal.id} is {proposal.state.value}; cannot evaluate.")
 
-    policy_path = Path(args.policy) if args.policy else config.DEFAULT_POLICY_FILE
-    policy = load_policy(policy_path)
-    policy_hash = sha256_file(policy_path)
-    policy_eval = evaluate_policy(proposal, policy)
-
-    proposal.policy = {
-        "name": policy_eval.policy_name,
-        "path": str(policy_path),
-        "hash": policy_hash,
-        "passed": policy_eval.passed,
-        "violations": policy_eval.violations,
-        "required_evidence": policy_eval.required_evidence,
-        "performance_budget_ms": policy_eval.performance_budget_ms,
-        "evaluated_at": utc_now(),
-    }
-
-    evidence_file = Path(args.evidence) if args.evidence else evidence_path(proposal.id)
-    evidence_eval = None
     try:
-        evidence_data = load_evidence(evidence_file)
-        evidence_eval = evaluate_evidence(
-            evidence_data,
-            policy_eval.required_evidence,
-            required_metadata=["runner", "run_id", "artifact_sha256"],
-            performance_budget_ms=policy_eval.performance_budget_ms,
+        outcome = run_evaluation(
+            proposal,
+            policy_paths=[Path(args.policy)] if args.policy else None,
+            evidence_file=Path(args.evidence) if args.evidence else None,
+            force=args.force,
         )
-        proposal.evidence = {
-            "path": str(evidence_file),
-            "passed": evidence_eval.passed,
-            "missing": evidence_eval.missing,
-            "failures": evidence_eval.failures,
-            "metadata_missing": evidence_eval.metadata_missing,
-            "metadata_invalid": evidence_eval.metadata_invalid,
-            "performance": evidence_eval.performance,
-            "performance_budget_ms": evidence_eval.performance_budget_ms,
-            "evaluated_at": utc_now(),
-        }
-    except FileNotFoundError as exc:
-        proposal.evidence = {
-            "path": str(evidence_file),
-            "passed": False,
-            "missing": policy_eval.required_evidence,
-            "failures": [str(exc)],
-            "evaluated_at": utc_now(),
-        }
-
-    should_advance = policy_eval.passed and evidence_eval and evidence_eval.passed
-    if should_advance and proposal.state == ProposalState.PROPOSED:
-        proposal.update_state(ProposalState.EVALUATED)
-    with file_lock(config.LOCK_DIR / f"{proposal.id}.lock"):
-        proposal.save()
-
-    record_event(
-        "evaluate",
-        proposal.id,
-        proposal.agent,
-        {
-            "policy_passed": policy_eval.passed,
-            "policy_violations": policy_eval.violations,
-            "evidence_passed": bool(evidence_eval and evidence_eval.passed),
-        },
-    )
+    except (OSError, ValueError) as exc:
+        raise SystemExit(str(exc))
 
-    print(f"Policy:   {'PASS' if policy_eval.passed else 'FAIL'}")
-    if policy_eval.violations:
-        for v in policy_eval.violations:
-            print(f"  - {v}")
-    print(f"Evidence: {'PASS' if evidence_eval and evidence_eval.passed else 'FAIL'}")
+    if outcome.cache == "unchanged":
+        print("Inputs unchanged since the last evaluation; nothing rewritten (use --force to re-run).")
+    elif outcome.cache == "hit":
+        print("Reused a cached evaluation of identical inputs.")
+    print(f"Policy:   {'PASS' if outcome.policy_passed else 'FAIL'} ({', '.join(outcome.policies)})")
+    for v in proposal.policy.get("violations") or []:
+        print(f"  - {v}")
+    print(f"Evidence: {'PASS' if outcome.evidence_passed else 'FAIL'}")
     if proposal.evidence.get("failures"):
         for f in proposal.evidence["failures"]:
             print(f"  - {f}")
@@ -143,8 +153,40 @@ def handle_evaluate(args: argparse.Namespace) -> None:
     print(f"State:    {proposal.state.value.upper()}")
 
 
+def handle_decide_batch(args: argparse.Namespace) -> None:
+    from .gate import decide_batch, select_evaluated
+
+    if args.proposal_id:
+        raise SystemExit("--batch cannot be combined with a positional id.")
+    ids = list(args.batch)
+    if args.agent or args.risk_level:
+        ids += select_evaluated(agent=args.agent, risk_level=args.risk_level)
+    elif not ids:
+        raise SystemExit("--batch needs proposal ids, --agent or --risk-level.")
+    decision = "accept" if args.accept else "reject"
+    actor = args.by or "human"
+    _require_audit_log()
+    try:
+        result = decide_batch(ids, decision=decision, actor=actor, reason=args.reason or "", otp=args.otp or "")
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+    for item in result["items"]:
+        if item["status"] == "decided":
+            print(f"{decision.upper()} proposal {item['proposal_id']} -> {item['state']}")
+        else:
+            print(f"{item['status'].upper()} {item['proposal_id']}: {item['error']}")
+    print(f"Decision set {result['set_id']}: {decision} {len(result['proposal_ids'])} of {result['requested']} by {actor}")
+    if len(result["proposal_ids"]) != result["requested"]:
+        raise SystemExit("Decision set incomplete.")
+
+
 def handle_decide(args: argparse.Namespace) -> None:
-    proposal = load_proposal(args.proposal_id)
+    if args.batch is not None or args.agent or args.risk_level:
+        return handle_decide_batch(args)
+    if not args.proposal_id:
+        raise SystemExit("A proposal id (or --batch) is required.")
+    _require_audit_log()
+    proposal = load_proposal(args.proposal_id, fields=())
     decision = "accept" if args.accept else "reject"
     actor = args.by or "human"
     try:
@@ -163,12 +205,52 @@ def handle_decide(args: argparse.Namespace) -> None:
     print(f"State:  {proposal.state.value}")
 
 
+def handle_commit_batch(args: argparse.Namespace) -> None:
+    from .committer import commit_batch
+
+    if args.proposal_id or args.worktree or args.message:
+        raise SystemExit("--batch cannot be combined with a positional id, --worktree or --message.")
+    _require_audit_log()
+    try:
+        result = commit_batch(
+            args.batch, stage_all=args.stage_all, tag=args.tag, push=args.push, branch=args.branch
+        )
+    except (ValueError, RuntimeError) as exc:
+        raise SystemExit(str(exc))
+    for item in result["items"]:
+        if item["status"] == "committed":
+            print(f"Committed proposal {item['proposal_id']} -> {item['sha']}" + (f" (tag {item['tag']})" if item["tag"] else ""))
+        else:
+            print(f"{item['status'].upper()} {item['proposal_id']}: {item['error']}")
+    if result["push_error"]:
+        print(f"Push failed: {result['push_error']}")
+    elif result["pushed"]:
+        print("Pushed to remote.")
+    if not result["ok"]:
+        raise SystemExit("Batch commit incomplete.")
+
+
 def handle_commit(args: argparse.Namespace) -> None:
+    if args.batch:
+        return handle_commit_batch(args)
+    if not args.proposal_id:
+        raise SystemExit("Proposal id required (or use --batch <ids...>).")
+    _require_audit_log()
     proposal = load_proposal(args.proposal_id)
     if proposal.state != ProposalState.ACCEPTED:
         raise SystemExit(f"Proposal {proposal.id} must be ACCEPTED before commit (current: {proposal.state.value}).")
 
-    repo_root = git_adapter.default_repo_root()
+    pool: Optional[WorktreePool] = None
+    if args.worktree:
+        pool = WorktreePool()
+        lease = pool.find(proposal.id)
+        if lease is None:
+            raise SystemExit(f"No worktree leased for {proposal.id}; run `aap worktree lease {proposal.id}` first.")
+        if args.push and not args.branch:
+            raise SystemExit("--push from a worktree requires --branch.")
+        repo_root = Path(lease.path)
+    else:
+        repo_root = git_adapter.default_repo_root()
     if args.stage_all:
         git_adapter.stage_all(cwd=repo_root)
 
@@ -185,38 +267,77 @@ def handle_commit(args: argparse.Namespace) -> None:
     if violations:
         raise SystemExit(f"Staged paths outside scope: {', '.join(violations)}")
 
-    message = args.message or f"aap:{proposal.id} {proposal.goal}"
-    try:
-        commit_sha = git_adapter.create_commit(
-            message=message, cwd=repo_root, stage_all_changes=args.stage_all
-        )
-        tag_name: Optional[str] = None
-        if args.tag:
-            tag_name = f"{config.DEFAULT_TAG_PREFIX}{proposal.id}"
-            git_adapter.create_tag(tag_name, message=f"AAP {proposal.id}", cwd=repo_root)
-        if args.push:
-            git_adapter.push(branch=args.branch, push_tags=args.tag, cwd=repo_root)
-    except RuntimeError as exc:
-        raise SystemExit(str(exc))
+    # Held from the re-read to the event, as in gate.decide: a proposal rejected
+    # while the scope was checked must not be committed from the stale copy.
+    with proposal_lock(proposal.id):
+        proposal.reload()
+        if proposal.state != ProposalState.ACCEPTED:
+            raise SystemExit(f"Proposal {proposal.id} is {proposal.state.value} now; it must be ACCEPTED to commit.")
 
-    proposal.update_state(ProposalState.COMMITTED)
-    proposal.commit = {
-        "message": message,
-        "sha": commit_sha,
-        "tag": tag_name,
-        "pushed": args.push,
-        "branch": args.branch,
-        "committed_at": utc_now(),
-    }
-    with file_lock(config.LOCK_DIR / f"{proposal.id}.lock"):
+        message = args.message or f"aap:{proposal.id} {proposal.goal}"
+        # A worktree slot's HEAD is detached, and releasing the slot moves it back to
+        # the base: without a ref of its own the commit would be garbage-collected.
+        keep_ref: Optional[str] = None
+        if git_adapter.head_ref(cwd=repo_root) == "HEAD":
+            keep_ref = f"{config.COMMIT_REF_PREFIX}{proposal.id}"
+        try:
+            commit_sha = git_adapter.create_commit(
+                message=message, cwd=repo_root, stage_all_changes=args.stage_all
+            )
+            if args.push and pool:
+                # Every slot starts from the same base: replay the commit onto the
+                # branch as it is now, so the push fast-forwards.
+                if git_adapter.rebase_onto_remote(args.branch, cwd=repo_root):
+                    commit_sha = git_adapter.rev_parse("HEAD", cwd=repo_root)
+            if keep_ref:
+                git_adapter.update_ref(keep_ref, commit_sha, cwd=repo_root)
+            tag_name: Optional[str] = None
+            if args.tag:
+                tag_name = f"{config.DEFAULT_TAG_PREFIX}{proposal.id}"
+                git_adapter.create_tag(tag_name, message=f"AAP {proposal.id}", cwd=repo_root)
+            if args.push:
+                try:
+                    git_adapter.push(
+                        branch=args.branch,
+                        cwd=repo_root,
+                        source="HEAD" if pool else None,
+                        tags=[tag_name] if tag_name else [],
+                    )
+                except RuntimeError as exc:
+                    kept = f"; the commit is kept at {keep_ref}" if keep_ref else ""
+                    raise RuntimeError(f"Push to {args.branch or 'the current branch'} failed{kept}: {exc}")
+        except RuntimeError as exc:
+            raise SystemExit(str(exc))
+
+        proposal.update_state(ProposalState.COMMITTED)
+        proposal.commit = {
+            "message": message,
+            "sha": commit_sha,
+            "tag": tag_name,
+            "pushed": args.push,
+            "branch": args.branch,
+            "ref": keep_ref,
+            "committed_at": utc_now(),
+        }
         proposal.save()
 
-    record_event(
-        "commit",
-        proposal.id,
-        actor="system",
-        data={"sha": commit_sha, "tag": tag_name, "pushed": args.push, "branch": args.branch},
-    )
+        record_event(
+            "commit",
+            proposal.id,
+            actor="system",
+            data={
+                "sha": commit_sha,
+                "tag": tag_name,
+                "pushed": args.push,
+                "branch": args.branch,
+                "state": proposal.state.value,
+                "commit": proposal.commit,
+                "updated_at": proposal.updated_at,
+            },
+        )
+
+    if pool:
+        pool.release(proposal.id)
 
     print(f"Committed proposal {proposal.id} -> {commit_sha}")
     if tag_name:
@@ -227,8 +348,67 @@ def handle_commit(args: argparse.Namespace) -> None:
         print("Push skipped (use --push to push).")
 
 
-def handle_list(_: argparse.Namespace) -> None:
-    proposals = list_proposals()
+def handle_worktree(args: argparse.Namespace) -> None:
+    pool = WorktreePool()
+    try:
+        if args.worktree_command == "lease":
+            lease = pool.lease(args.proposal_id, ttl=args.ttl)
+            print(lease.path)
+        elif args.worktree_command == "release":
+            if not pool.release(args.proposal_id):
+                raise SystemExit(f"No worktree leased for {args.proposal_id}")
+            print(f"Released worktree for {args.proposal_id}")
+        elif args.worktree_command == "prepare":
+            slots = pool.prepare(args.count)
+            print(f"{len(slots)} worktrees ready in {pool.pool_dir}")
+        elif args.worktree_command == "reclaim":
+            reclaimed = pool.reclaim_stale()
+            print(f"Reclaimed {len(reclaimed)} stale worktree(s)")
+        else:
+            leases = {lease.slot: lease for lease in pool.leases()}
+            for slot in pool.slots():
+                lease = leases.get(slot)
+                status = "free"
+                if lease:
+                    status = f"leased to {lease.proposal_id}" + (" (stale)" if lease.is_stale() else "")
+                print(f"{slot} {status}")
+    except RuntimeError as exc:
+        raise SystemExit(str(exc))
+
+
+def handle_evidence(args: argparse.Namespace) -> None:
+    from .evidence_store import put_file, read_manifest
+
+    proposal = load_proposal(args.proposal_id, fields=())
+    if args.evidence_command == "put":
+        _require_audit_log()
+        source = Path(args.file)
+        if not source.is_file():
+            raise SystemExit(f"Evidence file not found: {source}")
+        try:
+            entry = put_file(proposal.id, source, name=args.name)
+        except ValueError as exc:
+            raise SystemExit(str(exc))
+        record_event(
+            "evidence",
+            proposal.id,
+            proposal.agent,
+            {
+                "name": entry["name"],
+                "sha256": entry["sha256"],
+                "size": entry["size"],
+                "deduplicated": entry["deduplicated"],
+            },
+        )
+        note = " (already stored)" if entry["deduplicated"] else ""
+        print(f"Stored {entry['name']} for {proposal.id}: sha256 {entry['sha256']}, {entry['size']} bytes{note}")
+    else:
+        for name, entry in sorted(read_manifest(proposal.id)["files"].items()):
+            print(f"{name} {entry['sha256']} {entry['size']} {entry['uploaded_at']}")
+
+
+def handle_list(args: argparse.Namespace) -> None:
+    proposals = list_summaries(include_archived=args.archived)
     if not proposals:
         print("No proposals recorded.")
         return
@@ -249,6 +429,86 @@ def handle_audit(args: argparse.Namespace) -> None:
         print(f"{ev['timestamp']} {ev['event']} proposal={ev['proposal_id']} actor={ev['actor']} data={ev['data']}")
 
 
+def handle_audit_verify(args: argparse.Namespace) -> None:
+    from .audit import verify_chain, verify_log
+
+    if args.log:
+        result = verify_log()
+    else:
+        result = verify_chain(full=args.full, workers=args.workers)
+        if result["trusted_segment"] is not None:
+            print(f"Trusted checkpoint: segment {result['trusted_segment']}")
+        print(f"Segments checked: {result['segments_checked']}")
+    print(f"Events checked: {result['events_checked']}")
+    if not result["ok"]:
+        for err in result["errors"]:
+            print(f"  - {err}")
+        raise SystemExit("Audit chain verification FAILED")
+    print("Audit chain OK")
+
+
+def handle_audit_proof(args: argparse.Namespace) -> None:
+    from .audit import inclusion_proof, verify_inclusion
+
+    try:
+        proof = inclusion_proof(args.seq)
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+    print(f"seq: {proof['seq']}")
+    print(f"hash: {proof['hash']}")
+    print(f"segment: {proof['segment']}")
+    print(f"root: {proof['root']}")
+    for side, sibling in proof["path"]:
+        print(f"  {side} {sibling}")
+    print(f"valid: {verify_inclusion(proof)}")
+
+
+def handle_stats(args: argparse.Namespace) -> None:
+    from .stats import get_stats, rebuild_stats
+
+    if args.rebuild:
+        result = rebuild_stats()
+        print(f"Rebuilt counters from {result['transitions']} transitions over {result['proposals']} proposals")
+    stats = get_stats(agent=args.agent, days=args.days)
+    if not stats["states"]:
+        print("No proposals recorded.")
+        return
+    print("By state:")
+    for state, count in sorted(stats["states"].items()):
+        print(f"  {state}: {count}")
+    print("By agent:")
+    for agent, counts in sorted(stats["agents"].items()):
+        summary = ", ".join(f"{state}={count}" for state, count in sorted(counts.items()))
+        print(f"  {agent}: {summary}")
+    print(f"Transitions since {stats['since']} (all agents):")
+    for state, count in sorted(stats["window_transitions"].items()):
+        print(f"  -> {state}: {count}")
+    rate = stats["reject_rate"]
+    print(f"Reject rate: {'n/a' if rate is None else f'{rate:.1%}'}")
+
+
+def handle_replay(args: argparse.Namespace) -> None:
+    from .replay import rebuild, take_snapshot
+
+    if args.snapshot:
+        result = take_snapshot()
+        print(f"Snapshot at event {result['event_id']} ({len(result['proposals'])} proposals)")
+        return
+    result = rebuild(
+        until_id=args.until_event,
+        until_ts=args.until,
+        to_db=args.db,
+        yaml_dir=Path(args.yaml_dir) if args.yaml_dir else None,
+    )
+    base = result["snapshot_event_id"]
+    print(f"Replayed {result['events_applied']} events from {'snapshot @' + str(base) if base else 'the beginning'}")
+    print(f"State as of event {result['event_id']} ({result['event_ts'] or 'n/a'}): {len(result['proposals'])} proposals")
+    if args.db:
+        print("Rebuilt SQLite proposals table")
+    if args.yaml_dir:
+        print(f"Wrote YAML store to {args.yaml_dir}")
+
+
 def handle_show(args: argparse.Namespace) -> None:
     proposal = load_proposal(args.proposal_id)
     print(f"id: {proposal.id}")
@@ -268,13 +528,285 @@ def handle_show(args: argparse.Namespace) -> None:
         print(f"commit: {proposal.commit}")
 
 
+def handle_locks(args: argparse.Namespace) -> None:
+    from .locks import remove_legacy_locks
+
+    removed = remove_legacy_locks(dry_run=args.dry_run)
+    for path in removed:
+        print(path.name)
+    verb = "Would remove" if args.dry_run else "Removed"
+    print(f"{verb} {len(removed)} legacy lock file(s); proposal locks now use {config.LOCK_STRIPES} stripes")
+
+
+def handle_worker(args: argparse.Namespace) -> None:
+    from .jobs import run_pool
+
+    try:
+        codes = run_pool(args.processes, once=args.once, visibility_seconds=args.visibility_timeout)
+    except KeyboardInterrupt:
+        return
+    if any(codes):
+        raise SystemExit(f"Worker exit codes: {codes}")
+
+
+def handle_jobs(args: argparse.Namespace) -> None:
+    import json
+
+    from .db import get_job, job_counts, list_jobs
+
+    if args.job_id is not None:
+        job = get_job(args.job_id)
+        if job is None:
+            raise SystemExit(f"Job {args.job_id} not found.")
+        print(json.dumps(job, indent=2))
+        return
+    jobs = list_jobs(state=args.state, proposal_id=args.proposal, limit=args.limit)
+    if args.json:
+        print(json.dumps({"jobs": jobs, "counts": job_counts()}, indent=2))
+        return
+    for job in jobs:
+        detail = job["error"] or (job["result"] or {}).get("state") or ""
+        print(f"{job['id']:>6}  {job['state']:<9} p{job['priority']:<3} {job['kind']} {job['proposal_id']}  {detail}")
+    print(", ".join(f"{state}: {count}" for state, count in sorted(job_counts().items())) or "No jobs")
+
+
+def handle_layout(args: argparse.Namespace) -> None:
+    import json
+
+    from .layout import depth_counts, migrate
+
+    report = migrate(dry_run=args.dry_run) if args.migrate or args.dry_run else {}
+    report["depths"] = depth_counts()
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    if report.get("fanout") is not None:
+        verb = "Would move" if args.dry_run else "Moved"
+        moved = ", ".join(f"{report[store]} {store}" for store in ("proposals", "decisions", "evidence"))
+        print(f"{verb} {moved} to fan-out {report['fanout']}")
+        for path in report["conflicts"]:
+            print(f"conflict: {path} also exists at its new location; left in place")
+    for store, depths in report["depths"].items():
+        counts = ", ".join(f"depth {depth}: {count}" for depth, count in depths.items()) or "empty"
+        print(f"{store}: {counts}")
+
+
+def handle_queue(args: argparse.Namespace) -> None:
+    import json
+
+    from .auth import is_allowed_actor
+    from .db import queue_claim, queue_peek, queue_release, queue_size
+
+    if (args.claim or args.release) and not args.by:
+        raise SystemExit("--claim and --release need --by.")
+    if (args.claim or args.release) and not is_allowed_actor(args.by):
+        raise SystemExit(f"Reviewer {args.by} is not in allowlist ({config.AUTH_ALLOWLIST_FILE})")
+    if args.release:
+        released = queue_release(args.release, args.by)
+        print(f"Released {released} claim(s) held by {args.by}")
+        return
+    if args.claim:
+        rows = queue_claim(args.next, args.by, args.lease or config.REVIEW_LEASE_SECONDS)
+    else:
+        rows = queue_peek(args.next, by=args.by, include_claimed=args.all)
+    if args.json:
+        print(json.dumps({"items": rows, **queue_size()}, indent=2))
+        return
+    if not rows:
+        print("Review queue is empty.")
+        return
+    for row in rows:
+        claim = f" claimed_by={row['claimed_by']}" if row["claimed_by"] else ""
+        print(
+            f"{row['proposal_id']} [{row['risk_level']}] agent={row['agent']} queued={row['queued_at']} "
+            f"p95_delta_ms={row['perf_delta']:g}{claim} goal={row['goal']}"
+        )
+
+
+def handle_export(args: argparse.Namespace) -> None:
+    import json
+    import sys
+
+    from .backup import export_store
+
+    result = export_store(args.output, level=args.level, workers=args.workers)
+    # With the archive on stdout, the summary must not end up inside it.
+    out = sys.stderr if args.output == "-" else sys.stdout
+    if args.json:
+        print(json.dumps(result, indent=2), file=out)
+        return
+    print(
+        f"Exported {result['rows']} row(s) and {result['files']} file(s) as of seq {result['last_seq']}: "
+        f"{result['bytes']} bytes, {result['compressed_bytes']} compressed; "
+        f"writers paused {result['paused_seconds'] * 1000:.1f} ms",
+        file=out,
+    )
+
+
+def handle_import(args: argparse.Namespace) -> None:
+    import json
+
+    from .backup import import_store
+
+    try:
+        result = import_store(args.archive, Path(args.data_dir) if args.data_dir else None)
+    except (OSError, ValueError, RuntimeError) as exc:
+        raise SystemExit(str(exc))
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(
+            f"Imported {result['rows']} row(s) and {result['files']} file(s) as of {result['snapshot_at']}; "
+            f"chain {'verified' if result['verified'] else 'INVALID'}"
+        )
+    if not result["verified"]:
+        raise SystemExit(1)
+
+
+def handle_replicate(args: argparse.Namespace) -> None:
+    import json
+    from contextlib import nullcontext
+
+    from . import replication
+
+    if args.replicate_command == "ship":
+        def step() -> None:
+            result = replication.ship(Path(args.target))
+            if result["shipped"] or not args.follow:
+                print(f"Shipped {result['shipped']} event(s); head seq {result['last_seq']}")
+    elif args.replicate_command == "restore":
+        try:
+            result = replication.restore(Path(args.source), Path(args.data_dir) if args.data_dir else None)
+        except RuntimeError as exc:
+            raise SystemExit(str(exc))
+        print(f"Restored {result['applied']} event(s); chain {'verified' if result['verified'] else 'INVALID'}")
+        if not result["verified"]:
+            raise SystemExit(1)
+        return
+    else:
+        def step() -> None:
+            with use_data_dir(Path(args.data_dir)) if args.data_dir else nullcontext():
+                if args.replicate_command == "status":
+                    print(json.dumps(replication.status(Path(args.source)), indent=2))
+                    return
+                result = replication.apply(Path(args.source))
+            if result["applied"] or not args.follow:
+                print(f"Applied {result['applied']} event(s); replica at seq {result['applied_seq']}")
+
+    try:
+        if getattr(args, "follow", False):
+            replication.follow(step, args.interval)
+        else:
+            step()
+    except RuntimeError as exc:
+        raise SystemExit(str(exc))
+    except KeyboardInterrupt:
+        pass
+
+
+def handle_conflicts(args: argparse.Namespace) -> None:
+    import json
+
+    from .scopes import conflict_pairs
+
+    pairs = conflict_pairs()
+    if args.json:
+        print(json.dumps(pairs, indent=2))
+        return
+    if not pairs:
+        print("No overlapping in-flight proposals.")
+        return
+    for pair in pairs:
+        entries = ", ".join(a if a == b else f"{a} ~ {b}" for a, b in pair["entries"])
+        print(f"{pair['a']} <-> {pair['b']}: {entries}")
+
+
+def handle_archive(args: argparse.Namespace) -> None:
+    import json
+
+    from .archive import archive, gc
+
+    report = archive(older_than_days=args.older_than, dry_run=args.dry_run)
+    if args.gc:
+        report["gc"] = gc(dry_run=args.dry_run)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    verb = "Would archive" if args.dry_run else "Archived"
+    packs = ", ".join(f"{month}: {count}" for month, count in sorted(report["packs"].items())) or "none"
+    print(f"{verb} {len(report['archived'])} proposal(s) last updated before {report['cutoff']} (packs: {packs})")
+    if report["changed"]:
+        print(f"Left {len(report['changed'])} changed proposal(s) in place: {', '.join(report['changed'])}")
+    if args.gc:
+        verb = "Would remove" if args.dry_run else "Removed"
+        counts = ", ".join(f"{len(names)} {kind}" for kind, names in report["gc"].items())
+        print(f"GC: {verb} {counts}")
+
+
+def handle_stress(args: argparse.Namespace) -> None:
+    import json
+
+    from .stress import StressConfig, remove_data_dir, run_stress
+
+    cfg = StressConfig(
+        agents=args.agents, humans=args.humans, duration=args.duration, mode=args.mode,
+        kill=args.kill, think=args.think, seed=args.seed,
+    )
+    try:
+        report = run_stress(cfg, Path(args.data_dir) if args.data_dir else None)
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+    if not args.keep and not args.data_dir:
+        remove_data_dir(report)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(
+            f"{report['total_ops']} ops in {report['elapsed']}s ({report['throughput']} ok/s); "
+            f"killed {report['killed']}, hung {report['hung']}, crashed {report['crashed']}"
+        )
+        for op, r in report["ops"].items():
+            lat = r["latency_ms"]
+            print(
+                f"  {op:<9} ok={r['ok']} rejected={r['rejected']} shed={r['shed']} error={r['error']} "
+                f"{r['throughput']}/s  p50<={lat['p50']}ms p99<={lat['p99']}ms max={lat['max']}ms"
+            )
+        for detail, count in report["errors"].items():
+            print(f"  error x{count}: {detail}")
+        inv = report["invariants"]
+        print(f"Invariants over {inv['proposals']} proposals / {inv['events_checked']} events:", "OK" if report["ok"] else "FAILED")
+        for violation in inv["violations"]:
+            print(f"  - {violation}")
+        if args.keep or args.data_dir:
+            print(f"Data kept in {report['data_dir']}")
+    if not report["ok"]:
+        raise SystemExit(1)
+
+
+def handle_bench(args: argparse.Namespace) -> None:
+    import json
+
+    from .bench import bench_storage
+
+    report = bench_storage(args.proposals, memory_sample=args.memory_sample, pure_yaml=args.pure_yaml)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{report['proposals']} proposals (memory sampled over {report['memory_sample']}):")
+    for name, view in report["views"].items():
+        print(
+            f"  {name:<15} list {view['seconds']:>8.2f}s  {view['us_per_proposal']:>8.1f} us/proposal  "
+            f"{view['bytes_per_proposal']:>6} B/proposal"
+        )
+
+
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="AAP MVP control-plane CLI")
     sub = parser.add_subparsers(dest="command")
 
     propose = sub.add_parser("propose", help="Create a new proposal")
-    propose.add_argument("--agent", required=True, help="Agent identifier")
-    propose.add_argument("--goal", required=True, help="Intent/goal for the proposal")
+    propose.add_argument("--agent", help="Agent identifier")
+    propose.add_argument("--goal", help="Intent/goal for the proposal")
     propose.add_argument(
         "--scope",
         nargs="*",
@@ -290,16 +822,27 @@ def build_parser() -> argparse.ArgumentParser:
     propose.add_argument("--risk-level", default="medium", help="Risk level label")
     propose.add_argument("--policy", help="Path to policy file (YAML/JSON)")
     propose.add_argument("--id", help="Optional proposal id")
+    propose.add_argument(
+        "--from-file",
+        help="Create many proposals from an NDJSON file ('-' for stdin), one JSON object per line",
+    )
+    propose.add_argument("--verbose", action="store_true", help="With --from-file, also list created ids")
     propose.set_defaults(func=handle_propose)
 
     evaluate = sub.add_parser("evaluate", help="Evaluate a proposal against policy + evidence")
     evaluate.add_argument("proposal_id")
     evaluate.add_argument("--policy", help="Path to policy file")
     evaluate.add_argument("--evidence", help="Path to evidence file (JSON/YAML)")
+    evaluate.add_argument("--force", action="store_true", help="Re-run even if an identical evaluation is cached")
     evaluate.set_defaults(func=handle_evaluate)
 
     decide_cmd = sub.add_parser("decide", help="Record a human accept/reject decision")
-    decide_cmd.add_argument("proposal_id")
+    decide_cmd.add_argument("proposal_id", nargs="?")
+    decide_cmd.add_argument(
+        "--batch", nargs="*", metavar="ID", help="Decide several EVALUATED proposals with one OTP (ids and/or filters)"
+    )
+    decide_cmd.add_argument("--agent", help="With --batch: every EVALUATED proposal from this agent")
+    decide_cmd.add_argument("--risk-level", choices=["low", "medium", "high"], help="With --batch: filter by risk level")
     group = decide_cmd.add_mutually_exclusive_group(required=True)
     group.add_argument("--accept", action="store_true", help="Accept the proposal")
     group.add_argument("--reject", action="store_true", help="Reject the proposal")
@@ -309,21 +852,179 @@ def build_parser() -> argparse.ArgumentParser:
     decide_cmd.set_defaults(func=handle_decide)
 
     commit_cmd = sub.add_parser("commit", help="Commit an accepted proposal to git")
-    commit_cmd.add_argument("proposal_id")
+    commit_cmd.add_argument("proposal_id", nargs="?")
+    commit_cmd.add_argument(
+        "--batch", nargs="+", metavar="ID", help="Commit several accepted proposals in one git pass"
+    )
     commit_cmd.add_argument("--message", help="Commit message override")
     commit_cmd.add_argument("--stage-all", action="store_true", help="Stage all changes before commit")
     commit_cmd.add_argument("--tag", action="store_true", default=True, help="Create a tag aap/<id>")
     commit_cmd.add_argument("--no-tag", dest="tag", action="store_false")
     commit_cmd.add_argument("--push", action="store_true", help="Push commit (and tag if created)")
     commit_cmd.add_argument("--branch", help="Branch to push (default: current)")
+    commit_cmd.add_argument(
+        "--worktree", action="store_true", help="Commit inside the proposal's leased worktree, then release it"
+    )
     commit_cmd.set_defaults(func=handle_commit)
 
+    worktree_cmd = sub.add_parser("worktree", help="Manage the per-proposal git worktree pool")
+    worktree_cmd.set_defaults(func=handle_worktree)
+    worktree_sub = worktree_cmd.add_subparsers(dest="worktree_command")
+    wt_lease = worktree_sub.add_parser("lease", help="Lease a clean worktree for a proposal and print its path")
+    wt_lease.add_argument("proposal_id")
+    wt_lease.add_argument("--ttl", type=float, help="Lease lifetime in seconds")
+    wt_release = worktree_sub.add_parser("release", help="Reset and return a proposal's worktree to the pool")
+    wt_release.add_argument("proposal_id")
+    wt_prepare = worktree_sub.add_parser("prepare", help="Pre-create worktrees")
+    wt_prepare.add_argument("--count", type=int, help="Number of worktrees (default: pool size)")
+    worktree_sub.add_parser("reclaim", help="Free leases that expired or whose owner died")
+    worktree_sub.add_parser("list", help="Show slots and leases")
+
+    evidence_cmd = sub.add_parser("evidence", help="Manage evidence in the content-addressed store")
+    evidence_cmd.set_defaults(func=handle_evidence)
+    evidence_sub = evidence_cmd.add_subparsers(dest="evidence_command")
+    ev_put = evidence_sub.add_parser("put", help="Store a file as evidence (results.json is what evaluate reads)")
+    ev_put.add_argument("proposal_id")
+    ev_put.add_argument("file")
+    ev_put.add_argument("--name", default="results.json", help="Evidence name (default: results.json)")
+    ev_list = evidence_sub.add_parser("list", help="Show a proposal's stored evidence")
+    ev_list.add_argument("proposal_id")
+
+    locks_cmd = sub.add_parser("locks", help="Remove per-proposal lock files left by older versions")
+    locks_cmd.add_argument("--dry-run", action="store_true", help="Only list what would be removed")
+    locks_cmd.set_defaults(func=handle_locks)
+
+    worker_cmd = sub.add_parser("worker", help="Run background jobs (queued evaluations) from the SQLite job queue")
+    worker_cmd.add_argument("--processes", type=int, default=1, help="Worker processes (default: 1, in this process)")
+    worker_cmd.add_argument("--once", action="store_true", help="Exit once no job is visible instead of waiting")
+    worker_cmd.add_argument(
+        "--visibility-timeout",
+        type=float,
+        help=f"Seconds a claimed job stays hidden before another worker may retry it (default: {config.JOB_VISIBILITY_TIMEOUT})",
+    )
+    worker_cmd.set_defaults(func=handle_worker)
+
+    jobs_cmd = sub.add_parser("jobs", help="Show background jobs, newest first, or one job")
+    jobs_cmd.add_argument("job_id", nargs="?", type=int)
+    jobs_cmd.add_argument("--state", choices=["queued", "running", "succeeded", "failed"])
+    jobs_cmd.add_argument("--proposal", help="Only jobs for this proposal")
+    jobs_cmd.add_argument("--limit", type=int, default=50)
+    jobs_cmd.add_argument("--json", action="store_true", help="Print jobs and per-state counts as JSON")
+    jobs_cmd.set_defaults(func=handle_jobs)
+
+    layout_cmd = sub.add_parser("layout", help="Show (or migrate) the fan-out layout of the proposal stores")
+    layout_cmd.add_argument(
+        "--migrate", action="store_true", help=f"Move entries to the configured fan-out ({config.STORE_FANOUT})"
+    )
+    layout_cmd.add_argument("--dry-run", action="store_true", help="Only count what --migrate would move")
+    layout_cmd.add_argument("--json", action="store_true", help="Print the report as JSON")
+    layout_cmd.set_defaults(func=handle_layout)
+
+    queue_cmd = sub.add_parser("queue", help="Show (or claim) the next EVALUATED proposals awaiting review")
+    queue_cmd.add_argument("--next", type=int, default=10, metavar="N", help="How many to show or claim")
+    queue_cmd.add_argument("--by", help="Reviewer; their own claims are shown too")
+    queue_cmd.add_argument("--claim", action="store_true", help="Lease the next N to --by")
+    queue_cmd.add_argument(
+        "--lease", type=float, help=f"Claim duration in seconds (default: {config.REVIEW_LEASE_SECONDS})"
+    )
+    queue_cmd.add_argument("--release", nargs="+", metavar="ID", help="Drop --by's claims on these proposals")
+    queue_cmd.add_argument("--all", action="store_true", help="Include proposals claimed by other reviewers")
+    queue_cmd.add_argument("--json", action="store_true", help="Print the items and queue size as JSON")
+    queue_cmd.set_defaults(func=handle_queue)
+
+    replicate_cmd = sub.add_parser("replicate", help="Ship the audit log to read replicas, apply it, or restore from it")
+    replicate_sub = replicate_cmd.add_subparsers(dest="replicate_command", required=True)
+    ship_cmd = replicate_sub.add_parser("ship", help="Primary: copy new audit events to a shipping directory")
+    ship_cmd.add_argument("--target", required=True, help="Shipping directory (shared volume / object store mount)")
+    apply_cmd = replicate_sub.add_parser("apply", help="Replica: apply shipped events to this node's store")
+    restore_cmd = replicate_sub.add_parser("restore", help="Rebuild an empty data directory from shipped events")
+    status_cmd = replicate_sub.add_parser("status", help="Replica position and lag")
+    for cmd in (apply_cmd, restore_cmd, status_cmd):
+        cmd.add_argument("--source", required=True, help="Shipping directory written by `replicate ship`")
+        cmd.add_argument("--data-dir", help="Data directory to use instead of this node's own paths")
+    for cmd in (ship_cmd, apply_cmd):
+        cmd.add_argument("--follow", action="store_true", help="Keep running, one pass per --interval")
+        cmd.add_argument("--interval", type=float, help=f"Seconds between passes (default: {config.REPLICATION_INTERVAL})")
+    replicate_cmd.set_defaults(func=handle_replicate)
+
+    export_cmd = sub.add_parser("export", help="Write a consistent, compressed snapshot of the whole store")
+    export_cmd.add_argument("output", help="Archive file (.ndjson.gz), or - for stdout")
+    export_cmd.add_argument(
+        "--level", type=int, help=f"gzip level 1-9 (default: {config.EXPORT_COMPRESS_LEVEL})"
+    )
+    export_cmd.add_argument("--workers", type=int, help="Compression threads (default: one per core)")
+    export_cmd.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    export_cmd.set_defaults(func=handle_export)
+
+    import_cmd = sub.add_parser("import", help="Load an export into an empty data directory")
+    import_cmd.add_argument("archive", help="Archive written by `aap export`, or - for stdin")
+    import_cmd.add_argument("--data-dir", help="Data directory to load into instead of this node's own paths")
+    import_cmd.add_argument("--json", action="store_true", help="Print the counts as JSON")
+    import_cmd.set_defaults(func=handle_import)
+
+    conflicts_cmd = sub.add_parser("conflicts", help="List in-flight proposals whose scopes overlap")
+    conflicts_cmd.add_argument("--json", action="store_true", help="Print the pairs as JSON")
+    conflicts_cmd.set_defaults(func=handle_conflicts)
+
+    archive_cmd = sub.add_parser("archive", help="Move old committed/rejected proposals into compressed monthly packs")
+    archive_cmd.add_argument(
+        "--older-than", type=float, help=f"Retention in days (default: {config.ARCHIVE_RETENTION_DAYS})"
+    )
+    archive_cmd.add_argument("--dry-run", action="store_true", help="Only report what would be archived/removed")
+    archive_cmd.add_argument("--gc", action="store_true", help="Also remove orphaned lock, evidence and blob files")
+    archive_cmd.add_argument("--json", action="store_true", help="Print the report as JSON")
+    archive_cmd.set_defaults(func=handle_archive)
+
+    stress_cmd = sub.add_parser("stress", help="Run a multi-process load/chaos round and check invariants")
+    stress_cmd.add_argument("--agents", type=int, default=50, help="Agent worker processes (propose/evaluate/list)")
+    stress_cmd.add_argument("--humans", type=int, default=5, help="Human worker processes (list/decide)")
+    stress_cmd.add_argument("--duration", type=float, default=10.0, help="Seconds of load")
+    stress_cmd.add_argument("--mode", choices=["cli", "api", "mixed"], default="cli", help="Drive CLI handlers, the API, or both")
+    stress_cmd.add_argument("--kill", type=int, default=0, help="SIGKILL this many workers mid-run (chaos)")
+    stress_cmd.add_argument("--think", type=float, default=0.0, help="Pause between a worker's operations (seconds)")
+    stress_cmd.add_argument("--seed", type=int, default=0)
+    stress_cmd.add_argument("--data-dir", help="Use this (empty) directory instead of a temporary one; kept afterwards")
+    stress_cmd.add_argument("--keep", action="store_true", help="Keep the temporary data directory")
+    stress_cmd.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    stress_cmd.set_defaults(func=handle_stress)
+
+    bench_cmd = sub.add_parser("bench", help="Benchmark list latency and memory per proposal by read projection")
+    bench_cmd.add_argument("--proposals", type=int, default=100_000, help="Records to generate (default: 100000)")
+    bench_cmd.add_argument("--memory-sample", type=int, default=10_000, help="Records measured with tracemalloc")
+    bench_cmd.add_argument("--pure-yaml", action="store_true", help="Also time PyYAML's pure-Python loader (slow)")
+    bench_cmd.add_argument("--json", action="store_true", help="Print the report as JSON")
+    bench_cmd.set_defaults(func=handle_bench)
+
     list_cmd = sub.add_parser("list", help="List proposals")
+    list_cmd.add_argument("--archived", action="store_true", help="Include proposals moved to archive packs")
     list_cmd.set_defaults(func=handle_list)
 
     audit_cmd = sub.add_parser("audit", help="Show recent audit events")
     audit_cmd.add_argument("--limit", type=int, default=50, help="Number of events to show")
     audit_cmd.set_defaults(func=handle_audit)
+    audit_sub = audit_cmd.add_subparsers(dest="audit_command")
+    verify_cmd = audit_sub.add_parser("verify", help="Verify the tamper-evident audit hash chain")
+    verify_cmd.add_argument("--full", action="store_true", help="Re-verify all segments, not just those after the last checkpoint marked verified (that mark lives in the same DB)")
+    verify_cmd.add_argument("--log", action="store_true", help="Verify audit.log instead of the events table")
+    verify_cmd.add_argument("--workers", type=int, help="Parallel hashing processes (default: CPU count)")
+    verify_cmd.set_defaults(func=handle_audit_verify)
+    proof_cmd = audit_sub.add_parser("proof", help="Print a Merkle inclusion proof for one event")
+    proof_cmd.add_argument("seq", type=int, help="Event sequence number")
+    proof_cmd.set_defaults(func=handle_audit_proof)
+
+    stats_cmd = sub.add_parser("stats", help="Show aggregate proposal counters")
+    stats_cmd.add_argument("--agent", help="Only count proposals from this agent")
+    stats_cmd.add_argument("--days", type=int, default=7, help="Window for transition counts (days)")
+    stats_cmd.add_argument("--rebuild", action="store_true", help="Recompute counters from the events table first")
+    stats_cmd.set_defaults(func=handle_stats)
+
+    replay_cmd = sub.add_parser("replay", help="Rebuild proposal state from the events table")
+    replay_cmd.add_argument("--until-event", type=int, help="Replay up to and including this event id")
+    replay_cmd.add_argument("--until", help="Replay up to this ISO timestamp (point-in-time)")
+    replay_cmd.add_argument("--db", action="store_true", help="Replace the SQLite proposals table with the result")
+    replay_cmd.add_argument("--yaml-dir", help="Write the result as a YAML proposal store into this directory")
+    replay_cmd.add_argument("--snapshot", action="store_true", help="Only record a new snapshot at the latest event")
+    replay_cmd.set_defaults(func=handle_replay)
 
     show_cmd = sub.add_parser("show", help="Show proposal details")
     show_cmd.add_argument("proposal_id")
@@ -338,7 +1039,10 @@ def main() -> None:
     if not hasattr(args, "func"):
         parser.print_help()
         return
-    args.func(args)
+    try:
+        args.func(args)
+    except AuditLogBroken as exc:  # broken after the command's own check
+        raise SystemExit(f"Audit log unusable: {exc}")
 
 
 if __name__ == "__main__":
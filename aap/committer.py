@@ -0,0 +1,201 @@
+"""Batch commit: land many ACCEPTED proposals in one git pass.
+
+All scopes are validated against the staged changes before anything is
+written. Commits are then built one after another on a temporary index, tags
+are created as objects, and the branch plus every ``aap/<id>`` tag move in a
+single ``update-ref --stdin`` transaction followed by one push.
+
+The proposals are locked and re-read before the ref update and stay locked
+until their records are written; if any is no longer ACCEPTED, nothing lands.
+The git side is atomic; the store side is ordered, not transactional. After
+the ref update, the ``commit`` events and their mirror rows are persisted
+first (one audit append, one SQLite transaction), and only then is each YAML
+record rewritten. A crash in between can leave records still ACCEPTED behind
+audited commits, which replaying the events (``aap replay --yaml-dir``)
+repairs. It never leaves a COMMITTED record without its event.
+"""
+
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import config
+from .adapters import git_adapter
+from .audit import record_events
+from .locks import lock_manager
+from .state import ProposalState
+from .storage import Proposal, load_proposal
+from .utils import utc_now
+
+
+@dataclass
+class BatchItem:
+    proposal_id: str
+    status: str = "pending"  # committed | rolled_back | not_attempted
+    sha: Optional[str] = None
+    tag: Optional[str] = None
+    paths: Optional[List[str]] = None
+    error: Optional[str] = None
+
+
+def assign_paths(
+    proposals: List[Proposal], changes: List[Tuple[str, str]]
+) -> Tuple[Dict[str, List[Tuple[str, str]]], List[str]]:
+    """Map every staged change to exactly one proposal by scope prefix."""
+    assigned: Dict[str, List[Tuple[str, str]]] = {p.id: [] for p in proposals}
+    errors: List[str] = []
+    for status, path in changes:
+        owners = [p.id for p in proposals if any(path.startswith(scope) for scope in p.scope)]
+        if not owners:
+            errors.append(f"staged path {path} is outside every proposal scope")
+        elif len(owners) > 1:
+            errors.append(f"staged path {path} matches several proposals: {', '.join(owners)}")
+        else:
+            assigned[owners[0]].append((status, path))
+    for pid, paths in assigned.items():
+        if not paths:
+            errors.append(f"proposal {pid} has no staged changes in scope")
+    return assigned, errors
+
+
+def commit_batch(
+    proposal_ids: List[str],
+    cwd: Optional[Path] = None,
+    stage_all: bool = False,
+    tag: bool = True,
+    push: bool = False,
+    branch: Optional[str] = None,
+    actor: str = "system",
+) -> Dict[str, Any]:
+    """Commit ``proposal_ids`` in order; raise ValueError if validation fails.
+
+    If building commit N fails, proposals 1..N-1 still land and the rest are
+    reported as rolled back. If the ref transaction fails, nothing lands.
+    """
+    repo_root = cwd or git_adapter.default_repo_root()
+    head_ref = git_adapter.head_ref(cwd=repo_root)
+    if push and not branch and head_ref == "HEAD":
+        raise ValueError("HEAD is detached; pass --branch to push.")
+    errors: List[str] = []
+    proposals: List[Proposal] = []
+    for pid in dict.fromkeys(proposal_ids):
+        try:
+            proposal = load_proposal(pid)
+        except FileNotFoundError as exc:
+            errors.append(str(exc))
+            continue
+        if proposal.state != ProposalState.ACCEPTED:
+            errors.append(f"proposal {pid} must be ACCEPTED (current: {proposal.state.value})")
+        elif not proposal.scope:
+            errors.append(f"proposal {pid} scope is empty")
+        proposals.append(proposal)
+    if errors:
+        raise ValueError("; ".join(errors))
+
+    if stage_all:
+        git_adapter.stage_all(cwd=repo_root)
+    changes = git_adapter.list_staged_changes(cwd=repo_root)
+    if not changes:
+        raise ValueError("No staged changes. Stage files or pass --stage-all.")
+    assigned, errors = assign_paths(proposals, changes)
+    if errors:
+        raise ValueError("; ".join(errors))
+
+    head = git_adapter.rev_parse("HEAD", cwd=repo_root)
+    items = [BatchItem(proposal_id=p.id, paths=[path for _, path in assigned[p.id]]) for p in proposals]
+    parent = head
+    ref_updates: List[Tuple[str, str, Optional[str]]] = []
+    for proposal, item in zip(proposals, items):
+        try:
+            item.sha = git_adapter.commit_staged_paths(
+                parent, assigned[proposal.id], f"aap:{proposal.id} {proposal.goal}", cwd=repo_root
+            )
+            if tag:
+                item.tag = f"{config.DEFAULT_TAG_PREFIX}{proposal.id}"
+                tag_object = git_adapter.create_tag_object(item.tag, item.sha, f"AAP {proposal.id}", cwd=repo_root)
+                ref_updates.append((f"refs/tags/{item.tag}", tag_object, None))
+        except RuntimeError as exc:
+            item.status, item.error, item.sha, item.tag = "rolled_back", str(exc), None, None
+            break
+        item.status = "committed"
+        parent = item.sha
+    for item in items:
+        if item.status == "pending":
+            item.status, item.error = "not_attempted", "an earlier proposal in the batch failed"
+
+    committed = [(p, i) for p, i in zip(proposals, items) if i.status == "committed"]
+    pushed, push_error = False, None
+    manager = lock_manager()
+    with ExitStack() as stack:
+        # Lock (stripe order, like decide_batch) and re-read before anything lands:
+        # a proposal rejected since validation must not be committed from a stale copy.
+        for path in sorted({manager.path_for("proposal", p.id) for p, _ in committed}):
+            stack.enter_context(manager.hold(path, name="proposal"))
+        stale = []
+        for proposal, _ in committed:
+            proposal.reload()
+            if proposal.state != ProposalState.ACCEPTED:
+                stale.append(f"proposal {proposal.id} is {proposal.state.value} now, not accepted")
+        if stale:
+            for _, item in committed:
+                item.status, item.error = "rolled_back", "; ".join(stale)
+            committed = []
+        if committed:
+            try:
+                git_adapter.update_refs([(head_ref, parent, head)] + ref_updates, cwd=repo_root)
+            except RuntimeError as exc:
+                for _, item in committed:
+                    item.status, item.error = "rolled_back", f"ref update failed: {exc}"
+                committed = []
+
+        if push and committed:
+            target = branch or head_ref.replace("refs/heads/", "", 1)
+            refspecs = [f"{parent}:refs/heads/{target}"] + [f"refs/tags/{i.tag}" for _, i in committed if i.tag]
+            try:
+                git_adapter.push_refspecs(refspecs, cwd=repo_root)
+                pushed = True
+            except RuntimeError as exc:
+                push_error = str(exc)
+
+        events = []
+        for proposal, item in committed:
+            proposal.update_state(ProposalState.COMMITTED)
+            proposal.commit = {
+                "message": f"aap:{proposal.id} {proposal.goal}",
+                "sha": item.sha,
+                "tag": item.tag,
+                "pushed": pushed,
+                "branch": branch,
+                "committed_at": utc_now(),
+            }
+            events.append(
+                (
+                    "commit",
+                    proposal.id,
+                    actor,
+                    {
+                        "sha": item.sha,
+                        "tag": item.tag,
+                        "pushed": pushed,
+                        "branch": branch,
+                        "state": proposal.state.value,
+                        "commit": proposal.commit,
+                        "updated_at": proposal.updated_at,
+                        "batch": [p.id for p in proposals],
+                    },
+                )
+            )
+        if events:
+            # Events and rows first: a record never says COMMITTED without its event.
+            record_events(events, proposals=[p.to_dict() for p, _ in committed])
+            for proposal, _ in committed:
+                proposal.save(mirror=False, touch=False)
+
+    return {
+        "ok": len(committed) == len(items),
+        "head": parent if committed else head,
+        "pushed": pushed,
+        "push_error": push_error,
+        "items": [asdict(item) for item in items],
+    }
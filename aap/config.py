@@ -9,13 +9,27 @@ POLICY_DIR = BASE_DIR / "policies"
 EVIDENCE_DIR = BASE_DIR / "evidence"
 DECISIONS_DIR = BASE_DIR / "decisions"
 LOCK_DIR = BASE_DIR / "locks"
+ARCHIVE_DIR = BASE_DIR / "archive"
 DB_FILE = BASE_DIR / "aap.db"
 
+# Hash fan-out of the proposal, decision and evidence stores: directory levels
+# (one hex pair of sha1(id) each, at most 3) above every entry; 0 is flat.
+# After changing it, `aap layout --migrate` moves existing entries (both
+# layouts are read meanwhile).
+STORE_FANOUT = 0
+
 # Default files
 DEFAULT_POLICY_FILE = POLICY_DIR / "default.yaml"
+# Routed policy sets (each with a `match:` block), applied on top of the default policy
+POLICY_SET_DIR = POLICY_DIR / "sets"
+# How often the files of POLICY_SET_DIR are re-stat'ed for in-place edits (seconds);
+# sets added or removed are seen at once through the directory's mtime
+POLICY_RELOAD_INTERVAL = 1.0
 
 # Git settings
 DEFAULT_TAG_PREFIX = "aap/"
+# Commits made on a detached HEAD (worktree slots) are kept reachable under this prefix
+COMMIT_REF_PREFIX = "refs/aap/"
 
 # Auth / audit
 AUTH_ALLOWLIST_FILE = BASE_DIR / "auth_allowlist.txt"
@@ -23,3 +37,95 @@ AUDIT_LOG_FILE = BASE_DIR / "audit.log"
 TOTP_SECRET_ENV = "AAP_TOTP_SECRET"
 API_TOKEN_ENV = "AAP_API_TOKEN"
 API_TOKEN_FILE = BASE_DIR / "api_tokens.txt"
+
+# Audit hash chain: events per Merkle checkpoint segment
+AUDIT_CHECKPOINT_INTERVAL = 1024
+
+# Event replay: a full replay folding this many events past its base snapshot records a new one
+SNAPSHOT_INTERVAL = 10000
+
+# Git worktree pool (None = <git common dir>/aap-worktrees)
+WORKTREE_POOL_DIR = None
+WORKTREE_POOL_SIZE = 4
+WORKTREE_BASE_REF = "HEAD"
+WORKTREE_LEASE_TTL = 3600  # seconds
+
+# Push coordinator: coalescing window, attempts and base backoff (seconds)
+PUSH_COALESCE_WINDOW = 0.05
+PUSH_MAX_ATTEMPTS = 4
+PUSH_RETRY_BACKOFF = 0.5
+
+# API admission control limits (YAML/JSON, reloaded when changed)
+RATE_LIMIT_FILE = BASE_DIR / "rate_limits.yaml"
+# Token buckets kept in memory per API process (least recently used dropped first)
+ADMISSION_MAX_BUCKETS = 10000
+
+# POST /proposals:batch: records per commit (one directory fsync, audit write and
+# SQLite transaction each); results are streamed back as each commit lands
+INGEST_COMMIT_RECORDS = 500
+
+# Proposal watch hub: live changes buffered per subscriber before eviction, and
+# how often it checks for writes from other processes (seconds; an O(1) check of
+# the invalidation bus, see aap/invalidation.py)
+WATCH_BUFFER_SIZE = 1000
+WATCH_POLL_INTERVAL = 0.05
+
+# API read path: serialized proposals kept in memory, and the body size from which
+# responses are gzip-compressed for clients that accept it
+READ_CACHE_SIZE = 10000
+GZIP_MIN_BYTES = 4096
+
+# Memoized evaluate results (SQLite eval_cache table), evicted LRU beyond this many entries
+EVAL_CACHE_SIZE = 5000
+
+# Largest evidence upload accepted (bytes); blobs live under EVIDENCE_DIR/blobs
+EVIDENCE_MAX_BYTES = 1 << 30
+
+# File locks: stripes shared by per-proposal locks, and the default acquisition timeout (seconds)
+LOCK_STRIPES = 64
+LOCK_TIMEOUT = 30.0
+
+# Archive packs: terminal proposals untouched for this many days move to ARCHIVE_DIR
+ARCHIVE_RETENTION_DAYS = 90
+
+# Review queue: how long a reviewer's claim on a queued proposal lasts (seconds)
+REVIEW_LEASE_SECONDS = 900
+
+# Background jobs (aap worker): how long a claim hides a job from other workers
+# (seconds), claims before a job is failed, delay before retrying after lock
+# contention, idle re-check interval, and how long finished jobs are kept (days)
+JOB_VISIBILITY_TIMEOUT = 300.0
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_DELAY = 5.0
+JOB_POLL_INTERVAL = 1.0
+JOB_RETENTION_DAYS = 7
+
+# Replication: audit events per shipped segment, the follow-loop interval (seconds),
+# a replica's applied position, and the env vars that make an API node a read-only
+# replica and point it at the shipping directory (for lag in GET /replication)
+REPLICATION_SEGMENT_EVENTS = 10000
+REPLICATION_INTERVAL = 1.0
+REPLICA_STATE_FILE = BASE_DIR / "replica.json"
+READ_ONLY_ENV = "AAP_READ_ONLY"
+REPLICATION_SOURCE_ENV = "AAP_REPLICATION_SOURCE"
+
+# Export/import (aap export / aap import): uncompressed bytes per gzip member and
+# per file chunk, gzip level, compression threads (None = one per core), and
+# SQLite rows per export record / import transaction
+EXPORT_CHUNK_BYTES = 1 << 20
+EXPORT_COMPRESS_LEVEL = 6
+EXPORT_WORKERS = None
+EXPORT_BATCH_ROWS = 5000
+
+# Every writable location, relative to a data directory (see utils.use_data_dir)
+DATA_PATHS = {
+    "PROPOSAL_DIR": "proposals",
+    "EVIDENCE_DIR": "evidence",
+    "DECISIONS_DIR": "decisions",
+    "LOCK_DIR": "locks",
+    "ARCHIVE_DIR": "archive",
+    "DB_FILE": "aap.db",
+    "AUDIT_LOG_FILE": "audit.log",
+    "AUTH_ALLOWLIST_FILE": "auth_allowlist.txt",
+    "REPLICA_STATE_FILE": "replica.json",
+}
@@ -1,21 +1,38 @@
 import json
 import sqlite3
+import time
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 from . import config
 from .utils import ensure_dir, file_lock
 
+# Database files already initialised by this process; avoids re-running DDL on every write.
+_INITIALIZED: Set[Path] = set()
 
-def _connect() -> sqlite3.Connection:
-    ensure_dir(config.DB_FILE.parent)
-    conn = sqlite3.connect(config.DB_FILE)
+# Jobs that are not finished yet: waiting, or claimed by a worker whose lease may lapse.
+_JOB_PENDING = "state in ('queued', 'running')"
+
+
+def _connect(db_file: Optional[Path] = None) -> sqlite3.Connection:
+    path = db_file or config.DB_FILE
+    ensure_dir(path.parent)
+    conn = sqlite3.connect(path)
     conn.execute("pragma journal_mode=WAL;")
     conn.execute("pragma foreign_keys=ON;")
     return conn
 
 
+def _ensure_columns(conn: sqlite3.Connection, table: str, columns: Dict[str, str]) -> None:
+    existing = {row[1] for row in conn.execute(f"pragma table_info({table})")}
+    for name, decl in columns.items():
+        if name not in existing:
+            conn.execute(f"alter table {table} add column {name} {decl}")
+
+
 def init_db() -> None:
+    if config.DB_FILE in _INITIALIZED:
+        return
     with file_lock(config.LOCK_DIR / "db.lock"):
         conn = _connect()
         try:
@@ -31,6 +48,24 @@ def init_db() -> None:
                 );
                 """
             )
+            # Hash-chain columns; older databases are migrated in place.
+            _ensure_columns(conn, "events", {"seq": "integer", "prev_hash": "text", "hash": "text"})
+            conn.execute("create unique index if not exists events_seq on events(seq)")
+            conn.execute("create index if not exists events_proposal_seq on events(proposal_id, seq)")
+            conn.execute(
+                """
+                create table if not exists checkpoints (
+                    segment integer primary key,
+                    first_seq integer not null,
+                    last_seq integer not null,
+                    prev_hash text not null,
+                    head_hash text not null,
+                    root text not null,
+                    created_at text not null,
+                    verified_at text
+                );
+                """
+            )
             conn.execute(
                 """
                 create table if not exists proposals (
@@ -50,91 +85,1152 @@ def init_db() -> None:
                 );
                 """
             )
+            conn.execute(
+                """
+                create table if not exists snapshots (
+                    id integer primary key autoincrement,
+                    event_id integer not null,
+                    event_ts text,
+                    created_at text not null,
+                    data blob not null
+                );
+                """
+            )
+            # Memoized evaluate results, evicted least-recently-used first.
+            conn.execute(
+                """
+                create table if not exists eval_cache (
+                    key text primary key,
+                    result text not null,
+                    created_at text not null,
+                    used_at real not null
+                );
+                """
+            )
+            conn.execute("create index if not exists eval_cache_used on eval_cache(used_at)")
+            # Materialized aggregates maintained alongside every proposal upsert.
+            conn.execute(
+                """
+                create table if not exists state_counts (
+                    state text not null,
+                    agent text not null,
+                    risk_level text not null,
+                    count integer not null default 0,
+                    primary key (state, agent, risk_level)
+                );
+                """
+            )
+            conn.execute(
+                """
+                create table if not exists transition_counts (
+                    day text not null,
+                    from_state text not null,
+                    to_state text not null,
+                    count integer not null default 0,
+                    primary key (day, from_state, to_state)
+                );
+                """
+            )
+            # Scope entries of open proposals, and a change log processes follow to keep
+            # their in-memory scope trie current (see aap/scopes.py).
+            backfill = not conn.execute("select 1 from sqlite_master where name = 'scope_index'").fetchone()
+            conn.execute(
+                """
+                create table if not exists scope_index (
+                    proposal_id text not null,
+                    path text not null,
+                    primary key (proposal_id, path)
+                );
+                """
+            )
+            conn.execute(
+                """
+                create table if not exists scope_changes (
+                    seq integer primary key autoincrement,
+                    proposal_id text not null
+                );
+                """
+            )
+            if backfill:
+                _rebuild_scope_index(conn)
+            # EVALUATED proposals awaiting review, in priority order (see queue_peek).
+            backfill = not conn.execute("select 1 from sqlite_master where name = 'review_queue'").fetchone()
+            conn.execute(
+                """
+                create table if not exists review_queue (
+                    proposal_id text primary key,
+                    risk_rank integer not null,
+                    queued_at text not null,
+                    perf_delta real not null,
+                    agent text not null,
+                    risk_level text,
+                    goal text,
+                    claimed_by text,
+                    claim_expires real
+                );
+                """
+            )
+            conn.execute(
+                "create index if not exists review_queue_order "
+                "on review_queue(risk_rank, queued_at, perf_delta desc, agent, proposal_id)"
+            )
+            if backfill:
+                _rebuild_review_queue(conn)
+            # Background jobs (see aap/jobs.py): claimed in priority order, hidden from
+            # other workers until visible_at, one pending job per dedup_key.
+            conn.execute(
+                """
+                create table if not exists jobs (
+                    id integer primary key autoincrement,
+                    kind text not null,
+                    proposal_id text,
+                    dedup_key text not null,
+                    params text not null,
+                    priority integer not null default 0,
+                    state text not null,
+                    attempts integer not null default 0,
+                    visible_at real not null,
+                    claimed_by text,
+                    actor text,
+                    created_at text not null,
+                    started_at text,
+                    finished_at text,
+                    result text,
+                    error text
+                );
+                """
+            )
+            conn.execute(f"create index if not exists jobs_ready on jobs(priority desc, id) where {_JOB_PENDING}")
+            conn.execute(f"create unique index if not exists jobs_dedup on jobs(dedup_key) where {_JOB_PENDING}")
+            conn.execute("create index if not exists jobs_proposal on jobs(proposal_id, id)")
+            # Per-entity change counters bumped by every write, so processes can
+            # invalidate their caches (see aap/invalidation.py).
+            conn.execute(
+                """
+                create table if not exists generations (
+                    entity text primary key,
+                    gen integer not null
+                );
+                """
+            )
             conn.commit()
         finally:
             conn.close()
+    _INITIALIZED.add(config.DB_FILE)
 
 
-def insert_event(ts: str, event: str, proposal_id: str, actor: str, data: Dict[str, Any]) -> None:
+def insert_event(
+    ts: str,
+    event: str,
+    proposal_id: str,
+    actor: str,
+    data: Dict[str, Any],
+    seq: Optional[int] = None,
+    prev_hash: Optional[str] = None,
+    hash_: Optional[str] = None,
+) -> None:
     init_db()
     with file_lock(config.LOCK_DIR / "db.lock"):
         conn = _connect()
         try:
             conn.execute(
-                "insert into events (ts, event, proposal_id, actor, data) values (?, ?, ?, ?, ?)",
-                (ts, event, proposal_id, actor, json.dumps(data, ensure_ascii=False)),
+                "insert into events (ts, event, proposal_id, actor, data, seq, prev_hash, hash) values (?, ?, ?, ?, ?, ?, ?, ?)",
+                (ts, event, proposal_id, actor, json.dumps(data, ensure_ascii=False), seq, prev_hash, hash_),
+            )
+            _bump(conn, "events")
+            conn.commit()
+        finally:
+            conn.close()
+
+
+_INC_STATE_COUNT = (
+    "insert into state_counts (state, agent, risk_level, count) values (?, ?, ?, ?) "
+    "on conflict(state, agent, risk_level) do update set count = count + excluded.count"
+)
+_INC_TRANSITION_COUNT = (
+    "insert into transition_counts (day, from_state, to_state, count) values (?, ?, ?, ?) "
+    "on conflict(day, from_state, to_state) do update set count = count + excluded.count"
+)
+
+
+def _bump(conn: sqlite3.Connection, *entities: str) -> None:
+    """Advance the generation of ``entities`` (in the caller's transaction)."""
+    conn.executemany(
+        "insert into generations (entity, gen) values (?, 1) on conflict(entity) do update set gen = gen + 1",
+        [(entity,) for entity in entities],
+    )
+
+
+def bump_generation(*entities: str) -> None:
+    """Advance ``entities`` for a change made outside the mirror and the event log
+    (archiving, a YAML replay, an import), so caches built on them rebuild."""
+    init_db()
+    with file_lock(config.LOCK_DIR / "db.lock"):
+        conn = _connect()
+        try:
+            conn.execute("begin immediate")
+            _bump(conn, *entities)
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def read_generations(conn: sqlite3.Connection) -> Dict[str, int]:
+    return dict(conn.execute("select entity, gen from generations"))
+
+
+def record_batch(events: List[Dict[str, Any]], proposals: Iterable[Dict[str, Any]] = ()) -> None:
+    """Insert chained audit events and upsert proposal rows in a single transaction."""
+    init_db()
+    with file_lock(config.LOCK_DIR / "db.lock"):
+        conn = _connect()
+        try:
+            conn.execute("begin immediate")
+            for data in proposals:
+                _upsert_proposal_row(conn, data)
+            conn.executemany(
+                "insert into events (ts, event, proposal_id, actor, data, seq, prev_hash, hash) values (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        e["timestamp"], e["event"], e["proposal_id"], e["actor"],
+                        json.dumps(e["data"], ensure_ascii=False), e["seq"], e["prev_hash"], e["hash"],
+                    )
+                    for e in events
+                ],
             )
+            if events:
+                _bump(conn, "events")
             conn.commit()
         finally:
             conn.close()
 
 
+def _apply_counters(conn: sqlite3.Connection, old: Optional[tuple], data: Dict[str, Any]) -> None:
+    """Maintain aggregate counters for one proposal row change (same transaction)."""
+    new = (data.get("state") or "", data.get("agent") or "", data.get("risk_level") or "")
+    if old == new:
+        return
+    if old is not None:
+        conn.execute(_INC_STATE_COUNT, old + (-1,))
+    conn.execute(_INC_STATE_COUNT, new + (1,))
+    from_state = old[0] if old is not None else "draft"
+    if from_state != new[0]:
+        day = (data.get("updated_at") or "")[:10]
+        conn.execute(_INC_TRANSITION_COUNT, (day, from_state, new[0], 1))
+
+
+_UPSERT_PROPOSAL = """
+    insert into proposals
+        (id, agent, goal, scope, constraints, risk_level, state, policy, evidence, decision, commit_data, created_at, updated_at)
+    values
+        (:id, :agent, :goal, :scope, :constraints, :risk_level, :state, :policy, :evidence, :decision, :commit_data, :created_at, :updated_at)
+    on conflict(id) do update set
+        agent=excluded.agent,
+        goal=excluded.goal,
+        scope=excluded.scope,
+        constraints=excluded.constraints,
+        risk_level=excluded.risk_level,
+        state=excluded.state,
+        policy=excluded.policy,
+        evidence=excluded.evidence,
+        decision=excluded.decision,
+        commit_data=excluded.commit_data,
+        created_at=excluded.created_at,
+        updated_at=excluded.updated_at;
+"""
+
+
+def _proposal_params(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": data.get("id"),
+        "agent": data.get("agent"),
+        "goal": data.get("goal"),
+        "scope": json.dumps(data.get("scope", []), ensure_ascii=False),
+        "constraints": json.dumps(data.get("constraints", []), ensure_ascii=False),
+        "risk_level": data.get("risk_level"),
+        "state": data.get("state"),
+        "policy": json.dumps(data.get("policy", {}), ensure_ascii=False),
+        "evidence": json.dumps(data.get("evidence", {}), ensure_ascii=False),
+        "decision": json.dumps(data.get("decision", {}), ensure_ascii=False),
+        "commit_data": json.dumps(data.get("commit", {}), ensure_ascii=False),
+        "created_at": data.get("created_at"),
+        "updated_at": data.get("updated_at"),
+    }
+
+
+def _upsert_proposal_row(conn: sqlite3.Connection, data: Dict[str, Any]) -> None:
+    old = conn.execute(
+        "select state, agent, risk_level, scope from proposals where id = ?", (data.get("id"),)
+    ).fetchone()
+    conn.execute(_UPSERT_PROPOSAL, _proposal_params(data))
+    _bump(conn, "proposals")
+    _apply_counters(conn, tuple(v or "" for v in old[:3]) if old else None, data)
+    old_paths = _open_scope(old[0], json.loads(old[3] or "[]")) if old else []
+    new_paths = _open_scope(data.get("state"), data.get("scope", []))
+    if old_paths != new_paths:
+        conn.execute("delete from scope_index where proposal_id = ?", (data.get("id"),))
+        conn.executemany(
+            "insert into scope_index (proposal_id, path) values (?, ?)", [(data.get("id"), p) for p in new_paths]
+        )
+        _log_scope_change(conn, data.get("id"))
+    if data.get("state") == "evaluated":
+        conn.execute(_UPSERT_QUEUE, _queue_params(data))
+    else:
+        conn.execute("delete from review_queue where proposal_id = ?", (data.get("id"),))
+
+
+# Proposals in these states no longer hold their scope.
+TERMINAL_STATES = ("rejected", "committed")
+# Rows kept in scope_changes; a process that falls further behind reloads the whole index.
+SCOPE_CHANGES_KEPT = 10000
+# scope_changes marker for "reload everything" (after a rebuild).
+SCOPE_RELOAD = "*"
+
+
+def _open_scope(state: Optional[str], scope: Iterable[str]) -> List[str]:
+    return [] if (state or "") in TERMINAL_STATES else sorted(set(scope))
+
+
+def _log_scope_change(conn: sqlite3.Connection, proposal_id: str) -> None:
+    cur = conn.execute("insert into scope_changes (proposal_id) values (?)", (proposal_id,))
+    conn.execute("delete from scope_changes where seq <= ?", (cur.lastrowid - SCOPE_CHANGES_KEPT,))
+
+
+RISK_RANKS = {"high": 0, "medium": 1, "low": 2}
+_QUEUE_ORDER = "risk_rank, queued_at, perf_delta desc, agent, proposal_id"
+_QUEUE_COLUMNS = "proposal_id, agent, risk_level, goal, queued_at, perf_delta, claimed_by, claim_expires"
+_UPSERT_QUEUE = """
+    insert into review_queue (proposal_id, risk_rank, queued_at, perf_delta, agent, risk_level, goal)
+    values (:proposal_id, :risk_rank, :queued_at, :perf_delta, :agent, :risk_level, :goal)
+    on conflict(proposal_id) do update set
+        risk_rank=excluded.risk_rank,
+        queued_at=excluded.queued_at,
+        perf_delta=excluded.perf_delta,
+        agent=excluded.agent,
+        risk_level=excluded.risk_level,
+        goal=excluded.goal;
+"""
+
+
+def _queue_params(data: Dict[str, Any]) -> Dict[str, Any]:
+    # The evaluator records the p95 latency delta (ms) as ``evidence.performance``.
+    performance = (data.get("evidence") or {}).get("performance")
+    if isinstance(performance, dict):
+        performance = performance.get("p95_latency_delta_ms")
+    try:
+        perf_delta = float(performance or 0)
+    except (TypeError, ValueError):
+        perf_delta = 0.0
+    return {
+        "proposal_id": data.get("id"),
+        "risk_rank": RISK_RANKS.get(data.get("risk_level") or "", 1),
+        "queued_at": (data.get("policy") or {}).get("evaluated_at") or data.get("updated_at") or "",
+        "perf_delta": perf_delta,
+        "agent": data.get("agent") or "",
+        "risk_level": data.get("risk_level"),
+        "goal": data.get("goal"),
+    }
+
+
+def _rebuild_review_queue(conn: sqlite3.Connection) -> None:
+    """Resync the queue with the mirror, keeping the claims of proposals still queued."""
+    rows = conn.execute(
+        "select id, agent, goal, risk_level, policy, evidence, updated_at from proposals where state = 'evaluated'"
+    ).fetchall()
+    conn.execute("delete from review_queue where proposal_id not in (select id from proposals where state = 'evaluated')")
+    conn.executemany(
+        _UPSERT_QUEUE,
+        [
+            _queue_params({
+                "id": pid, "agent": agent, "goal": goal, "risk_level": risk, "updated_at": updated_at,
+                "policy": json.loads(policy or "{}"), "evidence": json.loads(evidence or "{}"),
+            })
+            for pid, agent, goal, risk, policy, evidence, updated_at in rows
+        ],
+    )
+
+
+def _rebuild_scope_index(conn: sqlite3.Connection) -> None:
+    conn.execute("delete from scope_index")
+    rows = conn.execute("select id, state, scope from proposals")
+    conn.executemany(
+        "insert into scope_index (proposal_id, path) values (?, ?)",
+        [(pid, path) for pid, state, scope in rows for path in _open_scope(state, json.loads(scope or "[]"))],
+    )
+    _log_scope_change(conn, SCOPE_RELOAD)
+
+
 def upsert_proposal(data: Dict[str, Any]) -> None:
-    """Persist proposal snapshot (YAML remains source-of-truth for now)."""
-    init_db()
-    with file_lock(config.LOCK_DIR / "db.lock"):
-        conn = _connect()
-        try:
-            conn.execute(
-                """
-                insert into proposals
-                    (id, agent, goal, scope, constraints, risk_level, state, policy, evidence, decision, commit, created_at, updated_at)
-                values
-                    (:id, :agent, :goal, :scope, :constraints, :risk_level, :state, :policy, :evidence, :decision, :commit, :created_at, :updated_at)
-                on conflict(id) do update set
-                    agent=excluded.agent,
-                    goal=excluded.goal,
-                    scope=excluded.scope,
-                    constraints=excluded.constraints,
-                    risk_level=excluded.risk_level,
-                    state=excluded.state,
-                    policy=excluded.policy,
-                    evidence=excluded.evidence,
-                    decision=excluded.decision,
-                    commit_data=excluded.commit_data,
-                    created_at=excluded.created_at,
-                    updated_at=excluded.updated_at;
-                """,
-                {
-                    "id": data.get("id"),
-                    "agent": data.get("agent"),
-                    "goal": data.get("goal"),
-                    "scope": json.dumps(data.get("scope", []), ensure_ascii=False),
-                    "constraints": json.dumps(data.get("constraints", []), ensure_ascii=False),
-                    "risk_level": data.get("risk_level"),
-                    "state": data.get("state"),
-                    "policy": json.dumps(data.get("policy", {}), ensure_ascii=False),
-                    "evidence": json.dumps(data.get("evidence", {}), ensure_ascii=False),
-                    "decision": json.dumps(data.get("decision", {}), ensure_ascii=False),
-                    "commit_data": json.dumps(data.get("commit", {}), ensure_ascii=False),
-                    "created_at": data.get("created_at"),
-                    "updated_at": data.get("updated_at"),
-                },
+    """Persist proposal snapshot (YAML remains source-of-truth for now).
+
+    Aggregate counters are updated in the same transaction as the row.
+    """
+    init_db()
+    with file_lock(config.LOCK_DIR / "db.lock"):
+        conn = _connect()
+        try:
+            conn.execute("begin immediate")
+            _upsert_proposal_row(conn, data)
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def read_state_counts(agent: Optional[str] = None) -> List[Dict[str, Any]]:
+    init_db()
+    conn = _connect()
+    try:
+        if agent is None:
+            cur = conn.execute(
+                "select state, agent, risk_level, count from state_counts where count > 0 order by state, agent, risk_level"
+            )
+        else:
+            cur = conn.execute(
+                "select state, agent, risk_level, count from state_counts where agent = ? and count > 0 order by state, risk_level",
+                (agent,),
+            )
+        keys = ["state", "agent", "risk_level", "count"]
+        return [dict(zip(keys, row)) for row in cur.fetchall()]
+    finally:
+        conn.close()
+
+
+def proposal_states() -> Dict[str, str]:
+    """Mirrored state of every proposal row (id -> state)."""
+    init_db()
+    conn = _connect()
+    try:
+        return dict(conn.execute("select id, state from proposals"))
+    finally:
+        conn.close()
+
+
+def known_proposal_ids() -> Set[str]:
+    """Every id the proposals mirror or the event log has seen, including deleted ones."""
+    init_db()
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "select id from proposals union select proposal_id from events where proposal_id is not null"
+        ).fetchall()
+    finally:
+        conn.close()
+    return {pid for (pid,) in rows if pid}
+
+
+def count_open_proposals(agent: str) -> int:
+    """Open (PROPOSED/EVALUATED) proposals for ``agent`` via the state_counts primary key."""
+    init_db()
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "select coalesce(sum(count), 0) from state_counts where state in ('proposed', 'evaluated') and agent = ?",
+            (agent,),
+        ).fetchone()
+        return int(row[0])
+    finally:
+        conn.close()
+
+
+def read_scope_index() -> Tuple[int, Dict[str, List[str]]]:
+    """(last scope change seq, open proposal id -> scope entries), read from one snapshot."""
+    init_db()
+    conn = _connect()
+    try:
+        conn.execute("begin")
+        seq = conn.execute("select coalesce(max(seq), 0) from scope_changes").fetchone()[0]
+        scopes: Dict[str, List[str]] = {}
+        for pid, path in conn.execute("select proposal_id, path from scope_index"):
+            scopes.setdefault(pid, []).append(path)
+        return seq, scopes
+    finally:
+        conn.close()
+
+
+def read_scope_changes(after_seq: int) -> Optional[Tuple[int, Dict[str, List[str]]]]:
+    """Scope entries of the proposals changed after ``after_seq`` (an empty list once a
+    proposal closed), with the new last seq. None when the log no longer reaches back
+    that far, or the index was rebuilt: reload it with :func:`read_scope_index`."""
+    init_db()
+    conn = _connect()
+    try:
+        conn.execute("begin")
+        changes = conn.execute(
+            "select seq, proposal_id from scope_changes where seq > ? order by seq", (after_seq,)
+        ).fetchall()
+        if not changes:
+            return after_seq, {}
+        if changes[0][0] != after_seq + 1 or any(pid == SCOPE_RELOAD for _, pid in changes):
+            return None
+        ids = sorted({pid for _, pid in changes})
+        scopes: Dict[str, List[str]] = {pid: [] for pid in ids}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start : start + 500]
+            marks = ",".join("?" * len(chunk))
+            for pid, path in conn.execute(
+                f"select proposal_id, path from scope_index where proposal_id in ({marks})", chunk
+            ):
+                scopes[pid].append(path)
+        return changes[-1][0], scopes
+    finally:
+        conn.close()
+
+
+def read_transition_counts(since_day: str = "") -> List[Dict[str, Any]]:
+    init_db()
+    conn = _connect()
+    try:
+        cur = conn.execute(
+            "select day, from_state, to_state, count from transition_counts where day >= ? order by day, from_state, to_state",
+            (since_day,),
+        )
+        keys = ["day", "from_state", "to_state", "count"]
+        return [dict(zip(keys, row)) for row in cur.fetchall()]
+    finally:
+        conn.close()
+
+
+def replace_counters(state_rows: List[tuple], transition_rows: List[tuple]) -> None:
+    """Atomically replace both aggregate tables (used by `aap stats --rebuild`)."""
+    init_db()
+    with file_lock(config.LOCK_DIR / "db.lock"):
+        conn = _connect()
+        try:
+            conn.execute("begin immediate")
+            conn.execute("delete from state_counts")
+            conn.execute("delete from transition_counts")
+            conn.executemany(
+                "insert into state_counts (state, agent, risk_level, count) values (?, ?, ?, ?)", state_rows
+            )
+            conn.executemany(
+                "insert into transition_counts (day, from_state, to_state, count) values (?, ?, ?, ?)",
+                transition_rows,
             )
             conn.commit()
         finally:
             conn.close()
 
 
-def list_events(limit: int = 50) -> list[Dict[str, Any]]:
+def replace_proposals(rows: Iterable[Dict[str, Any]], batch_size: int = 5000) -> int:
+    """Replace the proposals mirror with ``rows`` using batched bulk inserts.
+
+    ``state_counts`` is recomputed from the new rows in the same transaction;
+    per-day transition counts are historical and left to `aap stats --rebuild`.
+    """
     init_db()
+    count = 0
     with file_lock(config.LOCK_DIR / "db.lock"):
         conn = _connect()
         try:
+            conn.execute("begin immediate")
+            conn.execute("delete from proposals")
+            batch: List[Dict[str, Any]] = []
+            for data in rows:
+                batch.append(_proposal_params(data))
+                if len(batch) >= batch_size:
+                    conn.executemany(_UPSERT_PROPOSAL, batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                conn.executemany(_UPSERT_PROPOSAL, batch)
+                count += len(batch)
+            conn.execute("delete from state_counts")
+            conn.execute(
+                "insert into state_counts (state, agent, risk_level, count) "
+                "select coalesce(state, ''), coalesce(agent, ''), coalesce(risk_level, ''), count(*) "
+                "from proposals group by 1, 2, 3"
+            )
+            _rebuild_scope_index(conn)
+            _rebuild_review_queue(conn)
+            _bump(conn, "proposals")
+            conn.commit()
+        finally:
+            conn.close()
+    return count
+
+
+def _queue_rows(cur: sqlite3.Cursor) -> List[Dict[str, Any]]:
+    keys = [c.strip() for c in _QUEUE_COLUMNS.split(",")]
+    return [dict(zip(keys, row)) for row in cur.fetchall()]
+
+
+def queue_peek(limit: int, by: Optional[str] = None, include_claimed: bool = False) -> List[Dict[str, Any]]:
+    """The first ``limit`` queued proposals in priority order (risk high to low,
+    longest waiting, largest p95 latency delta, agent). Proposals under another
+    reviewer's unexpired claim are skipped unless ``include_claimed``. The scan
+    follows the ``review_queue_order`` index, so it costs O(log n + limit +
+    claimed rows skipped) rather than a sort of the queue."""
+    init_db()
+    conn = _connect()
+    try:
+        if include_claimed:
+            cur = conn.execute(f"select {_QUEUE_COLUMNS} from review_queue order by {_QUEUE_ORDER} limit ?", (limit,))
+        else:
             cur = conn.execute(
-                "select ts, event, proposal_id, actor, data from events order by id desc limit ?",
-                (limit,),
+                f"select {_QUEUE_COLUMNS} from review_queue "
+                "where claim_expires is null or claim_expires < ? or claimed_by = ? "
+                f"order by {_QUEUE_ORDER} limit ?",
+                (time.time(), by, limit),
             )
-            rows = cur.fetchall()
+        return _queue_rows(cur)
+    finally:
+        conn.close()
+
+
+def queue_claim(limit: int, by: str, lease_seconds: float) -> List[Dict[str, Any]]:
+    """Lease the next ``limit`` unclaimed proposals to ``by`` (renewing its own
+    claims among them) and return them. Claims expire after ``lease_seconds``."""
+    init_db()
+    with file_lock(config.LOCK_DIR / "db.lock"):
+        conn = _connect()
+        try:
+            conn.execute("begin immediate")
+            now = time.time()
+            rows = _queue_rows(conn.execute(
+                f"select {_QUEUE_COLUMNS} from review_queue "
+                "where claim_expires is null or claim_expires < ? or claimed_by = ? "
+                f"order by {_QUEUE_ORDER} limit ?",
+                (now, by, limit),
+            ))
+            for row in rows:
+                row["claimed_by"], row["claim_expires"] = by, now + lease_seconds
+            conn.executemany(
+                "update review_queue set claimed_by = ?, claim_expires = ? where proposal_id = ?",
+                [(by, row["claim_expires"], row["proposal_id"]) for row in rows],
+            )
+            conn.commit()
+            return rows
+        finally:
+            conn.close()
+
+
+def queue_release(proposal_ids: Iterable[str], by: str) -> int:
+    """Drop ``by``'s claims on ``proposal_ids``; returns how many were released."""
+    init_db()
+    with file_lock(config.LOCK_DIR / "db.lock"):
+        conn = _connect()
+        try:
+            with conn:
+                cur = conn.executemany(
+                    "update review_queue set claimed_by = null, claim_expires = null "
+                    "where proposal_id = ? and claimed_by = ?",
+                    [(pid, by) for pid in proposal_ids],
+                )
+            return cur.rowcount
+        finally:
+            conn.close()
+
+
+def queue_claimed_by(proposal_id: str) -> Optional[str]:
+    """The reviewer holding an unexpired claim on ``proposal_id``, if any."""
+    init_db()
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "select claimed_by from review_queue where proposal_id = ? and claim_expires >= ?",
+            (proposal_id, time.time()),
+        ).fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+
+def queue_size() -> Dict[str, int]:
+    init_db()
+    conn = _connect()
+    try:
+        total, claimed = conn.execute(
+            "select count(*), coalesce(sum(claim_expires >= ?), 0) from review_queue", (time.time(),)
+        ).fetchone()
+        return {"queued": total, "claimed": claimed}
+    finally:
+        conn.close()
+
+
+def eval_cache_get(key: str) -> Optional[Dict[str, Any]]:
+    """Return a cached evaluation result and mark it as recently used."""
+    init_db()
+    conn = _connect()
+    try:
+        row = conn.execute("select result from eval_cache where key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with file_lock(config.LOCK_DIR / "db.lock"):
+            with conn:
+                conn.execute("update eval_cache set used_at = ? where key = ?", (time.time(), key))
+        return json.loads(row[0])
+    finally:
+        conn.close()
+
+
+def eval_cache_put(key: str, result: Dict[str, Any], created_at: str, max_entries: int) -> None:
+    init_db()
+    with file_lock(config.LOCK_DIR / "db.lock"):
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute(
+                    "insert or replace into eval_cache(key, result, created_at, used_at) values (?, ?, ?, ?)",
+                    (key, json.dumps(result), created_at, time.time()),
+                )
+                (count,) = conn.execute("select count(*) from eval_cache").fetchone()
+                if count > max_entries:
+                    conn.execute(
+                        "delete from eval_cache where key in (select key from eval_cache order by used_at limit ?)",
+                        (count - max_entries,),
+                    )
         finally:
             conn.close()
+
+
+def insert_snapshot(event_id: int, event_ts: str, created_at: str, blob: bytes) -> None:
+    init_db()
+    with file_lock(config.LOCK_DIR / "db.lock"):
+        conn = _connect()
+        try:
+            conn.execute(
+                "insert into snapshots (event_id, event_ts, created_at, data) values (?, ?, ?, ?)",
+                (event_id, event_ts, created_at, blob),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def latest_snapshot(until_id: Optional[int] = None, until_ts: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Return the newest snapshot taken at or before the given event id / timestamp."""
+    init_db()
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "select id, event_id, event_ts, created_at, data from snapshots "
+            "where (? is null or event_id <= ?) and (? is null or event_ts <= ?) "
+            "order by event_id desc limit 1",
+            (until_id, until_id, until_ts, until_ts),
+        ).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    return dict(zip(["id", "event_id", "event_ts", "created_at", "data"], row))
+
+
+def last_event_id() -> int:
+    init_db()
+    conn = _connect()
+    try:
+        row = conn.execute("select max(id) from events").fetchone()
+        return row[0] or 0
+    finally:
+        conn.close()
+
+
+def iter_events(batch_size: int = 10000, after_id: int = 0, until_id: Optional[int] = None):
+    """Stream events in insertion order without loading them all at once."""
+    init_db()
+    conn = _connect()
+    try:
+        cur = conn.execute(
+            "select id, ts, event, proposal_id, actor, data from events "
+            "where id > ? and (? is null or id <= ?) order by id",
+            (after_id, until_id, until_id),
+        )
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            for row_id, ts, event, pid, actor, data in rows:
+                try:
+                    payload = json.loads(data) if data else {}
+                except Exception:
+                    payload = {"raw": data}
+                yield {"id": row_id, "timestamp": ts, "event": event, "proposal_id": pid, "actor": actor, "data": payload}
+    finally:
+        conn.close()
+
+
+def list_events(limit: int = 50) -> list[Dict[str, Any]]:
+    # Read-only: WAL readers see a consistent snapshot without the writers' lock.
+    init_db()
+    conn = _connect()
+    try:
+        cur = conn.execute(
+            "select ts, event, proposal_id, actor, data, seq, hash from events order by id desc limit ?",
+            (limit,),
+        )
+        rows = cur.fetchall()
+    finally:
+        conn.close()
     events = []
-    for ts, event, pid, actor, data in rows:
+    for ts, event, pid, actor, data, seq, h in rows:
         try:
             payload = json.loads(data) if data else {}
         except Exception:
             payload = {"raw": data}
         events.append(
-            {"timestamp": ts, "event": event, "proposal_id": pid, "actor": actor, "data": payload}
+            {"timestamp": ts, "event": event, "proposal_id": pid, "actor": actor, "data": payload, "seq": seq, "hash": h}
         )
     return events
+
+
+def fetch_chain(first_seq: int, last_seq: Optional[int] = None, db_file: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """Return chained events with ``first_seq <= seq <= last_seq`` ordered by seq.
+
+    ``db_file`` lets verification workers read their segment without relying on
+    the parent's (possibly overridden) config.
+    """
+    if db_file is None:
+        init_db()
+    conn = _connect(db_file)
+    try:
+        if last_seq is None:
+            cur = conn.execute(
+                "select seq, ts, event, proposal_id, actor, data, prev_hash, hash from events "
+                "where seq >= ? order by seq",
+                (first_seq,),
+            )
+        else:
+            cur = conn.execute(
+                "select seq, ts, event, proposal_id, actor, data, prev_hash, hash from events "
+                "where seq between ? and ? order by seq",
+                (first_seq, last_seq),
+            )
+        rows = cur.fetchall()
+    finally:
+        conn.close()
+    chain = []
+    for seq, ts, event, pid, actor, data, prev_hash, h in rows:
+        try:
+            payload = json.loads(data) if data else {}
+        except Exception:
+            payload = {"raw": data}
+        chain.append(
+            {
+                "seq": seq,
+                "timestamp": ts,
+                "event": event,
+                "proposal_id": pid,
+                "actor": actor,
+                "data": payload,
+                "prev_hash": prev_hash,
+                "hash": h,
+            }
+        )
+    return chain
+
+
+def max_seq() -> int:
+    """Highest chained event seq, or -1 for an empty chain."""
+    init_db()
+    conn = _connect()
+    try:
+        row = conn.execute("select max(seq) from events").fetchone()
+        return -1 if row[0] is None else row[0]
+    finally:
+        conn.close()
+
+
+def chain_head() -> Optional[Tuple[int, str]]:
+    """(seq, hash) of the newest chained event, or None for an empty chain."""
+    init_db()
+    conn = _connect()
+    try:
+        row = conn.execute("select seq, hash from events where seq is not null order by seq desc limit 1").fetchone()
+        return (row[0], row[1]) if row else None
+    finally:
+        conn.close()
+
+
+def latest_seq_by_proposal() -> Dict[str, int]:
+    """Newest chained event seq per proposal (served from the events_proposal_seq index)."""
+    init_db()
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "select proposal_id, max(seq) from events where proposal_id is not null and seq is not null "
+            "group by proposal_id"
+        ).fetchall()
+    finally:
+        conn.close()
+    return {pid: seq for pid, seq in rows}
+
+
+def fetch_changes(
+    after_seq: int, limit: int = 500, until_seq: Optional[int] = None, proposal_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """State-change rows with ``after_seq < seq <= until_seq``. Only ``data.state`` is read
+    from the payload, plus ``job_id`` and ``status`` for background ``job`` events."""
+    init_db()
+    sql = (
+        "select seq, ts, event, proposal_id, actor, "
+        "case when json_valid(data) then json_extract(data, '$.state') end, "
+        "case when event = 'job' and json_valid(data) then json_extract(data, '$.job_id') end, "
+        "case when event = 'job' and json_valid(data) then json_extract(data, '$.status') end "
+        "from events where seq > ?"
+    )
+    params: List[Any] = [after_seq]
+    if until_seq is not None:
+        sql += " and seq <= ?"
+        params.append(until_seq)
+    if proposal_id is not None:
+        sql += " and proposal_id = ?"
+        params.append(proposal_id)
+    conn = _connect()
+    try:
+        rows = conn.execute(sql + " order by seq limit ?", params + [limit]).fetchall()
+    finally:
+        conn.close()
+    changes = []
+    for seq, ts, event, pid, actor, state, job_id, status in rows:
+        change = {"rv": seq, "timestamp": ts, "event": event, "proposal_id": pid, "actor": actor, "state": state}
+        if event == "job":
+            change.update(job_id=job_id, status=status)
+        changes.append(change)
+    return changes
+
+
+def segment_hashes(first_seq: int, last_seq: int) -> List[str]:
+    init_db()
+    conn = _connect()
+    try:
+        cur = conn.execute(
+            "select hash from events where seq between ? and ? order by seq", (first_seq, last_seq)
+        )
+        return [row[0] for row in cur.fetchall()]
+    finally:
+        conn.close()
+
+
+def insert_checkpoint(
+    segment: int, first_seq: int, last_seq: int, prev_hash: str, head_hash: str, root: str, created_at: str
+) -> None:
+    init_db()
+    with file_lock(config.LOCK_DIR / "db.lock"):
+        conn = _connect()
+        try:
+            conn.execute(
+                "insert or ignore into checkpoints (segment, first_seq, last_seq, prev_hash, head_hash, root, created_at) "
+                "values (?, ?, ?, ?, ?, ?, ?)",
+                (segment, first_seq, last_seq, prev_hash, head_hash, root, created_at),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def list_checkpoints() -> List[Dict[str, Any]]:
+    init_db()
+    conn = _connect()
+    try:
+        cur = conn.execute(
+            "select segment, first_seq, last_seq, prev_hash, head_hash, root, created_at, verified_at "
+            "from checkpoints order by segment"
+        )
+        keys = ["segment", "first_seq", "last_seq", "prev_hash", "head_hash", "root", "created_at", "verified_at"]
+        return [dict(zip(keys, row)) for row in cur.fetchall()]
+    finally:
+        conn.close()
+
+
+def mark_checkpoints_verified(segments: List[int], verified_at: str) -> None:
+    if not segments:
+        return
+    init_db()
+    with file_lock(config.LOCK_DIR / "db.lock"):
+        conn = _connect()
+        try:
+            conn.executemany(
+                "update checkpoints set verified_at = ? where segment = ?",
+                [(verified_at, segment) for segment in segments],
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+
+_JOB_COLUMNS = (
+    "id, kind, proposal_id, dedup_key, params, priority, state, attempts, visible_at, claimed_by, "
+    "actor, created_at, started_at, finished_at, result, error"
+)
+
+
+def _job_rows(cur: Iterable[tuple]) -> List[Dict[str, Any]]:
+    jobs = []
+    for row in cur:
+        job = dict(zip(_JOB_COLUMNS.split(", "), row))
+        for key in ("params", "result"):
+            job[key] = json.loads(job[key]) if job[key] else None
+        jobs.append(job)
+    return jobs
+
+
+def job_enqueue(
+    kind: str, proposal_id: Optional[str], dedup_key: str, params: Dict[str, Any], priority: int, actor: str, created_at: str
+) -> Tuple[Dict[str, Any], bool]:
+    """Queue a job, or return the pending one with the same ``dedup_key`` (raising
+    its priority to ``priority`` if lower). Returns (job, deduplicated)."""
+    init_db()
+    with file_lock(config.LOCK_DIR / "db.lock"):
+        conn = _connect()
+        try:
+            conn.execute("begin immediate")
+            found = _job_rows(conn.execute(
+                f"select {_JOB_COLUMNS} from jobs where dedup_key = ? and {_JOB_PENDING}", (dedup_key,)
+            ))
+            if found:
+                job = found[0]
+                if priority > job["priority"]:
+                    conn.execute("update jobs set priority = ? where id = ?", (priority, job["id"]))
+                    job["priority"] = priority
+            else:
+                cur = conn.execute(
+                    "insert into jobs (kind, proposal_id, dedup_key, params, priority, state, visible_at, actor, created_at) "
+                    "values (?, ?, ?, ?, ?, 'queued', ?, ?, ?)",
+                    (kind, proposal_id, dedup_key, json.dumps(params, ensure_ascii=False), priority, time.time(), actor, created_at),
+                )
+                job = _job_rows(conn.execute(f"select {_JOB_COLUMNS} from jobs where id = ?", (cur.lastrowid,)))[0]
+            _bump(conn, "jobs")
+            conn.commit()
+            return job, bool(found)
+        finally:
+            conn.close()
+
+
+def job_claim(worker: str, visibility_seconds: float, max_attempts: int, now_ts: str) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Lease the highest-priority visible job to ``worker`` for ``visibility_seconds``.
+
+    A running job whose lease lapsed (its worker died) is visible again. One
+    that has already been tried ``max_attempts`` times is failed instead.
+    Returns (claimed job or None, jobs failed that way).
+    """
+    init_db()
+    abandoned: List[Dict[str, Any]] = []
+    with file_lock(config.LOCK_DIR / "db.lock"):
+        conn = _connect()
+        try:
+            conn.execute("begin immediate")
+            now = time.time()
+            while True:
+                rows = _job_rows(conn.execute(
+                    f"select {_JOB_COLUMNS} from jobs where {_JOB_PENDING} and visible_at <= ? "
+                    "order by priority desc, id limit 1",
+                    (now,),
+                ))
+                if not rows:
+                    job = None
+                    break
+                job = rows[0]
+                if job["attempts"] < max_attempts:
+                    conn.execute(
+                        "update jobs set state = 'running', attempts = attempts + 1, claimed_by = ?, visible_at = ?, "
+                        "started_at = ? where id = ?",
+                        (worker, now + visibility_seconds, now_ts, job["id"]),
+                    )
+                    job.update(state="running", attempts=job["attempts"] + 1, claimed_by=worker, started_at=now_ts)
+                    break
+                error = f"abandoned after {job['attempts']} attempt(s) (worker {job['claimed_by']} stopped responding)"
+                conn.execute(
+                    "update jobs set state = 'failed', error = ?, finished_at = ? where id = ?", (error, now_ts, job["id"])
+                )
+                job.update(state="failed", error=error, finished_at=now_ts)
+                abandoned.append(job)
+            if job is not None or abandoned:
+                _bump(conn, "jobs")
+            conn.commit()
+            return job, abandoned
+        finally:
+            conn.close()
+
+
+def job_finish(
+    job_id: int, worker: str, state: str, now_ts: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None
+) -> bool:
+    """Record the outcome of ``worker``'s claim; False if its lease lapsed and the
+    job was claimed again meanwhile."""
+    init_db()
+    with file_lock(config.LOCK_DIR / "db.lock"):
+        conn = _connect()
+        try:
+            with conn:
+                cur = conn.execute(
+                    "update jobs set state = ?, result = ?, error = ?, finished_at = ?, claimed_by = ? "
+                    "where id = ? and claimed_by = ? and state = 'running'",
+                    (state, json.dumps(result, ensure_ascii=False) if result is not None else None, error, now_ts,
+                     worker, job_id, worker),
+                )
+                if cur.rowcount:
+                    _bump(conn, "jobs")
+            return bool(cur.rowcount)
+        finally:
+            conn.close()
+
+
+def job_retry(job_id: int, worker: str, delay: float, error: str) -> bool:
+    """Put ``worker``'s claimed job back in the queue, visible again after ``delay`` seconds."""
+    init_db()
+    with file_lock(config.LOCK_DIR / "db.lock"):
+        conn = _connect()
+        try:
+            with conn:
+                cur = conn.execute(
+                    "update jobs set state = 'queued', claimed_by = null, visible_at = ?, error = ? "
+                    "where id = ? and claimed_by = ? and state = 'running'",
+                    (time.time() + delay, error, job_id, worker),
+                )
+                if cur.rowcount:
+                    _bump(conn, "jobs")
+            return bool(cur.rowcount)
+        finally:
+            conn.close()
+
+
+def get_job(job_id: int) -> Optional[Dict[str, Any]]:
+    init_db()
+    conn = _connect()
+    try:
+        rows = _job_rows(conn.execute(f"select {_JOB_COLUMNS} from jobs where id = ?", (job_id,)))
+    finally:
+        conn.close()
+    return rows[0] if rows else None
+
+
+def list_jobs(state: Optional[str] = None, proposal_id: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+    """Most recent jobs first, optionally filtered by state and proposal."""
+    init_db()
+    sql = f"select {_JOB_COLUMNS} from jobs where 1 = 1"
+    params: List[Any] = []
+    if state:
+        sql += " and state = ?"
+        params.append(state)
+    if proposal_id:
+        sql += " and proposal_id = ?"
+        params.append(proposal_id)
+    conn = _connect()
+    try:
+        return _job_rows(conn.execute(sql + " order by id desc limit ?", params + [limit]))
+    finally:
+        conn.close()
+
+
+def job_counts() -> Dict[str, int]:
+    init_db()
+    conn = _connect()
+    try:
+        return dict(conn.execute("select state, count(*) from jobs group by state"))
+    finally:
+        conn.close()
+
+
+def purge_jobs(finished_before: str) -> int:
+    """Delete succeeded and failed jobs that finished before ``finished_before``."""
+    init_db()
+    with file_lock(config.LOCK_DIR / "db.lock"):
+        conn = _connect()
+        try:
+            with conn:
+                cur = conn.execute(
+                    "delete from jobs where state in ('succeeded', 'failed') and finished_at < ?", (finished_before,)
+                )
+            return cur.rowcount
+        finally:
+            conn.close()
@@ -0,0 +1,185 @@
+"""Shared evaluate step (policy + evidence) for the CLI and API, with memoization.
+
+Results are cached in SQLite under a digest of the inputs that determine them:
+the proposal's agent, scope, constraints and risk level, the hash of every
+applicable policy, and a digest of the evidence. A proposal whose last
+evaluation already has that key is left untouched: no write and no audit
+event. Any other proposal with the same inputs reuses the stored result
+instead of re-running the checks. Runs without evidence are never stored or
+looked up: their result names the missing file, which the digest does not
+cover. ``force`` bypasses the cache. Scope overlaps
+with other in-flight proposals are checked on every run, outside the cache.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from . import config
+from .audit import record_event
+from .db import eval_cache_get, eval_cache_put
+from .evaluator import evaluate_evidence, load_evidence
+from .evidence_store import resolve_evidence
+from .locks import proposal_lock
+from .policy import conflict_mode, evaluate_policies, resolve_policies
+from .scopes import describe, find_conflicts
+from .state import ProposalState
+from .storage import Proposal
+from .utils import sha256_file, utc_now
+
+# Bump when evaluation logic changes so stale cached results are not reused.
+CACHE_VERSION = 1
+REQUIRED_METADATA = ["runner", "run_id", "artifact_sha256"]
+# Evidence digest of a run whose evidence file does not exist
+MISSING = "missing"
+
+
+@dataclass
+class EvaluationOutcome:
+    proposal: Proposal
+    policies: List[str]
+    cache: str  # "miss" (evaluated), "hit" (stored result applied), "unchanged" (nothing written), "bypass"
+
+    @property
+    def policy_passed(self) -> bool:
+        return bool(self.proposal.policy.get("passed"))
+
+    @property
+    def evidence_passed(self) -> bool:
+        return bool(self.proposal.evidence.get("passed"))
+
+
+def _digest(data: Any) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, separators=(",", ":"), default=str).encode()).hexdigest()
+
+
+def cache_key(proposal: Proposal, policy_hashes: List[str], evidence_digest: str) -> str:
+    return _digest(
+        {
+            "v": CACHE_VERSION,
+            "agent": proposal.agent,
+            "scope": proposal.scope,
+            "constraints": proposal.constraints,
+            "risk_level": proposal.risk_level,
+            "policies": policy_hashes,
+            "evidence": evidence_digest,
+        }
+    )
+
+
+def _compute(proposal: Proposal, policies, evidence_file: Optional[Path], evidence: Optional[Dict[str, Any]]):
+    policy_eval = evaluate_policies(proposal, policies)
+    policy = {
+        "name": policy_eval.policy_name,
+        "path": str(policies[0].path),
+        "hash": policies[0].hash,
+        "applied": policy_eval.applied,
+        "passed": policy_eval.passed,
+        "violations": policy_eval.violations,
+        "required_evidence": policy_eval.required_evidence,
+        "performance_budget_ms": policy_eval.performance_budget_ms,
+    }
+    try:
+        data = evidence if evidence is not None else load_evidence(evidence_file)
+        evidence_eval = evaluate_evidence(
+            data,
+            policy_eval.required_evidence,
+            required_metadata=REQUIRED_METADATA,
+            performance_budget_ms=policy_eval.performance_budget_ms,
+        )
+        evidence_record = {
+            "passed": evidence_eval.passed,
+            "missing": evidence_eval.missing,
+            "failures": evidence_eval.failures,
+            "metadata_missing": evidence_eval.metadata_missing,
+            "metadata_invalid": evidence_eval.metadata_invalid,
+            "performance": evidence_eval.performance,
+            "performance_budget_ms": evidence_eval.performance_budget_ms,
+        }
+    except FileNotFoundError as exc:
+        evidence_record = {
+            "passed": False,
+            "missing": policy_eval.required_evidence,
+            "failures": [str(exc)],
+        }
+    return {"policy": policy, "evidence": evidence_record}
+
+
+def run_evaluation(
+    proposal: Proposal,
+    policy_paths: Optional[List[Path]] = None,
+    evidence_file: Optional[Path] = None,
+    evidence: Optional[Dict[str, Any]] = None,
+    force: bool = False,
+) -> EvaluationOutcome:
+    """Evaluate ``proposal`` against its policies and inline evidence, an evidence file, or
+    (when neither is given) the uploaded ``results.json`` from the evidence store.
+
+    Raises OSError/ValueError if a policy cannot be loaded, and ValueError if the
+    proposal was rejected or committed in the meantime.
+    """
+    policies = resolve_policies(proposal, policy_paths)
+    recorded_digest = None
+    if evidence is None and evidence_file is None:
+        evidence_file, recorded_digest = resolve_evidence(proposal.id)
+    if evidence is not None:
+        evidence_digest, evidence_label = _digest(evidence), "inline"
+    else:
+        evidence_label = str(evidence_file)
+        evidence_digest = recorded_digest or (sha256_file(evidence_file) if evidence_file.is_file() else MISSING)
+    key = cache_key(proposal, [p.hash for p in policies], evidence_digest)
+    names = [p.name for p in policies]
+    # Overlaps depend on the other open proposals, so they are checked on every run, not cached.
+    mode = conflict_mode(policies)
+    conflicts = {} if mode == "off" else find_conflicts(proposal.scope, exclude=proposal.id)
+
+    if (
+        not force
+        and proposal.policy.get("eval_key") == key
+        and proposal.evidence.get("path") == evidence_label
+        and proposal.policy.get("conflicts", {}) == conflicts
+    ):
+        return EvaluationOutcome(proposal, names, "unchanged")
+    cacheable = not force and evidence_digest != MISSING
+    result = eval_cache_get(key) if cacheable else None
+    status = "hit" if result is not None else ("bypass" if force else "miss")
+    if result is None:
+        result = _compute(proposal, policies, evidence_file, evidence)
+        if cacheable:
+            eval_cache_put(key, result, utc_now(), config.EVAL_CACHE_SIZE)
+
+    with proposal_lock(proposal.id):
+        # The checks ran on the caller's copy; apply the result to the current record.
+        proposal.reload()
+        if proposal.state in {ProposalState.REJECTED, ProposalState.COMMITTED}:
+            raise ValueError(f"Proposal {proposal.id} is {proposal.state.value}; cannot evaluate.")
+        now = utc_now()
+        proposal.policy = {**result["policy"], "eval_key": key, "evaluated_at": now}
+        if conflicts:
+            proposal.policy["conflicts"] = conflicts
+            if mode == "block":
+                proposal.policy["passed"] = False
+                proposal.policy["violations"] = proposal.policy["violations"] + describe(conflicts)
+        proposal.evidence = {"path": evidence_label, "sha256": evidence_digest, **result["evidence"], "evaluated_at": now}
+        if proposal.policy["passed"] and proposal.evidence["passed"] and proposal.state == ProposalState.PROPOSED:
+            proposal.update_state(ProposalState.EVALUATED)
+        proposal.save()
+
+        record_event(
+            "evaluate",
+            proposal.id,
+            proposal.agent,
+            {
+                "policy_passed": proposal.policy["passed"],
+                "policy_violations": proposal.policy["violations"],
+                "evidence_passed": proposal.evidence["passed"],
+                "state": proposal.state.value,
+                "policy": proposal.policy,
+                "evidence": proposal.evidence,
+                "updated_at": proposal.updated_at,
+                "cache": status,
+            },
+        )
+    return EvaluationOutcome(proposal, names, status)
@@ -3,11 +3,16 @@ from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 from . import config
+from .layout import locate
 from .utils import load_yaml_or_json
 
 
+def evidence_dir(proposal_id: str) -> Path:
+    return locate(config.EVIDENCE_DIR, proposal_id)
+
+
 def evidence_path(proposal_id: str, filename: str = "results.json") -> Path:
-    return config.EVIDENCE_DIR / proposal_id / filename
+    return evidence_dir(proposal_id) / filename
 
 
 @dataclass
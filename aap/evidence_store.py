@@ -0,0 +1,137 @@
+"""Content-addressed evidence store.
+
+Uploads are streamed in chunks to a temporary file under
+``EVIDENCE_DIR/blobs/tmp`` and hashed as they arrive, so memory use does not
+grow with the upload size. The finished file is renamed to
+``blobs/<sha[:2]>/<sha>``, or dropped if that blob already exists, so identical
+artifacts from CI retries are stored once. Each proposal keeps a
+``manifest.json`` that maps evidence names to digests. The evaluator reads
+``results.json`` through it and uses the recorded digest rather than re-hashing.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from . import config
+from .evaluator import evidence_dir, evidence_path
+from .locks import lock_manager
+from .utils import ensure_dir, fsync_dir, utc_now
+
+NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,127}$")
+RESULTS_NAME = "results.json"
+
+
+class EvidenceTooLarge(ValueError):
+    pass
+
+
+def blob_dir() -> Path:
+    return config.EVIDENCE_DIR / "blobs"
+
+
+def blob_path(digest: str) -> Path:
+    return blob_dir() / digest[:2] / digest
+
+
+def manifest_path(proposal_id: str) -> Path:
+    return evidence_dir(proposal_id) / "manifest.json"
+
+
+class BlobWriter:
+    """Incrementally write and hash one upload; :meth:`commit` stores it by digest."""
+
+    def __init__(self, max_bytes: Optional[int] = None) -> None:
+        self.max_bytes = max_bytes or config.EVIDENCE_MAX_BYTES
+        self.size = 0
+        self._hash = hashlib.sha256()
+        tmp_dir = blob_dir() / "tmp"
+        ensure_dir(tmp_dir)
+        fd, name = tempfile.mkstemp(dir=tmp_dir, prefix="upload-")
+        self._file = os.fdopen(fd, "wb")
+        self._tmp = Path(name)
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            self.abort()
+            raise EvidenceTooLarge(f"evidence exceeds {self.max_bytes} bytes")
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    def commit(self) -> Tuple[str, int, bool]:
+        """Return (sha256, size, deduplicated)."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        digest = self._hash.hexdigest()
+        target = blob_path(digest)
+        if target.exists():
+            self._tmp.unlink()
+            os.utime(target)  # a fresh mtime keeps archive GC's grace period from collecting it
+            return digest, self.size, True
+        ensure_dir(target.parent)
+        os.replace(self._tmp, target)
+        fsync_dir(target.parent)
+        return digest, self.size, False
+
+    def abort(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+        self._tmp.unlink(missing_ok=True)
+
+
+def store_chunks(chunks: Iterable[bytes], max_bytes: Optional[int] = None) -> Tuple[str, int, bool]:
+    writer = BlobWriter(max_bytes)
+    try:
+        for chunk in chunks:
+            writer.write(chunk)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.commit()
+
+
+def read_manifest(proposal_id: str) -> Dict[str, Any]:
+    path = manifest_path(proposal_id)
+    if not path.exists():
+        return {"files": {}}
+    return json.loads(path.read_text())
+
+
+def record_upload(
+    proposal_id: str, name: str, digest: str, size: int, content_type: Optional[str] = None
+) -> Dict[str, Any]:
+    """Point ``name`` in the proposal's manifest at a stored blob; returns the entry."""
+    if not NAME_PATTERN.match(name):
+        raise ValueError(f"invalid evidence name {name!r}")
+    entry = {"sha256": digest, "size": size, "content_type": content_type, "uploaded_at": utc_now()}
+    with lock_manager().lock("evidence", proposal_id):
+        path = manifest_path(proposal_id)
+        ensure_dir(path.parent)
+        manifest = read_manifest(proposal_id)
+        manifest["files"][name] = entry
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(manifest, indent=2))
+        os.replace(tmp, path)
+    return entry
+
+
+def put_file(proposal_id: str, source: Path, name: str = RESULTS_NAME, chunk_size: int = 1 << 20) -> Dict[str, Any]:
+    """Stream a local file into the store (the CLI counterpart of the upload endpoint)."""
+    with source.open("rb") as f:
+        digest, size, dedup = store_chunks(iter(lambda: f.read(chunk_size), b""))
+    entry = record_upload(proposal_id, name, digest, size)
+    return {**entry, "name": name, "deduplicated": dedup}
+
+
+def resolve_evidence(proposal_id: str, name: str = RESULTS_NAME) -> Tuple[Path, Optional[str]]:
+    """Path of a proposal's evidence and its recorded digest (None for legacy, unmanaged files)."""
+    entry = read_manifest(proposal_id)["files"].get(name)
+    if entry and blob_path(entry["sha256"]).exists():
+        return blob_path(entry["sha256"]), entry["sha256"]
+    return evidence_path(proposal_id, name), None
@@ -1,19 +1,25 @@
+from contextlib import ExitStack
 from pathlib import Path
-from typing import Dict
+from typing import Any, Dict, Iterable, List, Optional
+from uuid import uuid4
 
 from . import config
-from .audit import record_event
+from .audit import record_event, record_events
 from .auth import is_allowed_actor, validate_totp
+from .db import queue_claimed_by
+from .layout import locate
+from .locks import lock_manager, proposal_lock
 from .state import ProposalState
-from .storage import Proposal
-from .utils import dump_yaml_or_json, ensure_dir, utc_now, file_lock
+from .storage import Proposal, list_summaries, load_proposal
+from .utils import dump_yaml_or_json, ensure_dir, utc_now
 
 
 def decision_path(proposal_id: str) -> Path:
-    return config.DECISIONS_DIR / f"{proposal_id}.yaml"
+    return locate(config.DECISIONS_DIR, proposal_id, ".yaml")
 
 
-def decide(proposal: Proposal, decision: str, actor: str, reason: str = "", otp: str = "") -> Dict[str, str]:
+def _authorize(decision: str, actor: str, otp: str) -> str:
+    """Check the decision, the allowlist and the OTP; return the normalized decision."""
     normalized = decision.lower()
     if normalized not in {"accept", "reject"}:
         raise ValueError("Decision must be 'accept' or 'reject'")
@@ -25,25 +31,162 @@ def decide(proposal: Proposal, decision: str, actor: str, reason: str = "", otp:
         raise ValueError("OTP code required for decision (TOTP)")
     if not validate_totp(otp):
         raise ValueError("Invalid OTP code")
+    return normalized
+
+
+def _claimed_by_other(proposal_id: str, actor: str) -> Optional[str]:
+    """Why ``actor`` may not decide ``proposal_id`` now (another reviewer's claim), or None."""
+    holder = queue_claimed_by(proposal_id)
+    if holder is None or holder == actor:
+        return None
+    return f"Proposal {proposal_id} is claimed for review by {holder}"
+
 
+def decide(proposal: Proposal, decision: str, actor: str, reason: str = "", otp: str = "") -> Dict[str, str]:
+    normalized = _authorize(decision, actor, otp)
     target_state = ProposalState.ACCEPTED if normalized == "accept" else ProposalState.REJECTED
-    proposal.update_state(target_state)
-
-    record = {
-        "proposal_id": proposal.id,
-        "decision": normalized,
-        "by": actor,
-        "reason": reason,
-        "timestamp": utc_now(),
-    }
-
-    proposal.decision = record
-    decision_file = decision_path(proposal.id)
     ensure_dir(config.DECISIONS_DIR)
 
-    with file_lock(config.LOCK_DIR / f"{proposal.id}.lock"):
+    # Re-read and transition under the lock: two humans deciding at once must not
+    # both succeed from the same stale EVALUATED copy.
+    with proposal_lock(proposal.id):
+        claimed = _claimed_by_other(proposal.id, actor)
+        if claimed:
+            raise ValueError(claimed)
+        proposal.reload()
+        proposal.update_state(target_state)
+        record = {
+            "proposal_id": proposal.id,
+            "decision": normalized,
+            "by": actor,
+            "reason": reason,
+            "timestamp": utc_now(),
+        }
+        proposal.decision = record
         proposal.save()
-        dump_yaml_or_json(record, decision_file)
+        dump_yaml_or_json(record, decision_path(proposal.id))
 
-    record_event("decision", proposal.id, actor, {"decision": normalized, "reason": reason})
+        record_event(
+            "decision",
+            proposal.id,
+            actor,
+            {
+                "decision": normalized,
+                "reason": reason,
+                "state": proposal.state.value,
+                "record": record,
+                "updated_at": proposal.updated_at,
+            },
+        )
     return record
+
+
+def select_evaluated(agent: Optional[str] = None, risk_level: Optional[str] = None) -> List[str]:
+    """Ids of EVALUATED proposals matching the filters, oldest first."""
+    return [
+        s.id
+        for s in sorted(list_summaries(), key=lambda s: s.updated_at)
+        if s.state == ProposalState.EVALUATED
+        and (agent is None or s.agent == agent)
+        and (risk_level is None or s.risk_level == risk_level)
+    ]
+
+
+def decide_batch(
+    proposal_ids: Iterable[str], decision: str, actor: str, reason: str = "", otp: str = ""
+) -> Dict[str, Any]:
+    """Apply one decision to many EVALUATED proposals with a single authentication.
+
+    The actor and OTP are checked once. Every listed proposal is then locked,
+    re-read and, if still EVALUATED, transitioned in memory. The per-proposal
+    ``decision`` events, their mirror rows and one ``decision_set`` event naming
+    the whole set are stored first, together: a single audit log append and one
+    SQLite transaction. Only then are the YAML records and decision files
+    written (still under the locks), so a failed append leaves every file
+    untouched. Proposals that are missing or not EVALUATED are reported per
+    item and left untouched, and a set that decides nothing records no event
+    at all; a file write that fails after the events landed is
+    reported per item too (``aap replay --yaml-dir`` rewrites the YAML).
+    """
+    normalized = _authorize(decision, actor, otp)
+    ids = list(dict.fromkeys(proposal_ids))
+    if not ids:
+        raise ValueError("No proposals to decide")
+    target_state = ProposalState.ACCEPTED if normalized == "accept" else ProposalState.REJECTED
+    set_id = uuid4().hex[:12]
+    timestamp = utc_now()
+    ensure_dir(config.DECISIONS_DIR)
+
+    items: List[Dict[str, Any]] = []
+    decided: List[Proposal] = []
+    events: List[Any] = []
+    rows: List[Dict[str, Any]] = []
+    manager = lock_manager()
+    with ExitStack() as stack:
+        # Stripe order, so two batches over overlapping stripes cannot deadlock.
+        for path in sorted({manager.path_for("proposal", pid) for pid in ids}):
+            stack.enter_context(manager.hold(path, name="proposal"))
+        for pid in ids:
+            try:
+                proposal = load_proposal(pid)
+            except FileNotFoundError:
+                items.append({"proposal_id": pid, "status": "error", "error": "proposal not found"})
+                continue
+            if proposal.state != ProposalState.EVALUATED:
+                items.append({
+                    "proposal_id": pid, "status": "skipped",
+                    "error": f"proposal is {proposal.state.value}, not evaluated",
+                })
+                continue
+            claimed = _claimed_by_other(pid, actor)
+            if claimed:
+                items.append({"proposal_id": pid, "status": "skipped", "error": claimed})
+                continue
+            proposal.update_state(target_state)
+            record = {
+                "proposal_id": pid,
+                "decision": normalized,
+                "by": actor,
+                "reason": reason,
+                "timestamp": timestamp,
+                "set_id": set_id,
+            }
+            proposal.decision = record
+            decided.append(proposal)
+            rows.append(proposal.to_dict())
+            events.append((
+                "decision",
+                pid,
+                actor,
+                {
+                    "decision": normalized,
+                    "reason": reason,
+                    "state": proposal.state.value,
+                    "record": record,
+                    "updated_at": proposal.updated_at,
+                    "set_id": set_id,
+                },
+            ))
+            items.append({"proposal_id": pid, "status": "decided", "state": proposal.state.value})
+        summary = {
+            "set_id": set_id,
+            "decision": normalized,
+            "by": actor,
+            "reason": reason,
+            "timestamp": timestamp,
+            "proposal_ids": [p.id for p in decided],
+            "requested": len(ids),
+        }
+        if not decided:
+            return {**summary, "items": items}  # nothing changed, so nothing to record
+        events.append(("decision_set", "", actor, summary))
+        # Events and rows first: a YAML record never says decided without its event.
+        record_events(events, rows)
+        by_id = {item["proposal_id"]: item for item in items}
+        for proposal in decided:
+            try:
+                proposal.save(mirror=False, touch=False)
+                dump_yaml_or_json(proposal.decision, decision_path(proposal.id))
+            except OSError as exc:
+                by_id[proposal.id].update(status="error", error=f"decision recorded, but writing files failed: {exc}")
+    return {**summary, "items": items}
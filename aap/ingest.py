@@ -0,0 +1,211 @@
+"""Bulk proposal ingestion from NDJSON (``aap propose --from-file``, ``POST /proposals:batch``).
+
+Records are validated as they arrive; id collisions are checked against one
+directory listing taken up front (plus ids seen earlier in the batch). The
+accepted proposals are then written with exclusive-create opens, a single
+directory fsync, and one ``record_events`` call, so the audit log gets one
+write and SQLite one transaction per commit: the whole file for the CLI, every
+``INGEST_COMMIT_RECORDS`` records for the API, which streams results meanwhile.
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from uuid import uuid4
+
+from . import config
+from .audit import record_events
+from .layout import iter_files
+from .locks import scopes_lock
+from .scopes import ScopeIndex, check_proposal, describe
+from .state import ProposalState
+from .storage import Proposal, check_id, proposal_path
+from .utils import ensure_dir, fsync_dir, serialize_yaml_or_json
+
+ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,127}$")
+_FIELDS = {"id", "agent", "goal", "scope", "constraints", "risk_level", "policy"}
+
+# Optional per-record admission hook: returns an error message to refuse the record.
+Check = Callable[[Proposal], Optional[str]]
+
+
+def _string_list(record: Dict[str, Any], key: str) -> List[str]:
+    value = record.get(key) or []
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise ValueError(f"{key} must be a list of strings")
+    return value
+
+
+def parse_record(raw: Union[str, bytes, Dict[str, Any]]) -> Proposal:
+    """Validate one NDJSON record and build a PROPOSED proposal; raise ValueError."""
+    if isinstance(raw, (str, bytes)):
+        try:
+            record = json.loads(raw)
+        except ValueError as exc:
+            raise ValueError(f"invalid JSON: {exc}")
+    else:
+        record = raw
+    if not isinstance(record, dict):
+        raise ValueError("record must be a JSON object")
+    unknown = set(record) - _FIELDS
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+    for key in ("agent", "goal"):
+        if not isinstance(record.get(key), str) or not record[key].strip():
+            raise ValueError(f"{key} is required")
+    proposal_id = record.get("id") or uuid4().hex[:8]
+    if not isinstance(proposal_id, str) or not ID_PATTERN.match(proposal_id):
+        raise ValueError(f"invalid id {proposal_id!r}")
+    check_id(proposal_id)
+    risk_level = record.get("risk_level") or "medium"
+    if not isinstance(risk_level, str):
+        raise ValueError("risk_level must be a string")
+    policy = record.get("policy")
+    if policy is not None and not isinstance(policy, str):
+        raise ValueError("policy must be a path string")
+    proposal = Proposal(
+        id=proposal_id,
+        agent=record["agent"],
+        goal=record["goal"],
+        scope=_string_list(record, "scope"),
+        constraints=_string_list(record, "constraints"),
+        risk_level=risk_level,
+        policy={
+            "name": Path(policy).stem if policy else "default",
+            "path": policy or str(config.DEFAULT_POLICY_FILE),
+        },
+    )
+    proposal.update_state(ProposalState.PROPOSED)
+    return proposal
+
+
+def existing_ids() -> Set[str]:
+    """All proposal ids taken, from one walk of the proposal store plus the archive index."""
+    from .archive import archived_ids
+
+    return {pid for pid, _ in iter_files(config.PROPOSAL_DIR, ".yaml")} | archived_ids()
+
+
+class BatchIngest:
+    """Collect validated proposals, then persist them together with :meth:`commit`."""
+
+    def __init__(self, check: Optional[Check] = None, actor: Optional[str] = None) -> None:
+        self.check = check
+        self.actor = actor
+        self.taken = existing_ids()
+        self.pending: List[Tuple[int, Proposal]] = []
+        self.counts: Dict[str, int] = {"created": 0, "conflict": 0, "invalid": 0, "refused": 0, "error": 0}
+
+    def _result(
+        self, line: int, status: str, proposal_id: Optional[str] = None, error: Optional[str] = None
+    ) -> Dict[str, Any]:
+        self.counts[status] += 1
+        result: Dict[str, Any] = {"line": line, "id": proposal_id, "status": status}
+        if error:
+            result["error"] = error
+        return result
+
+    def add(self, line: int, raw: Union[str, bytes, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Queue one record; return its result right away if it is refused."""
+        try:
+            proposal = parse_record(raw)
+        except ValueError as exc:
+            return self._result(line, "invalid", error=str(exc))
+        if proposal.id in self.taken:
+            return self._result(line, "conflict", proposal.id, "proposal id already exists")
+        if self.check:
+            error = self.check(proposal)
+            if error:
+                return self._result(line, "refused", proposal.id, error)
+        self.taken.add(proposal.id)
+        self.pending.append((line, proposal))
+        return None
+
+    def _blocked(self, proposal: Proposal, batch_scopes: ScopeIndex) -> Optional[str]:
+        """Why ``scope_conflicts: block`` refuses ``proposal`` (against open proposals
+        and the records accepted earlier in this commit), or None."""
+        policy = proposal.policy["path"]
+        explicit = None if policy == str(config.DEFAULT_POLICY_FILE) else [Path(policy)]  # else routed
+        try:
+            mode, conflicts = check_proposal(proposal, explicit)
+        except (OSError, ValueError) as exc:
+            return f"Cannot check scope conflicts: {exc}"
+        if mode != "block":
+            return None
+        conflicts.update(batch_scopes.overlapping(proposal.scope))
+        return "; ".join(describe(conflicts)) or None
+
+    def commit(self) -> List[Dict[str, Any]]:
+        """Write every queued proposal, then flush their audit events in one batch.
+
+        Runs under the ``scopes`` lock, like a single propose, so records under
+        ``scope_conflicts: block`` are refused if they overlap an open proposal or
+        an earlier record of the batch.
+        """
+        with scopes_lock():
+            return self._commit()
+
+    def _commit(self) -> List[Dict[str, Any]]:
+        results: List[Dict[str, Any]] = []
+        created: List[Proposal] = []
+        directories: Set[Path] = set()
+        batch_scopes = ScopeIndex()
+        for line, proposal in self.pending:
+            blocked = self._blocked(proposal, batch_scopes)
+            if blocked:
+                results.append(self._result(line, "refused", proposal.id, blocked))
+                continue
+            path = proposal_path(proposal.id)
+            try:
+                ensure_dir(path.parent)
+                # "x" fails if another writer created the id since the listing was taken.
+                with path.open("x") as f:
+                    f.write(serialize_yaml_or_json(proposal.to_dict()))
+            except FileExistsError:
+                results.append(self._result(line, "conflict", proposal.id, "proposal id already exists"))
+                continue
+            except OSError as exc:
+                results.append(self._result(line, "error", proposal.id, str(exc)))
+                continue
+            created.append(proposal)
+            batch_scopes.set(proposal.id, proposal.scope)
+            directories.add(path.parent)
+            results.append(self._result(line, "created", proposal.id))
+        self.pending = []
+        if not created:
+            return results
+        for directory in directories:
+            fsync_dir(directory)
+        events = [
+            (
+                "propose",
+                p.id,
+                self.actor or p.agent,
+                {
+                    "goal": p.goal,
+                    "scope": p.scope,
+                    "constraints": p.constraints,
+                    "risk_level": p.risk_level,
+                    "state": p.state.value,
+                    "proposal": p.to_dict(),
+                },
+            )
+            for p in created
+        ]
+        record_events(events, proposals=[p.to_dict() for p in created])
+        return results
+
+
+def ingest_lines(
+    lines: Iterable[Union[str, bytes]], check: Optional[Check] = None, actor: Optional[str] = None
+) -> Iterator[Dict[str, Any]]:
+    """Ingest NDJSON lines, yielding per-record results (refusals first, as they occur)."""
+    batch = BatchIngest(check=check, actor=actor)
+    for line_no, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        result = batch.add(line_no, line)
+        if result:
+            yield result
+    yield from batch.commit()
@@ -0,0 +1,92 @@
+"""Cross-process cache invalidation through SQLite.
+
+Each API worker caches proposals, versions and the scope trie in memory, and
+other workers and CLI runs write behind its back. Every write to the proposals
+mirror or the events table also bumps a per-entity counter in the
+``generations`` table, in the same transaction. A cache records the generation
+it was built at and rebuilds when the generation moves.
+
+Reading the generations per request would be one query per cache. Instead, each
+process keeps one long-lived connection and asks it ``PRAGMA data_version``. The
+value changes only when another connection has committed, and in WAL mode it is
+answered from the shared-memory index without touching the database file. The
+``generations`` rows are re-read only then. The check is O(1) and needs no
+external service. A write becomes visible to the next request in any worker,
+and to the watch hub's background thread within ``WATCH_POLL_INTERVAL``.
+"""
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from . import config
+from .db import init_db, read_generations
+
+
+class InvalidationBus:
+    """Generation counters of one database, re-read only when it has changed."""
+
+    def __init__(self, db_file: Path) -> None:
+        self.db_file = db_file
+        self.generations: Dict[str, int] = {}
+        self.checks = 0
+        self.reloads = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._data_version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            # A connection must not cross a fork (uvicorn/gunicorn workers).
+            init_db()  # creates the table and switches the file to WAL, which persists
+            self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            self._pid = os.getpid()
+            self._data_version = None
+        return self._conn
+
+    def check(self) -> Dict[str, int]:
+        """Current generation of every entity; re-reads them only after a commit."""
+        with self._lock:
+            self.checks += 1
+            conn = self._connection()
+            version = conn.execute("pragma data_version").fetchone()[0]
+            if version != self._data_version:
+                # Read the version first: a commit landing in between changes it again.
+                self._data_version = version
+                self.generations = read_generations(conn)
+                self.reloads += 1
+            return self.generations
+
+    def generation(self, entity: str) -> int:
+        return self.check().get(entity, 0)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"checks": self.checks, "reloads": self.reloads, "generations": dict(self.generations)}
+
+
+_buses: Dict[Path, InvalidationBus] = {}
+_buses_lock = threading.Lock()
+
+
+def bus() -> InvalidationBus:
+    """This process's bus for ``DB_FILE``."""
+    with _buses_lock:
+        found = _buses.get(config.DB_FILE)
+        if found is None:
+            found = _buses[config.DB_FILE] = InvalidationBus(config.DB_FILE)
+        return found
+
+
+def generation(entity: str) -> int:
+    """Generation of ``entity`` ("proposals" or "events"); O(1) when nothing was committed."""
+    return bus().generation(entity)
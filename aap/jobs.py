@@ -0,0 +1,191 @@
+"""Background evaluation jobs.
+
+``POST /proposals/{id}/evaluate`` can hand its work to a durable queue in SQLite
+(the ``jobs`` table) rather than run it inside the request, and answer ``202``
+with a job id. ``aap worker`` processes drain the queue:
+
+- Jobs are claimed highest ``priority`` first, oldest first within a priority.
+- A claim hides the job from other workers for ``JOB_VISIBILITY_TIMEOUT``
+  seconds. If its worker dies, the job becomes visible again and is retried, up
+  to ``JOB_MAX_ATTEMPTS`` claims in all.
+- Queueing a job identical to one still queued or running (same proposal,
+  evidence, policy and ``force``) returns that job instead.
+- Every status change (queued, running, succeeded, failed) is recorded as an
+  audit ``job`` event. It therefore shows up in the change feed (SSE and
+  long-poll) as well as in ``GET /jobs/{id}``.
+
+Evaluation is memoized and idempotent, so a job that runs twice (its lease
+lapsed while the first worker was still busy) does no harm.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import config
+from .audit import record_event
+from .db import job_claim, job_enqueue, job_finish, job_retry, purge_jobs
+from .invalidation import generation
+from .locks import LockTimeout
+from .state import ProposalState
+from .utils import utc_now
+
+EVALUATE = "evaluate"
+
+
+def dedup_key(kind: str, proposal_id: Optional[str], params: Dict[str, Any]) -> str:
+    payload = json.dumps([kind, proposal_id, params], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _event(job: Dict[str, Any], status: str, **data: Any) -> None:
+    record_event(
+        "job",
+        job["proposal_id"],
+        job["actor"] or "aap-worker",
+        {"job_id": job["id"], "kind": job["kind"], "status": status, **data},
+    )
+
+
+def enqueue_evaluation(
+    proposal_id: str,
+    actor: str,
+    evidence: Optional[Dict[str, Any]] = None,
+    policy: Optional[str] = None,
+    force: bool = False,
+    priority: int = 0,
+) -> Tuple[Dict[str, Any], bool]:
+    """Queue an evaluation of ``proposal_id``; returns (job, deduplicated)."""
+    params = {"evidence": evidence, "policy": policy, "force": force}
+    job, deduplicated = job_enqueue(
+        EVALUATE, proposal_id, dedup_key(EVALUATE, proposal_id, params), params, priority, actor, utc_now()
+    )
+    if not deduplicated:
+        _event(job, "queued", priority=priority)
+    return job, deduplicated
+
+
+def _run(job: Dict[str, Any]) -> Dict[str, Any]:
+    from .evaluation import run_evaluation
+    from .storage import load_proposal
+
+    if job["kind"] != EVALUATE:
+        raise ValueError(f"unknown job kind {job['kind']!r}")
+    params = job["params"]
+    proposal = load_proposal(job["proposal_id"])
+    if proposal.state in {ProposalState.REJECTED, ProposalState.COMMITTED}:
+        raise ValueError(f"Proposal {proposal.id} is {proposal.state.value}; cannot evaluate.")
+    outcome = run_evaluation(
+        proposal,
+        policy_paths=[Path(params["policy"])] if params.get("policy") else None,
+        evidence=params.get("evidence"),
+        force=bool(params.get("force")),
+    )
+    return {
+        "state": outcome.proposal.state.value,
+        "policy_passed": outcome.policy_passed,
+        "evidence_passed": outcome.evidence_passed,
+        "cache": outcome.cache,
+        "policies": outcome.policies,
+    }
+
+
+def worker_name(index: int = 0) -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+
+def _fail(job: Dict[str, Any], worker: str, error: str) -> Dict[str, Any]:
+    if job_finish(job["id"], worker, "failed", utc_now(), error=error):
+        _event(job, "failed", error=error)
+    return {**job, "state": "failed", "error": error}
+
+
+def run_one(worker: str, visibility_seconds: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """Claim and run the next visible job; returns it with its outcome, or None if idle."""
+    visibility = visibility_seconds or config.JOB_VISIBILITY_TIMEOUT
+    job, abandoned = job_claim(worker, visibility, config.JOB_MAX_ATTEMPTS, utc_now())
+    for lost in abandoned:
+        _event(lost, "failed", error=lost["error"])
+    if job is None:
+        return None
+    _event(job, "running", attempt=job["attempts"], worker=worker)
+    try:
+        result = _run(job)
+    except LockTimeout as exc:
+        # Contention, not a bad job: back off and let any worker retry it.
+        if job_retry(job["id"], worker, config.JOB_RETRY_DELAY, str(exc)):
+            _event(job, "queued", retry=True, error=str(exc))
+        return {**job, "state": "queued", "error": str(exc)}
+    except (OSError, ValueError) as exc:
+        return _fail(job, worker, str(exc))
+    except Exception as exc:  # a bug in the job, not in the worker: record it and carry on
+        return _fail(job, worker, f"{type(exc).__name__}: {exc}")
+    if job_finish(job["id"], worker, "succeeded", utc_now(), result=result):
+        _event(job, "succeeded", result=result)
+    return {**job, "state": "succeeded", "result": result}
+
+
+def work(
+    worker: Optional[str] = None,
+    once: bool = False,
+    poll_interval: Optional[float] = None,
+    visibility_seconds: Optional[float] = None,
+) -> int:
+    """Run jobs until interrupted (``once``: until the queue is empty); returns how many ran.
+
+    While idle, the worker checks the ``jobs`` generation of the invalidation bus,
+    which is O(1), and claims again as soon as something is queued. It also
+    retries every ``poll_interval`` for leases that lapsed.
+    """
+    worker = worker or worker_name()
+    poll_interval = config.JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+    cutoff = datetime.now(timezone.utc) - timedelta(days=config.JOB_RETENTION_DAYS)
+    purge_jobs(cutoff.isoformat())
+    done = 0
+    while True:
+        seen = generation("jobs")
+        if run_one(worker, visibility_seconds) is not None:
+            done += 1
+            continue
+        if once:
+            break
+        deadline = time.monotonic() + poll_interval
+        while time.monotonic() < deadline and generation("jobs") == seen:
+            time.sleep(0.02)
+    return done
+
+
+def _pool_worker(index: int, once: bool, visibility_seconds: Optional[float]) -> None:
+    try:
+        work(worker_name(index), once=once, visibility_seconds=visibility_seconds)
+    except KeyboardInterrupt:
+        pass
+
+
+def run_pool(processes: int = 1, once: bool = False, visibility_seconds: Optional[float] = None) -> List[int]:
+    """Run ``processes`` workers (1: in this process); returns their exit codes."""
+    if processes <= 1:
+        work(once=once, visibility_seconds=visibility_seconds)
+        return [0]
+    ctx = multiprocessing.get_context("spawn")
+    procs = [
+        ctx.Process(target=_pool_worker, args=(i, once, visibility_seconds), name=f"aap-worker-{i}")
+        for i in range(processes)
+    ]
+    for proc in procs:
+        proc.start()
+    try:
+        for proc in procs:
+            proc.join()
+    except KeyboardInterrupt:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.join()
+    return [proc.exitcode for proc in procs]
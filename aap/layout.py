@@ -0,0 +1,171 @@
+"""Hash fan-out layout of the proposal, decision and evidence stores.
+
+With ``STORE_FANOUT = n``, proposal ``id`` is stored ``n`` directory levels
+down. Each level is named by the next hex pair of ``sha1(id)``, so with
+``n = 2`` the record is ``proposals/3f/a2/<id>.yaml``. Its decision is
+``decisions/3f/a2/<id>.yaml`` and its evidence is ``evidence/3f/a2/<id>/``.
+``0`` keeps the flat layout. Hashing spreads ids evenly whatever they look
+like, so no directory grows past ``total / 256**n`` entries.
+
+Lookups try the configured depth first and then every other depth, and walks
+accept entries at any depth. A store therefore stays readable while
+:func:`migrate` moves entries to the configured layout (after the fan-out
+changes). Each move is one ``rename`` made under the lock that writers of that
+entry hold, so an entry is never in two places. Only the lock stripe files
+live in ``LOCK_DIR``, so it is not sharded.
+"""
+
+import hashlib
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from . import config
+from .locks import lock_manager, proposal_lock
+from .utils import ensure_dir, fsync_dir
+
+MAX_FANOUT = 3
+_SHARD_NAME = re.compile(r"^[0-9a-f]{2}$")
+
+
+def shard(proposal_id: str, levels: Optional[int] = None) -> Tuple[str, ...]:
+    """Directory names above ``proposal_id``'s entries (``levels`` default: ``STORE_FANOUT``)."""
+    levels = config.STORE_FANOUT if levels is None else levels
+    if not 0 <= levels <= MAX_FANOUT:
+        raise ValueError(f"STORE_FANOUT must be between 0 and {MAX_FANOUT}, not {levels}")
+    digest = hashlib.sha1(proposal_id.encode("utf-8")).hexdigest()
+    return tuple(digest[2 * i : 2 * i + 2] for i in range(levels))
+
+
+def entry_path(base: Path, proposal_id: str, suffix: str = "", levels: Optional[int] = None) -> Path:
+    return base.joinpath(*shard(proposal_id, levels), proposal_id + suffix)
+
+
+def locate(base: Path, proposal_id: str, suffix: str = "") -> Path:
+    """Where the entry is: at the configured depth, else at the first other depth
+    holding it, else (a new entry) at the configured depth."""
+    preferred = entry_path(base, proposal_id, suffix)
+    if preferred.exists():
+        return preferred
+    for levels in range(MAX_FANOUT + 1):
+        if levels != config.STORE_FANOUT:
+            path = entry_path(base, proposal_id, suffix, levels)
+            if path.exists():
+                return path
+    return preferred
+
+
+def _scan(directory: Path) -> List[os.DirEntry]:
+    try:
+        with os.scandir(directory) as it:
+            return sorted(it, key=lambda e: e.name)
+    except FileNotFoundError:
+        return []
+
+
+def iter_files(base: Path, suffix: str, _depth: int = 0) -> Iterator[Tuple[str, Path]]:
+    """(id, path) of every ``<id><suffix>`` file under ``base``, at any depth."""
+    for entry in _scan(base):
+        if entry.name.endswith(suffix) and entry.is_file():
+            yield entry.name[: -len(suffix)], Path(entry.path)
+        elif _depth < MAX_FANOUT and _SHARD_NAME.match(entry.name) and entry.is_dir():
+            yield from iter_files(Path(entry.path), suffix, _depth + 1)
+
+
+def iter_dirs(base: Path, skip: Tuple[str, ...] = ("blobs",), _depth: int = 0) -> Iterator[Tuple[str, Path]]:
+    """(id, path) of every per-proposal directory under ``base``, at any depth.
+
+    Per-proposal directories only hold files, so a hex-pair directory holding
+    no files (possibly emptied by archiving) is a shard.
+    """
+    for entry in _scan(base):
+        if not entry.is_dir() or (_depth == 0 and entry.name in skip):
+            continue
+        path = Path(entry.path)
+        if _depth < MAX_FANOUT and _SHARD_NAME.match(entry.name) and not any(e.is_file() for e in _scan(path)):
+            yield from iter_dirs(path, skip, _depth + 1)
+        else:
+            yield entry.name, path
+
+
+def _stores() -> Tuple[Tuple[str, Path, str], ...]:
+    """(name, base directory, entry suffix) of each sharded store; evidence entries are directories."""
+    return (
+        ("proposals", config.PROPOSAL_DIR, ".yaml"),
+        ("decisions", config.DECISIONS_DIR, ".yaml"),
+        ("evidence", config.EVIDENCE_DIR, ""),
+    )
+
+
+def _entries(base: Path, suffix: str) -> Iterator[Tuple[str, Path]]:
+    """Entries of one store. Evidence directories count only when their proposal
+    exists (hot or archived), so other directories under ``EVIDENCE_DIR``, such
+    as the shipped ``example``, are never moved."""
+    if suffix:
+        return iter_files(base, suffix)
+    from .archive import archived_ids
+
+    existing = {pid for pid, _ in iter_files(config.PROPOSAL_DIR, ".yaml")} | archived_ids()
+    return ((pid, path) for pid, path in iter_dirs(base) if pid in existing)
+
+
+def depth_counts() -> Dict[str, Dict[int, int]]:
+    """Entries per store and depth; everything is at ``STORE_FANOUT`` once migrated."""
+    counts: Dict[str, Dict[int, int]] = {}
+    for store, base, suffix in _stores():
+        per_depth: Dict[int, int] = {}
+        for _, path in _entries(base, suffix):
+            depth = len(path.relative_to(base).parts) - 1
+            per_depth[depth] = per_depth.get(depth, 0) + 1
+        counts[store] = dict(sorted(per_depth.items()))
+    return counts
+
+
+def _move(base: Path, proposal_id: str, path: Path, suffix: str, dry_run: bool) -> str:
+    """Move one entry to its configured location; returns moved/conflict/gone."""
+    target = entry_path(base, proposal_id, suffix)
+    if dry_run:
+        return "moved"
+    if not path.exists():
+        return "gone"  # deleted or moved by someone else since the walk
+    if target.exists():
+        return "conflict"
+    ensure_dir(target.parent)
+    os.rename(path, target)
+    fsync_dir(target.parent)
+    fsync_dir(path.parent)
+    _prune(base, path.parent)
+    return "moved"
+
+
+def _prune(base: Path, directory: Path) -> None:
+    """Remove emptied shard directories deeper than the configured layout uses."""
+    while directory != base and len(directory.relative_to(base).parts) > config.STORE_FANOUT:
+        try:
+            directory.rmdir()
+        except OSError:
+            return
+        directory = directory.parent
+
+
+def migrate(dry_run: bool = False) -> Dict[str, Any]:
+    """Move every proposal, decision and evidence entry to the ``STORE_FANOUT``
+    layout, online. Returns per-store counts and any entries that also exist
+    at the target (left in place for a human to resolve)."""
+    report: Dict[str, Any] = {"fanout": config.STORE_FANOUT, "dry_run": dry_run, "conflicts": []}
+    for store, base, suffix in _stores():
+        moved = 0
+        for proposal_id, path in list(_entries(base, suffix)):
+            if path == entry_path(base, proposal_id, suffix):
+                continue
+            # The lock every writer of this entry holds: evidence has its own.
+            lock = lock_manager().lock("evidence", proposal_id) if store == "evidence" else proposal_lock(proposal_id)
+            with lock:
+                outcome = _move(base, proposal_id, path, suffix, dry_run)
+            if outcome == "moved":
+                moved += 1
+            elif outcome == "conflict":
+                report["conflicts"].append(str(path))
+        report[store] = moved
+    return report
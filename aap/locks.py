@@ -0,0 +1,287 @@
+"""Advisory file locks with shared/exclusive modes, timeouts and contention metrics.
+
+Locks are ``flock`` locks on files under ``LOCK_DIR``. A named lock (``db``,
+``audit.log``, ...) has its own file. Keyed locks (one per proposal) are striped
+over ``LOCK_STRIPES`` files (``proposal-07.lock``), so the directory no longer
+grows by one file per proposal. Two keys that share a stripe only serialize with
+each other, which is cheap at these hold times.
+
+A thread that already holds a lock file gets it again without another
+``flock`` call (re-entrant fast path). This also covers two keys that land on
+the same stripe. Upgrading shared to exclusive while holding is refused, because
+two upgraders would deadlock. Acquisition waits at most ``timeout`` seconds
+(``LOCK_TIMEOUT`` by default) and then raises :class:`LockTimeout`.
+
+Wait and hold times are recorded per lock name in millisecond histograms,
+which are served at ``GET /locks``.
+"""
+
+import bisect
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from . import config
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is unbounded.
+BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class LockTimeout(TimeoutError):
+    def __init__(self, name: str, timeout: float) -> None:
+        super().__init__(f"timed out after {timeout:g}s waiting for lock {name!r}")
+        self.name = name
+        self.timeout = timeout
+
+
+class Histogram:
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the ``q`` quantile (``max`` for the open bucket)."""
+        count = sum(self.counts)
+        if not count:
+            return None
+        rank, seen = q * count, 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else round(self.max, 3)
+        return round(self.max, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        count = sum(self.counts)
+        return {
+            "count": count,
+            "mean": round(self.total / count, 3) if count else None,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "max": round(self.max, 3),
+            "buckets": {
+                (f"le_{b:g}" if i < len(BUCKETS_MS) else "inf"): n
+                for i, (b, n) in enumerate(zip(BUCKETS_MS + (None,), self.counts))
+                if n
+            },
+        }
+
+
+class _Stats:
+    def __init__(self) -> None:
+        self.acquired = 0
+        self.contended = 0
+        self.timeouts = 0
+        self.reentrant = 0
+        self.wait = Histogram()
+        self.hold = Histogram()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "acquired": self.acquired,
+            "contended": self.contended,
+            "timeouts": self.timeouts,
+            "reentrant": self.reentrant,
+            "wait_ms": self.wait.to_dict(),
+            "hold_ms": self.hold.to_dict(),
+        }
+
+
+class _Held:
+    __slots__ = ("file", "shared", "depth")
+
+    def __init__(self, file, shared: bool) -> None:
+        self.file = file
+        self.shared = shared
+        self.depth = 1
+
+
+class LockManager:
+    def __init__(self, stripes: Optional[int] = None) -> None:
+        self.stripes = stripes or config.LOCK_STRIPES
+        self._local = threading.local()
+        self._stats: Dict[str, _Stats] = {}
+        self._stats_lock = threading.Lock()
+
+    def path_for(self, name: str, key: Optional[str] = None) -> Path:
+        if key is None:
+            return config.LOCK_DIR / f"{name}.lock"
+        stripe = zlib.crc32(key.encode("utf-8")) % self.stripes
+        return config.LOCK_DIR / f"{name}-{stripe:02d}.lock"
+
+    def stripe_paths(self, name: str) -> List[Path]:
+        """Every stripe file of keyed lock ``name``, in acquisition order."""
+        return [config.LOCK_DIR / f"{name}-{stripe:02d}.lock" for stripe in range(self.stripes)]
+
+    def lock(self, name: str, key: Optional[str] = None, shared: bool = False, timeout: Optional[float] = None):
+        """Lock ``name`` (or the stripe of ``name`` that ``key`` hashes to)."""
+        return self.hold(self.path_for(name, key), shared=shared, timeout=timeout, name=name)
+
+    @contextmanager
+    def hold(
+        self, path: Path, shared: bool = False, timeout: Optional[float] = None, name: Optional[str] = None
+    ) -> Iterator[None]:
+        import fcntl
+
+        name = name or path.stem
+        held: Dict[str, _Held] = self._held()
+        slot = str(path)
+        current = held.get(slot)
+        if current is not None:
+            if current.shared and not shared:
+                raise RuntimeError(f"cannot upgrade shared lock {name!r} to exclusive while holding it")
+            current.depth += 1
+            self._record(name, reentrant=True)
+            try:
+                yield
+            finally:
+                current.depth -= 1
+            return
+
+        timeout = config.LOCK_TIMEOUT if timeout is None else timeout
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lock_file = path.open("a")
+        mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        started = time.monotonic()
+        contended = False
+        try:
+            delay = 0.001
+            while True:
+                try:
+                    fcntl.flock(lock_file.fileno(), mode | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    contended = True
+                    remaining = started + timeout - time.monotonic()
+                    if remaining <= 0:
+                        self._record(name, timed_out=True)
+                        raise LockTimeout(name, timeout) from None
+                    time.sleep(min(delay, remaining))
+                    delay = min(delay * 2, 0.05)
+        except BaseException:
+            lock_file.close()
+            raise
+        acquired = time.monotonic()
+        held[slot] = _Held(lock_file, shared)
+        try:
+            yield
+        finally:
+            del held[slot]
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            finally:
+                lock_file.close()
+            self._record(
+                name,
+                wait_ms=(acquired - started) * 1000,
+                hold_ms=(time.monotonic() - acquired) * 1000,
+                contended=contended,
+            )
+
+    def _held(self) -> Dict[str, _Held]:
+        held = getattr(self._local, "held", None)
+        if held is None:
+            held = self._local.held = {}
+        return held
+
+    def _record(
+        self,
+        name: str,
+        wait_ms: Optional[float] = None,
+        hold_ms: Optional[float] = None,
+        contended: bool = False,
+        timed_out: bool = False,
+        reentrant: bool = False,
+    ) -> None:
+        with self._stats_lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = _Stats()
+            if timed_out:
+                stats.timeouts += 1
+                return
+            if reentrant:
+                stats.reentrant += 1
+                return
+            stats.acquired += 1
+            stats.contended += contended
+            stats.wait.observe(wait_ms)
+            stats.hold.observe(hold_ms)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {"stripes": self.stripes, "locks": {name: s.to_dict() for name, s in sorted(self._stats.items())}}
+
+    def reset_metrics(self) -> None:
+        with self._stats_lock:
+            self._stats.clear()
+
+
+_default: Optional[LockManager] = None
+_default_lock = threading.Lock()
+
+
+def lock_manager() -> LockManager:
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = LockManager()
+        return _default
+
+
+def proposal_lock(proposal_id: str, shared: bool = False, timeout: Optional[float] = None):
+    """Lock guarding one proposal's YAML record (striped)."""
+    return lock_manager().lock("proposal", proposal_id, shared=shared, timeout=timeout)
+
+
+def scopes_lock(timeout: Optional[float] = None):
+    """Lock held from a new proposal's scope-conflict check until it is saved, so
+    two overlapping proposes cannot both pass ``scope_conflicts: block``.
+    Taken before any proposal lock."""
+    return lock_manager().lock("scopes", timeout=timeout)
+
+
+def remove_legacy_locks(
+    lock_dir: Optional[Path] = None, dry_run: bool = False, ids: Optional[Iterable[str]] = None
+) -> List[Path]:
+    """Delete per-proposal ``<id>.lock`` files left by older versions; returns what was removed.
+
+    Only files named after a known proposal (``ids``, default: those in
+    ``PROPOSAL_DIR``) are considered, and only when nobody holds them.
+    """
+    import fcntl
+
+    lock_dir = lock_dir or config.LOCK_DIR
+    if not lock_dir.exists():
+        return []
+    if ids is None:
+        from .layout import iter_files
+
+        ids = {pid for pid, _ in iter_files(config.PROPOSAL_DIR, ".yaml")}
+    ids = set(ids)
+    removed: List[Path] = []
+    for path in lock_dir.glob("*.lock"):
+        stem = path.stem[: -len(".evidence")] if path.stem.endswith(".evidence") else path.stem
+        if stem not in ids:
+            continue
+        if dry_run:
+            removed.append(path)
+            continue
+        with path.open("a") as f:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue
+            os.unlink(path)
+            removed.append(path)
+    return removed
@@ -0,0 +1,64 @@
+"""Binary Merkle tree helpers used for audit checkpoints and inclusion proofs."""
+
+import hashlib
+from typing import List, Tuple
+
+# Leaves and interior nodes are domain-separated so a leaf can never be
+# reinterpreted as an interior node (second pre-image protection).
+_LEAF_PREFIX = b"\x00"
+_NODE_PREFIX = b"\x01"
+
+
+def _leaf(value: str) -> bytes:
+    return hashlib.sha256(_LEAF_PREFIX + bytes.fromhex(value)).digest()
+
+
+def _node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(_NODE_PREFIX + left + right).digest()
+
+
+def _next_level(level: List[bytes]) -> List[bytes]:
+    # An odd trailing node is promoted unchanged to the next level.
+    parents = [_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+    if len(level) % 2:
+        parents.append(level[-1])
+    return parents
+
+
+def merkle_root(hashes: List[str]) -> str:
+    """Return the hex Merkle root over a list of hex leaf hashes."""
+    if not hashes:
+        return hashlib.sha256(b"").hexdigest()
+    level = [_leaf(h) for h in hashes]
+    while len(level) > 1:
+        level = _next_level(level)
+    return level[0].hex()
+
+
+def merkle_proof(hashes: List[str], index: int) -> List[Tuple[str, str]]:
+    """Return the audit path for ``hashes[index]`` as (side, sibling) pairs.
+
+    ``side`` is ``"L"`` when the sibling sits left of the running hash and
+    ``"R"`` when it sits right. The path has O(log n) entries.
+    """
+    if not 0 <= index < len(hashes):
+        raise IndexError(f"Leaf index {index} out of range (0..{len(hashes) - 1})")
+    path: List[Tuple[str, str]] = []
+    level = [_leaf(h) for h in hashes]
+    while len(level) > 1:
+        if index % 2:
+            path.append(("L", level[index - 1].hex()))
+        elif index + 1 < len(level):
+            path.append(("R", level[index + 1].hex()))
+        level = _next_level(level)
+        index //= 2
+    return path
+
+
+def verify_proof(leaf: str, path: List[Tuple[str, str]], root: str) -> bool:
+    """Check that ``leaf`` is included under ``root`` via ``path``."""
+    current = _leaf(leaf)
+    for side, sibling in path:
+        other = bytes.fromhex(sibling)
+        current = _node(other, current) if side == "L" else _node(current, other)
+    return current.hex() == root
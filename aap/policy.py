@@ -1,10 +1,14 @@
-from dataclasses import dataclass
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 from . import config
 from .storage import Proposal
-from .utils import load_yaml_or_json
+from .utils import load_yaml_or_json, sha256_file
+
+MATCH_KEYS = ("risk_level", "agent", "scope_prefix")
 
 
 @dataclass
@@ -14,6 +18,34 @@ class PolicyEvaluation:
     required_evidence: List[str]
     policy_name: str
     performance_budget_ms: Optional[float]
+    applied: List[Dict[str, str]] = field(default_factory=list)  # name/path/hash of every policy evaluated
+
+
+@dataclass
+class LoadedPolicy:
+    name: str
+    path: Path
+    hash: str
+    data: Dict[str, Any]
+
+    @classmethod
+    def load(cls, path: Path) -> "LoadedPolicy":
+        """Parse and hash ``path``; reused until the file's mtime or size changes."""
+        stat = path.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = _loaded.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        data = load_policy(path)
+        policy = cls(name=data.get("name", path.stem), path=path, hash=sha256_file(path), data=data)
+        _loaded[path] = (signature, policy)
+        return policy
+
+    def describe(self) -> Dict[str, str]:
+        return {"name": self.name, "path": str(self.path), "hash": self.hash}
+
+
+_loaded: Dict[Path, Tuple[Tuple[int, int], LoadedPolicy]] = {}
 
 
 def load_policy(path: Optional[Path] = None) -> Dict[str, Any]:
@@ -24,7 +56,14 @@ def load_policy(path: Optional[Path] = None) -> Dict[str, Any]:
     return data
 
 
-def evaluate_policy(proposal: Proposal, policy: Dict[str, Any]) -> PolicyEvaluation:
+DEFAULT_REQUIRED_EVIDENCE = ["unit_tests", "integration_tests"]
+
+
+def evaluate_policy(
+    proposal: Proposal, policy: Dict[str, Any], default_evidence: Optional[List[str]] = None
+) -> PolicyEvaluation:
+    """Check ``proposal`` against one policy. A policy without ``require_evidence``
+    requires ``default_evidence`` (``DEFAULT_REQUIRED_EVIDENCE`` if not given)."""
     violations: List[str] = []
     rules: Dict[str, Any] = policy.get("rules", {})
     policy_name = policy.get("name", "default")
@@ -46,7 +85,9 @@ def evaluate_policy(proposal: Proposal, policy: Dict[str, Any]) -> PolicyEvaluat
         if constraint not in proposal.constraints:
             violations.append(f"missing required constraint '{constraint}'")
 
-    required_evidence = rules.get("require_evidence", ["unit_tests", "integration_tests"])
+    if default_evidence is None:
+        default_evidence = DEFAULT_REQUIRED_EVIDENCE
+    required_evidence = rules.get("require_evidence", default_evidence)
     performance_budget_ms = rules.get("max_latency_delta_ms")
 
     return PolicyEvaluation(
@@ -56,3 +97,180 @@ def evaluate_policy(proposal: Proposal, policy: Dict[str, Any]) -> PolicyEvaluat
         policy_name=policy_name,
         performance_budget_ms=performance_budget_ms,
     )
+
+
+def _as_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def evaluate_policies(proposal: Proposal, policies: List[LoadedPolicy]) -> PolicyEvaluation:
+    """Evaluate several policies at once and merge the results.
+
+    Violations are prefixed with the policy name when more than one policy
+    applies. Required evidence is the union, in first-seen order; a routed set
+    without ``require_evidence`` inherits the default policy's. The
+    performance budget is the tightest one set.
+    """
+    if not policies:
+        raise ValueError("No policy applies to this proposal")
+    inherited = None
+    for policy in policies:
+        if policy.path == config.DEFAULT_POLICY_FILE:
+            inherited = _as_list(policy.data.get("rules", {}).get("require_evidence", DEFAULT_REQUIRED_EVIDENCE))
+            break
+    violations: List[str] = []
+    required: Dict[str, None] = {}
+    budgets: List[float] = []
+    for policy in policies:
+        result = evaluate_policy(proposal, policy.data, inherited)
+        prefix = f"[{policy.name}] " if len(policies) > 1 else ""
+        violations.extend(prefix + v for v in result.violations)
+        required.update(dict.fromkeys(result.required_evidence))
+        if result.performance_budget_ms is not None:
+            budgets.append(result.performance_budget_ms)
+    return PolicyEvaluation(
+        passed=not violations,
+        violations=violations,
+        required_evidence=list(required),
+        policy_name="+".join(p.name for p in policies),
+        performance_budget_ms=min(budgets) if budgets else None,
+        applied=[p.describe() for p in policies],
+    )
+
+
+class _PrefixTrie:
+    """Character trie of scope prefixes; a lookup costs O(len(path)), not O(#policies)."""
+
+    def __init__(self) -> None:
+        self.root: Dict[str, Any] = {}
+
+    def add(self, prefix: str, value: int) -> None:
+        node = self.root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node.setdefault("", set()).add(value)
+
+    def matches(self, path: str) -> Set[int]:
+        found: Set[int] = set(self.root.get("", ()))
+        node = self.root
+        for char in path:
+            node = node.get(char)
+            if node is None:
+                break
+            found.update(node.get("", ()))
+        return found
+
+
+class PolicyRouter:
+    """Index of the policy sets under ``POLICY_SET_DIR``.
+
+    Each set is a regular policy file with an optional ``match`` block listing
+    ``risk_level``, ``agent`` and/or ``scope_prefix`` values; a key that is left
+    out matches everything. Selection intersects three candidate sets: two dict
+    lookups and a trie walk per scope path. It never scans the policy list.
+    """
+
+    def __init__(self, policies: List[LoadedPolicy]) -> None:
+        self.policies = policies
+        self._exact: Dict[str, Dict[str, Set[int]]] = {"risk_level": {}, "agent": {}}
+        self._any: Dict[str, Set[int]] = {key: set() for key in MATCH_KEYS}
+        self._scopes = _PrefixTrie()
+        for index, policy in enumerate(policies):
+            match = policy.data.get("match") or {}
+            unknown = set(match) - set(MATCH_KEYS)
+            if unknown:
+                raise ValueError(f"{policy.path}: unknown match keys {sorted(unknown)}")
+            for key in ("risk_level", "agent"):
+                values = _as_list(match.get(key))
+                if not values:
+                    self._any[key].add(index)
+                for value in values:
+                    self._exact[key].setdefault(str(value), set()).add(index)
+            prefixes = _as_list(match.get("scope_prefix"))
+            if not prefixes:
+                self._any["scope_prefix"].add(index)
+            for prefix in prefixes:
+                self._scopes.add(str(prefix), index)
+
+    @classmethod
+    def from_dir(cls, path: Path) -> "PolicyRouter":
+        files = sorted(p for p in path.glob("*") if p.suffix in (".yaml", ".yml", ".json")) if path.is_dir() else []
+        return cls([LoadedPolicy.load(p) for p in files])
+
+    def select(self, proposal: Proposal) -> List[LoadedPolicy]:
+        risk = self._exact["risk_level"].get(proposal.risk_level, set()) | self._any["risk_level"]
+        agent = self._exact["agent"].get(proposal.agent, set()) | self._any["agent"]
+        scope = set(self._any["scope_prefix"])
+        for path in proposal.scope:
+            scope |= self._scopes.matches(path)
+        return [self.policies[i] for i in sorted(risk & agent & scope)]
+
+
+# path -> (checked_at, directory mtime, file signature, router)
+_router_cache: Dict[Path, Tuple[float, Optional[int], Tuple[Tuple[str, int], ...], PolicyRouter]] = {}
+_router_lock = threading.Lock()
+
+
+def _dir_mtime(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _dir_signature(path: Path) -> Tuple[Tuple[str, int], ...]:
+    if not path.is_dir():
+        return ()
+    return tuple(sorted((p.name, p.stat().st_mtime_ns) for p in path.iterdir() if p.is_file()))
+
+
+def policy_router(path: Optional[Path] = None) -> PolicyRouter:
+    """Router for ``path`` (default ``POLICY_SET_DIR``), rebuilt only when its files change.
+
+    Each call stats the directory alone, which catches sets being added, removed
+    or replaced by rename. Every file is stat'ed at most once per
+    ``POLICY_RELOAD_INTERVAL``, so in-place edits show up within that interval.
+    """
+    path = path or config.POLICY_SET_DIR
+    now = time.monotonic()
+    dir_mtime = _dir_mtime(path)
+    with _router_lock:
+        cached = _router_cache.get(path)
+    if cached is not None and cached[1] == dir_mtime and now - cached[0] < config.POLICY_RELOAD_INTERVAL:
+        return cached[3]
+    signature = _dir_signature(path)
+    with _router_lock:
+        cached = _router_cache.get(path)
+        if cached is None or cached[2] != signature:
+            cached = (now, dir_mtime, signature, PolicyRouter.from_dir(path))
+        else:
+            cached = (now, dir_mtime, signature, cached[3])
+        _router_cache[path] = cached
+        return cached[3]
+
+
+CONFLICT_MODES = ("off", "warn", "block")
+
+
+def conflict_mode(policies: List[LoadedPolicy]) -> str:
+    """How scope overlaps with in-flight proposals are handled: the strictest
+    ``rules.scope_conflicts`` among ``policies`` (default ``warn``)."""
+    modes = [str(p.data.get("rules", {}).get("scope_conflicts", "warn")) for p in policies] or ["warn"]
+    for mode in modes:
+        if mode not in CONFLICT_MODES:
+            raise ValueError(f"scope_conflicts must be one of {', '.join(CONFLICT_MODES)}, not {mode!r}")
+    return max(modes, key=CONFLICT_MODES.index)
+
+
+def resolve_policies(proposal: Proposal, explicit: Optional[Iterable[Path]] = None) -> List[LoadedPolicy]:
+    """Policies that apply to ``proposal``.
+
+    Explicit paths (``--policy``) are used as given. Otherwise the default
+    policy applies, plus every routed policy set that matches.
+    """
+    explicit = list(explicit or [])
+    if explicit:
+        return [LoadedPolicy.load(Path(p)) for p in explicit]
+    return [LoadedPolicy.load(config.DEFAULT_POLICY_FILE)] + policy_router().select(proposal)
@@ -0,0 +1,173 @@
+"""Serialized-JSON cache and ETags for proposal reads.
+
+A proposal's version is the rv of its latest change as tracked by the watch
+hub, plus a stamp of the stored record: the YAML's mtime, or its place in an
+archive pack. So an ETag can be computed, and ``If-None-Match`` answered, with
+one ``stat`` instead of reading the YAML. A change that bypasses the audit log
+(a hand edit, ``aap replay --yaml-dir``) still moves the ETag, and a proposal
+that no longer exists has none, so it is never answered with 304. The list's
+version is the hub's global rv plus the ``proposals`` generation, which
+archiving, a YAML replay and an import bump, since they change the set of
+hot proposals without recording an event. Bodies are cached
+per version (LRU-bounded), with a gzip copy made on demand for large bodies.
+Proposals that have no audit events (e.g. imported by hand) fall back to a
+content-hash ETag and are re-read on every request. Every read syncs the hub
+first (O(1) unless the database changed), so in a multi-worker deployment a
+write made by one worker is seen by the next request to any other.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from . import config
+from .archive import index as archive_index
+from .invalidation import generation
+from .layout import iter_files
+from .storage import load_proposal, proposal_path
+from .watch import WatchHub, default_hub
+
+
+@dataclass
+class CachedBody:
+    etag: str
+    body: bytes
+    updated_at: str = ""
+    version: Optional[int] = None
+    _gzipped: Optional[bytes] = None
+
+    @property
+    def gzip_etag(self) -> str:
+        # A different content-coding is a different representation, so a different strong ETag.
+        return self.etag[:-1] + '-gzip"'
+
+    def gzipped(self) -> bytes:
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=6)
+        return self._gzipped
+
+
+def _stamp(proposal_id: str) -> Optional[str]:
+    """Identity of the stored record (YAML mtime, or archive pack and offset); None if there is none."""
+    try:
+        return format(proposal_path(proposal_id).stat().st_mtime_ns, "x")
+    except FileNotFoundError:
+        pass
+    entry = archive_index().get(proposal_id)
+    return None if entry is None else f"{entry['pack']}-{entry['offset']:x}"
+
+
+def _serialize(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class ProposalReadCache:
+    def __init__(self, hub: Optional[WatchHub] = None, max_entries: Optional[int] = None) -> None:
+        self._hub = hub
+        self.max_entries = max_entries or config.READ_CACHE_SIZE
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, str], CachedBody]]" = OrderedDict()
+        self._list: Optional[Tuple[Tuple[int, int], CachedBody]] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hub(self) -> WatchHub:
+        hub = self._hub or default_hub()
+        hub.start()
+        hub.sync()  # O(1) unless another process wrote
+        return hub
+
+    def _version(self, proposal_id: str) -> Optional[Tuple[int, str]]:
+        version = self.hub.versions.get(proposal_id)
+        if version is None:
+            return None
+        stamp = _stamp(proposal_id)
+        return None if stamp is None else (version, stamp)
+
+    def etag(self, proposal_id: str) -> Optional[str]:
+        """ETag for the current version, or None if only the content can tell (or it is gone)."""
+        version = self._version(proposal_id)
+        return None if version is None else f'"{proposal_id}.{version[0]}.{version[1]}"'
+
+    def list_version(self) -> Tuple[int, int]:
+        """(global rv, ``proposals`` generation) of the list."""
+        return self.hub.rv, generation("proposals")
+
+    def list_etag(self, version: Tuple[int, int]) -> str:
+        return f'"list.{version[0]}.{version[1]}"'
+
+    def get(self, proposal_id: str) -> CachedBody:
+        """Serialized proposal; raises FileNotFoundError like ``load_proposal``."""
+        version = self._version(proposal_id)
+        with self._lock:
+            cached = self._entries.get(proposal_id)
+            if cached is not None and version is not None and cached[0] == version:
+                self._entries.move_to_end(proposal_id)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+        proposal = load_proposal(proposal_id)
+        body = _serialize(proposal.to_dict())
+        if version is None or self._version(proposal_id) != version:  # no events, or changed while reading
+            return CachedBody(f'"{hashlib.sha256(body).hexdigest()[:32]}"', body, proposal.updated_at)
+        entry = CachedBody(f'"{proposal_id}.{version[0]}.{version[1]}"', body, proposal.updated_at, version[0])
+        with self._lock:
+            self._entries[proposal_id] = (version, entry)
+            self._entries.move_to_end(proposal_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get_list(self) -> CachedBody:
+        """All proposals, newest ``updated_at`` first, assembled from per-proposal entries."""
+        version = self.list_version()
+        with self._lock:
+            if self._list is not None and self._list[0] == version:
+                self.hits += 1
+                return self._list[1]
+        items: List[CachedBody] = []
+        for proposal_id, _ in iter_files(config.PROPOSAL_DIR, ".yaml"):
+            try:
+                items.append(self.get(proposal_id))
+            except FileNotFoundError:
+                continue
+        items.sort(key=lambda item: item.updated_at, reverse=True)
+        body = b"[" + b",".join(item.body for item in items) + b"]"
+        entry = CachedBody(self.list_etag(version), body, version=version[0])
+        if self.list_version() != version:  # changed while reading
+            return entry
+        with self._lock:
+            self._list = (version, entry)
+        return entry
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison as required for If-None-Match (RFC 9110 13.1.2), any content-coding."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in (etag, etag[:-1] + '-gzip"'):
+            return True
+    return False
+
+
+_default: Optional[ProposalReadCache] = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> ProposalReadCache:
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = ProposalReadCache()
+        return _default
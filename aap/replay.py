@@ -0,0 +1,144 @@
+"""Event-sourced reconstruction of proposal state from the events table.
+
+Replay starts from the newest snapshot at or before the requested point in
+time and folds the remaining events on top of it in streamed batches.
+"""
+
+import json
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from . import config
+from .db import bump_generation, insert_snapshot, iter_events, last_event_id, latest_snapshot, replace_proposals
+from .stats import PASSIVE_EVENTS, infer_state
+from .utils import dump_yaml_or_json, ensure_dir, utc_now
+
+
+def apply_event(proposals: Dict[str, Dict[str, Any]], event: Dict[str, Any]) -> None:
+    """Fold one audit event into the in-memory proposal map."""
+    pid = event.get("proposal_id")
+    if not pid or event.get("event") in PASSIVE_EVENTS:
+        return
+    data = event.get("data") or {}
+    kind = event.get("event")
+    ts = event.get("timestamp")
+    current = proposals.get(pid)
+
+    if kind == "propose" or current is None:
+        if "proposal" in data:
+            current = dict(data["proposal"])
+        else:
+            # Events written before full payloads were recorded.
+            current = {
+                "id": pid,
+                "agent": data.get("agent") or event.get("actor"),
+                "goal": data.get("goal", ""),
+                "scope": data.get("scope", []),
+                "constraints": data.get("constraints", []),
+                "risk_level": data.get("risk_level", "medium"),
+                "policy": {},
+                "evidence": {},
+                "decision": {},
+                "commit": {},
+                "state": "draft",
+                "created_at": ts,
+            }
+        proposals[pid] = current
+
+    if kind == "evaluate":
+        for key in ("policy", "evidence"):
+            if key in data:
+                current[key] = data[key]
+    elif kind == "decision":
+        current["decision"] = data.get("record") or {
+            "proposal_id": pid,
+            "decision": data.get("decision"),
+            "by": event.get("actor"),
+            "reason": data.get("reason", ""),
+            "timestamp": ts,
+        }
+    elif kind == "commit":
+        current["commit"] = data.get("commit") or {
+            "sha": data.get("sha"),
+            "tag": data.get("tag"),
+            "pushed": data.get("pushed"),
+            "branch": data.get("branch"),
+            "committed_at": ts,
+        }
+    current["state"] = infer_state(event, current.get("state")) or current.get("state")
+    if not (kind == "propose" and "proposal" in data):
+        current["updated_at"] = data.get("updated_at") or ts
+
+
+def replay(
+    until_id: Optional[int] = None,
+    until_ts: Optional[str] = None,
+    batch_size: int = 10000,
+    use_snapshot: bool = True,
+) -> Dict[str, Any]:
+    """Rebuild all proposals as of ``until_id`` / ``until_ts`` (default: now)."""
+    proposals: Dict[str, Dict[str, Any]] = {}
+    base_id = 0
+    snapshot = latest_snapshot(until_id, until_ts) if use_snapshot else None
+    if snapshot:
+        proposals = json.loads(zlib.decompress(snapshot["data"]))
+        base_id = snapshot["event_id"]
+    last_id, last_ts, applied = base_id, snapshot["event_ts"] if snapshot else None, 0
+    for event in iter_events(batch_size=batch_size, after_id=base_id, until_id=until_id):
+        if until_ts is not None and event["timestamp"] > until_ts:
+            break
+        apply_event(proposals, event)
+        last_id, last_ts = event["id"], event["timestamp"]
+        applied += 1
+    return {
+        "proposals": proposals,
+        "event_id": last_id,
+        "event_ts": last_ts,
+        "events_applied": applied,
+        "snapshot_event_id": snapshot["event_id"] if snapshot else None,
+    }
+
+
+def save_snapshot(result: Dict[str, Any]) -> None:
+    blob = zlib.compress(json.dumps(result["proposals"], ensure_ascii=False).encode("utf-8"))
+    insert_snapshot(result["event_id"], result["event_ts"], utc_now(), blob)
+
+
+def take_snapshot() -> Dict[str, Any]:
+    """Replay up to the newest event and persist the result as a snapshot."""
+    result = replay(until_id=last_event_id())
+    if result["events_applied"]:
+        save_snapshot(result)
+    return result
+
+
+def write_yaml_store(proposals: Dict[str, Dict[str, Any]], directory: Path) -> int:
+    ensure_dir(directory)
+    for pid, data in proposals.items():
+        dump_yaml_or_json(data, directory / f"{pid}.yaml")
+    return len(proposals)
+
+
+def rebuild(
+    until_id: Optional[int] = None,
+    until_ts: Optional[str] = None,
+    to_db: bool = False,
+    yaml_dir: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """Replay events and materialize the result into the DB mirror and/or a YAML directory.
+
+    A full (not point-in-time) replay that had to fold more than
+    ``SNAPSHOT_INTERVAL`` events past its base snapshot records a new snapshot,
+    so snapshots are refreshed periodically as a side effect of replays.
+    """
+    result = replay(until_id=until_id, until_ts=until_ts)
+    point_in_time = until_id is not None or until_ts is not None
+    if not point_in_time and result["events_applied"] >= config.SNAPSHOT_INTERVAL:
+        save_snapshot(result)
+    if to_db:
+        replace_proposals(result["proposals"].values())
+    if yaml_dir is not None:
+        write_yaml_store(result["proposals"], yaml_dir)
+        bump_generation("proposals")
+    return result
@@ -0,0 +1,241 @@
+"""Log-shipping replication of the control-plane store to read replicas.
+
+Every committed change is an event in the hash-chained ``audit.log``. That
+log is the replication stream; the SQLite WAL is not shipped, because a
+replica can derive its database and YAML store from the events.
+
+- ``ship(target)`` runs on the primary. It reads the complete lines appended
+  to ``audit.log`` since the last pass and writes them to
+  ``target/segments/<first_seq>-<last_seq>.ndjson.gz``. It then advances
+  ``target/manifest.json`` (log offset, head seq/hash, segment list) by atomic
+  replace. ``target`` stands in for object storage or a shared volume. A
+  segment written without its manifest update is rewritten by the next pass.
+- ``apply(source)`` runs on a replica, against its own data paths. It reads the
+  segments past its ``REPLICA_STATE_FILE``, checks that the chain links onto
+  its head, and appends the lines to its ``audit.log``. The events are folded
+  into its YAML store with the replay fold, and stored with their mirror rows
+  in one SQLite transaction. Steps a crash already completed are skipped when
+  the segment is applied again.
+- ``restore(source, data_dir)`` rebuilds an empty data directory from the
+  shipped segments.
+
+Replicas serve read-only API traffic (``AAP_READ_ONLY=1``). ``status`` reports
+replication lag in events and seconds (the age of the oldest shipped event not
+applied yet).
+"""
+
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from . import config
+from .audit import GENESIS_HASH, _read_chain_head, entry_hash
+from .db import max_seq, record_batch
+from .locks import lock_manager, proposal_lock
+from .replay import apply_event
+from .storage import load_proposal, proposal_path
+from .utils import dump_yaml_or_json, ensure_dir, file_lock, fsync_dir, use_data_dir, utc_now
+
+
+def _read_json(path: Path, default: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return dict(default)
+
+
+def _write_json(path: Path, data: Dict[str, Any]) -> None:
+    ensure_dir(path.parent)
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    fsync_dir(path.parent)
+
+
+def _empty_manifest() -> Dict[str, Any]:
+    return {"version": 1, "log_offset": 0, "last_seq": -1, "head_hash": GENESIS_HASH, "segments": []}
+
+
+def read_manifest(target: Path) -> Dict[str, Any]:
+    return _read_json(Path(target) / "manifest.json", _empty_manifest())
+
+
+def ship(target: Path, segment_events: Optional[int] = None) -> Dict[str, Any]:
+    """Ship the audit events appended since the last pass; returns what was shipped."""
+    target = Path(target)
+    segment_events = segment_events or config.REPLICATION_SEGMENT_EVENTS
+    ensure_dir(target / "segments")
+    with lock_manager().hold(target / "ship.lock", name="replication-ship"):
+        manifest = read_manifest(target)
+        log_path = config.AUDIT_LOG_FILE
+        if not log_path.exists():
+            return {"shipped": 0, "last_seq": manifest["last_seq"]}
+        # Appends are whole batches under the audit lock: the size seen under a
+        # shared hold ends on a line boundary.
+        with file_lock(config.LOCK_DIR / "audit.log.lock", shared=True):
+            size = log_path.stat().st_size
+        if size < manifest["log_offset"]:
+            raise RuntimeError(f"{log_path} is shorter than the shipped offset; was it truncated or replaced?")
+        with log_path.open("rb") as f:
+            f.seek(manifest["log_offset"])
+            chunk = f.read(size - manifest["log_offset"])
+        entries = [json.loads(line) for line in chunk.splitlines() if line.strip()]
+        entries = [e for e in entries if "hash" in e and e["seq"] > manifest["last_seq"]]
+        for start in range(0, len(entries), segment_events):
+            batch = entries[start : start + segment_events]
+            name = f"{batch[0]['seq']:012d}-{batch[-1]['seq']:012d}.ndjson.gz"
+            body = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in batch).encode("utf-8")
+            tmp = target / "segments" / (name + ".tmp")
+            with tmp.open("wb") as out:
+                out.write(gzip.compress(body, mtime=0))
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp, target / "segments" / name)
+            manifest["segments"].append({
+                "name": name,
+                "first_seq": batch[0]["seq"],
+                "last_seq": batch[-1]["seq"],
+                "first_ts": batch[0]["timestamp"],
+                "last_ts": batch[-1]["timestamp"],
+            })
+        if entries:
+            fsync_dir(target / "segments")
+            manifest["last_seq"] = entries[-1]["seq"]
+            manifest["head_hash"] = entries[-1]["hash"]
+        manifest["log_offset"] = size
+        manifest["shipped_at"] = utc_now()
+        _write_json(target / "manifest.json", manifest)
+    return {"shipped": len(entries), "last_seq": manifest["last_seq"]}
+
+
+def _replica_state() -> Dict[str, Any]:
+    return _read_json(config.REPLICA_STATE_FILE, {"applied_seq": -1, "head_hash": GENESIS_HASH})
+
+
+def _read_segment(source: Path, segment: Dict[str, Any]) -> List[Dict[str, Any]]:
+    with gzip.open(source / "segments" / segment["name"], "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _apply_entries(entries: List[Dict[str, Any]]) -> None:
+    ensure_dir(config.AUDIT_LOG_FILE.parent)
+    with file_lock(config.LOCK_DIR / "audit.log.lock"):
+        next_log_seq, _ = _read_chain_head(config.AUDIT_LOG_FILE)
+        fresh = [e for e in entries if e["seq"] >= next_log_seq]
+        if fresh:
+            with config.AUDIT_LOG_FILE.open("a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in fresh))
+                f.flush()
+                os.fsync(f.fileno())
+        proposals: Dict[str, Dict[str, Any]] = {}
+        for entry in entries:
+            pid = entry.get("proposal_id")
+            if pid and pid not in proposals:
+                try:
+                    proposals[pid] = load_proposal(pid).to_dict()
+                except FileNotFoundError:
+                    pass
+            apply_event(proposals, entry)
+        for pid, data in proposals.items():
+            with proposal_lock(pid):
+                dump_yaml_or_json(data, proposal_path(pid))
+        in_db = max_seq()
+        record_batch([e for e in entries if e["seq"] > in_db], list(proposals.values()))
+
+
+def apply(source: Path) -> Dict[str, Any]:
+    """Apply shipped segments past this replica's position; returns the new position."""
+    source = Path(source)
+    manifest = read_manifest(source)
+    applied = 0
+    with lock_manager().lock("replication-apply"):
+        state = _replica_state()
+        for segment in manifest["segments"]:
+            if segment["last_seq"] <= state["applied_seq"]:
+                continue
+            entries = [e for e in _read_segment(source, segment) if e["seq"] > state["applied_seq"]]
+            seq, head = state["applied_seq"], state["head_hash"]
+            for entry in entries:
+                if entry["seq"] != seq + 1 or entry["prev_hash"] != head or entry_hash(entry) != entry["hash"]:
+                    raise RuntimeError(f"Segment {segment['name']} does not continue the replica's chain at seq {seq + 1}")
+                seq, head = entry["seq"], entry["hash"]
+            _apply_entries(entries)
+            state = {
+                "source": str(source),
+                "applied_seq": seq,
+                "head_hash": head,
+                "applied_ts": entries[-1]["timestamp"] if entries else state.get("applied_ts"),
+                "applied_at": utc_now(),
+            }
+            _write_json(config.REPLICA_STATE_FILE, state)
+            applied += len(entries)
+    return {"applied": applied, "applied_seq": state["applied_seq"]}
+
+
+def restore(source: Path, data_dir: Optional[Path] = None) -> Dict[str, Any]:
+    """Rebuild a data directory (default: this node's own paths) from shipped segments.
+
+    The target must not hold an audit log yet.
+    """
+    from .audit import verify_log
+
+    def run() -> Dict[str, Any]:
+        if config.AUDIT_LOG_FILE.exists() and config.AUDIT_LOG_FILE.stat().st_size:
+            raise RuntimeError(f"{config.AUDIT_LOG_FILE} already exists; restore needs an empty data directory")
+        result = apply(source)
+        return {**result, "verified": verify_log()["ok"]}
+
+    if data_dir is None:
+        return run()
+    with use_data_dir(Path(data_dir)):
+        return run()
+
+
+def _age_seconds(ts: Optional[str]) -> Optional[float]:
+    if not ts:
+        return None
+    value = datetime.fromisoformat(ts)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return max(0.0, time.time() - value.timestamp())
+
+
+def status(source: Optional[Path] = None) -> Dict[str, Any]:
+    """This replica's position and, given the shipping ``source``, its lag."""
+    state = _replica_state()
+    result: Dict[str, Any] = {
+        "read_only": read_only(),
+        "applied_seq": state["applied_seq"],
+        "applied_at": state.get("applied_at"),
+    }
+    if source is None:
+        return result
+    manifest = read_manifest(Path(source))
+    pending = [s for s in manifest["segments"] if s["last_seq"] > state["applied_seq"]]
+    result.update({
+        "shipped_seq": manifest["last_seq"],
+        "shipped_at": manifest.get("shipped_at"),
+        "lag_events": manifest["last_seq"] - state["applied_seq"],
+        "lag_seconds": round(_age_seconds(pending[0]["first_ts"]) or 0.0, 3) if pending else 0.0,
+    })
+    return result
+
+
+def read_only() -> bool:
+    return os.environ.get(config.READ_ONLY_ENV, "").lower() in ("1", "true", "yes")
+
+
+def follow(step, interval: Optional[float] = None) -> None:
+    """Run ``step()`` every ``interval`` seconds (default ``REPLICATION_INTERVAL``) until interrupted."""
+    interval = config.REPLICATION_INTERVAL if interval is None else interval
+    while True:
+        started = time.monotonic()
+        step()
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
@@ -0,0 +1,171 @@
+"""Scope-overlap index of in-flight proposals.
+
+Two scope entries overlap when one is a prefix of the other: the rule
+``forbid_paths`` and ``scope_prefix`` routing already use. ``ScopeIndex`` is a
+character trie over the scope entries of every open (not REJECTED or COMMITTED)
+proposal. Each node knows the proposals whose entry ends there and those with
+an entry at or below it. A query walks its path once, collecting the entries
+that are prefixes of it along the way and the entries it is a prefix of at the
+end. It costs O(len(path)) plus the number of hits, not O(open proposals x
+scope entries).
+
+The index is persisted in SQLite (``scope_index``), maintained in the same
+transaction as the proposals mirror on every write, so every transition
+updates it. Each process keeps the trie in memory. Before answering, it checks
+the ``proposals`` generation of the invalidation bus, which is O(1). If that
+moved, it applies the ``scope_changes`` log written since its last read, and
+reloads everything only when it has fallen behind the retained log.
+"""
+
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from . import config
+from .db import read_scope_changes, read_scope_index
+from .invalidation import generation
+from .storage import Proposal
+
+Conflicts = Dict[str, List[List[str]]]  # other proposal id -> [[our entry, their entry], ...]
+
+
+class _Node:
+    __slots__ = ("children", "here", "below")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_Node"] = {}
+        self.here: Dict[str, None] = {}  # proposals with an entry ending here
+        self.below: Dict[str, int] = {}  # proposals with entries at or below here -> how many
+
+
+class ScopeIndex:
+    """Character trie of open proposals' scope entries."""
+
+    def __init__(self) -> None:
+        self.root = _Node()
+        self.scopes: Dict[str, Tuple[str, ...]] = {}
+        self.seq = -1  # last scope_changes row applied; -1 = never loaded
+        self.generation = -1  # "proposals" generation at the last refresh
+
+    def __len__(self) -> int:
+        return len(self.scopes)
+
+    def set(self, proposal_id: str, paths: Iterable[str]) -> None:
+        """Replace ``proposal_id``'s entries (an empty ``paths`` removes it)."""
+        self.remove(proposal_id)
+        paths = tuple(sorted(set(paths)))
+        if not paths:
+            return
+        self.scopes[proposal_id] = paths
+        for path in paths:
+            node = self.root
+            node.below[proposal_id] = node.below.get(proposal_id, 0) + 1
+            for char in path:
+                node = node.children.setdefault(char, _Node())
+                node.below[proposal_id] = node.below.get(proposal_id, 0) + 1
+            node.here[proposal_id] = None
+
+    def remove(self, proposal_id: str) -> None:
+        for path in self.scopes.pop(proposal_id, ()):
+            trail = [self.root]
+            for char in path:
+                trail.append(trail[-1].children[char])
+            trail[-1].here.pop(proposal_id, None)
+            for depth, node in enumerate(trail):
+                left = node.below[proposal_id] - 1
+                if left:
+                    node.below[proposal_id] = left
+                else:
+                    del node.below[proposal_id]
+                if depth and not node.below:
+                    del trail[depth - 1].children[path[depth - 1]]
+                    break
+
+    def overlapping(self, paths: Iterable[str], exclude: Optional[str] = None) -> Conflicts:
+        """Proposals with an entry overlapping any of ``paths``, and which entries."""
+        found: Dict[str, Dict[Tuple[str, str], None]] = {}
+        for path in dict.fromkeys(paths):
+            node: Optional[_Node] = self.root
+            for depth in range(len(path) + 1):
+                for pid in node.here:  # their entry path[:depth] is a prefix of ours
+                    found.setdefault(pid, {})[(path, path[:depth])] = None
+                if depth == len(path):
+                    break
+                node = node.children.get(path[depth])
+                if node is None:
+                    break
+            if node is None:
+                continue
+            for pid in node.below:  # their entries that extend ours
+                for theirs in self.scopes[pid]:
+                    if theirs.startswith(path):
+                        found.setdefault(pid, {})[(path, theirs)] = None
+        found.pop(exclude, None)
+        return {pid: sorted([list(pair) for pair in pairs]) for pid, pairs in sorted(found.items())}
+
+    def pairs(self) -> List[Dict[str, object]]:
+        """Every overlapping pair of open proposals, each listed once."""
+        result = []
+        for pid in sorted(self.scopes):
+            for other, entries in self.overlapping(self.scopes[pid], exclude=pid).items():
+                if pid < other:
+                    result.append({"a": pid, "b": other, "entries": entries})
+        return result
+
+    def refresh(self) -> "ScopeIndex":
+        """Apply the persisted changes made since the last refresh (by any process)."""
+        current = generation("proposals")
+        if self.seq >= 0 and current == self.generation:
+            return self
+        self.generation = current  # taken before reading: later writes move it again
+        changes = read_scope_changes(self.seq) if self.seq >= 0 else None
+        if changes is None:
+            seq, scopes = read_scope_index()
+            self.root, self.scopes = _Node(), {}
+            for pid, paths in scopes.items():
+                self.set(pid, paths)
+        else:
+            seq, scopes = changes
+            for pid, paths in scopes.items():
+                self.set(pid, paths)
+        self.seq = seq
+        return self
+
+
+_indexes: Dict[Path, ScopeIndex] = {}
+_index_lock = threading.Lock()
+
+
+def _current() -> ScopeIndex:
+    """This process's index for ``DB_FILE``, refreshed; call with ``_index_lock`` held."""
+    return _indexes.setdefault(config.DB_FILE, ScopeIndex()).refresh()
+
+
+def find_conflicts(paths: Iterable[str], exclude: Optional[str] = None) -> Conflicts:
+    """Open proposals whose scope overlaps ``paths`` (other than ``exclude``)."""
+    with _index_lock:
+        return _current().overlapping(paths, exclude=exclude)
+
+
+def conflict_pairs() -> List[Dict[str, object]]:
+    with _index_lock:
+        return _current().pairs()
+
+
+def check_proposal(proposal: Proposal, policy_paths: Optional[Iterable[Path]] = None) -> Tuple[str, Conflicts]:
+    """(mode, conflicts) for ``proposal`` under the policies that apply to it; no
+    lookup when the mode is ``off``."""
+    from .policy import conflict_mode, resolve_policies
+
+    mode = conflict_mode(resolve_policies(proposal, policy_paths))
+    return mode, ({} if mode == "off" else find_conflicts(proposal.scope, exclude=proposal.id))
+
+
+def describe(conflicts: Conflicts) -> List[str]:
+    """One line per overlapping proposal, as used in warnings and policy violations."""
+    return [
+        f"Scope overlaps in-flight proposal {pid}: " + ", ".join(
+            ours if ours == theirs else f"{ours} ~ {theirs}" for ours, theirs in entries
+        )
+        for pid, entries in conflicts.items()
+    ]
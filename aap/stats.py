@@ -0,0 +1,92 @@
+"""Aggregate proposal counters: O(1) read views and a rebuild from the events table."""
+
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from .db import iter_events, read_state_counts, read_transition_counts, replace_counters
+
+# Events about a proposal that leave its record and state untouched: background
+# job status, and evidence uploads (older uploads recorded a ``state`` read before
+# the body was streamed, which a concurrent decision may have overtaken).
+PASSIVE_EVENTS = {"job", "evidence"}
+
+
+def infer_state(event: Dict[str, Any], current: Optional[str]) -> Optional[str]:
+    """Return the proposal state after ``event`` given the state before it.
+
+    Newer events carry an explicit ``state``; older ones are interpreted by type.
+    """
+    kind = event.get("event")
+    if kind in PASSIVE_EVENTS:
+        return current
+    data = event.get("data") or {}
+    if data.get("state"):
+        return data["state"]
+    if kind == "propose":
+        return "proposed"
+    if kind == "evaluate":
+        if current == "proposed" and data.get("policy_passed") and data.get("evidence_passed"):
+            return "evaluated"
+        return current
+    if kind == "decision":
+        return {"accept": "accepted", "reject": "rejected"}.get(data.get("decision"), current)
+    if kind == "commit":
+        return "committed"
+    return current
+
+
+def rebuild_stats() -> Dict[str, int]:
+    """Recompute the aggregate tables from scratch by folding the events table."""
+    proposals: Dict[str, list] = {}
+    transitions: Counter = Counter()
+    for event in iter_events():
+        pid = event["proposal_id"]
+        if not pid:
+            continue
+        data = event.get("data") or {}
+        record = proposals.get(pid)
+        if record is None:
+            record = proposals[pid] = [
+                "draft",
+                data.get("agent") or event.get("actor") or "",
+                data.get("risk_level") or "medium",
+            ]
+        new_state = infer_state(event, record[0])
+        if new_state and new_state != record[0]:
+            transitions[((event["timestamp"] or "")[:10], record[0], new_state)] += 1
+            record[0] = new_state
+    state_counts: Counter = Counter(tuple(record) for record in proposals.values())
+    replace_counters(
+        [key + (count,) for key, count in state_counts.items()],
+        [key + (count,) for key, count in transitions.items()],
+    )
+    return {"proposals": len(proposals), "transitions": sum(transitions.values())}
+
+
+def get_stats(agent: Optional[str] = None, days: int = 7) -> Dict[str, Any]:
+    """Summarize the materialized counters; no proposal files are read."""
+    since = (datetime.now(timezone.utc) - timedelta(days=days - 1)).date().isoformat()
+    by_state: Counter = Counter()
+    by_agent: Dict[str, Counter] = {}
+    by_risk: Counter = Counter()
+    for row in read_state_counts(agent):
+        by_state[row["state"]] += row["count"]
+        by_agent.setdefault(row["agent"], Counter())[row["state"]] += row["count"]
+        by_risk[row["risk_level"]] += row["count"]
+    transitions = read_transition_counts(since)
+    window: Counter = Counter()
+    for row in transitions:
+        window[row["to_state"]] += row["count"]
+    decided = window["accepted"] + window["rejected"]
+    return {
+        "agent": agent,
+        "states": dict(by_state),
+        "agents": {name: dict(counts) for name, counts in by_agent.items()},
+        "risk_levels": dict(by_risk),
+        "window_days": days,
+        "since": since,
+        "window_transitions": dict(window),
+        "reject_rate": (window["rejected"] / decided) if decided else None,
+        "daily": transitions,
+    }
@@ -1,32 +1,132 @@
-from dataclasses import dataclass, field
+import re
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
 
 from . import config
 from .state import ProposalState, parse_state, transition
-from .utils import dump_yaml_or_json, ensure_dir, load_yaml_or_json, utc_now
+from .layout import iter_files, locate
+from .utils import dump_yaml_or_json, ensure_dir, parse_yaml_or_json, utc_now
 from .db import upsert_proposal
 
 
 def proposal_path(proposal_id: str) -> Path:
-    return config.PROPOSAL_DIR / f"{proposal_id}.yaml"
+    return locate(config.PROPOSAL_DIR, proposal_id, ".yaml")
+
+
+# Names the stores use themselves: EVIDENCE_DIR/blobs is the content-addressed
+# blob store (with its tmp/ uploads), so no proposal's evidence may live there.
+RESERVED_IDS = frozenset({"blobs", "tmp"})
+
+
+def check_id(proposal_id: str) -> None:
+    """Raise ValueError for an id that would collide with a store's own directories."""
+    if proposal_id in RESERVED_IDS:
+        raise ValueError(f"proposal id {proposal_id!r} is reserved")
+
+
+HEAVY_FIELDS = ("policy", "evidence", "decision", "commit")
+_UNLOADED: Any = object()
+_TOP_LEVEL_KEY = re.compile(r"^([A-Za-z_][\w-]*):")
+
+
+def _heavy_field(name: str) -> property:
+    slot = f"_{name}"
+
+    def get(self: "Proposal") -> Dict[str, Any]:
+        value = getattr(self, slot)
+        if value is _UNLOADED:
+            self._load_heavy()
+            value = getattr(self, slot)
+        return value
+
+    def set(self: "Proposal", value: Dict[str, Any]) -> None:
+        setattr(self, slot, value)
+
+    return property(get, set, doc=f"The ``{name}`` sub-document; read from storage on first access if not loaded.")
+
+
+class StaleProposal(RuntimeError):
+    """A partly loaded proposal, changed in memory, whose stored record moved on."""
 
 
-@dataclass
 class Proposal:
-    id: str
-    agent: str
-    goal: str
-    scope: List[str]
-    constraints: List[str]
-    risk_level: str = "medium"
-    policy: Dict[str, Any] = field(default_factory=dict)
-    evidence: Dict[str, Any] = field(default_factory=dict)
-    decision: Dict[str, Any] = field(default_factory=dict)
-    commit: Dict[str, Any] = field(default_factory=dict)
-    state: ProposalState = ProposalState.DRAFT
-    created_at: str = field(default_factory=utc_now)
-    updated_at: str = field(default_factory=utc_now)
+    """A proposal record.
+
+    Slotted to keep per-instance memory small. The heavy sub-documents
+    (``HEAVY_FIELDS``) may be left unloaded by a projected ``load_proposal`` /
+    ``list_proposals``; they are read from the stored record the first time one
+    is accessed. If that record has been rewritten since (its ``updated_at``
+    moved), the whole object is refreshed from it, so fields from two versions
+    are never mixed; if this copy has itself been changed meanwhile, that is
+    an error (:class:`StaleProposal`) instead.
+    """
+
+    __slots__ = (
+        "id", "agent", "goal", "scope", "constraints", "risk_level", "state", "created_at", "updated_at",
+        "_policy", "_evidence", "_decision", "_commit", "_loaded_at",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        agent: str,
+        goal: str,
+        scope: List[str],
+        constraints: List[str],
+        risk_level: str = "medium",
+        policy: Optional[Dict[str, Any]] = None,
+        evidence: Optional[Dict[str, Any]] = None,
+        decision: Optional[Dict[str, Any]] = None,
+        commit: Optional[Dict[str, Any]] = None,
+        state: ProposalState = ProposalState.DRAFT,
+        created_at: Optional[str] = None,
+        updated_at: Optional[str] = None,
+    ) -> None:
+        self.id = id
+        self.agent = agent
+        self.goal = goal
+        self.scope = scope
+        self.constraints = constraints
+        self.risk_level = risk_level
+        self._policy = {} if policy is None else policy
+        self._evidence = {} if evidence is None else evidence
+        self._decision = {} if decision is None else decision
+        self._commit = {} if commit is None else commit
+        self.state = state
+        self.created_at = created_at or utc_now()
+        self.updated_at = updated_at or utc_now()
+        self._loaded_at = self.updated_at  # ``updated_at`` of the stored record this copy was read from
+
+    policy = _heavy_field("policy")
+    evidence = _heavy_field("evidence")
+    decision = _heavy_field("decision")
+    commit = _heavy_field("commit")
+
+    def __repr__(self) -> str:
+        return f"Proposal(id={self.id!r}, agent={self.agent!r}, state={self.state.value!r})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Proposal):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    __hash__ = None  # mutable, like the dataclass it replaces
+
+    def _load_heavy(self) -> None:
+        data = _stored_record(self.id)
+        if data.get("updated_at") != self._loaded_at:
+            if self.updated_at != self._loaded_at:
+                raise StaleProposal(
+                    f"Proposal {self.id} was changed here and rewritten in storage since it was loaded; "
+                    "reload it before reading its unloaded fields"
+                )
+            fresh = Proposal.from_dict(data)
+            for name in Proposal.__slots__:
+                setattr(self, name, getattr(fresh, name))
+            return
+        for name in HEAVY_FIELDS:
+            if getattr(self, f"_{name}") is _UNLOADED:
+                setattr(self, f"_{name}", data.get(name, {}))
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -46,32 +146,49 @@ class Proposal:
         }
 
     @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> "Proposal":
-        return cls(
+    def from_dict(cls, data: Dict[str, Any], fields: Optional[Iterable[str]] = None) -> "Proposal":
+        """Build from a stored record; heavy fields not in ``fields`` (default: all) stay unloaded."""
+        loaded = HEAVY_FIELDS if fields is None else set(fields)
+        heavy = {name: (data.get(name, {}) if name in loaded else _UNLOADED) for name in HEAVY_FIELDS}
+        proposal = cls(
             id=data["id"],
             agent=data["agent"],
             goal=data["goal"],
             scope=data.get("scope", []),
             constraints=data.get("constraints", []),
             risk_level=data.get("risk_level", "medium"),
-            policy=data.get("policy", {}),
-            evidence=data.get("evidence", {}),
-            decision=data.get("decision", {}),
-            commit=data.get("commit", {}),
             state=parse_state(data.get("state", "draft")),
-            created_at=data.get("created_at", utc_now()),
-            updated_at=data.get("updated_at", utc_now()),
+            created_at=data.get("created_at"),
+            updated_at=data.get("updated_at"),
+            **heavy,
         )
+        proposal._loaded_at = data.get("updated_at")
+        return proposal
 
-    def save(self) -> "Proposal":
-        ensure_dir(config.PROPOSAL_DIR)
-        self.updated_at = utc_now()
-        dump_yaml_or_json(self.to_dict(), proposal_path(self.id))
-        try:
-            upsert_proposal(self.to_dict())
-        except Exception:
-            # DB is best-effort; YAML remains source of truth for now
-            pass
+    def save(self, mirror: bool = True, touch: bool = True) -> "Proposal":
+        """Write the YAML record; ``mirror=False`` leaves the SQLite row to the caller
+        (e.g. batch operations that persist rows together with their audit events),
+        and ``touch=False`` keeps an ``updated_at`` those events already carry."""
+        if touch:
+            self.updated_at = utc_now()
+        record = self.to_dict()
+        dump_yaml_or_json(record, proposal_path(self.id))
+        self._loaded_at = self.updated_at
+        if mirror:
+            try:
+                upsert_proposal(record)
+            except Exception:
+                # DB is best-effort; YAML remains source of truth for now
+                pass
+        return self
+
+    def reload(self) -> "Proposal":
+        """Replace this object's fields with the stored record. Call it under the
+        proposal lock before a read-modify-write, so a concurrent writer's change
+        is not overwritten from a stale copy."""
+        fresh = load_proposal(self.id)
+        for name in Proposal.__slots__:
+            setattr(self, name, getattr(fresh, name))
         return self
 
     def update_state(self, target: ProposalState) -> None:
@@ -79,23 +196,123 @@ class Proposal:
         self.updated_at = utc_now()
 
 
-def list_proposals() -> List[Proposal]:
+class ProposalSummary(NamedTuple):
+    """What listing views show; a fraction of a loaded ``Proposal``'s memory."""
+
+    id: str
+    agent: str
+    goal: str
+    state: ProposalState
+    risk_level: str
+    created_at: str
+    updated_at: str
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ProposalSummary":
+        return cls(
+            data["id"],
+            data["agent"],
+            data["goal"],
+            parse_state(data.get("state", "draft")),
+            data.get("risk_level", "medium"),
+            data.get("created_at", ""),
+            data.get("updated_at", ""),
+        )
+
+    def load(self, fields: Optional[Iterable[str]] = None) -> Proposal:
+        return load_proposal(self.id, fields)
+
+
+def _read_record(path: Path, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Parse a stored proposal, skipping the heavy sections not in ``fields``.
+
+    ``save`` writes a block-style YAML mapping: a top-level key starts at column
+    0 and everything under it is indented (lists may start with ``- ``). So the
+    skipped sections are cut out line by line, and never parsed. JSON records
+    are parsed whole and trimmed afterwards.
+    """
+    text = path.read_text()
+    skip = set(HEAVY_FIELDS) - set(HEAVY_FIELDS if fields is None else fields)
+    if not skip or text.lstrip().startswith("{"):
+        data = parse_yaml_or_json(text)
+    else:
+        kept: List[str] = []
+        skipping = False
+        for line in text.splitlines(keepends=True):
+            if line[:1] not in ("", " ", "\t", "\n", "\r", "-"):
+                match = _TOP_LEVEL_KEY.match(line)
+                skipping = bool(match and match.group(1) in skip)
+            if not skipping:
+                kept.append(line)
+        data = parse_yaml_or_json("".join(kept))
+    for name in skip:
+        data.pop(name, None)
+    return data
+
+
+def _iter_records(fields: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
     ensure_dir(config.PROPOSAL_DIR)
-    proposals: List[Proposal] = []
-    for path in sorted(config.PROPOSAL_DIR.glob("*.yaml")):
+    for _, path in iter_files(config.PROPOSAL_DIR, ".yaml"):
         try:
-            proposals.append(load_proposal(path.stem))
+            data = _read_record(path, fields)
         except FileNotFoundError:
             continue
+        if data:
+            yield data
+
+
+def list_proposals(fields: Optional[Iterable[str]] = None) -> List[Proposal]:
+    """All proposals, newest first. ``fields`` projects the heavy sub-documents to
+    load now (default: all); the rest load lazily on first access."""
+    fields = None if fields is None else tuple(fields)
+    proposals = [Proposal.from_dict(data, fields) for data in _iter_records(fields)]
     proposals.sort(key=lambda p: p.updated_at, reverse=True)
     return proposals
 
 
-def load_proposal(proposal_id: str) -> Proposal:
+def list_summaries(include_archived: bool = False) -> List[ProposalSummary]:
+    """Id, agent, goal, state, risk level and timestamps of every proposal, newest
+    first, without parsing the heavy sub-documents. Archived proposals are listed
+    (from the archive index) only with ``include_archived``."""
+    summaries = [ProposalSummary.from_dict(data) for data in _iter_records(())]
+    if include_archived:
+        from .archive import index
+
+        hot = {s.id for s in summaries}
+        summaries.extend(ProposalSummary.from_dict(e) for pid, e in index().items() if pid not in hot)
+    summaries.sort(key=lambda s: s.updated_at, reverse=True)
+    return summaries
+
+
+def _stored_record(proposal_id: str, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """The hot YAML record, or the archived one once it has been packed."""
     path = proposal_path(proposal_id)
-    if not path.exists():
-        raise FileNotFoundError(f"Proposal {proposal_id} not found at {path}")
-    data = load_yaml_or_json(path)
+    try:
+        data = _read_record(path, fields)
+    except FileNotFoundError:
+        data = None
+        if proposal_path(proposal_id) != path:  # moved by a layout migration meanwhile
+            data = _read_record(proposal_path(proposal_id), fields)
+    if data is None:
+        from .archive import load_archived
+
+        data = load_archived(proposal_id)
+        if data is None:
+            raise FileNotFoundError(f"Proposal {proposal_id} not found at {path}") from None
     if not data:
         raise FileNotFoundError(f"Proposal {proposal_id} is empty or invalid")
-    return Proposal.from_dict(data)
+    return data
+
+
+def proposal_exists(proposal_id: str) -> bool:
+    """Whether the id is taken, by a hot or an archived proposal."""
+    from .archive import index
+
+    return proposal_path(proposal_id).exists() or proposal_id in index()
+
+
+def load_proposal(proposal_id: str, fields: Optional[Iterable[str]] = None) -> Proposal:
+    """Load one proposal, from the archive packs if it has been archived. ``fields``
+    limits which of ``HEAVY_FIELDS`` are parsed now (default: all); the others are
+    read on first access."""
+    return Proposal.from_dict(_stored_record(proposal_id, fields), fields)
@@ -0,0 +1,388 @@
+"""Multi-process load and chaos harness for the control plane.
+
+``run_stress`` spawns agent and human worker processes against a throwaway
+data directory. Agents propose, evaluate and list; humans list and decide.
+Each worker drives either the CLI handlers (in-process, the same code path as
+``python -m aap.cli``) or the API through FastAPI's TestClient. Every
+completed operation is appended to a per-worker NDJSON file, so results
+survive a worker killed with ``kill``.
+
+Once the workers finish, the store is checked against these invariants:
+
+- audited state sequences start at ``proposed`` and follow ``ALLOWED_TRANSITIONS``;
+- each proposal's YAML state is the state of its last audit event (no
+  unaudited transition) and matches the SQLite mirror;
+- no lost updates: every acknowledged propose exists, an acknowledged
+  evaluate (passing evidence) moved the proposal past ``proposed``, a proposal
+  has at most one acknowledged decision and ends in its state;
+- the audit hash chain verifies.
+
+The report carries per-operation outcome counts, throughput, latency
+histograms, and any violations.
+"""
+
+import io
+import json
+import multiprocessing
+import os
+import queue
+import random
+import re
+import shutil
+import tempfile
+import time
+from collections import Counter, defaultdict
+from contextlib import redirect_stdout
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import config
+from .utils import use_data_dir
+
+API_TOKEN = "stress-token"
+TOTP_SECRET = "JBSWY3DPEHPK3PXP"
+EVIDENCE = {
+    "unit_tests": "pass",
+    "integration_tests": "pass",
+    "lint": "pass",
+    "p95_latency_delta_ms": 1.0,
+    "runner": "aap-stress",
+    "run_id": "stress",
+    "artifact_sha256": "stress",
+}
+MAX_REPORTED_VIOLATIONS = 50
+STARTUP_TIMEOUT = 120.0
+_LIST_LINE = re.compile(r"^(\S+) \[(\w+)\]")
+
+
+@dataclass
+class StressConfig:
+    agents: int = 50
+    humans: int = 5
+    duration: float = 10.0
+    mode: str = "cli"  # "cli", "api" or "mixed" (alternating per worker)
+    kill: int = 0  # workers to SIGKILL at random points during the run
+    think: float = 0.0  # pause between a worker's operations (seconds)
+    seed: int = 0
+
+
+class Rejected(Exception):
+    """The control plane refused the operation (illegal state, bad OTP, 4xx)."""
+
+
+class Shed(Exception):
+    """Admission control shed the request (429)."""
+
+
+class CliDriver:
+    def __init__(self, data_dir: Path) -> None:
+        from .cli import build_parser
+
+        self.parser = build_parser()
+        self.evidence_file = data_dir / "evidence.json"
+
+    def _run(self, *argv: str) -> str:
+        args = self.parser.parse_args(list(argv))
+        out = io.StringIO()
+        try:
+            with redirect_stdout(out):
+                args.func(args)
+        except SystemExit as exc:
+            raise Rejected(str(exc)) from None
+        except FileNotFoundError as exc:
+            raise Rejected(str(exc)) from None
+        return out.getvalue()
+
+    def propose(self, proposal_id: str, agent: str) -> None:
+        self._run(
+            "propose", "--agent", agent, "--goal", "stress", "--scope", f"services/{agent}/",
+            "--constraints", "no_production_push_by_agent", "--id", proposal_id,
+        )
+
+    def evaluate(self, proposal_id: str) -> None:
+        self._run("evaluate", proposal_id, "--evidence", str(self.evidence_file))
+
+    def list(self) -> List[Tuple[str, str]]:
+        lines = self._run("list").splitlines()
+        return [m.groups() for m in map(_LIST_LINE.match, lines) if m]
+
+    def decide(self, proposal_id: str, actor: str, accept: bool, otp: str) -> None:
+        self._run(
+            "decide", proposal_id, "--accept" if accept else "--reject",
+            "--by", actor, "--reason", "stress", "--otp", otp,
+        )
+
+
+class ApiDriver:
+    def __init__(self, data_dir: Path) -> None:
+        from fastapi.testclient import TestClient
+
+        from .api import app
+
+        self.client = TestClient(app)
+        self.headers = {"X-API-Token": API_TOKEN}
+
+    def _call(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Any:
+        response = self.client.request(method, path, json=body, headers=self.headers)
+        if response.status_code == 429:
+            raise Shed(response.text)
+        if 400 <= response.status_code < 500:
+            raise Rejected(f"{response.status_code} {response.text}")
+        if response.status_code >= 500:
+            raise RuntimeError(f"{response.status_code} {response.text}")
+        return response.json()
+
+    def propose(self, proposal_id: str, agent: str) -> None:
+        self._call(
+            "POST", "/proposals",
+            {"id": proposal_id, "agent": agent, "goal": "stress", "scope": [f"services/{agent}/"],
+             "constraints": ["no_production_push_by_agent"]},
+        )
+
+    def evaluate(self, proposal_id: str) -> None:
+        self._call("POST", f"/proposals/{proposal_id}/evaluate", {"evidence": EVIDENCE})
+
+    def list(self) -> List[Tuple[str, str]]:
+        return [(p["id"], p["state"]) for p in self._call("GET", "/proposals")]
+
+    def decide(self, proposal_id: str, actor: str, accept: bool, otp: str) -> None:
+        self._call(
+            "POST", f"/proposals/{proposal_id}/decide",
+            {"accept": accept, "by": actor, "reason": "stress", "otp": otp},
+        )
+
+
+def _worker(role: str, index: int, mode: str, data_dir: str, think: float, seed: int, ready, go, window) -> None:
+    os.environ[config.API_TOKEN_ENV] = API_TOKEN
+    os.environ[config.TOTP_SECRET_ENV] = TOTP_SECRET
+    root = Path(data_dir)
+    rng = random.Random(seed * 7919 + index * 2 + (role == "human"))
+    name = f"{role}-{index}"
+    with use_data_dir(root), (root / "results" / f"{name}.ndjson").open("a") as out:
+        from .auth import totp_now
+
+        driver = ApiDriver(root) if mode == "api" else CliDriver(root)
+        own: List[str] = []
+        candidates: List[str] = []
+        counter = 0
+        ready.put(name)
+        go.wait()
+        start_at, deadline = window[:]
+        time.sleep(max(0.0, start_at - time.time()))
+        while time.time() < deadline:
+            target = None
+            accept = True
+            if role == "agent":
+                op = rng.choices(["propose", "evaluate", "list"], [35, 35, 30])[0] if own else "propose"
+                if op == "propose":
+                    counter += 1
+                    target = f"{name}-{counter:05d}"
+                elif op == "evaluate":
+                    target = rng.choice(own)
+            else:
+                op = "decide" if candidates and rng.random() < 0.7 else "list"
+                if op == "decide":
+                    target = candidates.pop(rng.randrange(len(candidates)))
+                    accept = rng.random() < 0.8
+            started = time.perf_counter()
+            outcome, detail = "ok", None
+            try:
+                if op == "propose":
+                    driver.propose(target, name)
+                    own.append(target)
+                elif op == "evaluate":
+                    driver.evaluate(target)
+                elif op == "list":
+                    listed = driver.list()
+                    if role == "human":
+                        candidates = [pid for pid, state in listed if state == "evaluated"]
+                else:
+                    driver.decide(target, name, accept, totp_now())
+            except Rejected as exc:
+                outcome, detail = "rejected", str(exc)[:200]
+            except Shed:
+                outcome = "shed"
+            except Exception as exc:
+                outcome, detail = "error", f"{type(exc).__name__}: {exc}"[:200]
+            record = {"op": op, "id": target, "outcome": outcome, "ms": (time.perf_counter() - started) * 1000}
+            if op == "decide":
+                record["accept"] = accept
+            if detail:
+                record["detail"] = detail
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            if think:
+                time.sleep(think)
+
+
+def _read_results(data_dir: Path) -> List[Dict[str, Any]]:
+    ops: List[Dict[str, Any]] = []
+    for path in sorted((data_dir / "results").glob("*.ndjson")):
+        for line in path.read_text().splitlines():
+            try:
+                ops.append(json.loads(line))
+            except ValueError:
+                continue  # torn last line of a killed worker
+    return ops
+
+
+def check_invariants(ops: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Check the store (as configured) against what clients saw acknowledged."""
+    from .audit import verify_chain
+    from .db import iter_events, proposal_states
+    from .state import ProposalState, can_transition
+    from .storage import list_summaries
+
+    violations: List[Tuple[str, str]] = []
+    proposals = {p.id: p for p in list_summaries()}
+    audited: Dict[str, List[str]] = defaultdict(list)
+    for event in iter_events():
+        data = event["data"]
+        if event["proposal_id"] and isinstance(data, dict) and data.get("state"):
+            audited[event["proposal_id"]].append(data["state"])
+
+    for pid, states in audited.items():
+        if states[0] != ProposalState.PROPOSED.value:
+            violations.append(("illegal_transition", f"{pid}: first audited state is {states[0]}"))
+        for prev, state in zip(states, states[1:]):
+            if state != prev and not can_transition(ProposalState(prev), ProposalState(state)):
+                violations.append(("illegal_transition", f"{pid}: {prev} -> {state}"))
+
+    mirror = proposal_states()
+    for pid, proposal in proposals.items():
+        state = proposal.state.value
+        if not audited.get(pid):
+            violations.append(("missing_audit", f"{pid}: no audit events"))
+        elif audited[pid][-1] != state:
+            violations.append(("missing_audit", f"{pid}: state {state} but last audited {audited[pid][-1]}"))
+        if mirror.get(pid) != state:
+            violations.append(("mirror_mismatch", f"{pid}: yaml {state}, db {mirror.get(pid)}"))
+
+    decisions: Dict[str, List[bool]] = defaultdict(list)
+    for op in ops:
+        if op["outcome"] != "ok" or op["id"] is None:
+            continue
+        proposal = proposals.get(op["id"])
+        if proposal is None:
+            violations.append(("lost_update", f"{op['id']}: acknowledged {op['op']} but proposal is missing"))
+        elif op["op"] == "evaluate" and proposal.state == ProposalState.PROPOSED:
+            violations.append(("lost_update", f"{op['id']}: acknowledged evaluate but state is proposed"))
+        elif op["op"] == "decide":
+            decisions[op["id"]].append(op["accept"])
+    for pid, accepts in decisions.items():
+        if len(accepts) > 1:
+            violations.append(("lost_update", f"{pid}: {len(accepts)} acknowledged decisions"))
+        expected = ProposalState.ACCEPTED if accepts[-1] else ProposalState.REJECTED
+        if len(accepts) == 1 and pid in proposals and proposals[pid].state != expected:
+            violations.append(("lost_update", f"{pid}: decided {expected.value} but state is {proposals[pid].state.value}"))
+
+    chain = verify_chain(full=True)
+    violations.extend(("audit_chain", error) for error in chain["errors"])
+
+    return {
+        "proposals": len(proposals),
+        "audited_proposals": len(audited),
+        "events_checked": chain["events_checked"],
+        "violation_counts": dict(Counter(kind for kind, _ in violations)),
+        "violations": [f"{kind}: {detail}" for kind, detail in violations[:MAX_REPORTED_VIOLATIONS]],
+    }
+
+
+def summarize(ops: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    from .locks import Histogram
+
+    outcomes: Dict[str, Counter] = defaultdict(Counter)
+    latency: Dict[str, Histogram] = defaultdict(Histogram)
+    errors: Counter = Counter()
+    for op in ops:
+        outcomes[op["op"]][op["outcome"]] += 1
+        latency[op["op"]].observe(op["ms"])
+        if op["outcome"] == "error":
+            errors[op.get("detail", "")] += 1
+    summary = {
+        name: {
+            **{k: outcomes[name][k] for k in ("ok", "rejected", "shed", "error")},
+            "throughput": round(outcomes[name]["ok"] / elapsed, 1) if elapsed else None,
+            "latency_ms": latency[name].to_dict(),
+        }
+        for name in sorted(outcomes)
+    }
+    return {"ops": summary, "errors": dict(errors.most_common(10))}
+
+
+def run_stress(cfg: StressConfig, data_dir: Optional[Path] = None) -> Dict[str, Any]:
+    """Run one load/chaos round and return the report (``report["ok"]`` is the verdict)."""
+    if cfg.mode not in {"cli", "api", "mixed"}:
+        raise ValueError(f"unknown mode {cfg.mode!r}")
+    if cfg.agents < 1 or cfg.humans < 0:
+        raise ValueError("need at least one agent and no negative worker counts")
+    root = Path(data_dir or tempfile.mkdtemp(prefix="aap-stress-"))
+    (root / "results").mkdir(parents=True, exist_ok=True)
+    (root / "evidence.json").write_text(json.dumps(EVIDENCE))
+    (root / "auth_allowlist.txt").write_text("".join(f"human-{i}\n" for i in range(cfg.humans)))
+
+    ctx = multiprocessing.get_context("spawn")
+    roles = [("agent", i) for i in range(cfg.agents)] + [("human", i) for i in range(cfg.humans)]
+    ready, go, window = ctx.Queue(), ctx.Event(), ctx.Array("d", 2)
+    procs = []
+    for n, (role, index) in enumerate(roles):
+        mode = cfg.mode if cfg.mode != "mixed" else ("cli", "api")[n % 2]
+        proc = ctx.Process(
+            target=_worker,
+            args=(role, index, mode, str(root), cfg.think, cfg.seed, ready, go, window),
+            name=f"aap-stress-{role}-{index}",
+        )
+        proc.start()
+        procs.append(proc)
+    # Spawned interpreters take a while to import; the clock starts once all of them are up.
+    waiting_until = time.time() + STARTUP_TIMEOUT
+    for _ in procs:
+        try:
+            ready.get(timeout=max(0.1, waiting_until - time.time()))
+        except queue.Empty:
+            break
+    started = time.time()
+    deadline = started + cfg.duration
+    window[:] = [started, deadline]
+    go.set()
+
+    rng = random.Random(cfg.seed)
+    victims = rng.sample(procs, min(cfg.kill, len(procs)))
+    kill_at = sorted(((started + rng.uniform(0.2, 0.8) * cfg.duration, proc) for proc in victims), key=lambda k: k[0])
+    for when, proc in kill_at:
+        time.sleep(max(0.0, when - time.time()))
+        proc.kill()
+
+    hung = crashed = 0
+    for proc in procs:
+        proc.join(timeout=max(0.0, deadline - time.time()) + config.LOCK_TIMEOUT * 2)
+        if proc.is_alive():
+            hung += 1  # stuck past the deadline: a deadlock or a lock that never times out
+            proc.kill()
+            proc.join()
+        elif proc.exitcode != 0 and proc not in victims:
+            crashed += 1
+    elapsed = time.time() - started
+
+    ops = _read_results(root)
+    with use_data_dir(root):
+        invariants = check_invariants(ops)
+    report = {
+        "config": asdict(cfg),
+        "data_dir": str(root),
+        "elapsed": round(elapsed, 2),
+        "killed": len(victims),
+        "hung": hung,
+        "crashed": crashed,
+        "total_ops": len(ops),
+        "throughput": round(sum(op["outcome"] == "ok" for op in ops) / elapsed, 1),
+        **summarize(ops, elapsed),
+        "invariants": invariants,
+    }
+    report["ok"] = not invariants["violation_counts"] and not hung and not crashed
+    return report
+
+
+def remove_data_dir(report: Dict[str, Any]) -> None:
+    shutil.rmtree(report["data_dir"], ignore_errors=True)
@@ -0,0 +1,50 @@
+import subprocess
+
+import pytest
+
+from aap import config
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Point every writable AAP location at a temporary directory."""
+    monkeypatch.setattr(config, "PROPOSAL_DIR", tmp_path / "proposals")
+    monkeypatch.setattr(config, "EVIDENCE_DIR", tmp_path / "evidence")
+    monkeypatch.setattr(config, "DECISIONS_DIR", tmp_path / "decisions")
+    monkeypatch.setattr(config, "LOCK_DIR", tmp_path / "locks")
+    monkeypatch.setattr(config, "ARCHIVE_DIR", tmp_path / "archive")
+    monkeypatch.setattr(config, "DB_FILE", tmp_path / "aap.db")
+    monkeypatch.setattr(config, "AUDIT_LOG_FILE", tmp_path / "audit.log")
+    monkeypatch.setattr(config, "REPLICA_STATE_FILE", tmp_path / "replica.json")
+    return tmp_path
+
+
+@pytest.fixture
+def cli(store, monkeypatch):
+    """Run CLI commands in-process against the temporary store."""
+    from aap.cli import build_parser
+
+    monkeypatch.setenv(config.TOTP_SECRET_ENV, "JBSWY3DPEHPK3PXP")
+
+    def run(*argv):
+        args = build_parser().parse_args([str(a) for a in argv])
+        return args.func(args)
+
+    return run
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """A throwaway git repository with one commit on ``main``."""
+    root = tmp_path / "repo"
+    root.mkdir()
+    for args in (
+        ["init", "-q", "-b", "main"],
+        ["config", "user.email", "t@example.com"],
+        ["config", "user.name", "t"],
+    ):
+        subprocess.run(["git", *args], cwd=root, check=True)
+    (root / "README").write_text("hi\n")
+    subprocess.run(["git", "add", "README"], cwd=root, check=True)
+    subprocess.run(["git", "commit", "-qm", "init"], cwd=root, check=True)
+    return root
@@ -0,0 +1,116 @@
+from types import SimpleNamespace
+
+import pytest
+
+from aap import config
+from aap.admission import AdmissionController, AdmissionRejected
+from aap.state import ProposalState
+from aap.storage import load_proposal
+
+
+def _controller(tmp_path, text):
+    path = tmp_path / "rate_limits.yaml"
+    path.write_text(text)
+    controller = AdmissionController(path=path)
+    controller.reload()
+    return controller
+
+
+def test_rate_limit_and_concurrency_cap(store):
+    controller = _controller(store, "defaults: {rate: 0.5, burst: 2}\nconcurrency: {evaluate: 1}\n")
+    for _ in range(2):
+        with controller.admit("t", "alpha", "propose"):
+            pass
+    with pytest.raises(AdmissionRejected) as exc:
+        with controller.admit("t", "alpha", "propose"):
+            pass
+    assert exc.value.reason == "rate" and exc.value.retry_after >= 1
+    # a different agent has its own bucket
+    with controller.admit("t", "beta", "propose"):
+        pass
+
+    with controller.admit("t", "gamma", "evaluate"):
+        with pytest.raises(AdmissionRejected) as exc:
+            with controller.admit("t", "delta", "evaluate"):
+                pass
+        assert exc.value.reason == "concurrency"
+
+    metrics = controller.metrics()
+    assert metrics["admitted"] == {"propose": 3, "evaluate": 1}
+    assert metrics["shed"] == {"propose": {"rate": 1}, "evaluate": {"concurrency": 1}}
+    assert metrics["in_flight"] == {}
+
+
+def test_open_proposal_quota(cli, store):
+    controller = _controller(store, "defaults: {rate: 100, burst: 100}\nagents:\n  alpha: {open_quota: 2}\n")
+    for pid in ("q1", "q2"):
+        with controller.admit("t", "alpha", "propose", check_quota=True):
+            cli("propose", "--id", pid, "--agent", "alpha", "--goal", "g", "--scope", "svc/")
+    with pytest.raises(AdmissionRejected) as exc:
+        with controller.admit("t", "alpha", "propose", check_quota=True):
+            pass
+    assert exc.value.reason == "quota"
+    with controller.admit("t", "beta", "propose", check_quota=True):
+        pass
+
+
+def test_quota_rejections_cost_no_rate(cli, store):
+    controller = _controller(store, "defaults: {rate: 0.001, burst: 4}\nagents:\n  alpha: {open_quota: 1}\n")
+    with controller.admit("t", "alpha", "propose", check_quota=True):
+        cli("propose", "--id", "q1", "--agent", "alpha", "--goal", "g", "--scope", "svc/")
+    for _ in range(3):
+        with pytest.raises(AdmissionRejected) as exc:
+            with controller.admit("t", "alpha", "propose", check_quota=True):
+                pass
+        assert exc.value.reason == "quota"
+    proposal = load_proposal("q1")
+    proposal.state = ProposalState.REJECTED  # a decision frees the quota
+    proposal.save()
+    with controller.admit("t", "alpha", "propose", check_quota=True):
+        pass
+
+    check = controller.batch_check("t")
+    results = [check(SimpleNamespace(agent="alpha")) for _ in range(3)]
+    assert results == [None] + ["Agent alpha has reached its open proposal quota (1)"] * 2
+
+
+def test_rotating_agents_share_the_token_bucket(store):
+    controller = _controller(store, "defaults: {rate: 100, burst: 100, token_rate: 0.5, token_burst: 3}\n")
+    for agent in ("a1", "a2", "a3"):
+        with controller.admit("t", agent, "propose"):
+            pass
+    with pytest.raises(AdmissionRejected) as exc:
+        with controller.admit("t", "a4", "propose"):
+            pass
+    assert exc.value.reason == "rate" and "API token" in exc.value.detail
+    with controller.admit("other", "a4", "propose"):
+        pass
+
+
+def test_reload_keeps_bucket_levels_and_idle_buckets_are_dropped(store, monkeypatch):
+    controller = _controller(store, "defaults: {rate: 0.001, burst: 2}\n")
+    for _ in range(2):
+        with controller.admit("t", "alpha", "propose"):
+            pass
+    controller.path.write_text("defaults: {rate: 0.001, burst: 5}\n")
+    controller.reload()
+    with pytest.raises(AdmissionRejected):
+        with controller.admit("t", "alpha", "propose"):
+            pass
+
+    monkeypatch.setattr(config, "ADMISSION_MAX_BUCKETS", 4)
+    for n in range(10):
+        with controller.admit("t", f"agent-{n}", "propose"):
+            pass
+    assert controller.metrics()["buckets"] <= 4
+
+
+def test_batch_records_are_charged_to_their_agents(store):
+    controller = _controller(store, "defaults: {rate: 0.001, burst: 2, token_burst: 4}\n")
+    check = controller.batch_check("t")
+    refused = [
+        check(SimpleNamespace(agent=agent)) for agent in ("alpha", "alpha", "alpha", "beta", "beta", "gamma")
+    ]
+    assert [bool(error) for error in refused] == [False, False, True, False, False, True]
+    assert "agent alpha" in refused[2] and "API token" in refused[5]
+    assert controller.metrics()["shed"] == {"propose": {"rate": 2}}
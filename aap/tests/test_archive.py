@@ -0,0 +1,97 @@
+import os
+from datetime import datetime, timedelta, timezone
+from importlib.machinery import SourceFileLoader
+from importlib.util import module_from_spec, spec_from_loader
+from pathlib import Path
+
+from aap import config
+from aap.archive import archive, gc, index, read_bundle
+from aap.evidence_store import blob_path, record_upload, store_chunks
+from aap.gate import decision_path
+from aap.state import ProposalState
+from aap.storage import Proposal, list_summaries, load_proposal, proposal_exists, proposal_path
+from aap.utils import dump_yaml_or_json
+
+LATER = datetime.now(timezone.utc) + timedelta(days=2)
+
+
+def _proposal(pid, state):
+    return Proposal(
+        id=pid, agent="a", goal=f"goal {pid}", scope=["svc/"], constraints=[], state=state,
+        evidence={"passed": True}, decision={"decision": "accept"},
+    ).save()
+
+
+def _seed():
+    committed = _proposal("c1", ProposalState.COMMITTED)
+    _proposal("r1", ProposalState.REJECTED)
+    _proposal("o1", ProposalState.PROPOSED)
+    dump_yaml_or_json({"proposal_id": "c1", "decision": "accept"}, decision_path("c1"))
+    digest, size, _ = store_chunks([b'{"unit_tests": "pass"}'])
+    record_upload("c1", "results.json", digest, size)
+    return committed, digest
+
+
+def test_archive_moves_terminal_proposals_and_loads_them_back(store):
+    committed, digest = _seed()
+    assert archive(older_than_days=1, dry_run=True, now=LATER)["archived"] == ["c1", "r1"]
+    assert archive(older_than_days=3, now=LATER)["archived"] == []
+
+    report = archive(older_than_days=1, now=LATER)
+    assert sorted(report["archived"]) == ["c1", "r1"] and report["changed"] == []
+    assert not proposal_path("c1").exists() and not decision_path("c1").exists()
+    assert not (config.EVIDENCE_DIR / "c1").exists() and proposal_path("o1").exists()
+
+    assert load_proposal("c1") == committed and load_proposal("r1", fields=()).evidence == {"passed": True}
+    assert proposal_exists("c1") and not proposal_exists("nope")
+    bundle = read_bundle("c1")
+    assert bundle["decision"]["decision"] == "accept" and "manifest.json" in bundle["evidence"]
+    assert index()["c1"]["blobs"] == [digest]
+    assert [s.id for s in list_summaries()] == ["o1"]
+    assert sorted(s.id for s in list_summaries(include_archived=True)) == ["c1", "o1", "r1"]
+    assert archive(older_than_days=1, now=LATER)["archived"] == []
+
+
+def test_pre_receive_hook_reads_archived_state(store, monkeypatch):
+    monkeypatch.setattr(config, "ARCHIVE_DIR", store / "aap" / "archive")
+    _seed()
+    archive(older_than_days=1, now=LATER)
+    hook = Path(config.BASE_DIR) / "hooks" / "pre-receive"
+    loader = SourceFileLoader("aap_pre_receive", str(hook))
+    module = module_from_spec(spec_from_loader(loader.name, loader))
+    loader.exec_module(module)
+    assert module.proposal_state(store, "c1") == "committed"
+    assert module.proposal_state(store, "r1") == "rejected"
+    assert module.proposal_state(store, "missing") == ""
+
+
+def test_gc_keeps_what_archived_proposals_reference(store):
+    _, digest = _seed()
+    archive(older_than_days=1, now=LATER)
+    orphan, _, _ = store_chunks([b"unreferenced"])
+    old = 0
+    os.utime(blob_path(orphan), (old, old))
+    _proposal("gone", ProposalState.REJECTED)
+    proposal_path("gone").unlink()  # deleted by hand; the mirror still knows the id
+    (config.EVIDENCE_DIR / "gone").mkdir()
+    (config.EVIDENCE_DIR / "example").mkdir()
+    (config.EVIDENCE_DIR / "example" / "results.json").write_text("{}")
+    config.LOCK_DIR.mkdir(exist_ok=True)
+    for name in ("c1.lock", "o1.evidence.lock", "unknown.lock"):
+        (config.LOCK_DIR / name).write_text("")
+
+    report = gc(grace_seconds=0)
+    assert report["blobs"] == [orphan] and report["evidence"] == ["gone"]
+    assert sorted(report["locks"]) == ["c1.lock", "o1.evidence.lock"]
+    assert blob_path(digest).exists() and not blob_path(orphan).exists()
+    assert (config.LOCK_DIR / "unknown.lock").exists()
+    assert (config.EVIDENCE_DIR / "example" / "results.json").exists()
+
+
+def test_gc_never_touches_directories_of_unknown_ids(store):
+    for name in ("example", "notes"):
+        (config.EVIDENCE_DIR / name).mkdir(parents=True)
+        (config.EVIDENCE_DIR / name / "results.json").write_text("{}")
+    assert gc(dry_run=True, grace_seconds=0)["evidence"] == []
+    assert gc(grace_seconds=0)["evidence"] == []
+    assert sorted(p.name for p in config.EVIDENCE_DIR.iterdir()) == ["example", "notes"]
@@ -0,0 +1,90 @@
+import gzip
+import json
+
+import pytest
+
+from aap import backup, config
+from aap.audit import verify_chain
+from aap.db import list_jobs, max_seq
+from aap.evidence_store import blob_path, put_file, read_manifest
+from aap.jobs import enqueue_evaluation
+from aap.layout import shard
+from aap.storage import list_proposals, load_proposal, proposal_path
+from aap.utils import use_data_dir
+
+EVIDENCE = {
+    "unit_tests": "pass", "integration_tests": "pass", "lint": "pass",
+    "runner": "r", "run_id": "1", "artifact_sha256": "x",
+}
+
+
+def _propose(cli, pid):
+    cli("propose", "--agent", "a", "--goal", "g", "--scope", f"svc/{pid}/", "--constraints",
+        "no_production_push_by_agent", "--id", pid)
+
+
+@pytest.fixture
+def seeded(cli, store):
+    evidence = store / "ev.json"
+    evidence.write_text(json.dumps(EVIDENCE))
+    for pid in ("e1", "e2"):
+        _propose(cli, pid)
+    cli("evaluate", "e1", "--evidence", evidence)
+    put_file("e1", evidence)
+    enqueue_evaluation("e2", "a", evidence=EVIDENCE)
+    return store
+
+
+def test_round_trip_into_a_fresh_resharded_directory(seeded, monkeypatch):
+    monkeypatch.setattr(config, "EXPORT_CHUNK_BYTES", 512)  # many gzip members and file chunks
+    out = seeded / "out" / "store.ndjson.gz"
+    result = backup.export_store(str(out), workers=4)
+    assert result["last_seq"] == max_seq() and result["replaced"] == 0
+    assert out.read_bytes().count(b"\x1f\x8b\x08") > 1
+    lines = [json.loads(line) for line in gzip.decompress(out.read_bytes()).splitlines()]
+    assert lines[0]["type"] == "header"
+    assert lines[-1] == {"type": "end", **{key: result[key] for key in ("rows", "files", "bytes")}}
+
+    expected = {p.id: p.to_dict() for p in list_proposals()}
+    manifest = read_manifest("e1")
+    target = seeded / "restored"
+    monkeypatch.setattr(config, "STORE_FANOUT", 2)
+    imported = backup.import_store(str(out), target)
+    assert imported["verified"] and (imported["rows"], imported["files"]) == (result["rows"], result["files"])
+    with use_data_dir(target):
+        assert {p.id: p.to_dict() for p in list_proposals()} == expected
+        assert proposal_path("e1") == target.joinpath("proposals", *shard("e1"), "e1.yaml")
+        assert max_seq() == result["last_seq"] and verify_chain()["ok"]
+        assert read_manifest("e1") == manifest
+        assert blob_path(manifest["files"]["results.json"]["sha256"]).exists()
+        assert [j["proposal_id"] for j in list_jobs()] == ["e2"]
+        with pytest.raises(RuntimeError, match="empty data directory"):
+            backup.import_store(str(out))
+
+    out.write_bytes(gzip.compress(b"".join(gzip.decompress(out.read_bytes()).splitlines(True)[:-1])))
+    with pytest.raises(RuntimeError, match="truncated"):
+        backup.import_store(str(out), seeded / "truncated")
+
+
+def test_writes_after_the_barrier_are_left_out(seeded, cli, monkeypatch):
+    before = load_proposal("e2").to_dict()
+    seq = max_seq()
+    copy_snapshot = backup._backup_db
+
+    def write_then_copy(source, target):
+        # Writers carry on once the barrier is released, before the copy is taken.
+        cli("evaluate", "e2", "--evidence", seeded / "ev.json")
+        _propose(cli, "late")
+        copy_snapshot(source, target)
+
+    monkeypatch.setattr(backup, "_backup_db", write_then_copy)
+    out = seeded / "store.ndjson.gz"
+    result = backup.export_store(str(out))
+    assert result["last_seq"] == seq and result["replaced"] == 1
+    assert load_proposal("e2").state.value == "evaluated"
+
+    backup.import_store(str(out), seeded / "restored")
+    with use_data_dir(seeded / "restored"):
+        assert load_proposal("e2").to_dict() == before
+        assert sorted(p.id for p in list_proposals()) == ["e1", "e2"]
+        assert max_seq() == seq and verify_chain()["ok"]
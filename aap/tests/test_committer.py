@@ -0,0 +1,111 @@
+import subprocess
+
+import pytest
+
+from aap import db
+from aap.adapters import git_adapter
+from aap.committer import commit_batch
+from aap.state import ProposalState
+from aap.storage import Proposal, load_proposal
+
+
+def _git(repo, *args):
+    return subprocess.run(["git", *args], cwd=repo, capture_output=True, text=True, check=True).stdout.strip()
+
+
+def _accepted(pid, scope):
+    Proposal(id=pid, agent="a", goal=f"goal {pid}", scope=[scope], constraints=[], state=ProposalState.ACCEPTED).save()
+
+
+def test_batch_commits_tags_and_pushes_in_one_pass(store, repo):
+    remote = store / "remote.git"
+    subprocess.run(["git", "init", "-q", "--bare", str(remote)], check=True)
+    _git(repo, "remote", "add", "origin", str(remote))
+    for pid in ("b1", "b2", "b3"):
+        _accepted(pid, f"{pid}/")
+        (repo / pid).mkdir()
+        (repo / pid / "f.txt").write_text(pid)
+    (repo / "README").unlink()
+    _accepted("b4", "README")
+
+    result = commit_batch(["b1", "b2", "b3", "b4"], cwd=repo, stage_all=True, push=True, branch="main")
+
+    assert result["ok"] and result["pushed"]
+    log = _git(repo, "log", "--format=%s", "-5").splitlines()
+    assert log[:4] == ["aap:b4 goal b4", "aap:b3 goal b3", "aap:b2 goal b2", "aap:b1 goal b1"]
+    assert _git(repo, "status", "--porcelain") == ""
+    assert _git(repo, "diff-tree", "--no-commit-id", "--name-only", "-r", "aap/b2^{commit}") == "b2/f.txt"
+    assert _git(str(remote), "rev-parse", "main") == result["head"]
+    assert _git(str(remote), "tag", "--list").split() == ["aap/b1", "aap/b2", "aap/b3", "aap/b4"]
+    assert load_proposal("b3").state == ProposalState.COMMITTED
+    assert [e["event"] for e in db.list_events()].count("commit") == 4
+    assert {r["state"] for r in db.read_state_counts()} == {"committed"}
+
+
+def test_batch_validates_all_scopes_up_front(store, repo):
+    _accepted("c1", "c1/")
+    Proposal(id="c2", agent="a", goal="g", scope=["c2/"], constraints=[], state=ProposalState.EVALUATED).save()
+    (repo / "c1").mkdir()
+    (repo / "c1" / "f.txt").write_text("x")
+    (repo / "stray.txt").write_text("x")
+    head = _git(repo, "rev-parse", "HEAD")
+
+    with pytest.raises(ValueError, match="ACCEPTED"):
+        commit_batch(["c1", "c2"], cwd=repo, stage_all=True)
+    with pytest.raises(ValueError, match="outside every proposal scope"):
+        commit_batch(["c1"], cwd=repo, stage_all=True)
+    assert _git(repo, "rev-parse", "HEAD") == head
+    assert load_proposal("c1").state == ProposalState.ACCEPTED
+
+
+def test_detached_head_needs_a_branch_to_push(store, repo):
+    _accepted("d1", "d1/")
+    (repo / "d1").mkdir()
+    (repo / "d1" / "f.txt").write_text("x")
+    _git(repo, "checkout", "-q", "--detach")
+    with pytest.raises(ValueError, match="detached"):
+        commit_batch(["d1"], cwd=repo, stage_all=True, push=True)
+    assert load_proposal("d1").state == ProposalState.ACCEPTED
+    assert _git(repo, "status", "--porcelain") == "?? d1/"
+
+
+def test_proposals_rejected_meanwhile_are_not_committed(store, repo, monkeypatch):
+    head = _git(repo, "rev-parse", "HEAD")
+    for pid in ("r1", "r2"):
+        _accepted(pid, f"{pid}/")
+        (repo / pid).mkdir()
+        (repo / pid / "f.txt").write_text(pid)
+    build = git_adapter.commit_staged_paths
+
+    def reject_r2_first(*args, **kwargs):
+        proposal = load_proposal("r2")
+        if proposal.state == ProposalState.ACCEPTED:
+            proposal.state = ProposalState.REJECTED  # a reviewer changes their mind mid-commit
+            proposal.save()
+        return build(*args, **kwargs)
+
+    monkeypatch.setattr(git_adapter, "commit_staged_paths", reject_r2_first)
+    result = commit_batch(["r1", "r2"], cwd=repo, stage_all=True)
+    assert not result["ok"] and {i["status"] for i in result["items"]} == {"rolled_back"}
+    assert "proposal r2 is rejected now" in result["items"][0]["error"]
+    assert _git(repo, "rev-parse", "HEAD") == head and load_proposal("r1").state == ProposalState.ACCEPTED
+
+
+def test_commit_rechecks_acceptance_under_the_lock(store, repo, monkeypatch, cli):
+    head = _git(repo, "rev-parse", "HEAD")
+    _accepted("r1", "r1/")
+    (repo / "r1").mkdir()
+    (repo / "r1" / "f.txt").write_text("r1")
+    list_staged = git_adapter.list_staged_files
+
+    def reject_r1_after_listing(*args, **kwargs):
+        proposal = load_proposal("r1")
+        proposal.state = ProposalState.REJECTED  # a reviewer changes their mind mid-commit
+        proposal.save()
+        return list_staged(*args, **kwargs)
+
+    monkeypatch.setattr(git_adapter, "list_staged_files", reject_r1_after_listing)
+    monkeypatch.setattr(git_adapter, "default_repo_root", lambda: repo)
+    with pytest.raises(SystemExit, match="r1 is rejected now"):
+        cli("commit", "r1", "--stage-all")
+    assert _git(repo, "rev-parse", "HEAD") == head and load_proposal("r1").state == ProposalState.REJECTED
@@ -0,0 +1,102 @@
+import pytest
+
+from aap import config, gate
+from aap.audit import verify_chain
+from aap.auth import totp_now
+from aap.db import list_events, queue_claim
+from aap.gate import decide, decide_batch, decision_path
+from aap.state import ProposalState
+from aap.storage import load_proposal
+
+
+@pytest.fixture
+def evaluated(cli, store, monkeypatch):
+    allowlist = store / "allow.txt"
+    allowlist.write_text("h1\n")
+    monkeypatch.setattr(config, "AUTH_ALLOWLIST_FILE", allowlist)
+    evidence = store / "ev.json"
+    evidence.write_text(
+        '{"unit_tests": "pass", "integration_tests": "pass", "lint": "pass", '
+        '"runner": "r", "run_id": "1", "artifact_sha256": "x"}'
+    )
+    for pid, agent in (("a1", "x"), ("a2", "x"), ("a3", "y"), ("a4", "y")):
+        cli("propose", "--agent", agent, "--goal", "g", "--scope", f"svc/{pid}/", "--constraints",
+            "no_production_push_by_agent", "--id", pid)
+        if pid != "a4":
+            cli("evaluate", pid, "--evidence", evidence)
+
+
+def test_batch_decides_evaluated_proposals_as_one_set(evaluated):
+    result = decide_batch(["a1", "a3", "a4", "nope"], "accept", "h1", reason="backlog", otp=totp_now())
+    assert result["proposal_ids"] == ["a1", "a3"] and result["requested"] == 4
+    assert [i["status"] for i in result["items"]] == ["decided", "decided", "skipped", "error"]
+    for pid in ("a1", "a3"):
+        proposal = load_proposal(pid)
+        assert proposal.state == ProposalState.ACCEPTED and proposal.decision["set_id"] == result["set_id"]
+        assert decision_path(pid).exists()
+    assert load_proposal("a4").state == ProposalState.PROPOSED
+
+    events = list_events(limit=3)
+    assert events[0]["event"] == "decision_set" and events[0]["data"]["proposal_ids"] == ["a1", "a3"]
+    assert {e["proposal_id"] for e in events[1:]} == {"a1", "a3"}
+    assert verify_chain()["ok"]
+
+    nothing = decide_batch(["a1", "a4", "nope"], "accept", "h1", otp=totp_now())
+    assert nothing["proposal_ids"] == [] and [i["status"] for i in nothing["items"]] == ["skipped", "skipped", "error"]
+    assert list_events(limit=1)[0] == events[0]  # no empty decision_set recorded
+
+
+def test_batch_authenticates_once_up_front(evaluated):
+    with pytest.raises(ValueError, match="Invalid OTP"):
+        decide_batch(["a1", "a2"], "accept", "h1", otp="000000")
+    with pytest.raises(ValueError, match="allowlist"):
+        decide_batch(["a1"], "reject", "intruder", otp=totp_now())
+    assert load_proposal("a1").state == ProposalState.EVALUATED
+
+
+def test_cli_batch_by_filter(cli, evaluated, capsys):
+    cli("decide", "--batch", "--agent", "x", "--reject", "--by", "h1", "--otp", totp_now())
+    assert "Decision set" in capsys.readouterr().out
+    assert [load_proposal(p).state for p in ("a1", "a2", "a3")] == [
+        ProposalState.REJECTED, ProposalState.REJECTED, ProposalState.EVALUATED,
+    ]
+
+
+def test_files_follow_the_events(evaluated, monkeypatch):
+    def fail(*_, **__):
+        raise OSError("disk full")
+
+    record = gate.record_events
+    monkeypatch.setattr(gate, "record_events", fail)
+    with pytest.raises(OSError):
+        decide_batch(["a1", "a2"], "accept", "h1", otp=totp_now())
+    assert load_proposal("a1").state == ProposalState.EVALUATED and not decision_path("a1").exists()
+    monkeypatch.setattr(gate, "record_events", record)
+
+    write = gate.dump_yaml_or_json
+
+    def fail_for_a2(data, path):
+        if path == decision_path("a2"):
+            raise OSError("disk full")
+        write(data, path)
+
+    monkeypatch.setattr(gate, "dump_yaml_or_json", fail_for_a2)
+    result = decide_batch(["a1", "a2"], "accept", "h1", otp=totp_now())
+    assert [i["status"] for i in result["items"]] == ["decided", "error"]
+    assert "decision recorded" in result["items"][1]["error"]
+    assert result["proposal_ids"] == ["a1", "a2"] and decision_path("a1").exists()
+
+
+def test_claims_are_enforced_and_reviewers_must_be_allowlisted(cli, evaluated):
+    assert [r["proposal_id"] for r in queue_claim(1, "h2", 60)] == ["a1"]
+    with pytest.raises(ValueError, match="claimed for review by h2"):
+        decide(load_proposal("a1"), "accept", "h1", otp=totp_now())
+    result = decide_batch(["a1", "a2"], "accept", "h1", otp=totp_now())
+    assert [i["status"] for i in result["items"]] == ["skipped", "decided"]
+    assert load_proposal("a1").state == ProposalState.EVALUATED
+
+    with pytest.raises(SystemExit, match="not in allowlist"):
+        cli("queue", "--claim", "--by", "h2")
+    cli("queue", "--claim", "--by", "h1")  # a1 is still h2's
+    decide(load_proposal("a3"), "reject", "h1", otp=totp_now())
+    assert load_proposal("a3").state == ProposalState.REJECTED
@@ -0,0 +1,57 @@
+from pathlib import Path
+
+from aap import config, db
+from aap.storage import load_proposal
+
+EXAMPLE_EVIDENCE = Path(config.BASE_DIR) / "evidence" / "example" / "results.json"
+
+
+def _evaluate_events():
+    return [e for e in db.list_events(limit=100) if e["event"] == "evaluate"]
+
+
+def test_repeat_evaluate_is_memoized(cli, store, capsys):
+    for pid in ("m1", "m2"):
+        cli("propose", "--id", pid, "--agent", "a", "--goal", "g", "--scope", "svc/", "--constraints", "no_production_push_by_agent")
+
+    cli("evaluate", "m1", "--evidence", EXAMPLE_EVIDENCE)
+    first = load_proposal("m1")
+    assert first.state.value == "evaluated" and first.policy["eval_key"]
+    assert _evaluate_events()[0]["data"]["cache"] == "miss"
+
+    capsys.readouterr()
+    cli("evaluate", "m1", "--evidence", EXAMPLE_EVIDENCE)
+    assert "nothing rewritten" in capsys.readouterr().out
+    assert load_proposal("m1").updated_at == first.updated_at
+    assert len(_evaluate_events()) == 1
+
+    # same inputs on another proposal reuse the stored result
+    cli("evaluate", "m2", "--evidence", EXAMPLE_EVIDENCE)
+    second = load_proposal("m2")
+    assert _evaluate_events()[0]["data"]["cache"] == "hit"
+    assert second.policy["eval_key"] == first.policy["eval_key"] and second.state.value == "evaluated"
+
+    cli("evaluate", "m1", "--evidence", EXAMPLE_EVIDENCE, "--force")
+    assert _evaluate_events()[0]["data"]["cache"] == "bypass"
+
+    # changed evidence changes the key
+    evidence = store / "failing.json"
+    evidence.write_text(EXAMPLE_EVIDENCE.read_text().replace('"lint": "pass"', '"lint": "fail"'))
+    cli("evaluate", "m1", "--evidence", evidence)
+    assert load_proposal("m1").policy["eval_key"] != first.policy["eval_key"]
+    assert _evaluate_events()[0]["data"]["cache"] == "miss"
+
+    # runs without evidence are not cached: the result names the file that is missing
+    for pid in ("m1", "m2"):
+        cli("evaluate", pid, "--evidence", store / f"{pid}-absent.json")
+        assert _evaluate_events()[0]["data"]["cache"] == "miss"
+        assert f"{pid}-absent.json" in load_proposal(pid).evidence["failures"][0]
+
+
+def test_eval_cache_lru_bound(store):
+    for i in range(4):
+        db.eval_cache_put(f"k{i}", {"i": i}, "t", max_entries=3)
+        if i == 1:
+            assert db.eval_cache_get("k0") == {"i": 0}  # k0 becomes most recently used
+    assert db.eval_cache_get("k1") is None
+    assert [db.eval_cache_get(k)["i"] for k in ("k0", "k2", "k3")] == [0, 2, 3]
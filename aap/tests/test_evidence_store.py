@@ -0,0 +1,49 @@
+from pathlib import Path
+
+import pytest
+
+from aap import config
+from aap.evidence_store import BlobWriter, EvidenceTooLarge, blob_dir, blob_path, read_manifest
+from aap.ingest import parse_record
+from aap.storage import load_proposal
+
+EXAMPLE_EVIDENCE = Path(config.BASE_DIR) / "evidence" / "example" / "results.json"
+
+
+def test_put_dedups_and_feeds_evaluate(cli, store, capsys):
+    for pid in ("v1", "v2"):
+        cli("propose", "--id", pid, "--agent", "a", "--goal", "g", "--scope", "svc/", "--constraints", "no_production_push_by_agent")
+    cli("evidence", "put", "v1", EXAMPLE_EVIDENCE)
+    cli("evidence", "put", "v2", EXAMPLE_EVIDENCE)
+    assert "(already stored)" in capsys.readouterr().out
+
+    blobs = [p for p in blob_dir().rglob("*") if p.is_file()]
+    assert len(blobs) == 1
+    digest = read_manifest("v2")["files"]["results.json"]["sha256"]
+    assert blob_path(digest) == blobs[0]
+
+    cli("evaluate", "v1")
+    proposal = load_proposal("v1")
+    assert proposal.state.value == "evaluated"
+    assert proposal.evidence["sha256"] == digest and proposal.evidence["path"] == str(blobs[0])
+
+
+def test_blob_writer_streams_and_enforces_limit(store):
+    writer = BlobWriter(max_bytes=10)
+    writer.write(b"12345")
+    with pytest.raises(EvidenceTooLarge):
+        writer.write(b"678901")
+    assert not any((blob_dir() / "tmp").iterdir())
+
+    writer = BlobWriter()
+    for chunk in (b"a" * 3, b"b" * 4):
+        writer.write(chunk)
+    digest, size, dedup = writer.commit()
+    assert (size, dedup) == (7, False) and blob_path(digest).read_bytes() == b"aaabbbb"
+
+
+def test_blob_store_names_are_not_proposal_ids(cli):
+    with pytest.raises(SystemExit, match="'blobs' is reserved"):
+        cli("propose", "--id", "blobs", "--agent", "a", "--goal", "g")
+    with pytest.raises(ValueError, match="'tmp' is reserved"):
+        parse_record({"id": "tmp", "agent": "a", "goal": "g"})
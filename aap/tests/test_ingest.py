@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from aap import config, db
+from aap.audit import verify_log
+from aap.ingest import ingest_lines
+
+
+def test_batch_ingest_reports_per_record_results(cli, store):
+    cli("propose", "--id", "taken", "--agent", "alpha", "--goal", "g")
+    lines = [
+        json.dumps({"id": "b1", "agent": "alpha", "goal": "one", "scope": ["svc/"]}),
+        json.dumps({"id": "taken", "agent": "alpha", "goal": "dup"}),
+        json.dumps({"id": "b1", "agent": "alpha", "goal": "dup in batch"}),
+        "{not json",
+        "",
+        json.dumps({"agent": "beta", "goal": "two", "scope": "svc/"}),
+        json.dumps({"id": "b2", "agent": "beta", "goal": "three", "risk_level": "high"}),
+    ]
+    results = {r["line"]: r for r in ingest_lines(lines)}
+    assert {line: r["status"] for line, r in results.items()} == {
+        1: "created",
+        2: "conflict",
+        3: "conflict",
+        4: "invalid",
+        6: "invalid",
+        7: "created",
+    }
+    assert "scope must be a list" in results[6]["error"]
+
+    assert sorted(p.name for p in config.PROPOSAL_DIR.glob("*.yaml")) == ["b1.yaml", "b2.yaml", "taken.yaml"]
+    events = db.list_events(limit=10)
+    assert sorted(e["proposal_id"] for e in events if e["event"] == "propose") == ["b1", "b2", "taken"]
+    assert db.count_open_proposals("beta") == 1
+    assert verify_log()["ok"]
+
+
+def test_cli_from_file(cli, store, capsys):
+    path = store / "batch.ndjson"
+    path.write_text(json.dumps({"id": "f1", "agent": "alpha", "goal": "g"}) + "\n{}\n")
+    with pytest.raises(SystemExit):
+        cli("propose", "--from-file", path)
+    out = capsys.readouterr().out
+    assert "line 2: invalid" in out and "Created 1 of 2 proposals" in out
+    assert (config.PROPOSAL_DIR / "f1.yaml").exists()
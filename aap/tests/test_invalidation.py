@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from aap import scopes
+from aap.invalidation import bus, generation
+from aap.read_cache import ProposalReadCache
+from aap.watch import WatchHub
+
+
+def _propose(cli, pid, scope="svc/"):
+    cli("propose", "--id", pid, "--agent", "alpha", "--goal", "g", "--scope", scope)
+
+
+def test_generations_reload_only_after_a_commit(cli):
+    _propose(cli, "g1")
+    before = {"proposals": generation("proposals"), "events": generation("events")}
+    assert before["proposals"] >= 1 and before["events"] >= 1
+    reloads = bus().reloads
+    for _ in range(100):
+        bus().check()
+    assert bus().reloads == reloads
+
+    _propose(cli, "g2")
+    assert generation("proposals") > before["proposals"] and generation("events") > before["events"]
+    assert bus().reloads == reloads + 1
+
+
+def test_reads_see_other_writers_without_waiting_for_the_poll(cli):
+    _propose(cli, "r1")
+    hub = WatchHub(poll_interval=60)  # not an audit listener: writes below look like another worker's
+    try:
+        cache = ProposalReadCache(hub=hub)
+        assert cache.get("r1").etag.startswith('"r1.0.')
+        _propose(cli, "r2")
+        assert cache.etag("r2").startswith('"r2.1.')
+        assert [p["id"] for p in json.loads(cache.get_list().body)] == ["r2", "r1"]
+    finally:
+        hub.close()
+
+
+def test_scope_trie_skips_the_change_log_when_nothing_changed(cli, monkeypatch):
+    _propose(cli, "s1", "svc/api/")
+    assert scopes.find_conflicts(["svc/"]) == {"s1": [["svc/", "svc/api/"]]}
+
+    def unexpected(*_):
+        raise AssertionError("scope_changes read without a new generation")
+
+    monkeypatch.setattr(scopes, "read_scope_changes", unexpected)
+    assert scopes.find_conflicts(["svc/api/x.py"]) == {"s1": [["svc/api/x.py", "svc/api/"]]}
+    _propose(cli, "s2", "lib/")
+    with pytest.raises(AssertionError, match="without a new generation"):
+        scopes.find_conflicts(["svc/"])
@@ -0,0 +1,69 @@
+import pytest
+
+from aap import config
+from aap.db import fetch_changes, get_job, job_claim, job_finish
+from aap.jobs import enqueue_evaluation, run_one, work
+from aap.replay import replay
+from aap.state import ProposalState
+from aap.storage import load_proposal
+from aap.utils import utc_now
+
+EVIDENCE = {
+    "unit_tests": "pass", "integration_tests": "pass", "lint": "pass",
+    "runner": "r", "run_id": "1", "artifact_sha256": "x",
+}
+
+
+@pytest.fixture
+def proposals(cli):
+    for pid in ("j1", "j2"):
+        cli("propose", "--agent", "a", "--goal", "g", "--scope", f"svc/{pid}/", "--constraints",
+            "no_production_push_by_agent", "--id", pid)
+
+
+def test_queue_dedups_runs_by_priority_and_feeds_changes(proposals):
+    first, dedup = enqueue_evaluation("j1", "a", evidence=EVIDENCE)
+    again, dedup_again = enqueue_evaluation("j1", "a", evidence=EVIDENCE)
+    assert (dedup, dedup_again, again["id"]) == (False, True, first["id"])
+    urgent, _ = enqueue_evaluation("j2", "a", evidence=EVIDENCE, priority=5)
+
+    assert work(once=True) == 2
+    assert [get_job(j["id"])["state"] for j in (urgent, first)] == ["succeeded", "succeeded"]
+    assert get_job(urgent["id"])["started_at"] <= get_job(first["id"])["started_at"]
+    assert get_job(first["id"])["result"]["state"] == "evaluated"
+    assert load_proposal("j1").state == ProposalState.EVALUATED
+
+    # A finished job no longer absorbs new requests.
+    assert enqueue_evaluation("j1", "a", evidence=EVIDENCE)[1] is False
+
+    statuses = [(c["job_id"], c["status"]) for c in fetch_changes(-1) if c["event"] == "job"]
+    assert statuses[:6] == [
+        (first["id"], "queued"), (urgent["id"], "queued"),
+        (urgent["id"], "running"), (urgent["id"], "succeeded"),
+        (first["id"], "running"), (first["id"], "succeeded"),
+    ]
+    assert replay()["proposals"]["j1"] == load_proposal("j1").to_dict()
+
+
+def test_lapsed_claims_are_retried_then_abandoned(proposals, monkeypatch):
+    job, _ = enqueue_evaluation("j1", "a", evidence=EVIDENCE)
+    claimed, _ = job_claim("crashed", 0, config.JOB_MAX_ATTEMPTS, utc_now())  # lease lapses at once
+    assert claimed["id"] == job["id"]
+    retried = run_one("alive")
+    assert (retried["state"], retried["attempts"]) == ("succeeded", 2)
+    assert not job_finish(job["id"], "crashed", "failed", utc_now(), error="late")
+    assert get_job(job["id"])["state"] == "succeeded"
+
+    monkeypatch.setattr(config, "JOB_MAX_ATTEMPTS", 1)
+    job, _ = enqueue_evaluation("j2", "a", evidence=EVIDENCE)
+    job_claim("crashed", 0, 1, utc_now())
+    assert run_one("alive") is None
+    failed = get_job(job["id"])
+    assert failed["state"] == "failed" and "abandoned after 1 attempt" in failed["error"]
+
+
+def test_failing_job_is_recorded(proposals, store):
+    job, _ = enqueue_evaluation("j1", "a", evidence=EVIDENCE, policy=str(store / "missing.yaml"))
+    assert run_one("w")["state"] == "failed"
+    assert "missing.yaml" in get_job(job["id"])["error"]
+    assert load_proposal("j1").state == ProposalState.PROPOSED
@@ -0,0 +1,64 @@
+import hashlib
+from importlib.machinery import SourceFileLoader
+from importlib.util import module_from_spec, spec_from_loader
+from pathlib import Path
+
+from aap import config
+from aap.evidence_store import put_file, read_manifest
+from aap.gate import decision_path
+from aap.layout import depth_counts, migrate, shard
+from aap.state import ProposalState
+from aap.storage import Proposal, list_summaries, load_proposal, proposal_path
+from aap.utils import dump_yaml_or_json
+
+
+def _seed(store):
+    for pid in ("a1", "a2"):
+        Proposal(id=pid, agent="a", goal="g", scope=["svc/"], constraints=[], state=ProposalState.ACCEPTED).save()
+    dump_yaml_or_json({"proposal_id": "a1", "decision": "accept"}, decision_path("a1"))
+    evidence = store / "ev.json"
+    evidence.write_text('{"unit_tests": "pass"}')
+    put_file("a1", evidence)
+
+
+def test_shard_is_stable_hex_fanout():
+    assert shard("a1", 2) == (hashlib.sha1(b"a1").hexdigest()[:2], hashlib.sha1(b"a1").hexdigest()[2:4])
+    assert shard("a1", 0) == ()
+
+
+def test_both_layouts_are_read_while_migrating(store, monkeypatch):
+    _seed(store)
+    (store / "evidence" / "example").mkdir()
+    (store / "evidence" / "example" / "results.json").write_text("{}")
+    monkeypatch.setattr(config, "STORE_FANOUT", 2)
+    assert proposal_path("a1") == store / "proposals" / "a1.yaml"  # not migrated yet: still found flat
+    Proposal(id="a3", agent="a", goal="g", scope=[], constraints=[]).save()
+    assert proposal_path("a3") == store.joinpath("proposals", *shard("a3"), "a3.yaml")
+    assert depth_counts()["proposals"] == {0: 2, 2: 1}
+    assert [s.id for s in sorted(list_summaries(), key=lambda s: s.id)] == ["a1", "a2", "a3"]
+
+    assert migrate(dry_run=True)["proposals"] == 2 and depth_counts()["proposals"] == {0: 2, 2: 1}
+    report = migrate()
+    assert (report["proposals"], report["decisions"], report["evidence"], report["conflicts"]) == (2, 1, 1, [])
+    assert depth_counts() == {"proposals": {2: 3}, "decisions": {2: 1}, "evidence": {2: 1}}
+    assert load_proposal("a1").state == ProposalState.ACCEPTED
+    assert decision_path("a1") == store.joinpath("decisions", *shard("a1"), "a1.yaml") and decision_path("a1").exists()
+    assert "results.json" in read_manifest("a1")["files"]
+    assert (store / "evidence" / "example" / "results.json").exists()  # not a proposal's: left in place
+    assert migrate()["proposals"] == 0
+
+    monkeypatch.setattr(config, "STORE_FANOUT", 0)
+    migrate()
+    assert sorted(p.name for p in (store / "proposals").iterdir()) == ["a1.yaml", "a2.yaml", "a3.yaml"]
+    assert sorted(p.name for p in (store / "evidence").iterdir()) == ["a1", "blobs", "example"]
+
+
+def test_pre_receive_hook_finds_sharded_proposals(store, monkeypatch):
+    monkeypatch.setattr(config, "PROPOSAL_DIR", store / "aap" / "proposals")
+    monkeypatch.setattr(config, "STORE_FANOUT", 3)
+    Proposal(id="c1", agent="a", goal="g", scope=[], constraints=[], state=ProposalState.COMMITTED).save()
+    hook = Path(config.BASE_DIR) / "hooks" / "pre-receive"
+    loader = SourceFileLoader("aap_pre_receive", str(hook))
+    module = module_from_spec(spec_from_loader(loader.name, loader))
+    loader.exec_module(module)
+    assert module.proposal_state(store, "c1") == "committed"
@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+from aap.locks import LockManager, LockTimeout, remove_legacy_locks
+
+
+def test_shared_readers_exclusive_writer_and_timeout(store):
+    manager = LockManager(stripes=4)
+    entered = threading.Event()
+    release = threading.Event()
+
+    def reader():
+        with manager.lock("db", shared=True):
+            entered.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    assert entered.wait(5)
+    # a second shared holder (another thread, so another flock) gets in at once
+    with manager.lock("db", shared=True, timeout=0.5):
+        pass
+    with pytest.raises(LockTimeout):
+        with manager.lock("db", timeout=0.05):
+            pass
+    release.set()
+    thread.join()
+    with manager.lock("db", timeout=1):
+        pass
+
+    stats = manager.metrics()["locks"]["db"]
+    assert stats["timeouts"] == 1 and stats["acquired"] == 3
+    assert stats["hold_ms"]["count"] == 3 and stats["wait_ms"]["max"] < 1000
+
+
+def test_striping_and_reentrancy(store):
+    manager = LockManager(stripes=2)
+    paths = {manager.path_for("proposal", f"p{i}") for i in range(50)}
+    assert len(paths) == 2
+    # two keys on the same stripe, nested in one thread: re-entrant, no self-deadlock
+    a, b = [f"p{i}" for i in range(50) if manager.path_for("proposal", f"p{i}") == min(paths)][:2]
+    with manager.lock("proposal", a, timeout=0.1):
+        with manager.lock("proposal", b, timeout=0.1):
+            pass
+        with pytest.raises(RuntimeError):
+            with manager.lock("db", shared=True):
+                with manager.lock("db"):
+                    pass
+    assert manager.metrics()["locks"]["proposal"]["reentrant"] == 1
+
+
+def test_remove_legacy_locks(store):
+    (store / "proposals").mkdir()
+    (store / "proposals" / "a1.yaml").write_text("id: a1\n")
+    locks = store / "locks"
+    locks.mkdir()
+    for name in ("a1.lock", "a1.evidence.lock", "db.lock", "proposal-01.lock"):
+        (locks / name).write_text("")
+    assert {p.name for p in remove_legacy_locks(dry_run=True)} == {"a1.lock", "a1.evidence.lock"}
+    assert {p.name for p in remove_legacy_locks()} == {"a1.lock", "a1.evidence.lock"}
+    assert sorted(p.name for p in locks.iterdir()) == ["db.lock", "proposal-01.lock"]
@@ -0,0 +1,70 @@
+from aap import config
+from aap.policy import PolicyRouter, evaluate_policies, policy_router, resolve_policies
+from aap.storage import Proposal
+
+
+def _write(directory, name, body):
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / name).write_text(body)
+
+
+def _proposal(**kwargs):
+    fields = dict(id="p", agent="bot", goal="g", scope=["services/payment/api.py"], constraints=[], risk_level="medium")
+    fields.update(kwargs)
+    return Proposal(**fields)
+
+
+def test_router_selects_by_risk_agent_and_scope(tmp_path):
+    sets = tmp_path / "sets"
+    _write(sets, "payments.yaml", "name: payments\nmatch: {scope_prefix: [services/payment/]}\nrules: {require_evidence: [pci_scan]}\n")
+    _write(sets, "high.yaml", "name: high\nmatch: {risk_level: high}\nrules: {max_latency_delta_ms: 1}\n")
+    _write(sets, "bot-high.yaml", "name: bot-high\nmatch: {risk_level: [high], agent: [bot]}\nrules: {}\n")
+    _write(sets, "everyone.yaml", "name: everyone\nrules: {require_evidence: [lint]}\n")
+    router = PolicyRouter.from_dir(sets)
+
+    names = lambda p: [policy.name for policy in router.select(p)]  # noqa: E731
+    assert names(_proposal()) == ["everyone", "payments"]
+    assert names(_proposal(risk_level="high", scope=["docs/x"])) == ["bot-high", "everyone", "high"]
+    assert names(_proposal(risk_level="high", agent="other", scope=[])) == ["everyone", "high"]
+
+
+def test_merged_evaluation_records_every_policy(tmp_path, monkeypatch):
+    sets = tmp_path / "sets"
+    monkeypatch.setattr(config, "POLICY_SET_DIR", sets)
+    assert [p.name for p in resolve_policies(_proposal())] == ["default"]
+
+    _write(sets, "payments.yaml", (
+        "name: payments\nmatch: {scope_prefix: services/payment/}\n"
+        "rules: {require_evidence: [unit_tests, pci_scan], max_latency_delta_ms: 2, forbid_paths: [payment/api]}\n"
+    ))
+    assert policy_router(sets) is policy_router(sets)
+    policies = resolve_policies(_proposal())
+    result = evaluate_policies(_proposal(), policies)
+    assert result.policy_name == "default+payments"
+    assert result.required_evidence == ["unit_tests", "integration_tests", "lint", "pci_scan"]
+    assert result.performance_budget_ms == 2
+    assert "[payments] path 'services/payment/api.py' violates forbid_paths rule 'payment/api'" in result.violations
+    assert [a["name"] for a in result.applied] == ["default", "payments"]
+    assert all(len(a["hash"]) == 64 for a in result.applied)
+
+
+def test_sets_inherit_default_evidence_and_reloads_are_throttled(tmp_path, monkeypatch):
+    default = tmp_path / "default.yaml"
+    default.write_text("name: default\nrules: {require_evidence: [lint]}\n")
+    sets = tmp_path / "sets"
+    _write(sets, "loose.yaml", "name: loose\nrules: {max_latency_delta_ms: 3}\n")
+    monkeypatch.setattr(config, "DEFAULT_POLICY_FILE", default)
+    monkeypatch.setattr(config, "POLICY_SET_DIR", sets)
+    monkeypatch.setattr(config, "POLICY_RELOAD_INTERVAL", 3600)
+    result = evaluate_policies(_proposal(), resolve_policies(_proposal()))
+    assert result.policy_name == "default+loose" and result.required_evidence == ["lint"]
+
+    # An in-place edit waits for the reload interval; a new file is seen at once.
+    router = policy_router(sets)
+    (sets / "loose.yaml").write_text("name: loose\nmatch: {agent: nobody}\nrules: {}\n")
+    assert policy_router(sets) is router
+    _write(sets, "extra.yaml", "name: extra\nrules: {}\n")
+    assert [p.name for p in policy_router(sets).select(_proposal())] == ["extra"]
+    monkeypatch.setattr(config, "POLICY_RELOAD_INTERVAL", 0)
+    _write(sets, "extra.yaml", "name: extra\nmatch: {agent: nobody}\nrules: {}\n")
+    assert policy_router(sets).select(_proposal()) == []
@@ -0,0 +1,61 @@
+import subprocess
+import threading
+
+from aap.adapters.push_queue import PushCoordinator, _run
+
+
+def _git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True, check=True).stdout.strip()
+
+
+def test_concurrent_pushes_are_coalesced(store, repo):
+    remote = store / "remote.git"
+    subprocess.run(["git", "init", "-q", "--bare", str(remote)], check=True)
+    _git(repo, "remote", "add", "origin", str(remote))
+    for i in range(5):
+        _git(repo, "tag", f"aap/t{i}")
+
+    coordinator = PushCoordinator(window=0.2)
+    requests = []
+
+    def submit(i):
+        requests.append(coordinator.submit(["refs/heads/main", f"refs/tags/aap/t{i}"], cwd=repo))
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    results = [r.wait(10) for r in requests]
+
+    assert all(r.ok for r in results)
+    assert coordinator.pushes == 1
+    assert results[0].coalesced == 5
+    assert set(_git(str(remote), "tag", "--list").split()) == {f"aap/t{i}" for i in range(5)}
+    # Only the requested tags were pushed; an unrelated local tag stays local.
+    _git(repo, "tag", "other")
+    assert coordinator.push(["refs/tags/aap/t0"], cwd=repo).refs == {"refs/tags/aap/t0": "up-to-date"}
+    assert "other" not in _git(str(remote), "tag", "--list").split()
+
+
+def test_transient_failures_are_retried(store, repo):
+    remote = store / "remote.git"
+    subprocess.run(["git", "init", "-q", "--bare", str(remote)], check=True)
+    _git(repo, "remote", "add", "origin", str(remote))
+    calls = []
+
+    def flaky(args, cwd):
+        calls.append(args)
+        if len(calls) == 1:
+            return subprocess.CompletedProcess(args, 128, "", "fatal: Could not read from remote repository.")
+        return _run(args, cwd)
+
+    result = PushCoordinator(window=0, backoff=0.01, runner=flaky).push(["refs/heads/main"], cwd=repo)
+    assert result.ok and result.attempts == 2
+    assert result.refs == {"refs/heads/main": "ok"}
+
+    # Non-fast-forward rejections are reported per ref, not retried.
+    _git(repo, "commit", "--amend", "-qm", "rewritten")
+    rejected = PushCoordinator(window=0, backoff=0.01).push(["refs/heads/main"], cwd=repo)
+    assert not rejected.ok and rejected.attempts == 1
+    assert rejected.refs["refs/heads/main"].startswith("rejected")
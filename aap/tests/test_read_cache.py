@@ -0,0 +1,78 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from aap import config
+from aap.archive import archive
+from aap.read_cache import ProposalReadCache, etag_matches
+from aap.state import ProposalState
+from aap.storage import load_proposal
+from aap.watch import WatchHub
+
+
+def test_versions_etags_and_cached_bodies(cli):
+    cli("propose", "--id", "r1", "--agent", "alpha", "--goal", "g", "--scope", "svc/")
+    hub = WatchHub(poll_interval=60)
+    try:
+        cache = ProposalReadCache(hub=hub)
+        first = cache.get("r1")
+        assert first.etag == cache.etag("r1") and first.etag.startswith('"r1.0.')
+        assert json.loads(first.body)["state"] == "proposed"
+        assert cache.get("r1") is first and cache.hits == 1
+
+        listing = cache.get_list()
+        assert listing.etag == cache.list_etag(cache.list_version()) and cache.get_list() is listing
+
+        cli("propose", "--id", "r2", "--agent", "alpha", "--goal", "g" * 5000)
+        hub.pump()
+        assert cache.etag("r1") == first.etag and cache.etag("r2").startswith('"r2.1.')
+        listing2 = cache.get_list()
+        assert listing2.version == 1
+        assert [p["id"] for p in json.loads(listing2.body)] == ["r2", "r1"]
+        assert json.loads(gzip.decompress(listing2.gzipped())) == json.loads(listing2.body)
+
+        # proposals without audit events fall back to a content hash
+        (config.PROPOSAL_DIR / "legacy.yaml").write_text((config.PROPOSAL_DIR / "r1.yaml").read_text().replace("r1", "legacy"))
+        assert cache.etag("legacy") is None
+        assert cache.get("legacy").etag == cache.get("legacy").etag
+
+        # a write that bypasses the audit log still moves the ETag; a deleted proposal has none
+        path = config.PROPOSAL_DIR / "r1.yaml"
+        path.write_text(path.read_text().replace("goal: g", "goal: edited"))
+        os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 1))
+        assert cache.etag("r1") != first.etag and json.loads(cache.get("r1").body)["goal"] == "edited"
+        path.unlink()
+        assert cache.etag("r1") is None
+        with pytest.raises(FileNotFoundError):
+            cache.get("r1")
+    finally:
+        hub.close()
+
+
+def test_list_moves_when_archiving_changes_the_hot_set(cli):
+    for pid in ("a1", "a2"):
+        cli("propose", "--id", pid, "--agent", "alpha", "--goal", "g", "--scope", f"svc/{pid}/")
+    proposal = load_proposal("a1")
+    proposal.state = ProposalState.COMMITTED
+    proposal.save()
+    hub = WatchHub(poll_interval=60)
+    try:
+        cache = ProposalReadCache(hub=hub)
+        listing = cache.get_list()
+        assert sorted(p["id"] for p in json.loads(listing.body)) == ["a1", "a2"]
+        rv = hub.rv
+        assert archive(older_than_days=0)["archived"] == ["a1"]
+        assert hub.rv == rv and cache.list_etag(cache.list_version()) != listing.etag  # no event, still a new ETag
+        assert [p["id"] for p in json.loads(cache.get_list().body)] == ["a2"]
+    finally:
+        hub.close()
+
+
+def test_if_none_match():
+    assert etag_matches('"a.1"', '"a.1"')
+    assert etag_matches('W/"x", "a.1-gzip"', '"a.1"')
+    assert etag_matches("*", '"a.1"')
+    assert not etag_matches('"a.0"', '"a.1"')
+    assert not etag_matches(None, '"a.1"')
@@ -0,0 +1,46 @@
+from pathlib import Path
+
+from aap import config, db
+from aap.audit import record_event
+from aap.auth import totp_now
+from aap.replay import rebuild, replay, take_snapshot
+from aap.stats import rebuild_stats
+from aap.storage import list_proposals, load_proposal
+from aap.utils import load_yaml_or_json
+
+EXAMPLE_EVIDENCE = Path(config.BASE_DIR) / "evidence" / "example" / "results.json"
+
+
+def test_replay_matches_yaml_store_and_supports_point_in_time(cli, store):
+    for pid in ("r1", "r2"):
+        cli("propose", "--id", pid, "--agent", "a", "--goal", "g", "--scope", "svc/", "--constraints", "no_production_push_by_agent")
+        cli("evaluate", pid, "--evidence", EXAMPLE_EVIDENCE)
+    take_snapshot()
+    cli("decide", "r1", "--accept", "--by", "tester", "--otp", totp_now())
+
+    expected = {p.id: p.to_dict() for p in list_proposals()}
+    result = rebuild(to_db=True, yaml_dir=store / "rebuilt")
+    assert result["snapshot_event_id"] == 4
+    assert result["events_applied"] == 1
+    assert result["proposals"] == expected
+    assert load_yaml_or_json(store / "rebuilt" / "r1.yaml") == expected["r1"]
+    assert {row["state"] for row in db.read_state_counts()} == {"accepted", "evaluated"}
+
+    # Point in time: before the decision, r1 was still EVALUATED with no decision.
+    earlier = replay(until_id=4)
+    assert earlier["proposals"]["r1"]["state"] == "evaluated"
+    assert earlier["proposals"]["r1"]["decision"] == {}
+
+
+def test_evidence_uploads_do_not_move_state(cli, store):
+    cli("propose", "--id", "u1", "--agent", "a", "--goal", "g", "--scope", "svc/", "--constraints", "no_production_push_by_agent")
+    cli("evaluate", "u1", "--evidence", EXAMPLE_EVIDENCE)
+    cli("decide", "u1", "--accept", "--by", "tester", "--otp", totp_now())
+    # An upload that started before the decision, recorded the old way (with a stale state).
+    record_event("evidence", "u1", "a", {"name": "late.json", "sha256": "x", "size": 1, "state": "evaluated"})
+    cli("evidence", "put", "u1", EXAMPLE_EVIDENCE)
+
+    assert replay()["proposals"]["u1"] == load_proposal("u1").to_dict()
+    assert load_proposal("u1").state.value == "accepted"
+    assert rebuild_stats()["proposals"] == 1
+    assert {row["state"] for row in db.read_state_counts()} == {"accepted"}
@@ -0,0 +1,66 @@
+import gzip
+import json
+
+import pytest
+
+from aap.audit import verify_chain
+from aap.db import max_seq
+from aap.replication import apply, restore, ship, status
+from aap.storage import list_proposals, load_proposal
+from aap.utils import use_data_dir
+
+
+def _propose(cli, pid):
+    cli("propose", "--agent", "a", "--goal", "g", "--scope", f"svc/{pid}/", "--constraints",
+        "no_production_push_by_agent", "--id", pid)
+
+
+@pytest.fixture
+def primary(cli, store):
+    evidence = store / "ev.json"
+    evidence.write_text(
+        '{"unit_tests": "pass", "integration_tests": "pass", "lint": "pass", '
+        '"runner": "r", "run_id": "1", "artifact_sha256": "x"}'
+    )
+    for pid in ("a1", "a2"):
+        _propose(cli, pid)
+    cli("evaluate", "a1", "--evidence", evidence)
+    return store
+
+
+def test_restore_then_follow_with_lag(cli, primary):
+    target = primary / "ship"
+    assert ship(target) == {"shipped": 3, "last_seq": 2}
+    assert ship(target)["shipped"] == 0
+    expected = {p.id: p.to_dict() for p in list_proposals()}
+
+    replica = primary / "replica"
+    assert restore(target, replica) == {"applied": 3, "applied_seq": 2, "verified": True}
+    with use_data_dir(replica):
+        assert {p.id: p.to_dict() for p in list_proposals()} == expected
+        assert max_seq() == 2 and verify_chain()["ok"]
+        with pytest.raises(RuntimeError, match="empty data directory"):
+            restore(target)
+
+    _propose(cli, "a3")
+    ship(target)
+    expected = load_proposal("a3").to_dict()
+    with use_data_dir(replica):
+        lag = status(target)
+        assert lag["lag_events"] == 1 and lag["lag_seconds"] >= 0
+        assert apply(target) == {"applied": 1, "applied_seq": 3}
+        assert apply(target)["applied"] == 0
+        assert status(target)["lag_events"] == 0 and status(target)["lag_seconds"] == 0
+        assert load_proposal("a3").to_dict() == expected
+
+
+def test_replica_refuses_a_broken_chain(primary):
+    target = primary / "ship"
+    ship(target)
+    segment = next((target / "segments").iterdir())
+    entries = [json.loads(line) for line in gzip.decompress(segment.read_bytes()).splitlines()]
+    entries[1]["data"]["goal"] = "tampered"
+    segment.write_bytes(gzip.compress("".join(json.dumps(e) + "\n" for e in entries).encode()))
+    with use_data_dir(primary / "replica"):
+        with pytest.raises(RuntimeError, match="does not continue the replica's chain at seq 1"):
+            apply(target)
@@ -0,0 +1,50 @@
+import sqlite3
+
+from aap import config
+from aap.db import queue_claim, queue_peek, queue_release, queue_size
+from aap.state import ProposalState
+from aap.storage import Proposal, load_proposal
+
+
+def _evaluated(pid, risk, evaluated_at, delta=0.0, agent="a"):
+    Proposal(
+        id=pid, agent=agent, goal="g", scope=[], constraints=[], risk_level=risk,
+        state=ProposalState.EVALUATED, policy={"evaluated_at": evaluated_at},
+        evidence={"performance": delta},
+    ).save()
+
+
+def test_queue_orders_by_risk_age_and_delta(store):
+    _evaluated("low-old", "low", "2024-01-01")
+    _evaluated("high-new", "high", "2024-03-01")
+    _evaluated("high-old-small", "high", "2024-02-01", delta=1)
+    _evaluated("high-old-big", "high", "2024-02-01", delta=4)
+    Proposal(id="draft", agent="a", goal="g", scope=[], constraints=[]).save()
+    assert [r["proposal_id"] for r in queue_peek(10)] == ["high-old-big", "high-old-small", "high-new", "low-old"]
+
+    # a decision (or any other transition) drops the proposal from the queue
+    proposal = load_proposal("high-old-big")
+    proposal.state = ProposalState.ACCEPTED
+    proposal.save()
+    assert [r["proposal_id"] for r in queue_peek(1)] == ["high-old-small"]
+
+    with sqlite3.connect(config.DB_FILE) as conn:
+        plan = " ".join(row[-1] for row in conn.execute(
+            "explain query plan select proposal_id from review_queue "
+            "order by risk_rank, queued_at, perf_delta desc, agent, proposal_id limit 1"
+        ))
+    assert "review_queue_order" in plan and "TEMP B-TREE" not in plan
+
+
+def test_claims_keep_reviewers_apart_until_released_or_expired(store):
+    for i in range(3):
+        _evaluated(f"p{i}", "medium", f"2024-01-0{i + 1}")
+    assert [r["proposal_id"] for r in queue_claim(2, "h1", 60)] == ["p0", "p1"]
+    assert [r["proposal_id"] for r in queue_claim(2, "h2", 60)] == ["p2"]
+    assert queue_claim(1, "h3", 60) == [] and queue_size() == {"queued": 3, "claimed": 3}
+    assert [r["proposal_id"] for r in queue_peek(5, by="h1")] == ["p0", "p1"]
+    assert len(queue_peek(5, include_claimed=True)) == 3
+
+    assert queue_release(["p0", "p2"], "h1") == 1  # p2 is h2's
+    assert [r["proposal_id"] for r in queue_claim(5, "h3", 0)] == ["p0"]
+    assert [r["proposal_id"] for r in queue_claim(5, "h4", 60)] == ["p0"]  # h3's lease already ran out
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from aap import config
+from aap.db import list_events
+from aap.ingest import ingest_lines
+from aap.scopes import ScopeIndex, conflict_pairs
+from aap.state import ProposalState
+from aap.storage import load_proposal
+
+PROPOSE = ("propose", "--agent", "a", "--goal", "g", "--constraints", "no_production_push_by_agent")
+
+
+def test_trie_finds_prefix_overlaps_both_ways():
+    index = ScopeIndex()
+    index.set("p1", ["svc/api/", "docs/"])
+    index.set("p2", ["svc/"])
+    index.set("p3", ["svc2/"])
+    assert index.overlapping(["svc/api/handlers.py"]) == {
+        "p1": [["svc/api/handlers.py", "svc/api/"]],
+        "p2": [["svc/api/handlers.py", "svc/"]],
+    }
+    assert index.overlapping(["svc/"], exclude="p2") == {"p1": [["svc/", "svc/api/"]]}
+    assert index.overlapping(["lib/"]) == {}
+    assert [(p["a"], p["b"]) for p in index.pairs()] == [("p1", "p2")]
+
+    index.remove("p1")
+    index.set("p2", [])
+    assert index.overlapping(["svc/api/"]) == {}
+    assert set(index.root.children) == {"s"} and len(index) == 1
+
+
+def test_propose_warns_and_index_follows_transitions(cli, store, capsys):
+    cli(*PROPOSE, "--scope", "svc/api/", "--id", "a1")
+    cli(*PROPOSE, "--scope", "svc/", "--id", "a2")
+    assert "warning: Scope overlaps in-flight proposal a1: svc/ ~ svc/api/" in capsys.readouterr().out
+    assert list_events(limit=1)[0]["data"]["conflicts"] == {"a1": [["svc/", "svc/api/"]]}
+    assert [(p["a"], p["b"]) for p in conflict_pairs()] == [("a1", "a2")]
+
+    proposal = load_proposal("a1")
+    proposal.state = ProposalState.REJECTED
+    proposal.save()
+    assert conflict_pairs() == []
+
+
+def test_policy_can_block_overlaps(cli, store):
+    policy = store / "strict.yaml"
+    policy.write_text(config.DEFAULT_POLICY_FILE.read_text().replace("scope_conflicts: warn", "scope_conflicts: block"))
+    cli(*PROPOSE, "--scope", "svc/", "--id", "a1")
+    with pytest.raises(SystemExit, match="overlaps in-flight proposal a1"):
+        cli(*PROPOSE, "--scope", "svc/x.py", "--id", "a2", "--policy", policy)
+
+    cli(*PROPOSE, "--scope", "svc/y.py", "--id", "a3")  # default policy only warns
+    evidence = store / "ev.json"
+    evidence.write_text(
+        '{"unit_tests": "pass", "integration_tests": "pass", "lint": "pass", '
+        '"runner": "r", "run_id": "1", "artifact_sha256": "x"}'
+    )
+    cli("evaluate", "a3", "--evidence", evidence, "--policy", policy)
+    evaluated = load_proposal("a3")
+    assert evaluated.state == ProposalState.PROPOSED and not evaluated.policy["passed"]
+    assert evaluated.policy["conflicts"] == {"a1": [["svc/y.py", "svc/"]]}
+
+
+def test_batch_ingest_honours_block(cli, store):
+    policy = store / "strict.yaml"
+    policy.write_text(config.DEFAULT_POLICY_FILE.read_text().replace("scope_conflicts: warn", "scope_conflicts: block"))
+    cli(*PROPOSE, "--scope", "svc/", "--id", "a1")
+    records = [
+        {"id": "b1", "scope": ["svc/x.py"], "policy": str(policy)},  # overlaps a1
+        {"id": "b2", "scope": ["lib/"], "policy": str(policy)},
+        {"id": "b3", "scope": ["lib/util.py"], "policy": str(policy)},  # overlaps b2, same batch
+        {"id": "b4", "scope": ["lib/util.py"]},  # default policy only warns
+    ]
+    lines = [json.dumps({"agent": "a", "goal": "g", **record}) for record in records]
+    results = {r["id"]: r for r in ingest_lines(lines)}
+    assert {pid: r["status"] for pid, r in results.items()} == {
+        "b1": "refused", "b2": "created", "b3": "refused", "b4": "created",
+    }
+    assert "overlaps in-flight proposal a1" in results["b1"]["error"]
+    assert "overlaps in-flight proposal b2" in results["b3"]["error"]
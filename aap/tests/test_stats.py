@@ -0,0 +1,29 @@
+from pathlib import Path
+
+from aap import config, db
+from aap.auth import totp_now
+from aap.stats import get_stats, rebuild_stats
+
+EXAMPLE_EVIDENCE = Path(config.BASE_DIR) / "evidence" / "example" / "results.json"
+
+
+def _flow(cli, pid, agent, accept=True):
+    cli("propose", "--id", pid, "--agent", agent, "--goal", "g", "--scope", "svc/", "--constraints", "no_production_push_by_agent")
+    cli("evaluate", pid, "--evidence", EXAMPLE_EVIDENCE)
+    cli("decide", pid, "--accept" if accept else "--reject", "--by", "tester", "--otp", totp_now())
+
+
+def test_counters_track_transitions_and_rebuild(cli):
+    _flow(cli, "a1", "alpha")
+    _flow(cli, "a2", "alpha", accept=False)
+    cli("propose", "--id", "b1", "--agent", "beta", "--goal", "g", "--scope", "svc/", "--risk-level", "high")
+
+    stats = get_stats()
+    assert stats["states"] == {"accepted": 1, "rejected": 1, "proposed": 1}
+    assert stats["agents"]["beta"] == {"proposed": 1}
+    assert stats["reject_rate"] == 0.5
+    assert db.read_state_counts("beta")[0]["risk_level"] == "high"
+
+    before = (db.read_state_counts(), db.read_transition_counts())
+    rebuild_stats()
+    assert (db.read_state_counts(), db.read_transition_counts()) == before
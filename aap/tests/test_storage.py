@@ -0,0 +1,63 @@
+import pytest
+
+from aap.state import ProposalState
+from aap.storage import _UNLOADED, Proposal, StaleProposal, list_proposals, list_summaries, load_proposal
+
+
+def _proposal(pid, **kwargs):
+    fields = dict(id=pid, agent="a", goal=f"goal {pid}", scope=["svc/"], constraints=[], state=ProposalState.PROPOSED)
+    fields.update(kwargs)
+    return Proposal(**fields)
+
+
+def test_projection_loads_heavy_fields_lazily(store):
+    evidence = {"passed": False, "failures": [f"test_{i} failed" for i in range(50)], "nested": {"list": [1, 2]}}
+    _proposal("p1", policy={"name": "default", "violations": ["x"]}, evidence=evidence, decision={}).save()
+
+    lazy = load_proposal("p1", fields=())
+    assert lazy._evidence is _UNLOADED and lazy._policy is _UNLOADED
+    assert lazy.evidence == evidence  # read on first access
+    assert lazy.policy["violations"] == ["x"] and lazy.commit == {}
+    assert lazy == load_proposal("p1")
+    assert not hasattr(lazy, "__dict__")
+
+    partial = load_proposal("p1", fields=["policy"])
+    assert partial._policy == {"name": "default", "violations": ["x"]} and partial._evidence is _UNLOADED
+
+
+def test_summaries_and_lazy_list_match_full(store):
+    for i in range(5):
+        _proposal(f"p{i}", evidence={"failures": ["boom"] * i}).save()
+    full = list_proposals()
+    summaries = list_summaries()
+    assert [s.id for s in summaries] == [p.id for p in full]
+    assert summaries[0].state == ProposalState.PROPOSED and summaries[0].goal == full[0].goal
+    assert summaries[0].load().to_dict() == full[0].to_dict()
+    assert [p.to_dict() for p in list_proposals(fields=())] == [p.to_dict() for p in full]
+
+
+def test_lazy_copy_saves_unchanged_heavy_fields(store):
+    _proposal("p1", evidence={"passed": True}).save()
+    lazy = load_proposal("p1", fields=())
+    lazy.goal = "changed"
+    lazy.save()
+    stored = load_proposal("p1")
+    assert stored.goal == "changed" and stored.evidence == {"passed": True}
+
+
+def test_lazy_fields_never_mix_versions(store):
+    _proposal("p1", evidence={"passed": False}).save()
+    reader = load_proposal("p1", fields=())
+    writer = load_proposal("p1", fields=())
+    newer = load_proposal("p1")
+    newer.evidence = {"passed": True}
+    newer.update_state(ProposalState.EVALUATED)
+    newer.save()
+
+    # an untouched copy is refreshed whole from the newer record
+    assert reader.evidence == {"passed": True} and reader.state == ProposalState.EVALUATED
+    # saving a copy changed meanwhile refuses to combine its fields with the newer ones
+    writer.goal = "stale edit"
+    with pytest.raises(StaleProposal):
+        writer.save()
+    assert load_proposal("p1").goal == "goal p1"
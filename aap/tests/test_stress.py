@@ -0,0 +1,56 @@
+import pytest
+
+from aap import config
+from aap.auth import totp_now
+from aap.gate import decide
+from aap.state import ProposalState
+from aap.storage import load_proposal
+from aap.stress import StressConfig, check_invariants, run_stress
+
+
+def test_check_invariants_flags_lost_and_unaudited_updates(cli, store):
+    evidence = store / "ev.json"
+    evidence.write_text(
+        '{"unit_tests": "pass", "integration_tests": "pass", "lint": "pass", '
+        '"runner": "r", "run_id": "1", "artifact_sha256": "x"}'
+    )
+    for pid in ("a1", "a2"):
+        cli("propose", "--agent", "a", "--goal", "g", "--scope", "svc/", "--constraints",
+            "no_production_push_by_agent", "--id", pid)
+        cli("evaluate", pid, "--evidence", evidence)
+    assert check_invariants([])["violation_counts"] == {}
+
+    # a second acknowledged decision, and a state change written without an audit event
+    ops = [{"op": "decide", "id": "a1", "outcome": "ok", "accept": True, "ms": 1.0}] * 2
+    proposal = load_proposal("a2")
+    proposal.state = ProposalState.ACCEPTED
+    proposal.save()
+    result = check_invariants(ops)
+    assert result["violation_counts"] == {"lost_update": 1, "missing_audit": 1}
+
+
+def test_small_round_holds_invariants(tmp_path):
+    report = run_stress(StressConfig(agents=3, humans=2, duration=1.5, mode="mixed"), tmp_path / "run")
+    assert report["ok"], report["invariants"]["violations"]
+    assert report["ops"]["propose"]["ok"] > 0 and report["hung"] == report["crashed"] == 0
+    assert report["invariants"]["proposals"] == report["ops"]["propose"]["ok"]
+
+
+def test_decide_rechecks_state_under_lock(cli, store, monkeypatch):
+    # The race the harness found: two humans deciding from the same EVALUATED copy.
+    allowlist = store / "allow.txt"
+    allowlist.write_text("h1\nh2\n")
+    monkeypatch.setattr(config, "AUTH_ALLOWLIST_FILE", allowlist)
+    evidence = store / "ev.json"
+    evidence.write_text(
+        '{"unit_tests": "pass", "integration_tests": "pass", "lint": "pass", '
+        '"runner": "r", "run_id": "1", "artifact_sha256": "x"}'
+    )
+    cli("propose", "--agent", "a", "--goal", "g", "--scope", "svc/", "--constraints",
+        "no_production_push_by_agent", "--id", "a1")
+    cli("evaluate", "a1", "--evidence", evidence)
+    first, second = load_proposal("a1"), load_proposal("a1")
+    decide(first, "accept", "h1", otp=totp_now())
+    with pytest.raises(ValueError, match="Illegal transition"):
+        decide(second, "reject", "h2", otp=totp_now())
+    assert load_proposal("a1").state == ProposalState.ACCEPTED
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+
+import pytest
+
+from aap import watch
+
+
+@pytest.fixture
+def make_hub(cli):
+    hubs = []
+
+    def make(**kwargs):
+        hubs.append(watch.WatchHub(**kwargs))
+        return hubs[-1]
+
+    yield make
+    for h in hubs:
+        h.close()
+
+
+def _propose(cli, pid, agent="alpha"):
+    cli("propose", "--id", pid, "--agent", agent, "--goal", "g", "--scope", "svc/")
+
+
+def test_long_poll_backlog_and_live_change(cli, make_hub):
+    hub = make_hub(poll_interval=0.02)
+    _propose(cli, "w1")
+    _propose(cli, "w2")
+
+    backlog = asyncio.run(hub.poll(-1, timeout=1))
+    assert [(c["proposal_id"], c["state"]) for c in backlog["changes"]] == [("w1", "proposed"), ("w2", "proposed")]
+    rv = backlog["rv"]
+
+    timer = threading.Timer(0.1, _propose, args=(cli, "w3"))
+    timer.start()
+    live = asyncio.run(hub.poll(rv, timeout=5))
+    timer.join()
+    assert [c["proposal_id"] for c in live["changes"]] == ["w3"]
+    assert live["rv"] == rv + 1
+
+    only_w1 = asyncio.run(hub.poll(-1, timeout=0.05, proposal_id="w1"))
+    assert [c["rv"] for c in only_w1["changes"]] == [0]
+    assert asyncio.run(hub.poll(live["rv"], timeout=0.05))["changes"] == []
+
+
+def test_slow_subscriber_is_evicted(cli, make_hub):
+    hub = make_hub(buffer_size=2, poll_interval=60)
+    subscriber = hub.subscribe()
+    for i in range(3):
+        _propose(cli, f"e{i}")
+    hub.pump()
+    assert subscriber.evicted
+    assert [c["proposal_id"] for c in subscriber.wait(0)] == ["e0", "e1"]
+    assert hub.metrics()["evictions"] == 1 and hub.metrics()["subscribers"] == 0
+
+
+def test_stream_catches_up_then_follows(cli, make_hub):
+    hub = make_hub(poll_interval=0.02)
+    _propose(cli, "s1")
+
+    async def follow():
+        seen = []
+        async for item in hub.stream(-1, heartbeat=0.05):
+            if "rv" in item:
+                seen.append(item["proposal_id"])
+                if len(seen) == 1:
+                    await asyncio.get_running_loop().run_in_executor(None, _propose, cli, "s2")
+            if len(seen) == 2:
+                return seen
+
+    assert asyncio.run(asyncio.wait_for(follow(), 5)) == ["s1", "s2"]
@@ -0,0 +1,77 @@
+import subprocess
+
+import pytest
+
+from aap.adapters import git_adapter
+from aap.adapters.worktree_pool import WorktreePool
+from aap.state import ProposalState
+from aap.storage import Proposal, load_proposal
+
+
+def test_leases_are_isolated_and_reset(store, repo):
+    pool = WorktreePool(repo_root=repo, pool_dir=store / "pool", size=2)
+    first = pool.lease("p1")
+    second = pool.lease("p2")
+    assert first.path != second.path
+    assert pool.lease("p1").slot == first.slot  # renewing keeps the slot
+    with pytest.raises(RuntimeError):
+        pool.lease("p3")
+
+    scratch = store / "pool" / first.slot / "scratch.txt"
+    scratch.write_text("dirty")
+    assert pool.release("p1")
+    assert not scratch.exists()
+    assert pool.lease("p3").slot == first.slot
+
+
+def test_stale_leases_are_reclaimed(store, repo):
+    pool = WorktreePool(repo_root=repo, pool_dir=store / "pool", size=1)
+    pool.lease("p1", ttl=-1)
+    assert pool.find("p1") is None
+    assert pool.lease("p2").slot == "slot-0"
+    assert pool.reclaim_stale() == []
+
+
+def test_commit_runs_inside_leased_worktree(cli, store, repo, monkeypatch):
+    monkeypatch.setattr(git_adapter, "default_repo_root", lambda: repo)
+    Proposal(id="wt1", agent="a", goal="g", scope=["svc/"], constraints=[], state=ProposalState.ACCEPTED).save()
+    lease = WorktreePool(repo_root=repo, pool_dir=store / "pool").lease("wt1")
+    (store / "pool" / lease.slot / "svc").mkdir()
+    (store / "pool" / lease.slot / "svc" / "a.py").write_text("x = 1\n")
+
+    monkeypatch.setattr("aap.config.WORKTREE_POOL_DIR", store / "pool")
+    cli("commit", "wt1", "--stage-all", "--worktree")
+
+    sha = load_proposal("wt1").commit["sha"]
+    tagged = subprocess.run(["git", "rev-list", "-n1", "aap/wt1"], cwd=repo, capture_output=True, text=True)
+    assert tagged.stdout.strip() == sha
+    assert not (repo / "svc").exists()  # main working tree untouched
+    assert WorktreePool(repo_root=repo, pool_dir=store / "pool").find("wt1") is None
+
+
+def _commit_in_slot(cli, store, repo, pid, name, *flags):
+    Proposal(id=pid, agent="a", goal="g", scope=["svc/"], constraints=[], state=ProposalState.ACCEPTED).save()
+    lease = WorktreePool(repo_root=repo, pool_dir=store / "pool").lease(pid)
+    (store / "pool" / lease.slot / "svc").mkdir(exist_ok=True)
+    (store / "pool" / lease.slot / "svc" / name).write_text("x = 1\n")
+    cli("commit", pid, "--stage-all", "--worktree", *flags)
+    return load_proposal(pid).commit
+
+
+def test_worktree_commits_stay_reachable_and_push_fast_forward(cli, store, repo, monkeypatch):
+    monkeypatch.setattr(git_adapter, "default_repo_root", lambda: repo)
+    monkeypatch.setattr("aap.config.WORKTREE_POOL_DIR", store / "pool")
+    remote = store / "remote.git"
+    subprocess.run(["git", "init", "-q", "--bare", str(remote)], check=True)
+    subprocess.run(["git", "remote", "add", "origin", str(remote)], cwd=repo, check=True)
+
+    untagged = _commit_in_slot(cli, store, repo, "k1", "k.py", "--no-tag")
+    assert untagged["ref"] == "refs/aap/k1"
+    assert git_adapter.rev_parse("refs/aap/k1", cwd=repo) == untagged["sha"]
+
+    # Both slots start from the same base; the second push is replayed onto the first.
+    first = _commit_in_slot(cli, store, repo, "p1", "a.py", "--push", "--branch", "main")
+    second = _commit_in_slot(cli, store, repo, "p2", "b.py", "--push", "--branch", "main")
+    assert git_adapter.rev_parse("main", cwd=remote) == second["sha"]
+    assert git_adapter.rev_parse(f"{second['sha']}^", cwd=remote) == first["sha"]
+    assert git_adapter.rev_parse("refs/aap/p2", cwd=repo) == second["sha"]
@@ -1,16 +1,21 @@
 import json
+from contextlib import contextmanager
 from datetime import datetime, timezone
 import hashlib
 import os
-from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Set
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
 
 try:
     import yaml  # type: ignore
 except ImportError:
     yaml = None
 
+if yaml:
+    # libyaml bindings when available: same output, several times faster to parse.
+    _YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    _YamlDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
 
 def utc_now() -> str:
     """Return an ISO 8601 timestamp with Z suffix."""
@@ -24,21 +29,35 @@ def ensure_dir(path: Path) -> None:
 def load_yaml_or_json(path: Path) -> Dict[str, Any]:
     if not path.exists():
         return {}
-    text = path.read_text()
+    return parse_yaml_or_json(path.read_text())
+
+
+def parse_yaml_or_json(text: str) -> Dict[str, Any]:
     if not text.strip():
         return {}
     if yaml:
-        return yaml.safe_load(text) or {}
+        return yaml.load(text, Loader=_YamlLoader) or {}
     return json.loads(text)
 
 
+def serialize_yaml_or_json(data: Dict[str, Any]) -> str:
+    if yaml:
+        return yaml.dump(data, Dumper=_YamlDumper, sort_keys=False)
+    return json.dumps(data, indent=2)
+
+
 def dump_yaml_or_json(data: Dict[str, Any], path: Path) -> None:
     ensure_dir(path.parent)
-    if yaml:
-        serialized = yaml.safe_dump(data, sort_keys=False)
-        path.write_text(serialized)
-    else:
-        path.write_text(json.dumps(data, indent=2))
+    path.write_text(serialize_yaml_or_json(data))
+
+
+def fsync_dir(path: Path) -> None:
+    """Flush directory entries (new/renamed files) to disk."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
 
 
 def sha256_file(path: Path) -> str:
@@ -61,15 +80,29 @@ def read_allowlist(path: Path) -> Set[str]:
     return set(entries)
 
 
+def file_lock(lock_path: Path, shared: bool = False, timeout: Optional[float] = None):
+    """Advisory flock on ``lock_path``, exclusive unless ``shared``.
+
+    Goes through the process-wide :class:`aap.locks.LockManager`, so it is
+    re-entrant per thread, gives up after ``timeout`` seconds (``LOCK_TIMEOUT``
+    by default) with ``LockTimeout``, and records wait/hold times under the
+    file's stem.
+    """
+    from .locks import lock_manager
+
+    return lock_manager().hold(lock_path, shared=shared, timeout=timeout)
+
+
 @contextmanager
-def file_lock(lock_path: Path):
-    """Advisory lock using fcntl (best-effort)."""
-    ensure_dir(lock_path.parent)
-    import fcntl
-
-    with lock_path.open("w") as lock_file:
-        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
-        try:
-            yield
-        finally:
-            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+def use_data_dir(data_dir: Path) -> Iterator[None]:
+    """Point every writable AAP location (``config.DATA_PATHS``) at ``data_dir``, restored on exit."""
+    from . import config
+
+    saved = {name: getattr(config, name) for name in config.DATA_PATHS}
+    for name, rel in config.DATA_PATHS.items():
+        setattr(config, name, data_dir / rel)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(config, name, value)
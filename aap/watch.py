@@ -0,0 +1,268 @@
+"""Change feed for proposals: a broadcast hub behind SSE watches and long-polls.
+
+The resource version (rv) of a change is the audit ``seq`` of its event, so it
+increases monotonically across processes (-1 means "before the first event").
+One background thread per process tails the events table, woken immediately by
+in-process audit writes and checking for writes from other processes (other
+API workers, the CLI) every ``poll_interval``. That check is the O(1)
+invalidation-bus generation (aap/invalidation.py), and the table is only read
+when it moved. Readers call :meth:`WatchHub.sync` for the same check, so a
+request sees another worker's write right away. The thread fans new changes out
+to subscribers. Each subscriber buffers at most
+``buffer_size`` live changes; one that falls further behind is evicted and
+resumes from its last rv. Catch-up from an older rv is paged from SQLite and
+never goes through the live buffers.
+"""
+
+import asyncio
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+from . import config
+from .audit import add_listener
+from .db import fetch_changes, latest_seq_by_proposal, max_seq
+from .invalidation import generation
+
+PAGE_SIZE = 500
+
+
+class Subscriber:
+    def __init__(
+        self,
+        start: int,
+        buffer_size: int,
+        proposal_id: Optional[str] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ) -> None:
+        self.start = start  # hub rv at registration; later changes arrive live
+        self.proposal_id = proposal_id
+        self.buffer_size = buffer_size
+        self.evicted = False
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._cond = threading.Condition()
+        # The loop to wake for wait_async (given when subscribing from a worker thread).
+        self._loop = loop or (asyncio.get_running_loop() if _in_event_loop() else None)
+        self._ready = asyncio.Event() if self._loop else None
+
+    def _offer(self, change: Dict[str, Any]) -> bool:
+        """Called by the hub thread; returns False once the subscriber is evicted."""
+        if self.proposal_id and change["proposal_id"] != self.proposal_id:
+            return True
+        with self._cond:
+            if len(self._buffer) >= self.buffer_size:
+                self.evicted = True
+            else:
+                self._buffer.append(change)
+            self._cond.notify_all()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        return not self.evicted
+
+    def _take(self) -> List[Dict[str, Any]]:
+        changes = list(self._buffer)
+        self._buffer.clear()
+        return changes
+
+    def wait(self, timeout: float) -> List[Dict[str, Any]]:
+        """Block until changes arrive, the subscriber is evicted, or ``timeout`` passes."""
+        with self._cond:
+            if not self._buffer and not self.evicted:
+                self._cond.wait(timeout)
+            return self._take()
+
+    async def wait_async(self, timeout: float) -> List[Dict[str, Any]]:
+        with self._cond:
+            if self._buffer or self.evicted:
+                return self._take()
+            self._ready.clear()
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        with self._cond:
+            return self._take()
+
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class WatchHub:
+    def __init__(self, buffer_size: Optional[int] = None, poll_interval: Optional[float] = None) -> None:
+        self.buffer_size = buffer_size or config.WATCH_BUFFER_SIZE
+        self.poll_interval = config.WATCH_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.rv = -1
+        self.versions: Dict[str, int] = {}  # proposal id -> rv of its latest change
+        self.evictions = 0
+        self._subscribers: List[Subscriber] = []
+        self._lock = threading.Lock()
+        self._pump_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._events_gen: Optional[int] = None  # "events" generation last pumped at
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._events_gen = generation("events")
+            self.rv = max_seq()
+            self.versions = latest_seq_by_proposal()
+            self._thread = threading.Thread(target=self._loop, name="aap-watch-hub", daemon=True)
+            self._thread.start()
+
+    def notify(self, *_: Any) -> None:
+        """Catch up right after an in-process audit write (registered as an audit listener),
+        so versions served to readers never lag this process's own writes."""
+        if self._thread is None:
+            return
+        try:
+            self.pump()
+        except Exception:
+            self._wakeup.set()
+
+    def sync(self) -> None:
+        """Pump if any process has written events since the last pump; O(1) otherwise."""
+        current = generation("events")
+        if current != self._events_gen:
+            self._events_gen = current  # taken before the pump: later writes move it again
+            self.pump()
+
+    def close(self) -> None:
+        """Stop the tailer thread (subscribers get nothing further)."""
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _loop(self) -> None:
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            if self._closed:
+                return
+            try:
+                self.sync()
+            except Exception:
+                # DB briefly unavailable; try again on the next tick.
+                continue
+
+    def pump(self) -> int:
+        """Fan out every event newer than the hub's rv; returns the number delivered."""
+        delivered = 0
+        with self._pump_lock:
+            while True:
+                changes = fetch_changes(self.rv, limit=PAGE_SIZE)
+                if not changes:
+                    return delivered
+                with self._lock:
+                    for change in changes:
+                        kept = [s for s in self._subscribers if s._offer(change)]
+                        self.evictions += len(self._subscribers) - len(kept)
+                        self._subscribers = kept
+                        if change["proposal_id"]:
+                            self.versions[change["proposal_id"]] = change["rv"]
+                    self.rv = changes[-1]["rv"]
+                delivered += len(changes)
+
+    def subscribe(
+        self, proposal_id: Optional[str] = None, loop: Optional[asyncio.AbstractEventLoop] = None
+    ) -> Subscriber:
+        """Register for live changes newer than the hub's current rv (``subscriber.start``)."""
+        self.start()
+        with self._lock:
+            subscriber = Subscriber(self.rv, self.buffer_size, proposal_id, loop)
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    async def _subscribe_async(self, proposal_id: Optional[str]) -> Subscriber:
+        """:meth:`subscribe` off the event loop (starting the hub reads SQLite)."""
+        from fastapi.concurrency import run_in_threadpool
+
+        return await run_in_threadpool(self.subscribe, proposal_id, asyncio.get_running_loop())
+
+    async def poll(self, since: int, timeout: float, proposal_id: Optional[str] = None) -> Dict[str, Any]:
+        """Long-poll: changes newer than ``since``, waiting up to ``timeout`` seconds for one.
+
+        SQLite reads run in the threadpool; only the wait happens on the event loop.
+        """
+        from fastapi.concurrency import run_in_threadpool
+
+        subscriber = await self._subscribe_async(proposal_id)
+        try:
+            changes: List[Dict[str, Any]] = []
+            if since < subscriber.start:
+                changes = await run_in_threadpool(
+                    fetch_changes, since, PAGE_SIZE, until_seq=subscriber.start, proposal_id=proposal_id
+                )
+            if not changes:
+                changes = await subscriber.wait_async(timeout)
+        finally:
+            self.unsubscribe(subscriber)
+        rv = changes[-1]["rv"] if changes else max(since, subscriber.start)
+        return {"rv": rv, "changes": changes}
+
+    async def stream(
+        self, since: Optional[int], proposal_id: Optional[str] = None, heartbeat: float = 15.0
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield changes forever: paged catch-up from ``since``, then live ones.
+
+        Yields ``{"heartbeat": rv}`` when idle and ``{"evicted": rv}`` as the last
+        item if the consumer fell too far behind. Catch-up pages are read in the
+        threadpool.
+        """
+        from fastapi.concurrency import run_in_threadpool
+
+        subscriber = await self._subscribe_async(proposal_id)
+        try:
+            after = subscriber.start if since is None else since
+            while after < subscriber.start:
+                page = await run_in_threadpool(
+                    fetch_changes, after, PAGE_SIZE, until_seq=subscriber.start, proposal_id=proposal_id
+                )
+                for change in page:
+                    yield change
+                if len(page) < PAGE_SIZE:
+                    break
+                after = page[-1]["rv"]
+            after = max(after, subscriber.start)
+            while True:
+                changes = await subscriber.wait_async(heartbeat)
+                for change in changes:
+                    after = change["rv"]
+                    yield change
+                if subscriber.evicted:
+                    yield {"evicted": after}
+                    return
+                if not changes:
+                    yield {"heartbeat": after}
+        finally:
+            self.unsubscribe(subscriber)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"rv": self.rv, "subscribers": len(self._subscribers), "evictions": self.evictions}
+
+
+_default: Optional[WatchHub] = None
+_default_lock = threading.Lock()
+
+
+def default_hub() -> WatchHub:
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = WatchHub()
+            add_listener(_default.notify)
+        return _default
@@ -21,6 +21,7 @@ setup(
             "hooks/pre-receive",
             "auth_allowlist.txt",
             "api_tokens.txt",
+            "rate_limits.yaml",
         ]
     },
     keywords=["agents", "governance", "authority", "control-plane", "cli"],